@@ -1,6 +1,27 @@
+import os
 from datetime import datetime, timedelta
+from pathlib import Path
 from airflow import DAG
 from airflow.operators.bash import BashOperator
+from airflow.operators.python import PythonOperator
+from airflow.utils.state import TaskInstanceState
+from airflow.utils.trigger_rule import TriggerRule
+import dbt_manifest
+
+DBT_PROJECT_DIR = os.getenv('DBT_PROJECT_DIR', '/opt/airflow/dbt/deel_takehome')
+DBT_PROFILES_DIR = os.getenv('DBT_PROFILES_DIR', DBT_PROJECT_DIR)
+DBT_TARGET = os.getenv('DBT_TARGET', 'dev')
+# Manifest the DAG is generated from, written by `dbt parse` (make dbt-manifest)
+DBT_MANIFEST_PATH = os.getenv('DBT_MANIFEST_PATH', os.path.join(DBT_PROJECT_DIR, 'target', 'manifest.json'))
+# Artifacts of the last run, the reference of the state:modified+ and result:error+ selections
+DBT_STATE_DIR = os.getenv('DBT_STATE_DIR', os.path.join(DBT_PROJECT_DIR, 'state'))
+# Airflow pool bounding the number of models built at the same time (make airflow-pools)
+DBT_POOL = os.getenv('DBT_POOL', 'dbt')
+# Selection of the scheduled runs, overridden per run with the `selection` key of the run configuration
+DBT_SELECTION = os.getenv('DBT_SELECTION', dbt_manifest.FULL)
+
+# Exit code of the model tasks not selected in the run (BashOperator's skip_on_exit_code)
+SKIP_EXIT_CODE = 99
 
 default_args = {
     'owner': 'airflow',
@@ -14,36 +35,92 @@ default_args = {
 dag = DAG(
     'dbt_models',
     default_args=default_args,
-    description='Run dbt models',
+    description='Build the dbt models, one task per model and its tests',
     schedule_interval=timedelta(days=1),
     start_date=datetime(2024, 1, 1),
     catchup=False,
+    max_active_runs=1,
 )
 
-# Define the dbt commands
-dbt_debug = BashOperator(
-    task_id='dbt_debug',
-    bash_command='cd /opt/airflow/dbt/deel_takehome && dbt debug',
-    dag=dag,
-)
 
+def dbt(args):
+    return dbt_manifest.dbt_command(args, DBT_PROJECT_DIR, DBT_PROFILES_DIR, DBT_TARGET)
+
+
+def select_models(**context):
+    """
+    Select the models built by the run and clear the artifacts of the previous run.
+
+    Returns:
+        List[str]: Unique ids of the selected models, pulled by the model tasks
+    """
+    mode = (context['dag_run'].conf or {}).get('selection', DBT_SELECTION)
+    manifest = dbt_manifest.load_json(DBT_MANIFEST_PATH)
+    models = dbt_manifest.load_models(manifest)
+    selected = dbt_manifest.select_models(models, mode, manifest=manifest, state_dir=DBT_STATE_DIR)
+    dbt_manifest.clear_artifacts(DBT_PROJECT_DIR)
+    print(f"Selection {mode}: {len(selected)} of {len(models)} models")
+    return sorted(selected)
+
+
+def save_state(**context):
+    """
+    Save the run results, and the manifest when every selected model was built.
+    """
+    failed_states = {TaskInstanceState.FAILED, TaskInstanceState.UPSTREAM_FAILED}
+    failed = any(ti.state in failed_states for ti in context['dag_run'].get_task_instances())
+    dbt_manifest.save_state(DBT_PROJECT_DIR, DBT_STATE_DIR, DBT_MANIFEST_PATH, save_manifest=not failed)
+
+
+# Packages are installed once, not by every run
 dbt_deps = BashOperator(
     task_id='dbt_deps',
-    bash_command='cd /opt/airflow/dbt/deel_takehome && dbt deps',
+    bash_command=f"cd {DBT_PROJECT_DIR} && (test -d dbt_packages || {dbt(['deps'])})",
     dag=dag,
 )
 
-dbt_run = BashOperator(
-    task_id='dbt_run',
-    bash_command='cd /opt/airflow/dbt/deel_takehome && dbt run',
-    dag=dag,
-)
+manifest = dbt_manifest.load_json(DBT_MANIFEST_PATH)
 
-dbt_test = BashOperator(
-    task_id='dbt_test',
-    bash_command='cd /opt/airflow/dbt/deel_takehome && dbt test',
-    dag=dag,
-)
+if manifest is None:
+    # No manifest yet: build the whole project in one task
+    dbt_build = BashOperator(
+        task_id='dbt_build',
+        bash_command=dbt(['build']),
+        pool=DBT_POOL,
+        dag=dag,
+    )
+    dbt_deps >> dbt_build
+else:
+    select_models_task = PythonOperator(
+        task_id='select_models',
+        python_callable=select_models,
+        dag=dag,
+    )
+    save_state_task = PythonOperator(
+        task_id='save_state',
+        python_callable=save_state,
+        trigger_rule=TriggerRule.ALL_DONE,
+        dag=dag,
+    )
+    dbt_deps >> select_models_task
 
-# Set task dependencies
-dbt_debug >> dbt_deps >> dbt_run >> dbt_test 
\ No newline at end of file
+    model_tasks = {}
+    for model in dbt_manifest.load_models(manifest).values():
+        # Models not selected are skipped, their downstream models still run against the existing tables
+        model_tasks[model.unique_id] = BashOperator(
+            task_id=model.name,
+            bash_command=(
+                f"{{% if '{model.unique_id}' in ti.xcom_pull(task_ids='select_models') %}}"
+                f"{dbt(dbt_manifest.model_build_args(model))}"
+                f"{{% else %}}exit {SKIP_EXIT_CODE}{{% endif %}}"
+            ),
+            skip_on_exit_code=SKIP_EXIT_CODE,
+            trigger_rule=TriggerRule.NONE_FAILED,
+            pool=DBT_POOL,
+            pool_slots=model.pool_slots,
+            doc_md=f"`dbt build --select {model.name}`: the model and its {len(model.tests)} tests",
+            dag=dag,
+        )
+        upstream_tasks = [model_tasks[upstream_id] for upstream_id in model.upstream]
+        (upstream_tasks or select_models_task) >> model_tasks[model.unique_id]
+        model_tasks[model.unique_id] >> save_state_task
@@ -0,0 +1,362 @@
+"""
+dbt manifest helpers for the Airflow DAG: model graph, state-aware selection and commands.
+
+Kept free of Airflow imports so that the graph and the selection can be tested on their own.
+"""
+import json
+import shlex
+import shutil
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set, Union
+
+# Selection modes of a DAG run
+FULL = "full"
+STATE_MODIFIED = "state:modified+"
+RESULT_ERROR = "result:error+"
+SELECTION_MODES = (FULL, STATE_MODIFIED, RESULT_ERROR)
+
+# Run result statuses of the nodes to rebuild in the result:error+ mode (models error, tests fail)
+FAILED_STATUSES = {"error", "fail", "runtime error"}
+
+# Per-model artifacts are written under <project>/<AIRFLOW_TARGET_DIR>/<model name>, so that
+# concurrent dbt invocations do not overwrite each other's manifest and run results
+AIRFLOW_TARGET_DIR = Path("target") / "airflow"
+
+
+@dataclass
+class DbtModel:
+    """
+    A dbt model and the tests run with it.
+
+    Attributes:
+        unique_id (str): Manifest id, e.g. `model.deel_takehome.stg__invoices`
+        name (str): Model name, used to select it
+        upstream (List[str]): Unique ids of the models it refs
+        tests (List[str]): Unique ids of its tests. A test on several models belongs to the
+            model it is defined on, or else to the most downstream of them
+        pool_slots (int): Pool slots taken by its task, from `meta: {airflow_pool_slots: n}`
+    """
+    unique_id: str
+    name: str
+    upstream: List[str] = field(default_factory=list)
+    tests: List[str] = field(default_factory=list)
+    pool_slots: int = 1
+
+
+def load_json(path: Union[str, Path]) -> Optional[Dict[str, Any]]:
+    """
+    Load a dbt artifact.
+
+    Args:
+        path (str | Path): manifest.json or run_results.json
+
+    Returns:
+        Dict[str, Any] | None: The artifact, or None if the file does not exist
+    """
+    path = Path(path)
+    if not path.exists():
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _enabled_nodes(manifest: Dict[str, Any], resource_type: str) -> Dict[str, Dict[str, Any]]:
+    return {
+        unique_id: node for unique_id, node in manifest.get("nodes", {}).items()
+        if node.get("resource_type") == resource_type and node.get("config", {}).get("enabled", True)
+    }
+
+
+def load_models(manifest: Dict[str, Any]) -> Dict[str, DbtModel]:
+    """
+    Build the model graph of a manifest.
+
+    Args:
+        manifest (Dict[str, Any]): dbt manifest (`target/manifest.json`)
+
+    Returns:
+        Dict[str, DbtModel]: Models keyed by unique id, in topological order (upstream first)
+
+    Raises:
+        ValueError: If the refs form a cycle
+    """
+    nodes = _enabled_nodes(manifest, "model")
+    models = {
+        unique_id: DbtModel(
+            unique_id=unique_id,
+            name=node["name"],
+            upstream=[
+                dependency for dependency in node.get("depends_on", {}).get("nodes", []) if dependency in nodes
+            ],
+            pool_slots=int(node.get("config", {}).get("meta", {}).get("airflow_pool_slots", 1)),
+        )
+        for unique_id, node in nodes.items()
+    }
+    order = topological_order(models)
+    models = {unique_id: models[unique_id] for unique_id in order}
+
+    position = {unique_id: index for index, unique_id in enumerate(order)}
+    for test_id, test in sorted(_enabled_nodes(manifest, "test").items()):
+        parents = [dependency for dependency in test.get("depends_on", {}).get("nodes", []) if dependency in models]
+        attached = test.get("attached_node")
+        if attached not in models:
+            attached = max(parents, key=position.__getitem__) if parents else None
+        if attached is not None:
+            models[attached].tests.append(test_id)
+    return models
+
+
+def topological_order(models: Dict[str, DbtModel]) -> List[str]:
+    """
+    Order models so that every model comes after the models it refs.
+
+    Args:
+        models (Dict[str, DbtModel]): Models keyed by unique id
+
+    Returns:
+        List[str]: Unique ids, upstream first. Independent models keep their name order
+
+    Raises:
+        ValueError: If the refs form a cycle
+    """
+    order: List[str] = []
+    visiting: Set[str] = set()
+    visited: Set[str] = set()
+
+    def visit(unique_id: str) -> None:
+        if unique_id in visited:
+            return
+        if unique_id in visiting:
+            raise ValueError(f"Cycle in the dbt models at {unique_id}")
+        visiting.add(unique_id)
+        for upstream_id in sorted(models[unique_id].upstream):
+            visit(upstream_id)
+        visiting.discard(unique_id)
+        visited.add(unique_id)
+        order.append(unique_id)
+
+    for unique_id in sorted(models, key=lambda unique_id: models[unique_id].name):
+        visit(unique_id)
+    return order
+
+
+def with_descendants(models: Dict[str, DbtModel], selected: Iterable[str]) -> Set[str]:
+    """
+    Add the downstream models of a selection (the `+` suffix of dbt selectors).
+
+    Args:
+        models (Dict[str, DbtModel]): Models keyed by unique id
+        selected (Iterable[str]): Unique ids of the selected models
+
+    Returns:
+        Set[str]: The selected models and all the models depending on them
+    """
+    downstream: Dict[str, List[str]] = {unique_id: [] for unique_id in models}
+    for model in models.values():
+        for upstream_id in model.upstream:
+            downstream[upstream_id].append(model.unique_id)
+
+    result: Set[str] = set()
+    stack = [unique_id for unique_id in selected if unique_id in models]
+    while stack:
+        unique_id = stack.pop()
+        if unique_id not in result:
+            result.add(unique_id)
+            stack.extend(downstream[unique_id])
+    return result
+
+
+def _node_state(node: Dict[str, Any]) -> Any:
+    # What makes a node modified: its SQL or YAML body and its configuration
+    return node.get("checksum", {}).get("checksum"), node.get("config")
+
+
+def modified_models(
+    manifest: Dict[str, Any],
+    state_manifest: Dict[str, Any],
+    models: Dict[str, DbtModel]
+) -> Set[str]:
+    """
+    Get the models new or modified since a previous manifest, with their downstream models.
+
+    Like dbt's `state:modified+`, a model is modified when its body (checksum) or configuration
+    changed. A new or changed test marks the model it belongs to as modified. Changes to macros
+    only are not detected.
+
+    Args:
+        manifest (Dict[str, Any]): Current manifest
+        state_manifest (Dict[str, Any]): Manifest of the last successful run
+        models (Dict[str, DbtModel]): Models of the current manifest (see load_models)
+
+    Returns:
+        Set[str]: Unique ids of the models to rebuild
+    """
+    previous_nodes = state_manifest.get("nodes", {})
+    current_nodes = manifest.get("nodes", {})
+
+    def changed(unique_id: str) -> bool:
+        previous = previous_nodes.get(unique_id)
+        return previous is None or _node_state(previous) != _node_state(current_nodes[unique_id])
+
+    modified = {
+        model.unique_id for model in models.values()
+        if changed(model.unique_id) or any(changed(test_id) for test_id in model.tests)
+    }
+    return with_descendants(models, modified)
+
+
+def failed_models(run_results: Dict[str, Any], models: Dict[str, DbtModel]) -> Set[str]:
+    """
+    Get the models that errored or whose tests failed in a previous run, with their downstream models.
+
+    Args:
+        run_results (Dict[str, Any]): Run results of the previous run (see merge_run_results)
+        models (Dict[str, DbtModel]): Models of the current manifest (see load_models)
+
+    Returns:
+        Set[str]: Unique ids of the models to rebuild
+    """
+    test_models = {test_id: model.unique_id for model in models.values() for test_id in model.tests}
+    failed = set()
+    for result in run_results.get("results", []):
+        if result.get("status") in FAILED_STATUSES:
+            unique_id = result["unique_id"]
+            failed.add(test_models.get(unique_id, unique_id))
+    return with_descendants(models, failed)
+
+
+def select_models(
+    models: Dict[str, DbtModel],
+    mode: str,
+    manifest: Optional[Dict[str, Any]] = None,
+    state_dir: Union[str, Path, None] = None
+) -> Set[str]:
+    """
+    Get the models to build in a selection mode.
+
+    Without state (first run, or state saved by an older DAG), every model is selected.
+
+    Args:
+        models (Dict[str, DbtModel]): Models of the current manifest
+        mode (str): "full", "state:modified+" or "result:error+"
+        manifest (Dict[str, Any], optional): Current manifest, for "state:modified+"
+        state_dir (str | Path, optional): Directory of the manifest.json and run_results.json
+            saved by the last run (see save_state)
+
+    Returns:
+        Set[str]: Unique ids of the selected models
+
+    Raises:
+        ValueError: If the mode is not supported
+    """
+    if mode not in SELECTION_MODES:
+        raise ValueError(f"Unsupported selection mode: {mode}. Expected one of: {', '.join(SELECTION_MODES)}")
+    if mode == STATE_MODIFIED and state_dir is not None and manifest is not None:
+        state_manifest = load_json(Path(state_dir) / "manifest.json")
+        if state_manifest is not None:
+            return modified_models(manifest, state_manifest, models)
+    if mode == RESULT_ERROR and state_dir is not None:
+        run_results = load_json(Path(state_dir) / "run_results.json")
+        if run_results is not None:
+            return failed_models(run_results, models)
+    return set(models)
+
+
+def dbt_command(
+    args: List[str],
+    project_dir: Union[str, Path],
+    profiles_dir: Union[str, Path],
+    target: str
+) -> str:
+    """
+    Build a dbt shell command on the project.
+
+    Args:
+        args (List[str]): dbt subcommand and its arguments
+        project_dir (str | Path): dbt project directory
+        profiles_dir (str | Path): Directory of profiles.yml
+        target (str): Profile target
+
+    Returns:
+        str: Shell command
+    """
+    command = ["dbt", *args, "--project-dir", str(project_dir), "--profiles-dir", str(profiles_dir),
+               "--target", target]
+    return f"cd {shlex.quote(str(project_dir))} && " + " ".join(shlex.quote(part) for part in command)
+
+
+def model_build_args(model: DbtModel) -> List[str]:
+    """
+    Get the dbt arguments building one model and running its tests.
+
+    Tests on several models run with the model they belong to, once their other parents are
+    built (`buildable` indirect selection: the other parents are upstream of it).
+
+    Args:
+        model (DbtModel): Model to build
+
+    Returns:
+        List[str]: `dbt build` arguments, with the model's own target and log directories
+    """
+    artifacts_dir = AIRFLOW_TARGET_DIR / model.name
+    return [
+        "build", "--select", model.name, "--indirect-selection", "buildable",
+        "--target-path", str(artifacts_dir), "--log-path", str(artifacts_dir / "logs"),
+    ]
+
+
+def merge_run_results(artifacts_root: Union[str, Path]) -> Dict[str, Any]:
+    """
+    Merge the run results of the per-model dbt invocations.
+
+    Args:
+        artifacts_root (str | Path): Directory of the per-model target directories
+
+    Returns:
+        Dict[str, Any]: Run results with the results of every invocation
+    """
+    results = []
+    for path in sorted(Path(artifacts_root).glob("*/run_results.json")):
+        run_results = load_json(path)
+        results.extend(run_results.get("results", []))
+    return {"results": results}
+
+
+def save_state(
+    project_dir: Union[str, Path],
+    state_dir: Union[str, Path],
+    manifest_path: Union[str, Path],
+    save_manifest: bool = True
+) -> Dict[str, Any]:
+    """
+    Save the artifacts of a run as the state of the next selective runs.
+
+    Args:
+        project_dir (str | Path): dbt project directory
+        state_dir (str | Path): Directory the state is saved to
+        manifest_path (str | Path): Manifest the DAG was built from
+        save_manifest (bool): Also save the manifest, the reference of `state:modified+`. Only
+            do so when every selected model was built, so that failed changes stay modified
+
+    Returns:
+        Dict[str, Any]: The merged run results
+    """
+    state_dir = Path(state_dir)
+    state_dir.mkdir(parents=True, exist_ok=True)
+    run_results = merge_run_results(Path(project_dir) / AIRFLOW_TARGET_DIR)
+    with open(state_dir / "run_results.json", "w", encoding="utf-8") as f:
+        json.dump(run_results, f)
+    if save_manifest:
+        shutil.copyfile(manifest_path, state_dir / "manifest.json")
+    return run_results
+
+
+def clear_artifacts(project_dir: Union[str, Path]) -> None:
+    """
+    Remove the per-model artifacts of the previous run, so that only this run's results are merged.
+
+    Args:
+        project_dir (str | Path): dbt project directory
+    """
+    shutil.rmtree(Path(project_dir) / AIRFLOW_TARGET_DIR, ignore_errors=True)
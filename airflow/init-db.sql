@@ -0,0 +1,2 @@
+-- Warehouse of the dbt postgres target, next to the Airflow metadata database
+create database deel_takehome_dev owner airflow;
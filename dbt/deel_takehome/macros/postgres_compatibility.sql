@@ -0,0 +1,31 @@
+{#
+    Snowflake functions and types used by the models, created in the public schema of the
+    Postgres target so that the model SQL runs unchanged (see local_backend for DuckDB).
+#}
+{% macro create_postgres_compatibility() %}
+    {% if target.type == 'postgres' %}
+        do $$
+        begin
+            create domain public.timestamp_ntz as timestamp;
+        exception when duplicate_object then null;
+        end
+        $$;
+
+        create or replace function public.convert_timezone(target_timezone text, ts timestamptz)
+        returns timestamp
+        language sql immutable
+        as $$ select ts at time zone target_timezone $$;
+
+        create or replace function public.datediff(date_part text, start_date date, end_date date)
+        returns integer
+        language sql immutable
+        as $$
+            select case lower(date_part)
+                when 'day' then end_date - start_date
+                when 'month' then ((extract(year from end_date) - extract(year from start_date)) * 12
+                                  + extract(month from end_date) - extract(month from start_date))::integer
+                when 'year' then (extract(year from end_date) - extract(year from start_date))::integer
+            end
+        $$;
+    {% endif %}
+{% endmacro %}
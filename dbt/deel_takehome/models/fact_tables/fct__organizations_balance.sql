@@ -1,13 +1,53 @@
 {{
     config(
-        materialized='table',
-        schema='fact_tables'
+        materialized='incremental',
+        schema='fact_tables',
+        unique_key=['organization_id', 'balance_date'],
+        incremental_strategy='delete+insert'
     )
 }}
 
 {% set stg_invoices = ref('stg__invoices') %}
 
-with daily_agg_invoice_data as (
+-- Incremental runs only reprocess the days from the last stored balance_date (the watermark, which
+-- may have been partially loaded) onwards, and seed the running balance of every organization with
+-- its last stored row before the watermark. Invoices created before the watermark are not picked up
+-- again: run with --full-refresh after a backfill.
+with {% if is_incremental() %}
+watermark as (
+    select max(balance_date) as balance_date from {{ this }}
+),
+
+previous_balances as (
+    select
+        organization_id,
+        seed_balance_usd,
+        seed_balance_date
+    from (
+        select
+            organization_id,
+            balance_usd as seed_balance_usd,
+            balance_date as seed_balance_date,
+            row_number() over (
+                partition by organization_id
+                order by balance_date desc
+            ) as balance_rank
+        from {{ this }}
+        where balance_date < (select balance_date from watermark)
+    ) ranked_balances
+    where balance_rank = 1
+),
+{% endif %}
+
+invoices as (
+    select *
+    from {{ stg_invoices }}
+    {% if is_incremental() %}
+    where created_at_utc::date >= (select balance_date from watermark)
+    {% endif %}
+),
+
+daily_agg_invoice_data as (
     select
         organization_id,
         created_at_utc::date as balance_date,
@@ -26,44 +66,80 @@ with daily_agg_invoice_data as (
                 when invoice_status = 'refunded' then invoice_id
               end
         ) as daily_invoices_refunded_count
-    from {{ stg_invoices }}
-    group by all
+    from invoices
+    group by 1, 2
 ),
 
 daily_balances as (
     select
-        organization_id,
-        balance_date,
-        daily_balance_change_usd,
-        daily_invoices_count,
-        daily_invoices_paid_count,
-        daily_invoices_refunded_count,
-        sum(daily_balance_change_usd) over (
-            partition by organization_id 
-            order by balance_date
+        d.organization_id,
+        d.balance_date,
+        d.daily_balance_change_usd,
+        d.daily_invoices_count,
+        d.daily_invoices_paid_count,
+        d.daily_invoices_refunded_count,
+        sum(d.daily_balance_change_usd) over (
+            partition by d.organization_id
+            order by d.balance_date
             rows between unbounded preceding and current row
-        ) as balance_usd
+        ) as processed_balance_usd,
+        {% if is_incremental() %}
+        p.seed_balance_usd,
+        p.seed_balance_date
+        {% else %}
+        null as seed_balance_usd,
+        null as seed_balance_date
+        {% endif %}
     from daily_agg_invoice_data d
+    {% if is_incremental() %}
+    left join previous_balances p
+        on d.organization_id = p.organization_id
+    {% endif %}
 ),
 
-daily_balances_with_previous_balance as (
+daily_balances_with_seed as (
     select
         *,
-        lag(balance_usd) over (
-            partition by organization_id 
-            order by balance_date
-        ) as previous_balance_usd,
-        lag(balance_date) over (
-            partition by organization_id 
-            order by balance_date
-        ) as previous_balance_date
+        (case  -- sum semantics: null only when every change so far is null
+            when seed_balance_usd is null then processed_balance_usd
+            when processed_balance_usd is null then seed_balance_usd
+            else seed_balance_usd + processed_balance_usd
+        end) as balance_usd
     from daily_balances
+),
+
+daily_balances_with_previous_balance as (
+    select
+        *,
+        (case
+            when row_number() over (partition by organization_id order by balance_date) = 1 then seed_balance_usd
+            else lag(balance_usd) over (
+                partition by organization_id
+                order by balance_date
+            )
+        end) as previous_balance_usd,
+        (case
+            when row_number() over (partition by organization_id order by balance_date) = 1 then seed_balance_date
+            else lag(balance_date) over (
+                partition by organization_id
+                order by balance_date
+            )
+        end) as previous_balance_date
+    from daily_balances_with_seed
 )
 
 select
-    *,
+    organization_id,
+    balance_date,
+    daily_balance_change_usd,
+    daily_invoices_count,
+    daily_invoices_paid_count,
+    daily_invoices_refunded_count,
+    balance_usd,
+    previous_balance_usd,
+    previous_balance_date,
     (balance_date - previous_balance_date) as days_since_last_balance_change,
     (case
         when previous_balance_usd != 0 then ((balance_usd - previous_balance_usd) / abs(previous_balance_usd) * 100)
     end) as balance_change_percentage  -- abs to take into account the case when both are negative
-from daily_balances_with_previous_balance
\ No newline at end of file
+from daily_balances_with_previous_balance
@@ -0,0 +1,47 @@
+{{
+    config(
+        materialized='incremental',
+        schema='fact_tables',
+        unique_key='organization_id',
+        incremental_strategy='delete+insert'
+    )
+}}
+
+{% set fct_organizations_balance = ref('fct__organizations_balance') %}
+
+-- Latest balance row of every organization. Incremental runs only read the balances from the latest
+-- stored balance_date onwards (the days an incremental run of fct__organizations_balance rewrites),
+-- and replace the rows of the organizations found there. Run with --full-refresh after a full
+-- refresh of fct__organizations_balance.
+with balances as (
+    select *
+    from {{ fct_organizations_balance }}
+    {% if is_incremental() %}
+    where balance_date >= (select max(balance_date) from {{ this }})
+    {% endif %}
+),
+
+ranked_balances as (
+    select
+        organization_id,
+        balance_date,
+        balance_usd,
+        previous_balance_usd,
+        previous_balance_date,
+        balance_change_percentage,
+        row_number() over (
+            partition by organization_id
+            order by balance_date desc
+        ) as balance_rank
+    from balances
+)
+
+select
+    organization_id,
+    balance_date,
+    balance_usd,
+    previous_balance_usd,
+    previous_balance_date,
+    balance_change_percentage
+from ranked_balances
+where balance_rank = 1
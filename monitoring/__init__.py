@@ -1,3 +1,36 @@
 """
 Monitoring package for Snowflake data monitoring.
-""" 
\ No newline at end of file
+
+The public names are imported on first access, so that `import monitoring` does not import
+their modules and dependencies until they are used.
+"""
+import importlib
+from typing import Any, List
+
+# Public name -> module defining it. The run functions are not listed: their names are those of
+# their submodules (`from monitoring.run_monitoring import run_monitoring`)
+_LAZY_ATTRIBUTES = {
+    "MonitoringConfig": "monitoring.config",
+    "MonitoringError": "monitoring.run_monitoring",
+    "MonitoringRule": "monitoring.monitoring_rule",
+    "RuleOutcome": "monitoring.run_concurrent_monitoring",
+    "create_connector": "monitoring.backends",
+    "format_monitoring_results": "monitoring.utils",
+    "load_config": "monitoring.config",
+    "summarize_monitoring_results": "monitoring.utils",
+}
+
+__all__ = sorted(_LAZY_ATTRIBUTES)
+
+
+def __getattr__(name: str) -> Any:
+    if name not in _LAZY_ATTRIBUTES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_LAZY_ATTRIBUTES[name]), name)
+    # Cache the attribute so that the next accesses do not go through __getattr__
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> List[str]:
+    return sorted(set(globals()) | set(_LAZY_ATTRIBUTES))
@@ -0,0 +1,4 @@
+import sys
+from monitoring.cli import main
+
+sys.exit(main())
@@ -0,0 +1,241 @@
+import sqlite3
+import time
+from pathlib import Path
+from typing import List, Optional, Tuple, Union
+import numpy as np
+import pandas as pd
+
+# Default time after which an alerted breach can be alerted again
+DEFAULT_TTL_SECONDS = 7 * 24 * 3600
+
+# Number of hashes looked up per SQLite statement (below SQLite's default limit of bound parameters)
+LOOKUP_CHUNK_SIZE = 500
+
+
+def hash_breaches(rule_key: str, breaches: pd.DataFrame) -> np.ndarray:
+    """
+    Hash the (rule, id, breach_date) identity of breaching records.
+
+    Args:
+        rule_key (str): Key of the rule (see monitoring.watermark_store.watermark_key)
+        breaches (pd.DataFrame): Records with `id` and `breach_date` columns (case-insensitive)
+
+    Returns:
+        np.ndarray: One signed 64-bit hash per record, stored as SQLite integers
+    """
+    breaches = breaches.rename(columns=str.lower)
+    identity = pd.DataFrame({
+        "rule": rule_key,
+        "id": breaches["id"].astype(str).to_numpy(),
+        "breach_date": breaches["breach_date"].astype(str).to_numpy(),
+    })
+    return pd.util.hash_pandas_object(identity, index=False).to_numpy().view(np.int64)
+
+
+class AlertStateStore:
+    """
+    Record of the breaches already alerted on, kept in a SQLite table.
+
+    Every breach is stored as a 64-bit hash of (rule, id, breach_date) with its difference to the
+    threshold and the time of the alert. A breach is alerted again when its difference grew by
+    more than `escalation_ratio`, or once its entry is older than `ttl_seconds`.
+
+    A run streaming its breaches stages them batch by batch under a staging id (see `stage`), and
+    commits them once the alert is delivered, so that its memory does not grow with the breaches.
+
+    Args:
+        path (str | Path): Path of the SQLite database, created if missing
+        ttl_seconds (float): Time after which an entry expires
+        escalation_ratio (float): Relative increase of the difference for a breach to escalate.
+            0 re-alerts on any increase
+        timeout (float): Seconds to wait for a lock held by another writer
+    """
+
+    def __init__(
+        self,
+        path: Union[str, Path],
+        ttl_seconds: float = DEFAULT_TTL_SECONDS,
+        escalation_ratio: float = 0.0,
+        timeout: float = 30
+    ):
+        self.path = Path(path)
+        self.ttl_seconds = ttl_seconds
+        self.escalation_ratio = escalation_ratio
+        self.timeout = timeout
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute(
+                    "create table if not exists alerted_breaches ("
+                    "breach_hash integer primary key, difference real, alerted_at real not null)"
+                )
+                conn.execute(
+                    "create index if not exists alerted_breaches_alerted_at on alerted_breaches (alerted_at)"
+                )
+                conn.execute(
+                    "create table if not exists staged_breaches ("
+                    "staging_id text not null, breach_hash integer not null, difference real, "
+                    "staged_at real not null, primary key (staging_id, breach_hash))"
+                )
+        finally:
+            conn.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=self.timeout)
+
+    def evict_expired(self) -> int:
+        """
+        Delete the entries older than the TTL.
+
+        Returns:
+            int: Number of deleted entries
+        """
+        conn = self._connect()
+        try:
+            with conn:
+                return conn.execute(
+                    "delete from alerted_breaches where alerted_at < ?", (time.time() - self.ttl_seconds,)
+                ).rowcount
+        finally:
+            conn.close()
+
+    def filter_new(self, rule_key: str, breaches: pd.DataFrame) -> pd.DataFrame:
+        """
+        Keep the breaches that were never alerted on, expired, or escalated.
+
+        Args:
+            rule_key (str): Key of the rule
+            breaches (pd.DataFrame): Records with `id`, `breach_date` and `difference` columns
+                (case-insensitive)
+
+        Returns:
+            pd.DataFrame: The new or escalated breaches
+        """
+        if breaches.empty:
+            return breaches
+        hashes = hash_breaches(rule_key, breaches)
+        expires_before = time.time() - self.ttl_seconds
+        alerted = {}
+        conn = self._connect()
+        try:
+            for start in range(0, len(hashes), LOOKUP_CHUNK_SIZE):
+                chunk = [int(h) for h in hashes[start:start + LOOKUP_CHUNK_SIZE]]
+                alerted.update(conn.execute(
+                    f"select breach_hash, difference from alerted_breaches "
+                    f"where alerted_at >= ? and breach_hash in ({', '.join('?' * len(chunk))})",
+                    [expires_before, *chunk],
+                ).fetchall())
+        finally:
+            conn.close()
+        if not alerted:
+            return breaches
+
+        difference = breaches.rename(columns=str.lower)["difference"].to_numpy(dtype="float64", na_value=np.nan)
+        previous = pd.Series(hashes).map(alerted).to_numpy(dtype="float64", na_value=np.nan)
+        was_alerted = pd.Series(hashes).isin(alerted).to_numpy()
+        escalated = difference > previous * (1 + self.escalation_ratio)
+        return breaches[~was_alerted | escalated]
+
+    def record(self, rule_key: str, breaches: pd.DataFrame) -> None:
+        """
+        Record breaches as alerted, and evict the expired entries.
+
+        Args:
+            rule_key (str): Key of the rule
+            breaches (pd.DataFrame): Records with `id`, `breach_date` and `difference` columns
+                (case-insensitive)
+        """
+        now = time.time()
+        rows = [(breach_hash, difference, now) for breach_hash, difference in _hash_rows(rule_key, breaches)]
+        conn = self._connect()
+        try:
+            with conn:
+                conn.executemany(
+                    "insert into alerted_breaches (breach_hash, difference, alerted_at) values (?, ?, ?) "
+                    "on conflict (breach_hash) do update set "
+                    "difference = excluded.difference, alerted_at = excluded.alerted_at",
+                    rows,
+                )
+                conn.execute("delete from alerted_breaches where alerted_at < ?", (now - self.ttl_seconds,))
+        finally:
+            conn.close()
+
+    def stage(self, staging_id: str, rule_key: str, breaches: pd.DataFrame) -> None:
+        """
+        Stage breaches about to be alerted on, until `commit_staged` or `discard_staged`.
+
+        Args:
+            staging_id (str): Id of the run staging the breaches, unique per run
+            rule_key (str): Key of the rule
+            breaches (pd.DataFrame): Records with `id`, `breach_date` and `difference` columns
+                (case-insensitive)
+        """
+        rows = _hash_rows(rule_key, breaches)
+        if not rows:
+            return
+        now = time.time()
+        conn = self._connect()
+        try:
+            with conn:
+                conn.executemany(
+                    "insert or replace into staged_breaches (staging_id, breach_hash, difference, staged_at) "
+                    "values (?, ?, ?, ?)",
+                    [(staging_id, breach_hash, difference, now) for breach_hash, difference in rows],
+                )
+        finally:
+            conn.close()
+
+    def commit_staged(self, staging_id: str) -> int:
+        """
+        Record the breaches staged under `staging_id` as alerted, and evict the expired entries.
+
+        Args:
+            staging_id (str): Id of the run that staged the breaches
+
+        Returns:
+            int: Number of breaches recorded
+        """
+        now = time.time()
+        conn = self._connect()
+        try:
+            with conn:
+                recorded = conn.execute(
+                    "insert into alerted_breaches (breach_hash, difference, alerted_at) "
+                    "select breach_hash, difference, ? from staged_breaches where staging_id = ? "
+                    "on conflict (breach_hash) do update set "
+                    "difference = excluded.difference, alerted_at = excluded.alerted_at",
+                    (now, staging_id),
+                ).rowcount
+                # Also drops the stages of runs that died before committing or discarding them
+                conn.execute(
+                    "delete from staged_breaches where staging_id = ? or staged_at < ?",
+                    (staging_id, now - self.ttl_seconds),
+                )
+                conn.execute("delete from alerted_breaches where alerted_at < ?", (now - self.ttl_seconds,))
+            return recorded
+        finally:
+            conn.close()
+
+    def discard_staged(self, staging_id: str) -> None:
+        """
+        Drop the breaches staged under `staging_id`, whose alert was not delivered.
+
+        Args:
+            staging_id (str): Id of the run that staged the breaches
+        """
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute("delete from staged_breaches where staging_id = ?", (staging_id,))
+        finally:
+            conn.close()
+
+
+def _hash_rows(rule_key: str, breaches: pd.DataFrame) -> List[Tuple[int, Optional[float]]]:
+    # (hash, difference) rows of the breaches, as stored in SQLite
+    if breaches.empty:
+        return []
+    hashes = hash_breaches(rule_key, breaches)
+    difference = breaches.rename(columns=str.lower)["difference"].astype("float64")
+    return [(int(h), None if pd.isna(d) else float(d)) for h, d in zip(hashes, difference)]
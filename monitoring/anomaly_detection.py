@@ -0,0 +1,226 @@
+from typing import Optional, Tuple
+import numpy as np
+import pandas as pd
+from monitoring.monitoring_rule import DEFAULT_MIN_PERIODS, DEFAULT_WINDOW
+
+# In-memory only detection mode (detect_rolling_percentile): Snowflake does not allow window
+# frames on percentile functions, so it cannot be a mode of a monitoring rule
+PERCENTILE = "percentile"
+
+# Rows scored at a time by the percentile mode, which holds a (rows, window) matrix in memory
+PERCENTILE_CHUNK_SIZE = 100_000
+
+ANOMALY_COLUMNS = ["id", "value", "breach_date", "rolling_mean", "rolling_std", "zscore", "difference"]
+PERCENTILE_COLUMNS = ["id", "value", "breach_date", "rolling_percentile", "difference"]
+
+
+def _sort_by_id_and_date(
+    df: pd.DataFrame,
+    id_column: str,
+    date_column: str,
+    target_column: str
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    # Sorted ids, dates and values, and the position of every row within the rows of its id
+    order = np.lexsort((df[date_column].to_numpy(), df[id_column].to_numpy()))
+    ids = df[id_column].to_numpy()[order]
+    dates = df[date_column].to_numpy()[order]
+    values = df[target_column].to_numpy(dtype="float64", na_value=np.nan)[order]
+
+    is_first = np.ones(len(ids), dtype=bool)
+    is_first[1:] = ids[1:] != ids[:-1]
+    positions = np.arange(len(ids))
+    group_start = np.maximum.accumulate(np.where(is_first, positions, 0))
+    return ids, dates, values, positions - group_start
+
+
+def _lagged(values: np.ndarray, position_in_group: np.ndarray, lag: int) -> np.ndarray:
+    # Value `lag` rows before in the same id, NaN when there is none
+    previous = np.full(len(values), np.nan)
+    previous[lag:] = values[:-lag]
+    previous[position_in_group < lag] = np.nan
+    return previous
+
+
+def _after(dates: np.ndarray, start_date: str) -> np.ndarray:
+    # Whether every date is on or after start_date, as in the monitoring queries
+    return np.asarray(pd.to_datetime(dates) >= pd.Timestamp(start_date))
+
+
+def _nanpercentile_rows(windows: np.ndarray, percentile: float, min_periods: int) -> np.ndarray:
+    # Linearly interpolated percentile of the non-null values of every row, as np.nanpercentile
+    # but without its per-row loop. NaN for rows with less than min_periods values
+    count = (~np.isnan(windows)).sum(axis=1)
+    ordered = np.sort(windows, axis=1)  # NaN sort last
+    rank = np.maximum(count - 1, 0) * percentile / 100
+    lower = np.floor(rank).astype(np.int64)
+    upper = np.minimum(lower + 1, np.maximum(count - 1, 0))
+    lower_values = np.take_along_axis(ordered, lower[:, None], axis=1)[:, 0]
+    upper_values = np.take_along_axis(ordered, upper[:, None], axis=1)[:, 0]
+    result = lower_values + (upper_values - lower_values) * (rank - lower)
+    return np.where(count >= max(min_periods, 1), result, np.nan)
+
+
+def rolling_window_stats(
+    values: np.ndarray,
+    position_in_group: np.ndarray,
+    window: int
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Compute the mean and sample standard deviation of the previous `window` values of every row.
+
+    The arrays are sorted by (id, date). The statistics are accumulated over the `window` lags of
+    the whole arrays at once, so the cost is O(rows * window) vectorized operations whatever the
+    number of ids. Null values count in the window but not in the statistics, as in SQL.
+
+    Args:
+        values (np.ndarray): Values sorted by (id, date), NaN for nulls
+        position_in_group (np.ndarray): Position of every row within the rows of its id
+        window (int): Number of previous rows
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray, np.ndarray]: Rolling mean, standard deviation and count of
+            non-null values. The mean is NaN without values, the deviation with less than two
+    """
+    count = np.zeros(len(values))
+    total = np.zeros(len(values))
+    for lag in range(1, window + 1):
+        previous = _lagged(values, position_in_group, lag)
+        has_value = ~np.isnan(previous)
+        count += has_value
+        total += np.where(has_value, previous, 0.0)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean = total / count
+        # Second pass on the deviations from the mean, more accurate than the sum of squares
+        squared_deviations = np.zeros(len(values))
+        for lag in range(1, window + 1):
+            previous = _lagged(values, position_in_group, lag)
+            squared_deviations += np.where(np.isnan(previous), 0.0, (previous - mean) ** 2)
+        std = np.where(count > 1, np.sqrt(squared_deviations / (count - 1)), np.nan)
+    return mean, std, count
+
+
+def detect_rolling_zscore(
+    df: pd.DataFrame,
+    id_column: str,
+    date_column: str,
+    target_column: str,
+    threshold: float,
+    window: int = DEFAULT_WINDOW,
+    min_periods: int = DEFAULT_MIN_PERIODS,
+    start_date: Optional[str] = None
+) -> pd.DataFrame:
+    """
+    Flag the records more than `threshold` standard deviations away from their id's rolling mean.
+
+    Mirrors ROLLING_ZSCORE_QUERY, for data already in memory (e.g. from
+    `compute_organizations_balance`).
+
+    Args:
+        df (pd.DataFrame): Records, e.g. one row per organization and balance date
+        id_column (str): Name of the column the statistics are partitioned by
+        date_column (str): Name of the column ordering the records of an id
+        target_column (str): Name of the monitored column
+        threshold (float): Absolute z-score above which a record breaches
+        window (int): Number of previous records of the same id the statistics are computed over
+        min_periods (int): Minimum number of non-null previous values to score a record
+        start_date (str, optional): Only report the records from this date on. The previous records are
+            still used in the statistics
+
+    Returns:
+        pd.DataFrame: Breaching records with the ANOMALY_COLUMNS, sorted by difference (z-score
+            in excess of the threshold) in descending order
+
+    Raises:
+        ValueError: If the window is not positive
+    """
+    if window < 1:
+        raise ValueError("window must be at least 1")
+    ids, dates, values, position_in_group = _sort_by_id_and_date(df, id_column, date_column, target_column)
+    mean, std, count = rolling_window_stats(values, position_in_group, window)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        zscore = np.where(std > 0, np.abs(values - mean) / std, np.nan)
+    breaches = (count >= min_periods) & (zscore > threshold)
+    if start_date is not None:
+        breaches &= _after(dates, start_date)
+
+    result = pd.DataFrame({
+        "id": ids[breaches],
+        "value": values[breaches],
+        "breach_date": dates[breaches],
+        "rolling_mean": mean[breaches],
+        "rolling_std": std[breaches],
+        "zscore": zscore[breaches],
+        "difference": zscore[breaches] - threshold,
+    }, columns=ANOMALY_COLUMNS)
+    return result.sort_values("difference", ascending=False, kind="stable").reset_index(drop=True)
+
+
+def detect_rolling_percentile(
+    df: pd.DataFrame,
+    id_column: str,
+    date_column: str,
+    target_column: str,
+    percentile: float,
+    window: int = DEFAULT_WINDOW,
+    min_periods: int = DEFAULT_MIN_PERIODS,
+    start_date: Optional[str] = None,
+    chunk_size: int = PERCENTILE_CHUNK_SIZE
+) -> pd.DataFrame:
+    """
+    Flag the records above the given percentile of the previous `window` records of their id.
+
+    The windows of `chunk_size` rows at a time are laid out as a (rows, window) matrix and
+    sorted along the rows, so memory is bounded by `chunk_size * window` values.
+    There is no warehouse version of this mode: Snowflake does not allow window frames on
+    percentile functions.
+
+    Args:
+        df (pd.DataFrame): Records, e.g. one row per organization and balance date
+        id_column (str): Name of the column the statistics are partitioned by
+        date_column (str): Name of the column ordering the records of an id
+        target_column (str): Name of the monitored column
+        percentile (float): Percentile of the previous values, between 0 and 100
+        window (int): Number of previous records of the same id
+        min_periods (int): Minimum number of non-null previous values to score a record
+        start_date (str, optional): Only report the records from this date on
+        chunk_size (int): Number of rows scored at a time
+
+    Returns:
+        pd.DataFrame: Breaching records with the PERCENTILE_COLUMNS, sorted by difference (value in
+            excess of the rolling percentile) in descending order
+
+    Raises:
+        ValueError: If the window is not positive or the percentile not between 0 and 100
+    """
+    if window < 1:
+        raise ValueError("window must be at least 1")
+    if not 0 <= percentile <= 100:
+        raise ValueError("percentile must be between 0 and 100")
+    ids, dates, values, position_in_group = _sort_by_id_and_date(df, id_column, date_column, target_column)
+
+    rolling_percentile = np.full(len(values), np.nan)
+    for start in range(0, len(values), chunk_size):
+        end = min(start + chunk_size, len(values))
+        # Column lag - 1 holds the value `lag` rows before, NaN outside of the id
+        rows = np.arange(start, end)
+        lags = np.arange(1, window + 1)
+        previous_rows = rows[:, None] - lags[None, :]
+        in_group = lags[None, :] <= position_in_group[start:end, None]
+        windows = np.where(in_group, values[np.maximum(previous_rows, 0)], np.nan)
+        rolling_percentile[start:end] = _nanpercentile_rows(windows, percentile, min_periods)
+
+    with np.errstate(invalid="ignore"):
+        breaches = values > rolling_percentile
+    if start_date is not None:
+        breaches &= _after(dates, start_date)
+
+    result = pd.DataFrame({
+        "id": ids[breaches],
+        "value": values[breaches],
+        "breach_date": dates[breaches],
+        "rolling_percentile": rolling_percentile[breaches],
+        "difference": values[breaches] - rolling_percentile[breaches],
+    }, columns=PERCENTILE_COLUMNS)
+    return result.sort_values("difference", ascending=False, kind="stable").reset_index(drop=True)
@@ -0,0 +1,57 @@
+import math
+import os
+from typing import Any, Dict, Optional
+
+# Supported warehouse backends
+BACKENDS = ("snowflake", "duckdb")
+
+
+def get_backend() -> str:
+    """
+    Get the monitoring backend from the MONITORING_BACKEND environment variable.
+
+    Returns:
+        str: Name of the backend, "snowflake" by default
+    """
+    return os.getenv("MONITORING_BACKEND", "snowflake").lower()
+
+
+def create_connector(
+    backend: Optional[str] = None,
+    connection_params: Optional[Dict[str, Any]] = None,
+    statement_timeout: Optional[float] = None
+) -> Any:
+    """
+    Create a connection for the given backend.
+
+    Args:
+        backend (str, optional): "snowflake" or "duckdb". Defaults to get_backend()
+        connection_params (dict, optional): Backend connection parameters. For Snowflake they
+            default to get_connection_params(); for DuckDB they are passed to
+            `create_duckdb_connector` (database, target_schema, seeds_dir, models_dir, path)
+        statement_timeout (float, optional): Seconds after which the warehouse cancels a query of
+            the connection (Snowflake STATEMENT_TIMEOUT_IN_SECONDS, rounded up). DuckDB has no
+            statement timeout: its queries always run to completion
+
+    Returns:
+        Any: A DB-API connection usable by read_snowflake_table and read_snowflake_batches
+
+    Raises:
+        ValueError: If the backend is not supported
+    """
+    backend = backend or get_backend()
+    if backend == "snowflake":
+        from monitoring.create_snowflake_connector import create_snowflake_connector
+        from monitoring.utils import get_connection_params
+        connection_params = connection_params or get_connection_params()
+        if statement_timeout is not None:
+            session_parameters = {
+                **connection_params.get("session_parameters", {}),
+                "STATEMENT_TIMEOUT_IN_SECONDS": math.ceil(statement_timeout),
+            }
+            connection_params = {**connection_params, "session_parameters": session_parameters}
+        return create_snowflake_connector(connection_params=connection_params)
+    if backend == "duckdb":
+        from monitoring.local_backend import create_duckdb_connector
+        return create_duckdb_connector(**(connection_params or {}))
+    raise ValueError(f"Unsupported backend: {backend}. Expected one of: {', '.join(BACKENDS)}")
@@ -0,0 +1,168 @@
+from pathlib import Path
+from typing import Union
+import numpy as np
+import pandas as pd
+
+# Column types of the landing invoices file (see dbt seeds)
+INVOICE_CSV_DTYPES = {
+    "INVOICE_ID": "int64",
+    "PARENT_INVOICE_ID": "Int64",
+    "TRANSACTION_ID": "Int64",
+    "ORGANIZATION_ID": "int64",
+    "TYPE": "Int64",
+    "STATUS": "string",
+    "CURRENCY": "string",
+    "PAYMENT_CURRENCY": "string",
+    "PAYMENT_METHOD": "string",
+    "AMOUNT": "float64",
+    "PAYMENT_AMOUNT": "float64",
+    "FX_RATE": "float64",
+    "FX_RATE_PAYMENT": "float64",
+}
+
+BALANCE_COLUMNS = [
+    "organization_id",
+    "balance_date",
+    "daily_balance_change_usd",
+    "daily_invoices_count",
+    "daily_invoices_paid_count",
+    "daily_invoices_refunded_count",
+    "balance_usd",
+    "previous_balance_usd",
+    "previous_balance_date",
+    "days_since_last_balance_change",
+    "balance_change_percentage",
+]
+
+
+def read_invoices_csv(path: Union[str, Path]) -> pd.DataFrame:
+    """
+    Read a landing invoices file (e.g. `invoices_sample.csv`) with the seed column types.
+
+    Args:
+        path (str | Path): Path to the CSV file
+
+    Returns:
+        pd.DataFrame: Raw invoices, with upper case column names as in the landing table
+    """
+    return pd.read_csv(path, dtype=INVOICE_CSV_DTYPES, parse_dates=["CREATED_AT"])
+
+
+def stage_invoices(raw_invoices: pd.DataFrame) -> pd.DataFrame:
+    """
+    Clean and standardize raw invoices, mirroring the `stg__invoices` model.
+
+    Args:
+        raw_invoices (pd.DataFrame): Landing invoices (column names are matched case-insensitively)
+
+    Returns:
+        pd.DataFrame: Staged invoices with the `stg__invoices` column names
+    """
+    raw = raw_invoices.rename(columns=str.lower)
+    created_at = pd.to_datetime(raw["created_at"], utc=True).dt.tz_localize(None)
+    return pd.DataFrame({
+        "invoice_id": raw["invoice_id"].abs(),
+        "parent_invoice_id": raw["parent_invoice_id"].abs(),
+        "transaction_id": raw["transaction_id"].abs(),
+        "organization_id": raw["organization_id"].abs(),
+        "invoice_type": raw["type"],
+        "invoice_status": raw["status"].str.lower(),
+        "invoice_currency": raw["currency"].str.lower(),
+        "payment_currency": raw["payment_currency"].str.lower(),
+        "payment_method": raw["payment_method"].str.lower(),
+        "invoice_amount": raw["amount"],
+        "payment_amount": raw["payment_amount"],
+        "invoice_fx_rate": raw["fx_rate"],
+        "payment_fx_rate": raw["fx_rate_payment"],
+        "created_at_utc": created_at,
+    })
+
+
+def compute_organizations_balance(invoices: pd.DataFrame) -> pd.DataFrame:
+    """
+    Compute the daily organization balances, mirroring the `fct__organizations_balance` model.
+
+    The computation is fully vectorized: one group-by aggregation per (organization, day),
+    then running sums and lags over the (organization_id, balance_date) sorted arrays.
+    SQL null semantics are preserved: a day whose changes are all null has a null daily
+    change, and running sums ignore nulls.
+
+    Args:
+        invoices (pd.DataFrame): Staged invoices (see `stage_invoices`)
+
+    Returns:
+        pd.DataFrame: One row per organization and day, with the columns of the fact table
+    """
+    is_paid = invoices["invoice_status"].eq("paid").fillna(False).to_numpy(dtype=bool)
+    is_refunded = invoices["invoice_status"].eq("refunded").fillna(False).to_numpy(dtype=bool)
+    payment_amount = invoices["payment_amount"].to_numpy(dtype="float64", na_value=np.nan)
+    balance_change = np.select(
+        [is_paid, is_refunded],
+        [
+            payment_amount * invoices["payment_fx_rate"].to_numpy(dtype="float64", na_value=np.nan),
+            -1 * payment_amount * invoices["invoice_fx_rate"].to_numpy(dtype="float64", na_value=np.nan),
+        ],
+        default=0.0,
+    )
+    has_invoice_id = invoices["invoice_id"].notna().to_numpy()
+
+    grouped = pd.DataFrame({
+        "organization_id": invoices["organization_id"].to_numpy(),
+        "balance_date": pd.to_datetime(invoices["created_at_utc"]).dt.normalize().to_numpy(),
+        "daily_balance_change_usd": balance_change,
+        "daily_invoices_count": has_invoice_id.astype("int64"),
+        "daily_invoices_paid_count": (has_invoice_id & is_paid).astype("int64"),
+        "daily_invoices_refunded_count": (has_invoice_id & is_refunded).astype("int64"),
+    }).groupby(["organization_id", "balance_date"], sort=True)
+
+    daily = grouped[["daily_invoices_count", "daily_invoices_paid_count", "daily_invoices_refunded_count"]].sum()
+    # min_count=1 keeps a day with only null changes null, as sum() does in SQL
+    daily.insert(0, "daily_balance_change_usd", grouped["daily_balance_change_usd"].sum(min_count=1))
+
+    return add_running_balance(daily.reset_index())
+
+
+def add_running_balance(daily: pd.DataFrame) -> pd.DataFrame:
+    """
+    Add the running balance, previous balance and balance change columns to daily aggregates.
+
+    Args:
+        daily (pd.DataFrame): One row per organization and day with `daily_balance_change_usd`,
+            sorted by (organization_id, balance_date)
+
+    Returns:
+        pd.DataFrame: The daily aggregates with all the fact table columns
+    """
+    daily = daily.reset_index(drop=True)
+    organization_id = daily["organization_id"].to_numpy()
+    balance_date = daily["balance_date"].to_numpy()
+    changes = daily["daily_balance_change_usd"].to_numpy(dtype="float64", na_value=np.nan)
+    has_change = ~np.isnan(changes)
+
+    # Running sum per organization ignoring nulls; null until the first non-null change
+    grouped = pd.Series(np.where(has_change, changes, 0.0)).groupby(organization_id, sort=False)
+    balance_usd = grouped.cumsum().to_numpy()
+    seen_change = pd.Series(has_change).groupby(organization_id, sort=False).cumsum().to_numpy() > 0
+    balance_usd = np.where(seen_change, balance_usd, np.nan)
+
+    # Lag over the sorted arrays: the first row of every organization has no previous row
+    is_first = np.ones(len(daily), dtype=bool)
+    is_first[1:] = organization_id[1:] != organization_id[:-1]
+    previous_balance_usd = np.roll(balance_usd, 1)
+    previous_balance_usd[is_first] = np.nan
+    previous_balance_date = np.roll(balance_date, 1)
+    previous_balance_date[is_first] = np.datetime64("NaT")
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        balance_change_percentage = np.where(
+            previous_balance_usd != 0,
+            (balance_usd - previous_balance_usd) / np.abs(previous_balance_usd) * 100,
+            np.nan,
+        )
+
+    daily["balance_usd"] = balance_usd
+    daily["previous_balance_usd"] = previous_balance_usd
+    daily["previous_balance_date"] = previous_balance_date
+    daily["days_since_last_balance_change"] = pd.Series(balance_date - previous_balance_date).dt.days.astype("Int64")
+    daily["balance_change_percentage"] = balance_change_percentage
+    return daily[BALANCE_COLUMNS]
@@ -0,0 +1,380 @@
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Union
+from monitoring.connection_pool import ConnectionPool
+from monitoring.local_backend import DEFAULT_DATABASE, create_duckdb_connector
+from monitoring.query_builder import build_monitoring_query, compile_monitoring_query
+from monitoring.run_monitoring import run_monitoring
+from monitoring.slack_notifier import SlackDeliveryQueue
+from monitoring.snowflake_reader import read_snowflake_table
+from monitoring.synthetic_data import write_synthetic_landing
+from monitoring.utils import format_monitoring_results, summarize_monitoring_results
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+
+# Baseline timings checked in with the repository, one file per environment (see baseline_path)
+BASELINE_DIR = PROJECT_DIR / "benchmarks"
+
+# A benchmark regresses when its fastest round is more than `tolerance` times slower than in the
+# baseline. The minimum is compared rather than the median, being the least sensitive to noise.
+# The baselines are shared by every machine of an environment, hence the wide tolerance
+DEFAULT_TOLERANCE = 3.0
+
+DEFAULT_ROWS = 1_000_000
+DEFAULT_REPEAT = 5
+
+# Rule benchmarked on the local backend
+BENCHMARK_RULE = {
+    "table_name": "fct__organizations_balance",
+    "target_column": "balance_change_percentage",
+    "id_column": "organization_id",
+    "date_column": "balance_date",
+    "threshold": 50.0,
+    "start_date": "2024-01-01",
+    "database": DEFAULT_DATABASE,
+    "schema": "ehernani_fact_tables",
+}
+
+# Query builds timed per round, the build of a single query being too fast to time alone
+QUERY_BUILDS = 10_000
+
+# Messages posted per round of the Slack benchmark, each to its own channel so none is coalesced
+SLACK_MESSAGES = 20
+
+# Entry points whose import time is benchmarked: the command line and a single monitoring run
+IMPORT_MODULES = ("monitoring.cli", "monitoring.run_monitoring")
+
+# Timing statistics of a benchmark: "min", "median" (seconds) and "rounds"
+Timing = Dict[str, float]
+
+
+def time_function(
+    func: Callable[[], Any],
+    repeat: int = DEFAULT_REPEAT,
+    setup: Optional[Callable[[], Any]] = None
+) -> Timing:
+    """
+    Time a function over several rounds.
+
+    Args:
+        func (Callable): Function to time
+        repeat (int): Number of rounds
+        setup (Callable, optional): Function called before every round, outside of the timing
+
+    Returns:
+        Timing: Minimum and median duration of a round in seconds, and the number of rounds
+    """
+    durations = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - start)
+    return {"min": min(durations), "median": statistics.median(durations), "rounds": repeat}
+
+
+def parse_import_time(importtime_output: str, module: str) -> float:
+    """
+    Get the cumulative import time of a module from the output of `python -X importtime`.
+
+    Args:
+        importtime_output (str): Standard error of the interpreter run with `-X importtime`
+        module (str): Fully qualified module name
+
+    Returns:
+        float: Import time of the module, including its dependencies, in seconds
+
+    Raises:
+        ValueError: If the module does not appear in the output
+    """
+    for line in importtime_output.splitlines():
+        # import time: self [us] | cumulative | imported package
+        parts = line.split("|")
+        if len(parts) == 3 and parts[2].strip() == module:
+            return int(parts[1]) / 1_000_000
+    raise ValueError(f"Module {module} not found in the import time output")
+
+
+def time_import(module: str, repeat: int = DEFAULT_REPEAT) -> Timing:
+    """
+    Time the import of a module in fresh interpreters, as paid by every scheduled run.
+
+    Args:
+        module (str): Fully qualified module name
+        repeat (int): Number of interpreters started
+
+    Returns:
+        Timing: Minimum and median import time in seconds, and the number of rounds
+    """
+    durations = []
+    for _ in range(repeat):
+        completed = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            capture_output=True, text=True, check=True, cwd=PROJECT_DIR,
+        )
+        durations.append(parse_import_time(completed.stderr, module))
+    return {"min": min(durations), "median": statistics.median(durations), "rounds": repeat}
+
+
+class _FakeSlackHandler(BaseHTTPRequestHandler):
+    # Accepts every Slack Web API call, so that delivery is timed without the network
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        response = b'{"ok": true}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(response)))
+        self.end_headers()
+        self.wfile.write(response)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@contextmanager
+def fake_slack_server() -> Iterator[str]:
+    """
+    Run a local fake of the Slack Web API.
+
+    Yields:
+        str: Base URL of the fake API, to pass to SlackDeliveryQueue
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _FakeSlackHandler)
+    thread = threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}/api/"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def run_benchmarks(
+    n_invoices: int = DEFAULT_ROWS,
+    repeat: int = DEFAULT_REPEAT,
+    seed: int = 0,
+    data_dir: Optional[Union[str, Path]] = None
+) -> Dict[str, Timing]:
+    """
+    Benchmark the monitoring pipeline on synthetic data in the local DuckDB backend.
+
+    Args:
+        n_invoices (int): Number of synthetic invoices
+        repeat (int): Number of rounds of every benchmark
+        seed (int): Seed of the synthetic data
+        data_dir (str | Path, optional): Directory of the synthetic landing files. Defaults to a
+            temporary directory
+
+    Returns:
+        Dict[str, Timing]: Timing of every benchmark, keyed by benchmark name
+    """
+    results: Dict[str, Timing] = {}
+    for module in IMPORT_MODULES:
+        results[f"import_{module.split('.')[-1]}"] = time_import(module, repeat=repeat)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        data_dir = Path(data_dir or tmp_dir)
+        results["generate_synthetic_data"] = time_function(
+            lambda: write_synthetic_landing(data_dir, n_invoices, seed=seed), repeat=1
+        )
+        conns = []
+        results["build_local_backend"] = time_function(
+            lambda: conns.append(create_duckdb_connector(seeds_dir=data_dir)), repeat=1
+        )
+    conn = conns[0]
+
+    def build_queries(cold: bool):
+        for _ in range(QUERY_BUILDS):
+            if cold:
+                compile_monitoring_query.cache_clear()
+            build_monitoring_query(**BENCHMARK_RULE, top_k=5)
+
+    results["build_query_cold"] = time_function(lambda: build_queries(cold=True), repeat=repeat)
+    results["build_query_cached"] = time_function(lambda: build_queries(cold=False), repeat=repeat)
+
+    # Every breaching row is read, as without pushdown
+    query, params = build_monitoring_query(**{**BENCHMARK_RULE, "threshold": 0.0, "start_date": "2019-01-01"})
+    results["read_arrow"] = time_function(
+        lambda: read_snowflake_table(conn=conn, query=query, params=params, arrow=True), repeat=repeat
+    )
+    results["read_pandas"] = time_function(
+        lambda: read_snowflake_table(conn=conn, query=query, params=params), repeat=repeat
+    )
+
+    table = read_snowflake_table(conn=conn, query=query, params=params, arrow=True)
+
+    def summarize_and_format():
+        total_count, records = summarize_monitoring_results([table])
+        format_monitoring_results(
+            records, BENCHMARK_RULE["table_name"], BENCHMARK_RULE["target_column"], total_count=total_count
+        )
+
+    results["summarize_and_format"] = time_function(summarize_and_format, repeat=repeat)
+
+    with fake_slack_server() as base_url:
+        with SlackDeliveryQueue(token="xoxb-benchmark", window_seconds=0, base_url=base_url) as slack_queue:
+            def deliver():
+                for i in range(SLACK_MESSAGES):
+                    slack_queue.submit(f"#benchmark-{i}", f"Monitoring result {i}")
+                slack_queue.flush()
+
+            results["slack_delivery"] = time_function(deliver, repeat=repeat)
+
+    pool = ConnectionPool(connect=conn.cursor, max_size=1)
+    for pushdown in (True, False):
+        name = "run_monitoring_pushdown" if pushdown else "run_monitoring"
+        results[name] = time_function(
+            lambda: run_monitoring(**BENCHMARK_RULE, pool=pool, pushdown=pushdown), repeat=repeat
+        )
+    pool.close()
+    conn.close()
+    return results
+
+
+def compare_to_baseline(
+    results: Dict[str, Timing],
+    baseline: Dict[str, Timing],
+    tolerance: float = DEFAULT_TOLERANCE
+) -> List[str]:
+    """
+    Compare benchmark timings to a baseline.
+
+    Args:
+        results (Dict[str, Timing]): Current timings (see run_benchmarks)
+        baseline (Dict[str, Timing]): Baseline timings
+        tolerance (float): Maximum ratio of the current minimum to the baseline minimum
+
+    Returns:
+        List[str]: Description of every regression, empty if there is none. Benchmarks missing
+            from either side are not compared
+    """
+    regressions = []
+    for name, timing in results.items():
+        if name not in baseline:
+            continue
+        ratio = timing["min"] / baseline[name]["min"]
+        if ratio > tolerance:
+            regressions.append(
+                f"{name}: {timing['min']:.4f}s vs {baseline[name]['min']:.4f}s baseline ({ratio:.2f}x)"
+            )
+    return regressions
+
+
+def baseline_path(
+    python_version: Optional[str] = None,
+    machine: Optional[str] = None,
+    directory: Union[str, Path] = BASELINE_DIR
+) -> Path:
+    """
+    Get the path of the baseline of an environment.
+
+    Timings depend on the interpreter and the architecture, so every environment has its own
+    baseline, e.g. `benchmarks/baseline-py3.11-x86_64.json`.
+
+    Args:
+        python_version (str, optional): Python version, e.g. "3.11.7". Defaults to the running one.
+            Only the major and minor versions are kept
+        machine (str, optional): Machine architecture. Defaults to the running one
+        directory (str | Path): Directory of the baselines
+
+    Returns:
+        Path: Path of the baseline file
+    """
+    python_version = python_version or platform.python_version()
+    machine = machine or platform.machine()
+    minor_version = ".".join(python_version.split(".")[:2])
+    return Path(directory) / f"baseline-py{minor_version}-{machine.lower()}.json"
+
+
+def load_baseline(path: Optional[Union[str, Path]] = None) -> Dict[str, Any]:
+    """
+    Load a baseline saved by save_baseline.
+
+    Args:
+        path (str | Path, optional): Path of the baseline file. Defaults to the baseline of the
+            running environment (see baseline_path)
+
+    Returns:
+        Dict[str, Any]: "rows", "environment" and "results" of the baseline
+    """
+    with open(path or baseline_path(), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_baseline(
+    results: Dict[str, Timing],
+    n_invoices: int,
+    path: Optional[Union[str, Path]] = None
+) -> None:
+    """
+    Save benchmark timings as the new baseline.
+
+    Args:
+        results (Dict[str, Timing]): Timings (see run_benchmarks)
+        n_invoices (int): Number of synthetic invoices the timings were measured on
+        path (str | Path, optional): Path of the baseline file. Defaults to the baseline of the
+            running environment (see baseline_path)
+    """
+    baseline = {
+        "rows": n_invoices,
+        "environment": {"python": platform.python_version(), "machine": platform.machine()},
+        "results": results,
+    }
+    path = Path(path or baseline_path())
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(baseline, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def main():
+    """
+    Run the benchmarks from the command line and compare them to the baseline.
+
+    Exits with status 1 if any benchmark regressed.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark the monitoring pipeline on synthetic data")
+    parser.add_argument("--rows", type=int, default=DEFAULT_ROWS, help="Number of synthetic invoices")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="Rounds of every benchmark")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the synthetic data")
+    parser.add_argument("--baseline", default=str(baseline_path()), help="Baseline file of this environment")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="Allowed slowdown ratio")
+    parser.add_argument("--save-baseline", action="store_true", help="Save the timings as the new baseline")
+    args = parser.parse_args()
+
+    results = run_benchmarks(n_invoices=args.rows, repeat=args.repeat, seed=args.seed)
+    for name, timing in results.items():
+        print(f"{name:<28} min {timing['min']:.4f}s  median {timing['median']:.4f}s")
+
+    if args.save_baseline:
+        save_baseline(results, args.rows, args.baseline)
+        print(f"Baseline saved to {args.baseline}")
+        return
+    if not Path(args.baseline).exists():
+        print(f"No baseline found at {args.baseline}: record one with --save-baseline")
+        return
+
+    baseline = load_baseline(args.baseline)
+    if baseline["rows"] != args.rows:
+        print(f"Warning: baseline measured on {baseline['rows']} rows, not {args.rows}")
+    regressions = compare_to_baseline(results, baseline["results"], args.tolerance)
+    for regression in regressions:
+        print(f"Regression: {regression}")
+    if regressions:
+        sys.exit(1)
+    print("No regression")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,294 @@
+import argparse
+import logging
+import os
+import sys
+import threading
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Dict, Iterator, List, Optional, Sequence, Tuple
+from monitoring.backends import create_connector
+from monitoring.config import ExecutorConfig, MonitoringConfig, load_config
+from monitoring.connection_pool import ConnectionPool
+from monitoring.metrics import MetricsRegistry
+from monitoring.monitoring_rule import MonitoringRule
+from monitoring.run_concurrent_monitoring import RuleOutcome, run_concurrent_monitoring
+from monitoring.slack_notifier import SlackDeliveryQueue
+from monitoring.watermark_store import create_watermark_store
+
+if TYPE_CHECKING:
+    from monitoring.alert_state import AlertStateStore
+    from monitoring.organization_dimension import OrganizationDimensionLookup
+    from monitoring.result_cache import ResultCache
+
+# Configuration file used when none is given, overridden by the MONITORING_CONFIG environment variable
+DEFAULT_CONFIG = "monitoring.toml"
+
+
+@contextmanager
+def executor_resources(
+    executor: ExecutorConfig,
+    rules: Sequence[MonitoringRule],
+    slack_token: Optional[str] = None
+) -> Iterator[Tuple[ConnectionPool, Optional[SlackDeliveryQueue]]]:
+    """
+    Open the connection pool and Slack delivery queue shared by the rules of a configuration.
+
+    Args:
+        executor (ExecutorConfig): How the rules are run
+        rules (Sequence[MonitoringRule]): Rules that will run, to know whether any posts to Slack
+        slack_token (str, optional): Slack bot token. No queue is created without a token
+
+    Yields:
+        Tuple[ConnectionPool, SlackDeliveryQueue | None]: The pool and the queue, closed on exit
+            (the queue delivering its remaining messages first)
+    """
+    shared_conn = None
+    if executor.backend == "duckdb":
+        # One embedded database, with a cursor (its own connection) per worker
+        shared_conn = create_connector("duckdb", executor.connection)
+        connect = shared_conn.cursor
+    else:
+        # The warehouse cancels the queries of a rule past its timeout, which the threads cannot do
+        connect = lambda: create_connector(
+            executor.backend, executor.connection or None, statement_timeout=executor.timeout
+        )
+    pool = ConnectionPool(connect=connect, max_size=executor.max_workers)
+    has_channel = bool(executor.slack_channel) or any(rule.slack_channel for rule in rules)
+    slack_queue = SlackDeliveryQueue(token=slack_token) if slack_token and has_channel else None
+    try:
+        yield pool, slack_queue
+    finally:
+        if slack_queue is not None:
+            slack_queue.close()
+        pool.close()
+        if shared_conn is not None:
+            shared_conn.close()
+
+
+def dimension_lookup(executor: ExecutorConfig) -> Optional["OrganizationDimensionLookup"]:
+    """
+    Get the organization dimension lookup of the process, when the configuration enriches alerts.
+
+    Args:
+        executor (ExecutorConfig): How the rules are run
+
+    Returns:
+        OrganizationDimensionLookup | None: The lookup shared by the runs of the process, or None
+    """
+    if not executor.enrich_organizations:
+        return None
+    # pandas is only imported when the alerts are enriched
+    from monitoring.organization_dimension import shared_dimension_lookup
+    from monitoring.result_cache import backend_freshness_probe
+
+    # DuckDB has no last altered time: the embedded dimension is read once per process
+    return shared_dimension_lookup(freshness_probe=backend_freshness_probe(executor.backend))
+
+
+def alert_state_store(executor: ExecutorConfig) -> Optional["AlertStateStore"]:
+    """
+    Open the alert store of a configuration, when it sets one.
+
+    Args:
+        executor (ExecutorConfig): How the rules are run
+
+    Returns:
+        AlertStateStore | None: The store at `executor.alert_store`, or None
+    """
+    if not executor.alert_store:
+        return None
+    # pandas is only imported when the alerts are deduplicated
+    from monitoring.alert_state import AlertStateStore
+
+    return AlertStateStore(executor.alert_store)
+
+
+def result_cache(executor: ExecutorConfig) -> Optional["ResultCache"]:
+    """
+    Create the result cache of a configuration, when it sets a TTL.
+
+    Args:
+        executor (ExecutorConfig): How the rules are run
+
+    Returns:
+        ResultCache | None: Cache probing the freshness of the tables with the probe of the
+            backend (see backend_freshness_probe), or None
+    """
+    if executor.result_cache_ttl is None:
+        return None
+    from monitoring.result_cache import ResultCache, backend_freshness_probe
+
+    return ResultCache(
+        ttl_seconds=executor.result_cache_ttl,
+        cache_dir=executor.result_cache_dir,
+        freshness_probe=backend_freshness_probe(executor.backend),
+    )
+
+
+def select_rules(config: MonitoringConfig, rule_names: Optional[Sequence[str]] = None) -> List[MonitoringRule]:
+    """
+    Get the rules of a configuration to run.
+
+    Args:
+        config (MonitoringConfig): Validated configuration
+        rule_names (Sequence[str], optional): Only keep these rules. Defaults to all the rules
+
+    Returns:
+        List[MonitoringRule]: Selected rules, in configuration order
+
+    Raises:
+        ValueError: If an unknown rule name is given
+    """
+    if not rule_names:
+        return list(config.rules)
+    unknown_names = sorted(set(rule_names) - {rule.name for rule in config.rules})
+    if unknown_names:
+        raise ValueError(f"Unknown monitoring rules: {', '.join(unknown_names)}")
+    return [rule for rule in config.rules if rule.name in rule_names]
+
+
+def run_config(
+    config: MonitoringConfig,
+    slack_token: Optional[str] = None,
+    rule_names: Optional[Sequence[str]] = None,
+    cancel_event: Optional[threading.Event] = None,
+    metrics_registry: Optional[MetricsRegistry] = None
+) -> Dict[str, RuleOutcome]:
+    """
+    Run the rules of a configuration in one process.
+
+    The rules share one connection pool and one Slack delivery queue, threshold rules reading
+    from the same table are batched into one query (unless disabled), and the rules run in
+    parallel on `max_workers` threads.
+
+    Args:
+        config (MonitoringConfig): Validated configuration (see load_config)
+        slack_token (str, optional): Slack bot token. Results are only posted with a token
+        rule_names (Sequence[str], optional): Only run these rules
+        cancel_event (threading.Event, optional): See run_concurrent_monitoring
+        metrics_registry (MetricsRegistry, optional): Registry the metrics of the runs are added to
+
+    Returns:
+        Dict[str, RuleOutcome]: Outcome of every rule keyed by rule name
+
+    Raises:
+        ValueError: If an unknown rule name is given
+    """
+    executor = config.executor
+    rules = select_rules(config, rule_names)
+    with executor_resources(executor, rules, slack_token) as (pool, slack_queue):
+        return run_concurrent_monitoring(
+            rules,
+            max_workers=executor.max_workers,
+            timeout=executor.timeout,
+            cancel_event=cancel_event,
+            slack_channel=executor.slack_channel,
+            pool=pool,
+            top_k=executor.top_k,
+            pushdown=executor.pushdown,
+            watermark_store=create_watermark_store(executor.watermark_store) if executor.watermark_store else None,
+            slack_queue=slack_queue,
+            metrics_registry=metrics_registry,
+            batch=executor.batch,
+            dimension_lookup=dimension_lookup(executor),
+            alert_store=alert_state_store(executor),
+            result_cache=result_cache(executor),
+        )
+
+
+def _print_outcomes(outcomes: Dict[str, RuleOutcome]) -> None:
+    for name, outcome in outcomes.items():
+        print(f"[{outcome.status}] {name} ({outcome.elapsed_seconds:.2f}s)")
+        if outcome.ok:
+            print(outcome.result)
+        elif outcome.error is not None:
+            print(f"Error: {outcome.error}")
+        print()
+
+
+def _run_daemon(
+    config: MonitoringConfig,
+    rule_names: Optional[Sequence[str]],
+    health_port: Optional[int],
+    metrics_registry: MetricsRegistry
+) -> int:
+    from monitoring.daemon import MonitoringDaemon, install_signal_handlers, serve_health
+
+    try:
+        daemon = MonitoringDaemon(
+            config, slack_token=os.getenv("SLACK_BOT_TOKEN"), rules=select_rules(config, rule_names),
+            metrics_registry=metrics_registry,
+        )
+    except ValueError as e:
+        print(str(e), file=sys.stderr)
+        return 1
+    install_signal_handlers(daemon)
+    health_port = health_port if health_port is not None else config.executor.health_port
+    server = serve_health(daemon, port=health_port, host="0.0.0.0") if health_port is not None else None
+    try:
+        daemon.run()
+    finally:
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+    return 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Command line entry point: `monitoring validate|run|daemon [config]`.
+
+    The Slack bot token is read from the SLACK_BOT_TOKEN environment variable, and the default
+    channel from SLACK_CHANNEL when the configuration has none.
+
+    Args:
+        argv (List[str], optional): Arguments, defaults to sys.argv
+
+    Returns:
+        int: Exit status, 1 if the configuration is invalid or any rule did not succeed (`run`)
+    """
+    parser = argparse.ArgumentParser(prog="monitoring", description="Run the monitoring rules of a configuration file")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    default_config = os.getenv("MONITORING_CONFIG", DEFAULT_CONFIG)
+
+    validate_parser = subparsers.add_parser("validate", help="Validate a configuration file")
+    validate_parser.add_argument("config", nargs="?", default=default_config, help="TOML or YAML file")
+
+    run_parser = subparsers.add_parser("run", help="Run the rules of a configuration file")
+    run_parser.add_argument("config", nargs="?", default=default_config, help="TOML or YAML file")
+    run_parser.add_argument("--rule", action="append", dest="rules", help="Only run this rule (repeatable)")
+
+    daemon_parser = subparsers.add_parser("daemon", help="Run the rules on their schedules until stopped")
+    daemon_parser.add_argument("config", nargs="?", default=default_config, help="TOML or YAML file")
+    daemon_parser.add_argument("--rule", action="append", dest="rules", help="Only run this rule (repeatable)")
+    daemon_parser.add_argument("--health-port", type=int, help="Port of the /health and /metrics endpoint")
+    args = parser.parse_args(argv)
+
+    try:
+        config = load_config(args.config)
+    except (OSError, ValueError, ImportError) as e:
+        print(str(e), file=sys.stderr)
+        return 1
+
+    if args.command == "validate":
+        print(f"{args.config}: valid ({len(config.rules)} rules)")
+        return 0
+
+    config.executor.slack_channel = config.executor.slack_channel or os.getenv("SLACK_CHANNEL")
+    config.executor.metrics_file = config.executor.metrics_file or os.getenv("MONITORING_METRICS_FILE")
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s %(message)s")
+    metrics_registry = MetricsRegistry()
+    if args.command == "daemon":
+        return _run_daemon(config, args.rules, args.health_port, metrics_registry)
+    try:
+        outcomes = run_config(
+            config, slack_token=os.getenv("SLACK_BOT_TOKEN"), rule_names=args.rules, metrics_registry=metrics_registry
+        )
+    except ValueError as e:
+        print(str(e), file=sys.stderr)
+        return 1
+    finally:
+        if config.executor.metrics_file:
+            metrics_registry.write_textfile(config.executor.metrics_file)
+
+    _print_outcomes(outcomes)
+    return 0 if all(outcome.ok for outcome in outcomes.values()) else 1
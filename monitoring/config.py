@@ -0,0 +1,238 @@
+import re
+import tomllib
+from dataclasses import dataclass, field, fields
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+from monitoring.backends import BACKENDS
+from monitoring.monitoring_rule import MODES, THRESHOLD, MonitoringRule
+from monitoring.query_builder import validate_identifier
+
+# Intervals such as "90", "30s", "15m", "1.5h" or "1d"
+INTERVAL_PATTERN = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*([smhd]?)\s*$")
+INTERVAL_UNITS = {"": 1, "s": 1, "m": 60, "h": 3600, "d": 86400}
+
+# Fields of a rule, and the ones without a default value
+RULE_FIELDS = {rule_field.name for rule_field in fields(MonitoringRule)}
+REQUIRED_RULE_FIELDS = [
+    "table_name", "target_column", "id_column", "date_column", "threshold", "start_date", "database", "schema",
+]
+RULE_IDENTIFIER_FIELDS = ["table_name", "target_column", "id_column", "date_column", "database", "schema"]
+
+# Modes run_monitoring can evaluate in the warehouse
+RULE_MODES = MODES
+
+CONFIG_SECTIONS = {"monitoring", "defaults", "rules"}
+
+
+def parse_interval(value: Union[str, int, float]) -> float:
+    """
+    Parse a schedule interval.
+
+    Args:
+        value (str | int | float): Number of seconds, or a number followed by s, m, h or d
+
+    Returns:
+        float: Interval in seconds
+
+    Raises:
+        ValueError: If the interval is invalid or not positive
+    """
+    match = INTERVAL_PATTERN.match(str(value))
+    if match is None:
+        raise ValueError(f"Invalid interval: {value!r}. Expected e.g. 30s, 15m, 1h or 1d")
+    seconds = float(match.group(1)) * INTERVAL_UNITS[match.group(2)]
+    if seconds <= 0:
+        raise ValueError(f"Invalid interval: {value!r}. It must be positive")
+    return seconds
+
+
+@dataclass
+class ExecutorConfig:
+    """
+    How the rules of a configuration are run, from its `[monitoring]` section.
+
+    Attributes:
+        backend (str): "snowflake" or "duckdb" (see monitoring.backends)
+        connection (Dict[str, Any]): Backend connection parameters. Snowflake defaults to the
+            environment variables (see get_connection_params)
+        max_workers (int): Maximum number of rules running at the same time, and size of the connection pool
+        timeout (float, optional): Maximum number of seconds for each rule, also the statement
+            timeout of the Snowflake sessions
+        batch (bool): Evaluate the threshold rules of the same table with a single query
+        top_k (int): Number of records displayed per rule
+        pushdown (bool): Let the warehouse return only the top_k records of every rule
+        slack_channel (str, optional): Slack channel of the rules without their own channel
+        watermark_store (str, optional): Path of the watermark store (see create_watermark_store)
+        alert_store (str, optional): Path of the SQLite alert store, to only alert on new or
+            escalated breaches (see monitoring.alert_state)
+        metrics_file (str, optional): Path of the Prometheus metrics file written after every run
+        result_cache_ttl (float, optional): Serve the results of the rules whose table did not
+            change from a cache for at most this many seconds (see monitoring.result_cache). The
+            batched rules are not cached
+        result_cache_dir (str, optional): Directory of the Parquet tier of the result cache, so
+            that cached results outlive the process. Requires result_cache_ttl
+        enrich_organizations (bool): Add the attributes of `dim__organizations` to the records of the
+            rules whose `id_column` is organization_id (see monitoring.organization_dimension)
+        jitter (float): Daemon only: random delay of every scheduled run, as a fraction of the
+            rule's interval, so that rules with the same schedule do not all start at once
+        health_port (int, optional): Daemon only: port of the health and metrics endpoint
+        shutdown_timeout (float): Daemon only: seconds to wait for the running rules on shutdown
+    """
+    backend: str = "snowflake"
+    connection: Dict[str, Any] = field(default_factory=dict)
+    max_workers: int = 4
+    timeout: Optional[float] = None
+    batch: bool = True
+    top_k: int = 5
+    pushdown: bool = True
+    slack_channel: Optional[str] = None
+    watermark_store: Optional[str] = None
+    alert_store: Optional[str] = None
+    metrics_file: Optional[str] = None
+    result_cache_ttl: Optional[float] = None
+    result_cache_dir: Optional[str] = None
+    enrich_organizations: bool = False
+    jitter: float = 0.1
+    health_port: Optional[int] = None
+    shutdown_timeout: float = 30.0
+
+
+@dataclass
+class MonitoringConfig:
+    """
+    Validated monitoring configuration.
+
+    Attributes:
+        rules (List[MonitoringRule]): Rules, in file order
+        executor (ExecutorConfig): How the rules are run
+    """
+    rules: List[MonitoringRule]
+    executor: ExecutorConfig = field(default_factory=ExecutorConfig)
+
+
+def _validate_rule(position: int, values: Dict[str, Any]) -> List[str]:
+    # Errors of one rule, prefixed with its name or position
+    label = f"rules[{position}] ({values['name']})" if values.get("name") else f"rules[{position}]"
+    errors = [f"{label}: unknown field {name}" for name in sorted(set(values) - RULE_FIELDS)]
+    errors += [f"{label}: missing field {name}" for name in REQUIRED_RULE_FIELDS if values.get(name) is None]
+    for name in RULE_IDENTIFIER_FIELDS:
+        if values.get(name) is not None:
+            try:
+                validate_identifier(str(values[name]))
+            except ValueError as e:
+                errors.append(f"{label}: {str(e)}")
+    threshold = values.get("threshold")
+    if threshold is not None and (isinstance(threshold, bool) or not isinstance(threshold, (int, float))):
+        errors.append(f"{label}: threshold must be a number")
+    if values.get("mode", THRESHOLD) not in RULE_MODES:
+        errors.append(f"{label}: mode must be one of {', '.join(RULE_MODES)}")
+    for name in ("window", "min_periods"):
+        value = values.get(name)
+        if value is not None and (isinstance(value, bool) or not isinstance(value, int) or value < 1):
+            errors.append(f"{label}: {name} must be a positive integer")
+    if values.get("schedule") is not None:
+        try:
+            parse_interval(values["schedule"])
+        except ValueError as e:
+            errors.append(f"{label}: {str(e)}")
+    return errors
+
+
+def _validate_executor(values: Dict[str, Any]) -> List[str]:
+    executor_fields = {executor_field.name for executor_field in fields(ExecutorConfig)}
+    errors = [f"monitoring: unknown field {name}" for name in sorted(set(values) - executor_fields)]
+    if values.get("backend", "snowflake") not in BACKENDS:
+        errors.append(f"monitoring: backend must be one of {', '.join(BACKENDS)}")
+    for name in ("max_workers", "top_k"):
+        value = values.get(name)
+        if value is not None and (isinstance(value, bool) or not isinstance(value, int) or value < 1):
+            errors.append(f"monitoring: {name} must be a positive integer")
+    jitter = values.get("jitter")
+    if jitter is not None and (isinstance(jitter, bool) or not isinstance(jitter, (int, float)) or not 0 <= jitter <= 1):
+        errors.append("monitoring: jitter must be a number between 0 and 1")
+    health_port = values.get("health_port")
+    if health_port is not None and (isinstance(health_port, bool) or not isinstance(health_port, int)
+                                    or not 0 <= health_port <= 65535):
+        errors.append("monitoring: health_port must be a port number")
+    for name in ("timeout", "shutdown_timeout", "result_cache_ttl"):
+        value = values.get(name)
+        if value is not None and (isinstance(value, bool) or not isinstance(value, (int, float)) or value <= 0):
+            errors.append(f"monitoring: {name} must be a positive number")
+    if values.get("result_cache_dir") and values.get("result_cache_ttl") is None:
+        errors.append("monitoring: result_cache_dir requires result_cache_ttl")
+    if values.get("batch", True) and values.get("watermark_store"):
+        errors.append("monitoring: batch cannot be combined with watermark_store, set batch = false")
+    if values.get("batch", True) and values.get("alert_store"):
+        errors.append("monitoring: batch cannot be combined with alert_store, set batch = false")
+    return errors
+
+
+def parse_config(data: Dict[str, Any]) -> MonitoringConfig:
+    """
+    Validate a configuration and build its rules.
+
+    Every field of `[defaults]` applies to the rules that do not set it. All the errors of the
+    configuration are reported at once.
+
+    Args:
+        data (Dict[str, Any]): Configuration with `monitoring`, `defaults` and `rules` sections
+
+    Returns:
+        MonitoringConfig: The validated configuration
+
+    Raises:
+        ValueError: If the configuration is invalid, with one line per error
+    """
+    errors = [f"unknown section {name}" for name in sorted(set(data) - CONFIG_SECTIONS)]
+    executor_values = data.get("monitoring") or {}
+    defaults = data.get("defaults") or {}
+    rule_values = data.get("rules") or []
+    errors += _validate_executor(executor_values)
+    if not rule_values:
+        errors.append("at least one rule is required")
+
+    merged_rules = [{**defaults, **values} for values in rule_values]
+    for position, values in enumerate(merged_rules):
+        errors += _validate_rule(position, values)
+
+    if not errors:
+        rules = [MonitoringRule(**values) for values in merged_rules]
+        rule_names = [rule.name for rule in rules]
+        duplicated_names = sorted({name for name in rule_names if rule_names.count(name) > 1})
+        if duplicated_names:
+            errors.append(f"duplicated rule names: {', '.join(duplicated_names)}")
+    if errors:
+        raise ValueError("Invalid monitoring configuration:\n" + "\n".join(f"- {error}" for error in errors))
+
+    return MonitoringConfig(rules=rules, executor=ExecutorConfig(**executor_values))
+
+
+def load_config(path: Union[str, Path]) -> MonitoringConfig:
+    """
+    Load and validate a TOML or YAML configuration file.
+
+    Args:
+        path (str | Path): `.toml`, `.yaml` or `.yml` file
+
+    Returns:
+        MonitoringConfig: The validated configuration
+
+    Raises:
+        ImportError: If a YAML file is given and PyYAML is not installed
+        ValueError: If the file type is not supported or the configuration is invalid
+    """
+    path = Path(path)
+    suffix = path.suffix.lower()
+    if suffix == ".toml":
+        with open(path, "rb") as f:
+            data = tomllib.load(f)
+    elif suffix in (".yaml", ".yml"):
+        try:
+            import yaml
+        except ImportError as e:
+            raise ImportError("YAML configuration files require PyYAML: pip install 'deel-takehome[config]'") from e
+        with open(path, "r", encoding="utf-8") as f:
+            data = yaml.safe_load(f) or {}
+    else:
+        raise ValueError(f"Unsupported configuration file type: {path.suffix}. Expected .toml, .yaml or .yml")
+    return parse_config(data)
@@ -0,0 +1,267 @@
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Deque, Iterable, Iterator, List, Optional, Tuple
+
+
+def ping_connection(conn: Any) -> bool:
+    """
+    Check that a DB-API connection is still usable.
+
+    Connections exposing `is_closed` (Snowflake) are checked without a round trip first,
+    then a trivial query is run on a fresh cursor.
+
+    Args:
+        conn: Connection to check
+
+    Returns:
+        bool: True if the connection answered, False otherwise
+    """
+    try:
+        is_closed = getattr(conn, "is_closed", None)
+        if callable(is_closed) and is_closed() is True:
+            return False
+        cur = conn.cursor()
+        try:
+            cur.execute("select 1")
+            cur.fetchone()
+        finally:
+            cur.close()
+        return True
+    except Exception:
+        return False
+
+
+def close_connection_quietly(conn: Any) -> None:
+    """
+    Close a connection, ignoring any error raised while closing.
+
+    Args:
+        conn: Connection to close
+    """
+    try:
+        conn.close()
+    except Exception:
+        pass
+
+
+def _close_all(connections: Iterable[Any]) -> None:
+    for conn in connections:
+        close_connection_quietly(conn)
+
+
+class ConnectionPool:
+    """
+    Bounded, thread-safe pool of reusable database connections.
+
+    The pool is backend agnostic: `connect` is any callable returning a DB-API style
+    connection (Snowflake, SQLite, DuckDB...). Idle connections are evicted after
+    `max_idle_seconds` and re-validated with `health_check` when they have been idle for
+    longer than `health_check_interval` seconds, so hot connections are handed out
+    without an extra round trip.
+
+    Usage:
+        pool = ConnectionPool(connect=create_connector)
+        with pool.connection() as conn:
+            df = read_snowflake_table(conn=conn, query=query)
+    """
+
+    def __init__(
+        self,
+        connect: Callable[[], Any],
+        max_size: int = 4,
+        max_idle_seconds: float = 300.0,
+        health_check: Optional[Callable[[Any], bool]] = ping_connection,
+        health_check_interval: float = 30.0,
+        checkout_timeout: Optional[float] = 30.0
+    ):
+        """
+        Args:
+            connect (Callable[[], Any]): Factory opening a new connection
+            max_size (int): Maximum number of open connections, idle or checked out
+            max_idle_seconds (float): Idle connections older than this are closed
+            health_check (Callable[[Any], bool], optional): Returns False for unusable connections
+            health_check_interval (float): Idle time after which a connection is re-validated on checkout
+            checkout_timeout (float, optional): Seconds to wait for a free connection. None waits forever
+
+        Raises:
+            ValueError: If max_size is lower than 1
+        """
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1")
+        self._connect = connect
+        self.max_size = max_size
+        self.max_idle_seconds = max_idle_seconds
+        self.health_check = health_check
+        self.health_check_interval = health_check_interval
+        self.checkout_timeout = checkout_timeout
+        self._idle: Deque[Tuple[Any, float]] = deque()
+        self._open_count = 0
+        self._closed = False
+        self._condition = threading.Condition()
+
+    @property
+    def open_count(self) -> int:
+        """Number of open connections, idle or checked out."""
+        return self._open_count
+
+    @property
+    def idle_count(self) -> int:
+        """Number of idle connections ready to be checked out."""
+        return len(self._idle)
+
+    def acquire(self) -> Any:
+        """
+        Check out a connection, reusing an idle one when possible.
+
+        Returns:
+            Any: An open connection. It must be given back with `release`
+
+        Raises:
+            RuntimeError: If the pool is closed
+            TimeoutError: If no connection becomes available within `checkout_timeout`
+        """
+        deadline = None if self.checkout_timeout is None else time.monotonic() + self.checkout_timeout
+        while True:
+            expired: List[Any] = []
+            try:
+                with self._condition:
+                    if self._closed:
+                        raise RuntimeError("Connection pool is closed")
+                    expired = self._pop_expired_locked()
+                    if self._idle:
+                        # Most recently used first, so that warm sessions are reused
+                        conn, last_used = self._idle.pop()
+                    elif self._open_count < self.max_size:
+                        self._open_count += 1
+                        conn, last_used = None, None
+                    else:
+                        remaining = None if deadline is None else deadline - time.monotonic()
+                        if remaining is not None and remaining <= 0:
+                            raise TimeoutError(
+                                f"Timed out waiting for a connection (max_size={self.max_size})"
+                            )
+                        self._condition.wait(remaining)
+                        continue
+            finally:
+                _close_all(expired)
+
+            if conn is None:
+                try:
+                    return self._connect()
+                except Exception:
+                    self._forget()
+                    raise
+
+            idle_time = time.monotonic() - last_used
+            if self.health_check is None or idle_time < self.health_check_interval or self.health_check(conn):
+                return conn
+            # Broken connection: drop it and try again
+            close_connection_quietly(conn)
+            self._forget()
+
+    def release(self, conn: Any, discard: bool = False) -> None:
+        """
+        Give a checked out connection back to the pool.
+
+        Args:
+            conn: Connection obtained from `acquire`
+            discard (bool): Close the connection instead of keeping it for reuse
+        """
+        with self._condition:
+            if not discard and not self._closed:
+                self._idle.append((conn, time.monotonic()))
+                self._condition.notify()
+                return
+        close_connection_quietly(conn)
+        self._forget()
+
+    @contextmanager
+    def connection(self) -> Iterator[Any]:
+        """
+        Context manager checking out a connection and giving it back on exit.
+
+        Yields:
+            Any: An open connection
+        """
+        conn = self.acquire()
+        try:
+            yield conn
+        except BaseException:
+            # The connection may be in an unknown state, validate it before the next use
+            self.release(conn, discard=self.health_check is not None and not self.health_check(conn))
+            raise
+        else:
+            self.release(conn)
+
+    def evict_idle(self) -> int:
+        """
+        Close idle connections that exceeded `max_idle_seconds`.
+
+        Returns:
+            int: Number of connections closed
+        """
+        with self._condition:
+            expired = self._pop_expired_locked()
+        _close_all(expired)
+        return len(expired)
+
+    def close(self) -> None:
+        """Close all idle connections and refuse further checkouts."""
+        with self._condition:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+            self._open_count -= len(idle)
+            self._condition.notify_all()
+        _close_all(conn for conn, _ in idle)
+
+    def __enter__(self) -> "ConnectionPool":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def _pop_expired_locked(self) -> List[Any]:
+        # Take the expired connections out of the pool. They are closed by the caller once the lock
+        # is released: closing a Snowflake session is a round trip that checkouts must not wait for
+        now = time.monotonic()
+        expired = []
+        # The oldest connections sit at the left of the deque
+        while self._idle and now - self._idle[0][1] > self.max_idle_seconds:
+            conn, _ = self._idle.popleft()
+            expired.append(conn)
+        if expired:
+            self._open_count -= len(expired)
+            self._condition.notify_all()
+        return expired
+
+    def _forget(self) -> None:
+        with self._condition:
+            self._open_count -= 1
+            self._condition.notify()
+
+
+@contextmanager
+def checkout_connection(pool: Optional[ConnectionPool], connect: Callable[[], Any]) -> Iterator[Any]:
+    """
+    Check out a connection from `pool`, or open a one-off connection closed on exit.
+
+    Args:
+        pool (ConnectionPool, optional): Pool to check the connection out from
+        connect (Callable[[], Any]): Factory used when no pool is given
+
+    Yields:
+        Any: An open connection
+    """
+    if pool is not None:
+        with pool.connection() as conn:
+            yield conn
+        return
+
+    conn = connect()
+    try:
+        yield conn
+    finally:
+        close_connection_quietly(conn)
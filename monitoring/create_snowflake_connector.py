@@ -1,10 +1,12 @@
 import os
-from typing import Optional, Dict, Any
-import snowflake.connector
+from typing import TYPE_CHECKING, Optional, Dict, Any
+
+if TYPE_CHECKING:
+    import snowflake.connector
 
 def create_snowflake_connector(
     connection_params: Optional[Dict[str, Any]]
-) -> snowflake.connector.SnowflakeConnection:
+) -> "snowflake.connector.SnowflakeConnection":
     """
     Create a connection to Snowflake.
     
@@ -32,9 +34,12 @@ def create_snowflake_connector(
     if missing_params:
         raise ValueError(f"Missing required connection parameters: {', '.join(missing_params)}")
     
+    # Imported on first use: the connector takes about a second to import
+    import snowflake.connector
+
     try:
-        # Establish connection to Snowflake
-        conn = snowflake.connector.connect(**connection_params)
+        # Establish connection to Snowflake. Queries bind values with `?` placeholders (see query_builder)
+        conn = snowflake.connector.connect(**{"paramstyle": "qmark", **connection_params})
         return conn
         
     except Exception as e:
@@ -0,0 +1,277 @@
+import argparse
+import threading
+import time
+from dataclasses import dataclass
+from datetime import date
+from typing import Any, Callable, Iterable, List, Optional
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from monitoring.connection_pool import ConnectionPool, checkout_connection
+from monitoring.local_backend import DEFAULT_DATABASE, DEFAULT_TARGET_SCHEMA, layer_schema
+from monitoring.query_builder import validate_identifier
+from monitoring.snowflake_reader import read_snowflake_table
+
+# dbt model with the latest balance row of every organization
+CURRENT_BALANCE_TABLE = "fct__organizations_current_balance"
+CURRENT_BALANCE_SCHEMA = layer_schema(DEFAULT_TARGET_SCHEMA, "fact_tables")
+
+
+@dataclass(frozen=True)
+class CurrentBalance:
+    """
+    Current balance of an organization.
+
+    Attributes:
+        organization_id (int): Identifier of the organization
+        balance_date (date): Date of its latest balance record
+        balance_usd (float, optional): Balance at that date, None when unknown
+    """
+    organization_id: int
+    balance_date: date
+    balance_usd: Optional[float]
+
+
+def read_current_balances(
+    conn: Any,
+    database: str = DEFAULT_DATABASE,
+    schema: str = CURRENT_BALANCE_SCHEMA,
+    table_name: str = CURRENT_BALANCE_TABLE
+) -> pa.Table:
+    """
+    Read the current balances from the warehouse.
+
+    Args:
+        conn: Snowflake or DuckDB connection
+        database (str): Name of the database
+        schema (str): Name of the schema
+        table_name (str): Name of the current balance table
+
+    Returns:
+        pa.Table: organization_id, balance_date and balance_usd of every organization
+    """
+    relation = ".".join(validate_identifier(name) for name in (database, schema, table_name))
+    table = read_snowflake_table(
+        conn, f"select organization_id, balance_date, balance_usd from {relation}", arrow=True
+    )
+    # Snowflake returns upper case column names
+    return table.rename_columns([column.lower() for column in table.column_names])
+
+
+class BalanceIndex:
+    """
+    Immutable in-memory index of the current balances, keyed by organization id.
+
+    The balances are stored in three NumPy arrays (about 24 bytes per organization) and the ids
+    in a hashed pandas Index, so a lookup is a hash probe and a bulk lookup a single vectorized
+    `get_indexer` call, whatever the number of organizations.
+    """
+
+    def __init__(self, organization_ids: Iterable[int], balance_dates: Iterable[Any], balances: Iterable[Optional[float]]):
+        """
+        Build the index.
+
+        Args:
+            organization_ids (Iterable[int]): Organization ids, unique
+            balance_dates (Iterable[Any]): Date of the latest balance record of each organization
+            balances (Iterable[float]): Balance of each organization, NaN or None when unknown
+
+        Raises:
+            ValueError: If the ids are not unique or the arrays do not have the same length
+        """
+        self._index = pd.Index(np.asarray(organization_ids, dtype=np.int64))
+        self._balance_dates = np.asarray(balance_dates, dtype="datetime64[D]")
+        self._balances = np.asarray(balances, dtype=np.float64)
+        if not len(self._index) == len(self._balance_dates) == len(self._balances):
+            raise ValueError("The organization ids, balance dates and balances must have the same length")
+        if not self._index.is_unique:
+            raise ValueError("Duplicated organization ids in the current balances")
+
+    @classmethod
+    def from_arrow(cls, table: pa.Table) -> "BalanceIndex":
+        """
+        Build the index from the current balances (see read_current_balances).
+
+        Args:
+            table (pa.Table): organization_id, balance_date and balance_usd columns. Rows without
+                an organization id are ignored
+
+        Returns:
+            BalanceIndex: The index
+        """
+        table = table.filter(table.column("organization_id").is_valid())
+        return cls(
+            table.column("organization_id").to_numpy(),
+            table.column("balance_date").cast(pa.date32()).to_numpy(),
+            table.column("balance_usd").cast(pa.float64()).to_numpy(zero_copy_only=False),
+        )
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __contains__(self, organization_id: int) -> bool:
+        return organization_id in self._index
+
+    @property
+    def nbytes(self) -> int:
+        """Memory used by the index, in bytes."""
+        return int(self._index.memory_usage() + self._balance_dates.nbytes + self._balances.nbytes)
+
+    def get(self, organization_id: int) -> Optional[CurrentBalance]:
+        """
+        Look up the current balance of an organization.
+
+        Args:
+            organization_id (int): Organization id
+
+        Returns:
+            CurrentBalance | None: The current balance, None for an unknown organization
+        """
+        try:
+            position = self._index.get_loc(organization_id)
+        except KeyError:
+            return None
+        balance = self._balances[position]
+        return CurrentBalance(
+            organization_id=int(organization_id),
+            balance_date=self._balance_dates[position].astype(date),
+            balance_usd=None if np.isnan(balance) else float(balance),
+        )
+
+    def get_many(self, organization_ids: Iterable[int]) -> pd.DataFrame:
+        """
+        Look up the current balances of many organizations at once.
+
+        Args:
+            organization_ids (Iterable[int]): Organization ids
+
+        Returns:
+            pd.DataFrame: organization_id, balance_date and balance_usd in the order of the ids,
+                with NaT and NaN for the unknown organizations
+        """
+        if not hasattr(organization_ids, "__len__"):
+            organization_ids = list(organization_ids)
+        ids = np.asarray(organization_ids, dtype=np.int64)
+        positions = self._index.get_indexer(ids)
+        found = positions >= 0
+        # Only the found positions are taken: -1 would read the last row, or fail on an empty index
+        balance_dates = np.full(len(ids), np.datetime64("NaT"), dtype="datetime64[D]")
+        balance_dates[found] = self._balance_dates[positions[found]]
+        balances = np.full(len(ids), np.nan)
+        balances[found] = self._balances[positions[found]]
+        return pd.DataFrame({"organization_id": ids, "balance_date": balance_dates, "balance_usd": balances})
+
+
+class CurrentBalanceLookup:
+    """
+    Point and bulk lookups of the current balances, loaded into a BalanceIndex.
+
+    The index is loaded on the first lookup and reloaded once it is older than `max_age`.
+    A reload builds the new index before swapping it in, so concurrent lookups always read a
+    consistent snapshot.
+    """
+
+    def __init__(
+        self,
+        database: str = DEFAULT_DATABASE,
+        schema: str = CURRENT_BALANCE_SCHEMA,
+        table_name: str = CURRENT_BALANCE_TABLE,
+        pool: Optional[ConnectionPool] = None,
+        connect: Optional[Callable[[], Any]] = None,
+        max_age: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        """
+        Initialize the lookup.
+
+        Args:
+            database (str): Name of the database
+            schema (str): Name of the schema
+            table_name (str): Name of the current balance table
+            pool (ConnectionPool, optional): Pool to check the connection out from
+            connect (Callable[[], Any], optional): Connection factory when no pool is given.
+                Defaults to create_connector (see MONITORING_BACKEND)
+            max_age (float, optional): Seconds after which the index is reloaded. Never by default
+            clock (Callable[[], float]): Monotonic clock, in seconds
+        """
+        self.database = database
+        self.schema = schema
+        self.table_name = table_name
+        self.pool = pool
+        self.connect = connect
+        self.max_age = max_age
+        self._clock = clock
+        self._index: Optional[BalanceIndex] = None
+        self._loaded_at: Optional[float] = None
+        self._refresh_lock = threading.Lock()
+
+    def _connect(self) -> Any:
+        if self.connect is not None:
+            return self.connect()
+        from monitoring.backends import create_connector
+        return create_connector()
+
+    def _is_stale(self) -> bool:
+        return self._index is None or (self.max_age is not None and self._clock() - self._loaded_at >= self.max_age)
+
+    def _load(self) -> BalanceIndex:
+        with checkout_connection(self.pool, self._connect) as conn:
+            table = read_current_balances(conn, self.database, self.schema, self.table_name)
+        self._index = BalanceIndex.from_arrow(table)
+        self._loaded_at = self._clock()
+        return self._index
+
+    def refresh(self) -> BalanceIndex:
+        """
+        Reload the index from the warehouse.
+
+        Returns:
+            BalanceIndex: The new index
+
+        Raises:
+            Exception: If there's an error reading the current balances
+        """
+        with self._refresh_lock:
+            return self._load()
+
+    @property
+    def index(self) -> BalanceIndex:
+        """The current index, loaded or reloaded when missing or stale."""
+        index = self._index
+        if not self._is_stale():
+            return index
+        with self._refresh_lock:
+            # Another thread may have reloaded the index while this one waited
+            if not self._is_stale():
+                return self._index
+            return self._load()
+
+    def get(self, organization_id: int) -> Optional[CurrentBalance]:
+        """
+        Look up the current balance of an organization (see BalanceIndex.get).
+        """
+        return self.index.get(organization_id)
+
+    def get_many(self, organization_ids: Iterable[int]) -> pd.DataFrame:
+        """
+        Look up the current balances of many organizations (see BalanceIndex.get_many).
+        """
+        return self.index.get_many(organization_ids)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """
+    Print the current balance of organizations from the command line.
+    """
+    parser = argparse.ArgumentParser(description="Look up the current balance of organizations")
+    parser.add_argument("organization_ids", nargs="+", type=int, help="Organization ids")
+    parser.add_argument("--database", default=DEFAULT_DATABASE, help="Database of the current balance table")
+    parser.add_argument("--schema", default=CURRENT_BALANCE_SCHEMA, help="Schema of the current balance table")
+    args = parser.parse_args(argv)
+
+    balances = CurrentBalanceLookup(database=args.database, schema=args.schema).get_many(args.organization_ids)
+    print(balances.to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,361 @@
+import json
+import logging
+import math
+import random
+import signal
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional, Sequence
+from monitoring.cli import alert_state_store, dimension_lookup, executor_resources, result_cache
+from monitoring.config import MonitoringConfig, parse_interval
+from monitoring.metrics import PROMETHEUS_CONTENT_TYPE, MetricsRegistry
+from monitoring.monitoring_rule import MonitoringRule
+from monitoring.run_concurrent_monitoring import FAILED, SUCCESS, TIMED_OUT, RuleOutcome, run_monitoring_rule
+from monitoring.watermark_store import create_watermark_store
+
+logger = logging.getLogger(__name__)
+
+# States of the daemon, reported by the health endpoint
+STARTING = "starting"
+RUNNING = "running"
+STOPPING = "stopping"
+STOPPED = "stopped"
+
+
+@dataclass
+class RuleSchedule:
+    """
+    Schedule and last outcome of a rule run by the daemon.
+
+    Runs are due every `interval` seconds from the start of the daemon, delayed by a random
+    jitter. A run due while the previous one is still going starts when it finishes, and the
+    slots missed meanwhile are skipped rather than run in a burst.
+
+    Attributes:
+        rule (MonitoringRule): Scheduled rule
+        interval (float): Seconds between two runs
+        slot_at (float): Monotonic time of the current slot, before jitter
+        next_run_at (float): Monotonic time of the next run
+        running (bool): Whether the rule is running
+        runs (int): Number of finished runs
+        consecutive_failures (int): Number of runs that did not succeed since the last success
+        skipped (int): Number of slots skipped because a run was still going or waiting for a worker
+        last_outcome (RuleOutcome, optional): Outcome of the last finished run
+        last_finished_at (float, optional): Unix time of the end of the last run
+    """
+    rule: MonitoringRule
+    interval: float
+    slot_at: float = 0.0
+    next_run_at: float = 0.0
+    running: bool = False
+    runs: int = 0
+    consecutive_failures: int = 0
+    skipped: int = 0
+    last_outcome: Optional[RuleOutcome] = None
+    last_finished_at: Optional[float] = None
+
+    def as_dict(self, now: float) -> Dict[str, Any]:
+        """
+        Get the state of the schedule as a JSON serializable dictionary.
+
+        Args:
+            now (float): Current monotonic time
+
+        Returns:
+            Dict[str, Any]: State of the schedule
+        """
+        return {
+            "interval_seconds": self.interval,
+            "next_run_in_seconds": None if self.running else round(max(self.next_run_at - now, 0.0), 3),
+            "running": self.running,
+            "runs": self.runs,
+            "consecutive_failures": self.consecutive_failures,
+            "skipped": self.skipped,
+            "last_status": self.last_outcome.status if self.last_outcome is not None else None,
+            "last_error": str(self.last_outcome.error) if self.last_outcome and self.last_outcome.error else None,
+            "last_elapsed_seconds": round(self.last_outcome.elapsed_seconds, 6) if self.last_outcome else None,
+            "last_finished_at": self.last_finished_at,
+        }
+
+
+class MonitoringDaemon:
+    """
+    Long-running process running the rules of a configuration on their schedules.
+
+    The connection pool, the Slack delivery queue, the watermark and alert stores, the organization
+    dimension, the result cache and the compiled query caches are created once and stay warm between runs, so a run only pays
+    for its queries.
+    At most `max_workers` rules run at the same time, and a rule never runs twice at the same time.
+
+    Usage:
+        daemon = MonitoringDaemon(load_config("monitoring.toml"), slack_token=token)
+        install_signal_handlers(daemon)
+        daemon.run()  # Until SIGTERM/SIGINT or daemon.stop()
+
+    Args:
+        config (MonitoringConfig): Validated configuration. Every rule needs a `schedule`
+        slack_token (str, optional): Slack bot token. Results are only posted with a token
+        rules (Sequence[MonitoringRule], optional): Rules to schedule. Defaults to all the rules
+        metrics_registry (MetricsRegistry, optional): Registry the metrics of the runs are added to
+        rng (random.Random, optional): Source of the jitter
+
+    Raises:
+        ValueError: If no rules are given or a rule has no schedule
+    """
+
+    def __init__(
+        self,
+        config: MonitoringConfig,
+        slack_token: Optional[str] = None,
+        rules: Optional[Sequence[MonitoringRule]] = None,
+        metrics_registry: Optional[MetricsRegistry] = None,
+        rng: Optional[random.Random] = None
+    ):
+        rules = list(config.rules if rules is None else rules)
+        if not rules:
+            raise ValueError("At least one monitoring rule is required")
+        unscheduled = [rule.name for rule in rules if rule.schedule is None]
+        if unscheduled:
+            raise ValueError(
+                f"Monitoring rules without a schedule: {', '.join(unscheduled)}. "
+                "Set `schedule` on the rules or in [defaults]"
+            )
+        self.config = config
+        self.executor_config = config.executor
+        self.slack_token = slack_token
+        self.metrics_registry = metrics_registry if metrics_registry is not None else MetricsRegistry()
+        self.schedules = [RuleSchedule(rule, parse_interval(rule.schedule)) for rule in rules]
+        self.state = STARTING
+        self._rng = rng or random.Random()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop_event = threading.Event()
+        self._futures: Dict[Future, RuleSchedule] = {}
+        self._started_at: Optional[float] = None
+        self._resources: Dict[str, Any] = {}
+
+    def run(self) -> None:
+        """
+        Run the rules on their schedules until `stop` is called.
+
+        On stop, no new run is started and the running ones are given `shutdown_timeout`
+        seconds to finish; the Slack queue then delivers its remaining messages.
+        """
+        executor_config = self.executor_config
+        rules = [schedule.rule for schedule in self.schedules]
+        with executor_resources(executor_config, rules, self.slack_token) as (pool, slack_queue):
+            self._resources = {
+                "pool": pool,
+                "slack_queue": slack_queue,
+                "watermark_store": (
+                    create_watermark_store(executor_config.watermark_store)
+                    if executor_config.watermark_store else None
+                ),
+                "dimension_lookup": dimension_lookup(executor_config),
+                "alert_store": alert_state_store(executor_config),
+                "result_cache": result_cache(executor_config),
+            }
+            executor = ThreadPoolExecutor(max_workers=executor_config.max_workers, thread_name_prefix="monitoring")
+            now = time.monotonic()
+            with self._lock:
+                self._started_at = now
+                for schedule in self.schedules:
+                    schedule.slot_at = now
+                    schedule.next_run_at = now + self._jitter(schedule)
+                self.state = RUNNING
+            logger.info("Monitoring daemon started with %d rules", len(self.schedules))
+            try:
+                while not self._stop_event.is_set():
+                    # Cleared before looking at the schedules, so that a run finishing meanwhile wakes the next wait
+                    self._wakeup.clear()
+                    self._dispatch_due_rules(executor)
+                    self._wakeup.wait(self._seconds_until_next_run())
+            finally:
+                with self._lock:
+                    self.state = STOPPING
+                    running = list(self._futures)
+                logger.info("Monitoring daemon stopping, waiting for %d running rules", len(running))
+                _, not_done = wait(running, timeout=executor_config.shutdown_timeout)
+                if not_done:
+                    logger.warning("Monitoring daemon abandoned %d running rules", len(not_done))
+                executor.shutdown(wait=False, cancel_futures=True)
+        self.state = STOPPED
+        logger.info("Monitoring daemon stopped")
+
+    def stop(self) -> None:
+        """Ask the daemon to stop. Safe to call from signal handlers and other threads."""
+        self._stop_event.set()
+        self._wakeup.set()
+
+    def health(self) -> Dict[str, Any]:
+        """
+        Get the state of the daemon and of every scheduled rule.
+
+        Returns:
+            Dict[str, Any]: JSON serializable health report
+        """
+        now = time.monotonic()
+        with self._lock:
+            return {
+                "status": self.state,
+                "uptime_seconds": round(now - self._started_at, 3) if self._started_at is not None else 0.0,
+                "running_rules": sum(schedule.running for schedule in self.schedules),
+                "rules": {schedule.rule.name: schedule.as_dict(now) for schedule in self.schedules},
+            }
+
+    def _jitter(self, schedule: RuleSchedule) -> float:
+        return self._rng.uniform(0, self.executor_config.jitter * schedule.interval)
+
+    def _advance(self, schedule: RuleSchedule, now: float) -> None:
+        # Move to the first slot after now, skipping the ones missed since the slot being run
+        missed = max(math.floor((now - schedule.slot_at) / schedule.interval), 0)
+        if missed:
+            schedule.skipped += missed
+            logger.warning("Monitoring rule %s started late, skipping %d runs", schedule.rule.name, missed)
+        schedule.slot_at += (missed + 1) * schedule.interval
+        schedule.next_run_at = schedule.slot_at + self._jitter(schedule)
+
+    def _dispatch_due_rules(self, executor: ThreadPoolExecutor) -> None:
+        now = time.monotonic()
+        to_start = []
+        with self._lock:
+            running_count = sum(schedule.running for schedule in self.schedules)
+            # Rules still running, or waiting for a free worker, stay due and start when a run finishes
+            due = sorted(
+                (schedule for schedule in self.schedules if schedule.next_run_at <= now and not schedule.running),
+                key=lambda schedule: schedule.next_run_at,
+            )
+            for schedule in due[:max(self.executor_config.max_workers - running_count, 0)]:
+                schedule.running = True
+                self._advance(schedule, now)
+                to_start.append(schedule)
+        # Submitted outside of the lock, which the callback of an already finished run takes
+        for schedule in to_start:
+            future = executor.submit(self._run_rule, schedule.rule)
+            with self._lock:
+                self._futures[future] = schedule
+            future.add_done_callback(self._finish_run)
+
+    def _seconds_until_next_run(self) -> Optional[float]:
+        # None waits until a run finishes or the daemon stops
+        with self._lock:
+            if sum(schedule.running for schedule in self.schedules) >= self.executor_config.max_workers:
+                return None
+            upcoming = [schedule.next_run_at for schedule in self.schedules if not schedule.running]
+        if not upcoming:
+            return None
+        return max(min(upcoming) - time.monotonic(), 0.0)
+
+    def _run_rule(self, rule: MonitoringRule) -> RuleOutcome:
+        # Runs on the worker itself: the rule stays running until its run returns, so a run past its
+        # timeout is never started again meanwhile. The warehouse statement timeout bounds its queries
+        executor_config = self.executor_config
+        started_at = time.monotonic()
+        try:
+            result = run_monitoring_rule(
+                rule,
+                slack_channel=executor_config.slack_channel,
+                dimension_lookup=self._resources["dimension_lookup"],
+                pool=self._resources["pool"],
+                top_k=executor_config.top_k,
+                pushdown=executor_config.pushdown,
+                watermark_store=self._resources["watermark_store"],
+                slack_queue=self._resources["slack_queue"],
+                alert_store=self._resources["alert_store"],
+                result_cache=self._resources["result_cache"],
+                metrics_registry=self.metrics_registry,
+            )
+        except Exception as e:
+            elapsed = time.monotonic() - started_at
+            timeout = executor_config.timeout
+            if timeout is not None and elapsed > timeout:
+                # e.g. the query was cancelled by the statement timeout
+                error = TimeoutError(f"Monitoring rule {rule.name} timed out after {timeout}s: {str(e)}")
+                return RuleOutcome(rule, TIMED_OUT, error=error, elapsed_seconds=elapsed)
+            return RuleOutcome(rule, FAILED, error=e, elapsed_seconds=elapsed)
+        return RuleOutcome(rule, SUCCESS, result=result, elapsed_seconds=time.monotonic() - started_at)
+
+    def _finish_run(self, future: Future) -> None:
+        with self._lock:
+            schedule = self._futures.pop(future)
+            error = future.exception() if not future.cancelled() else None
+            if future.cancelled():
+                outcome = None
+            elif error is not None:
+                outcome = RuleOutcome(schedule.rule, FAILED, error=error)
+            else:
+                outcome = future.result()
+            schedule.running = False
+            if outcome is not None:
+                schedule.runs += 1
+                schedule.last_outcome = outcome
+                schedule.last_finished_at = time.time()
+                schedule.consecutive_failures = 0 if outcome.status == SUCCESS else schedule.consecutive_failures + 1
+        if outcome is not None:
+            level = logging.INFO if outcome.status == SUCCESS else logging.ERROR
+            logger.log(level, "Monitoring rule %s %s in %.3fs", schedule.rule.name, outcome.status,
+                       outcome.elapsed_seconds)
+            if self.executor_config.metrics_file:
+                self.metrics_registry.write_textfile(self.executor_config.metrics_file)
+        self._wakeup.set()
+
+
+def serve_health(daemon: MonitoringDaemon, port: int = 8080, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """
+    Serve the health of the daemon on `/health` and its metrics on `/metrics` from a background thread.
+
+    `/health` answers 200 while the daemon is running and 503 otherwise, with the report of
+    `MonitoringDaemon.health` as JSON.
+
+    Args:
+        daemon (MonitoringDaemon): Daemon to report on
+        port (int): Port to listen on, 0 for any free port
+        host (str): Interface to listen on
+
+    Returns:
+        ThreadingHTTPServer: The running server. Call `shutdown()` and `server_close()` to stop it
+    """
+
+    class HealthHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            path = self.path.split("?")[0]
+            if path == "/health":
+                report = daemon.health()
+                status_code = 200 if report["status"] == RUNNING else 503
+                self._send(status_code, "application/json", json.dumps(report).encode("utf-8"))
+            elif path == "/metrics":
+                self._send(200, PROMETHEUS_CONTENT_TYPE, daemon.metrics_registry.to_prometheus().encode("utf-8"))
+            else:
+                self.send_error(404)
+
+        def _send(self, status_code: int, content_type: str, body: bytes) -> None:
+            self.send_response(status_code)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), HealthHandler)
+    threading.Thread(target=server.serve_forever, name="health-server", daemon=True).start()
+    return server
+
+
+def install_signal_handlers(
+    daemon: MonitoringDaemon,
+    signals: Sequence[int] = (signal.SIGTERM, signal.SIGINT)
+) -> None:
+    """
+    Stop the daemon gracefully on the given signals. Must be called from the main thread.
+
+    Args:
+        daemon (MonitoringDaemon): Daemon to stop
+        signals (Sequence[int]): Signals to handle
+    """
+    for signal_number in signals:
+        signal.signal(signal_number, lambda signum, frame: daemon.stop())
@@ -0,0 +1,483 @@
+import argparse
+import operator
+import sys
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
+from monitoring.local_backend import DEFAULT_DATABASE, DEFAULT_TARGET_SCHEMA, LANDING_COLUMNS, layer_schema
+from monitoring.query_builder import validate_identifier
+from monitoring.snowflake_reader import execute_query, fetch_arrow_table
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Kinds of data quality checks
+NOT_NULL = "not_null"
+UNIQUE = "unique"
+ACCEPTED_VALUES = "accepted_values"
+COMPARISON = "comparison"
+CHECK_KINDS = (NOT_NULL, UNIQUE, ACCEPTED_VALUES, COMPARISON)
+
+# Comparison operator -> SQL operator and vectorized function
+COMPARISON_OPERATORS: Dict[str, Tuple[str, Callable[[Any, Any], Any]]] = {
+    "==": ("=", operator.eq),
+    "!=": ("<>", operator.ne),
+    ">": (">", operator.gt),
+    ">=": (">=", operator.ge),
+    "<": ("<", operator.lt),
+    "<=": ("<=", operator.le),
+}
+
+# Failing rows reported per check
+DEFAULT_SAMPLE_SIZE = 5
+
+
+@dataclass
+class QualityCheck:
+    """
+    A data quality check on a column of a table.
+
+    Attributes:
+        kind (str): "not_null", "unique" (nulls are ignored), "accepted_values" or "comparison"
+        column (str): Column checked
+        values (Tuple[Any, ...], optional): Accepted values, in the "accepted_values" kind
+        operator (str, optional): "==", "!=", ">", ">=", "<" or "<=", in the "comparison" kind
+        other (str | float, optional): Column (str) or constant compared to, in the "comparison"
+            kind. Rows where either side is null pass
+        name (str, optional): Name of the check in the reports. Defaults to a description of the check
+    """
+    kind: str
+    column: str
+    values: Optional[Tuple[Any, ...]] = None
+    operator: Optional[str] = None
+    other: Union[str, float, None] = None
+    name: Optional[str] = None
+
+    def __post_init__(self):
+        if self.kind not in CHECK_KINDS:
+            raise ValueError(f"Unsupported check kind: {self.kind}. Expected one of: {', '.join(CHECK_KINDS)}")
+        validate_identifier(self.column)
+        if self.kind == ACCEPTED_VALUES and not self.values:
+            raise ValueError(f"The accepted_values check of {self.column} requires values")
+        if self.kind == COMPARISON:
+            if self.operator not in COMPARISON_OPERATORS:
+                raise ValueError(f"Unsupported operator: {self.operator}. Expected one of: {', '.join(COMPARISON_OPERATORS)}")
+            if self.other is None:
+                raise ValueError(f"The comparison check of {self.column} requires a column or value to compare to")
+            if isinstance(self.other, str):
+                validate_identifier(self.other)
+        if not self.name:
+            descriptions = {
+                NOT_NULL: f"{self.column} is not null",
+                UNIQUE: f"{self.column} is unique",
+                ACCEPTED_VALUES: f"{self.column} in accepted values",
+                COMPARISON: f"{self.column} {self.operator} {self.other}",
+            }
+            self.name = descriptions[self.kind]
+
+
+@dataclass
+class CheckResult:
+    """
+    Result of a check.
+
+    Attributes:
+        check (QualityCheck): The check
+        failures (int): Number of failing rows. For "unique", the rows beyond the first of every value
+        samples (pd.DataFrame, optional): Some failing rows, when the check failed
+    """
+    check: QualityCheck
+    failures: int
+    samples: Optional["pd.DataFrame"] = None
+
+    @property
+    def passed(self) -> bool:
+        return self.failures == 0
+
+
+@dataclass
+class ValidationReport:
+    """
+    Results of the checks of a table.
+
+    Attributes:
+        table (str): Table or file validated
+        row_count (int): Number of rows
+        results (List[CheckResult]): Result of every check, in check order
+    """
+    table: str
+    row_count: int
+    results: List[CheckResult] = field(default_factory=list)
+
+    @property
+    def failed_results(self) -> List[CheckResult]:
+        return [result for result in self.results if not result.passed]
+
+    @property
+    def passed(self) -> bool:
+        return not self.failed_results
+
+
+INVOICE_STATUSES = (
+    "awaiting_payment", "pending", "skipped", "refunded", "paid", "cancelled", "credited", "open", "failed",
+    "processing", "unpayable",
+)
+
+# Checks per landing and staging table: the dbt tests of the staging models, and the hypotheses
+# the models rely on (see the README): unique invoice ids, payment amounts equal to the invoice
+# amounts when both are set, and positive FX rates
+TABLE_CHECKS: Dict[str, List[QualityCheck]] = {
+    "invoices": [
+        QualityCheck(NOT_NULL, "INVOICE_ID"),
+        QualityCheck(UNIQUE, "INVOICE_ID"),
+        QualityCheck(NOT_NULL, "TRANSACTION_ID"),
+        QualityCheck(NOT_NULL, "ORGANIZATION_ID"),
+        QualityCheck(NOT_NULL, "STATUS"),
+        QualityCheck(NOT_NULL, "AMOUNT"),
+        QualityCheck(COMPARISON, "AMOUNT", operator="==", other="PAYMENT_AMOUNT"),
+        QualityCheck(COMPARISON, "FX_RATE", operator=">", other=0),
+        QualityCheck(COMPARISON, "FX_RATE_PAYMENT", operator=">", other=0),
+        QualityCheck(NOT_NULL, "CREATED_AT"),
+    ],
+    "organizations": [
+        QualityCheck(NOT_NULL, "ORGANIZATION_ID"),
+        QualityCheck(UNIQUE, "ORGANIZATION_ID"),
+        QualityCheck(NOT_NULL, "COUNT_TOTAL_CONTRACTS_ACTIVE"),
+        QualityCheck(COMPARISON, "COUNT_TOTAL_CONTRACTS_ACTIVE", operator=">=", other=0),
+        QualityCheck(NOT_NULL, "CREATED_DATE"),
+    ],
+    "stg__invoices": [
+        QualityCheck(NOT_NULL, "invoice_id"),
+        QualityCheck(UNIQUE, "invoice_id"),
+        QualityCheck(NOT_NULL, "transaction_id"),
+        QualityCheck(NOT_NULL, "organization_id"),
+        QualityCheck(NOT_NULL, "invoice_type"),
+        QualityCheck(NOT_NULL, "invoice_status"),
+        QualityCheck(ACCEPTED_VALUES, "invoice_status", values=INVOICE_STATUSES),
+        QualityCheck(NOT_NULL, "invoice_currency"),
+        QualityCheck(NOT_NULL, "invoice_amount"),
+        QualityCheck(COMPARISON, "invoice_amount", operator=">=", other=0),
+        QualityCheck(COMPARISON, "invoice_amount", operator="==", other="payment_amount"),
+        QualityCheck(NOT_NULL, "invoice_fx_rate"),
+        QualityCheck(COMPARISON, "invoice_fx_rate", operator=">", other=0),
+        QualityCheck(COMPARISON, "payment_fx_rate", operator=">", other=0),
+        QualityCheck(NOT_NULL, "created_at_utc"),
+    ],
+    "stg__organizations": [
+        QualityCheck(NOT_NULL, "organization_id"),
+        QualityCheck(UNIQUE, "organization_id"),
+        QualityCheck(NOT_NULL, "legal_entity_country_code"),
+        QualityCheck(NOT_NULL, "count_total_contracts_active"),
+        QualityCheck(COMPARISON, "count_total_contracts_active", operator=">=", other=0),
+        QualityCheck(NOT_NULL, "created_at_utc"),
+    ],
+}
+
+
+def get_table_checks(table_name: str) -> List[QualityCheck]:
+    """
+    Get the checks of a landing or staging table.
+
+    Args:
+        table_name (str): A key of TABLE_CHECKS
+
+    Returns:
+        List[QualityCheck]: The checks of the table
+
+    Raises:
+        ValueError: If the table has no checks
+    """
+    if table_name not in TABLE_CHECKS:
+        raise ValueError(f"No checks for table: {table_name}. Expected one of: {', '.join(TABLE_CHECKS)}")
+    return TABLE_CHECKS[table_name]
+
+
+def _failure_condition(check: QualityCheck) -> Tuple[str, List[Any]]:
+    # SQL condition of the failing rows of a row-level check, and its parameters
+    column = check.column
+    if check.kind == NOT_NULL:
+        return f"{column} is null", []
+    if check.kind == ACCEPTED_VALUES:
+        placeholders = ", ".join("?" for _ in check.values)
+        return f"{column} is not null and {column} not in ({placeholders})", list(check.values)
+    sql_operator = COMPARISON_OPERATORS[check.operator][0]
+    if isinstance(check.other, str):
+        return f"{column} is not null and {check.other} is not null and not ({column} {sql_operator} {check.other})", []
+    return f"{column} is not null and not ({column} {sql_operator} ?)", [check.other]
+
+
+def build_validation_query(relation: str, checks: Sequence[QualityCheck]) -> Tuple[str, List[Any]]:
+    """
+    Build the query evaluating every check of a table in one scan.
+
+    Row-level checks are conditional counts and uniqueness checks compare the count of values
+    with the count of distinct values, so the table is read once whatever the number of checks.
+
+    Args:
+        relation (str): Fully qualified table, e.g. `deel_takehome_dev.ehernani_landing.invoices`
+        checks (Sequence[QualityCheck]): Checks of the table
+
+    Returns:
+        Tuple[str, List[Any]]: Query returning the row count and the failures of every check in
+            one row (`row_count`, `check_0`, `check_1`, ...), and its `?` parameters
+    """
+    columns = ["count(*) as row_count"]
+    params: List[Any] = []
+    for position, check in enumerate(checks):
+        if check.kind == UNIQUE:
+            columns.append(f"count({check.column}) - count(distinct {check.column}) as check_{position}")
+        else:
+            condition, condition_params = _failure_condition(check)
+            columns.append(f"coalesce(sum(case when {condition} then 1 else 0 end), 0) as check_{position}")
+            params.extend(condition_params)
+    select_list = ",\n        ".join(columns)
+    return f"select\n        {select_list}\n    from {relation}", params
+
+
+def build_sample_query(relation: str, check: QualityCheck, sample_size: int = DEFAULT_SAMPLE_SIZE) -> Tuple[str, List[Any]]:
+    """
+    Build the query returning some failing rows of a check.
+
+    Args:
+        relation (str): Fully qualified table
+        check (QualityCheck): A failed check
+        sample_size (int): Maximum number of rows
+
+    Returns:
+        Tuple[str, List[Any]]: Query and its `?` parameters
+    """
+    if check.kind == UNIQUE:
+        return (
+            f"select * from {relation} where {check.column} is not null "
+            f"qualify count(*) over (partition by {check.column}) > 1 "
+            f"order by {check.column} limit {int(sample_size)}"
+        ), []
+    condition, params = _failure_condition(check)
+    return f"select * from {relation} where {condition} limit {int(sample_size)}", params
+
+
+def validate_table(
+    conn: Any,
+    database: str,
+    schema: str,
+    table_name: str,
+    checks: Optional[Sequence[QualityCheck]] = None,
+    sample_size: int = DEFAULT_SAMPLE_SIZE
+) -> ValidationReport:
+    """
+    Run the checks of a warehouse table in one scan, then fetch sample rows of the failed checks.
+
+    Args:
+        conn: Snowflake or DuckDB connection
+        database (str): Name of the database
+        schema (str): Name of the schema
+        table_name (str): Name of the table
+        checks (Sequence[QualityCheck], optional): Defaults to the checks of the table in TABLE_CHECKS
+        sample_size (int): Failing rows fetched per failed check, 0 to skip the samples
+
+    Returns:
+        ValidationReport: Results of the checks
+
+    Raises:
+        ValueError: If an identifier is invalid, or no checks are given for a table without checks
+        Exception: If there's an error running the queries
+    """
+    checks = list(checks) if checks is not None else get_table_checks(table_name)
+    relation = ".".join(validate_identifier(name) for name in (database, schema, table_name))
+    query, params = build_validation_query(relation, checks)
+
+    try:
+        cur = conn.cursor()
+        try:
+            execute_query(cur, query, params)
+            row = cur.fetchone()
+            report = ValidationReport(
+                table=relation,
+                row_count=int(row[0]),
+                results=[CheckResult(check=check, failures=int(row[position + 1])) for position, check in enumerate(checks)],
+            )
+            if sample_size > 0:
+                for result in report.failed_results:
+                    sample_query, sample_params = build_sample_query(relation, result.check, sample_size)
+                    execute_query(cur, sample_query, sample_params)
+                    result.samples = fetch_arrow_table(cur).to_pandas()
+        finally:
+            cur.close()
+    except Exception as e:
+        raise Exception(f"Error validating {relation}: {str(e)}")
+    return report
+
+
+def _failure_mask(data: "pd.DataFrame", check: QualityCheck, columns: Dict[str, str]) -> "pd.Series":
+    # Vectorized mask of the failing rows of a check
+    values = data[columns[check.column.lower()]]
+    if check.kind == NOT_NULL:
+        return values.isna()
+    if check.kind == UNIQUE:
+        return values.notna() & values.duplicated(keep=False)
+    if check.kind == ACCEPTED_VALUES:
+        return values.notna() & ~values.isin(check.values)
+    other = data[columns[check.other.lower()]] if isinstance(check.other, str) else check.other
+    both_set = values.notna() & (other.notna() if isinstance(check.other, str) else True)
+    return both_set & ~COMPARISON_OPERATORS[check.operator][1](values, other).fillna(False).astype(bool)
+
+
+def validate_dataframe(
+    data: "pd.DataFrame",
+    checks: Sequence[QualityCheck],
+    table: str = "dataframe",
+    sample_size: int = DEFAULT_SAMPLE_SIZE
+) -> ValidationReport:
+    """
+    Run checks on a DataFrame with vectorized operations, with the same semantics as validate_table.
+
+    Column names are matched case-insensitively, as in the warehouse.
+
+    Args:
+        data (pd.DataFrame): Rows to validate
+        checks (Sequence[QualityCheck]): Checks to run
+        table (str): Name of the data in the report
+        sample_size (int): Failing rows kept per failed check
+
+    Returns:
+        ValidationReport: Results of the checks
+
+    Raises:
+        ValueError: If a checked column is missing
+    """
+    columns = {column.lower(): column for column in data.columns}
+    checked_columns = [check.column for check in checks] + [check.other for check in checks if isinstance(check.other, str)]
+    missing_columns = sorted({column for column in checked_columns if column.lower() not in columns})
+    if missing_columns:
+        raise ValueError(f"Missing columns in {table}: {', '.join(missing_columns)}")
+
+    report = ValidationReport(table=table, row_count=len(data))
+    for check in checks:
+        mask = _failure_mask(data, check, columns)
+        if check.kind == UNIQUE:
+            values = data[columns[check.column.lower()]]
+            failures = int(values.notna().sum()) - int(values.nunique())
+        else:
+            failures = int(mask.sum())
+        result = CheckResult(check=check, failures=failures)
+        if failures and sample_size > 0:
+            samples = data[mask]
+            if check.kind == UNIQUE:
+                samples = samples.sort_values(columns[check.column.lower()], kind="stable")
+            result.samples = samples.head(sample_size).reset_index(drop=True)
+        report.results.append(result)
+    return report
+
+
+def read_landing_file(path: Union[str, Path], table_name: Optional[str] = None) -> "pd.DataFrame":
+    """
+    Read a CSV or Parquet file (or a directory of Parquet files) to validate.
+
+    Args:
+        path (str | Path): `.csv` or `.parquet` file, or directory of Parquet files (see csv_to_parquet)
+        table_name (str, optional): Landing table of the file, to parse a CSV with its column types
+
+    Returns:
+        pd.DataFrame: The rows of the file
+    """
+    import pyarrow.csv as pa_csv
+    import pyarrow.parquet as pq
+
+    path = Path(path)
+    if path.suffix.lower() == ".csv":
+        convert_options = None
+        if table_name in LANDING_COLUMNS:
+            from monitoring.landing_loader import landing_schema
+            schema = landing_schema(table_name)
+            convert_options = pa_csv.ConvertOptions(
+                column_types={landing_field.name: landing_field.type for landing_field in schema},
+                strings_can_be_null=True,
+            )
+        return pa_csv.read_csv(path, convert_options=convert_options).to_pandas()
+    return pq.read_table(path).to_pandas()
+
+
+def validate_file(
+    path: Union[str, Path],
+    table_name: str,
+    checks: Optional[Sequence[QualityCheck]] = None,
+    sample_size: int = DEFAULT_SAMPLE_SIZE
+) -> ValidationReport:
+    """
+    Run the checks of a table on a file, before it is loaded.
+
+    Args:
+        path (str | Path): CSV or Parquet file, or directory of Parquet files
+        table_name (str): Table of the file
+        checks (Sequence[QualityCheck], optional): Defaults to the checks of the table in TABLE_CHECKS
+        sample_size (int): Failing rows kept per failed check
+
+    Returns:
+        ValidationReport: Results of the checks
+
+    Raises:
+        ValueError: If a checked column is missing, or no checks are given for a table without checks
+    """
+    checks = list(checks) if checks is not None else get_table_checks(table_name)
+    return validate_dataframe(read_landing_file(path, table_name), checks, table=str(path), sample_size=sample_size)
+
+
+def format_validation_report(report: ValidationReport) -> str:
+    """
+    Format a validation report, with the sample rows of the failed checks.
+
+    Args:
+        report (ValidationReport): Results of the checks
+
+    Returns:
+        str: Formatted report
+    """
+    failed_results = report.failed_results
+    lines = [
+        f"Data quality of {report.table}: {report.row_count} rows, "
+        f"{len(failed_results)} of {len(report.results)} checks failed"
+    ]
+    for result in failed_results:
+        lines.append(f"- {result.check.name}: {result.failures} failing rows")
+        if result.samples is not None and not result.samples.empty:
+            lines.append(result.samples.to_string(index=False))
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Validate a landing or staging table, or a landing file, from the command line.
+
+    Args:
+        argv (List[str], optional): Arguments, defaults to sys.argv
+
+    Returns:
+        int: Exit status, 1 if any check failed
+    """
+    from monitoring.backends import BACKENDS, create_connector, get_backend
+
+    parser = argparse.ArgumentParser(description="Run the data quality checks of a table in one scan")
+    parser.add_argument("table", choices=sorted(TABLE_CHECKS), help="Table to validate")
+    parser.add_argument("--file", help="Validate this CSV or Parquet file instead of the warehouse table")
+    parser.add_argument("--backend", choices=BACKENDS, default=None, help="Warehouse backend (MONITORING_BACKEND)")
+    parser.add_argument("--database", default=DEFAULT_DATABASE, help="Database of the table")
+    parser.add_argument("--schema", default=None, help="Schema of the table, defaults to its dbt layer schema")
+    parser.add_argument("--samples", type=int, default=DEFAULT_SAMPLE_SIZE, help="Failing rows shown per check")
+    args = parser.parse_args(argv)
+
+    if args.file:
+        report = validate_file(args.file, args.table, sample_size=args.samples)
+    else:
+        layer = "landing" if args.table in LANDING_COLUMNS else "staging"
+        schema = args.schema or layer_schema(DEFAULT_TARGET_SCHEMA, layer)
+        conn = create_connector(args.backend or get_backend())
+        try:
+            report = validate_table(conn, args.database, schema, args.table, sample_size=args.samples)
+        finally:
+            conn.close()
+    print(format_validation_report(report))
+    return 0 if report.passed else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,365 @@
+import argparse
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+from monitoring.local_backend import DEFAULT_DATABASE, DEFAULT_TARGET_SCHEMA, LANDING_COLUMNS, layer_schema
+from monitoring.query_builder import validate_identifier
+
+# Arrow types of the landing column types
+ARROW_TYPES = {
+    "BIGINT": pa.int64(),
+    "VARCHAR": pa.string(),
+    "DOUBLE": pa.float64(),
+    "DATE": pa.date32(),
+    "TIMESTAMPTZ": pa.timestamp("us", tz="UTC"),
+}
+
+# Rows per Parquet file. Files of this size are loaded in parallel by COPY INTO
+DEFAULT_CHUNK_ROWS = 1_000_000
+
+# Bytes of CSV parsed at a time, which bounds the memory used by the conversion
+DEFAULT_BLOCK_SIZE = 16 << 20
+
+DEFAULT_COMPRESSION = "zstd"
+
+# Internal stage the Parquet files are uploaded to, dropped with the session
+DEFAULT_STAGE = "landing_loader_stage"
+
+# Suffix of the table a replaced landing table is loaded into before being swapped in
+LOADING_SUFFIX = "__loading"
+
+LOADER_BACKENDS = ("snowflake", "duckdb")
+
+LANDING_SCHEMA = layer_schema(DEFAULT_TARGET_SCHEMA, "landing")
+
+
+def landing_schema(table_name: str) -> pa.Schema:
+    """
+    Get the Arrow schema of a landing table.
+
+    Args:
+        table_name (str): Landing table, a key of LANDING_COLUMNS
+
+    Returns:
+        pa.Schema: Columns of the table with their Arrow types, in table order
+
+    Raises:
+        ValueError: If the table is not a landing table
+    """
+    if table_name not in LANDING_COLUMNS:
+        raise ValueError(f"Unknown landing table: {table_name}. Expected one of: {', '.join(LANDING_COLUMNS)}")
+    return pa.schema([
+        (column, ARROW_TYPES[column_type]) for column, column_type in LANDING_COLUMNS[table_name].items()
+    ])
+
+
+def csv_to_parquet(
+    csv_path: Union[str, Path],
+    output_dir: Union[str, Path],
+    table_name: str,
+    chunk_rows: int = DEFAULT_CHUNK_ROWS,
+    block_size: int = DEFAULT_BLOCK_SIZE,
+    compression: str = DEFAULT_COMPRESSION
+) -> List[Path]:
+    """
+    Convert a landing CSV file to compressed Parquet files in one streaming pass.
+
+    The CSV is parsed block by block with the types of the landing table, so memory use is
+    bounded by `block_size` whatever the size of the file, and written to files of at most
+    `chunk_rows` rows. Columns of the CSV that are not in the landing table are ignored.
+
+    Args:
+        csv_path (str | Path): CSV file with a header row
+        output_dir (str | Path): Directory of the Parquet files, `part-00000.parquet` onwards.
+            Parquet files already in it are removed
+        table_name (str): Landing table the file is loaded into (see LANDING_COLUMNS)
+        chunk_rows (int): Maximum number of rows per Parquet file
+        block_size (int): Bytes of CSV parsed at a time
+        compression (str): Parquet compression codec
+
+    Returns:
+        List[Path]: The Parquet files, at least one (empty when the CSV has no rows)
+
+    Raises:
+        ValueError: If the table is unknown or the CSV misses columns of the table
+        Exception: If there's an error reading the CSV or writing the Parquet files
+    """
+    schema = landing_schema(table_name)
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    for stale_path in output_dir.glob("*.parquet"):
+        stale_path.unlink()
+
+    try:
+        reader = pa_csv.open_csv(
+            csv_path,
+            read_options=pa_csv.ReadOptions(block_size=block_size),
+            convert_options=pa_csv.ConvertOptions(
+                column_types={landing_field.name: landing_field.type for landing_field in schema},
+                strings_can_be_null=True,
+            ),
+        )
+    except Exception as e:
+        raise Exception(f"Error reading {csv_path}: {str(e)}")
+    missing_columns = [column for column in schema.names if column not in reader.schema.names]
+    if missing_columns:
+        raise ValueError(f"{csv_path} misses columns of the {table_name} table: {', '.join(missing_columns)}")
+
+    paths: List[Path] = []
+    writer: Optional[pq.ParquetWriter] = None
+    rows_in_file = 0
+
+    def open_writer() -> pq.ParquetWriter:
+        paths.append(output_dir / f"part-{len(paths):05d}.parquet")
+        return pq.ParquetWriter(paths[-1], schema, compression=compression)
+
+    try:
+        for batch in reader:
+            batch = batch.select(schema.names)
+            offset = 0
+            while offset < batch.num_rows:
+                if writer is None:
+                    writer = open_writer()
+                    rows_in_file = 0
+                length = min(chunk_rows - rows_in_file, batch.num_rows - offset)
+                writer.write_batch(batch.slice(offset, length))
+                offset += length
+                rows_in_file += length
+                if rows_in_file == chunk_rows:
+                    writer.close()
+                    writer = None
+        if not paths:
+            writer = open_writer()
+    except Exception as e:
+        raise Exception(f"Error converting {csv_path} to Parquet: {str(e)}")
+    finally:
+        if writer is not None:
+            writer.close()
+    return paths
+
+
+def load_parquet_duckdb(
+    conn: Any,
+    parquet_dir: Union[str, Path],
+    table_name: str,
+    database: str = DEFAULT_DATABASE,
+    schema: str = LANDING_SCHEMA,
+    replace: bool = True
+) -> int:
+    """
+    Load Parquet files into a DuckDB landing table.
+
+    The table is replaced or appended to in one transaction: if the load fails, the table keeps
+    its previous rows.
+
+    Args:
+        conn: DuckDB connection (see create_duckdb_connector)
+        parquet_dir (str | Path): Directory of the Parquet files (see csv_to_parquet)
+        table_name (str): Landing table
+        database (str): Name of the database
+        schema (str): Landing schema
+        replace (bool): Replace the table, else append to it (creating it if needed)
+
+    Returns:
+        int: Number of rows loaded
+
+    Raises:
+        Exception: If there's an error loading the files
+    """
+    columns = LANDING_COLUMNS[table_name]
+    relation = ".".join(validate_identifier(name) for name in (database, schema, table_name))
+    casts = ", ".join(f"{column}::{column_type} as {column}" for column, column_type in columns.items())
+    source = f"select {casts} from read_parquet(?)"
+    parquet_glob = str(Path(parquet_dir) / "*.parquet")
+
+    try:
+        conn.execute(f"create schema if not exists {database}.{schema}")
+        conn.execute("begin transaction")
+        try:
+            if replace:
+                conn.execute(f"create or replace table {relation} as {source}", [parquet_glob])
+            else:
+                conn.execute(f"create table if not exists {relation} ({_column_definitions(table_name)})")
+                conn.execute(f"insert into {relation} {source}", [parquet_glob])
+            conn.execute("commit")
+        except Exception:
+            conn.execute("rollback")
+            raise
+        return conn.execute("select count(*) from read_parquet(?)", [parquet_glob]).fetchone()[0]
+    except Exception as e:
+        raise Exception(f"Error loading {table_name} into DuckDB: {str(e)}")
+
+
+def _column_definitions(table_name: str) -> str:
+    # BIGINT, VARCHAR, DOUBLE, DATE and TIMESTAMPTZ are valid types in Snowflake and DuckDB
+    return ", ".join(f"{column} {column_type}" for column, column_type in LANDING_COLUMNS[table_name].items())
+
+
+def _quote_literal(value: str) -> str:
+    return "'" + value.replace("\\", "\\\\").replace("'", "\\'") + "'"
+
+
+def load_parquet_snowflake(
+    conn: Any,
+    parquet_dir: Union[str, Path],
+    table_name: str,
+    database: str = DEFAULT_DATABASE,
+    schema: str = LANDING_SCHEMA,
+    replace: bool = True,
+    stage: str = DEFAULT_STAGE,
+    parallel: int = 8
+) -> int:
+    """
+    Bulk load Parquet files into a Snowflake landing table with PUT and COPY INTO.
+
+    The files are uploaded to a temporary internal stage, then copied by column name into the
+    table, which is created with the landing column types. The staged files are purged once loaded.
+    A replaced table is loaded under another name first and swapped in once the copy succeeded,
+    so a failed load leaves the table unchanged.
+
+    Args:
+        conn: Snowflake connection (see create_snowflake_connector)
+        parquet_dir (str | Path): Directory of the Parquet files (see csv_to_parquet)
+        table_name (str): Landing table
+        database (str): Name of the database
+        schema (str): Landing schema
+        replace (bool): Replace the table, else append to it (creating it if needed)
+        stage (str): Name of the temporary stage
+        parallel (int): Number of threads uploading the files
+
+    Returns:
+        int: Number of rows loaded
+
+    Raises:
+        Exception: If there's an error uploading or loading the files
+    """
+    relation = ".".join(validate_identifier(name) for name in (database, schema, table_name))
+    # Table the files are copied into: the landing table itself when appending
+    load_relation = f"{relation}{LOADING_SUFFIX}" if replace else relation
+    stage_location = f"@{database}.{schema}.{validate_identifier(stage)}/{table_name}"
+    file_pattern = (Path(parquet_dir).resolve() / "*.parquet").as_posix()
+
+    try:
+        cur = conn.cursor()
+        try:
+            cur.execute(f"create temporary stage if not exists {database}.{schema}.{stage}")
+            cur.execute(
+                f"put {_quote_literal('file://' + file_pattern)} {stage_location} "
+                f"parallel = {int(parallel)} auto_compress = false overwrite = true"
+            )
+            create = "create or replace table" if replace else "create table if not exists"
+            cur.execute(f"{create} {load_relation} ({_column_definitions(table_name)})")
+            try:
+                cur.execute(
+                    f"copy into {load_relation} from {stage_location} "
+                    "file_format = (type = parquet) match_by_column_name = case_insensitive purge = true"
+                )
+                results = cur.fetchall()
+                columns = [column[0].lower() for column in cur.description or []]
+                if replace:
+                    cur.execute(f"create table if not exists {relation} ({_column_definitions(table_name)})")
+                    cur.execute(f"alter table {load_relation} swap with {relation}")
+            finally:
+                if replace:
+                    # Holds the previous rows after the swap, or the partial load after a failure
+                    cur.execute(f"drop table if exists {load_relation}")
+        finally:
+            cur.close()
+    except Exception as e:
+        raise Exception(f"Error loading {table_name} into Snowflake: {str(e)}")
+
+    if "rows_loaded" not in columns:
+        return 0
+    rows_loaded = columns.index("rows_loaded")
+    return sum(int(result[rows_loaded]) for result in results)
+
+
+def load_landing_files(
+    conn: Any,
+    files: Dict[str, Union[str, Path]],
+    work_dir: Union[str, Path],
+    backend: str = "snowflake",
+    database: str = DEFAULT_DATABASE,
+    schema: str = LANDING_SCHEMA,
+    replace: bool = True,
+    chunk_rows: int = DEFAULT_CHUNK_ROWS
+) -> Dict[str, int]:
+    """
+    Load landing CSV files: convert them to Parquet, then bulk load them.
+
+    Args:
+        conn: Connection of the backend (see create_connector)
+        files (Dict[str, str | Path]): Landing table -> CSV file
+        work_dir (str | Path): Directory of the intermediate Parquet files, one subdirectory per table
+        backend (str): "snowflake" or "duckdb"
+        database (str): Name of the database
+        schema (str): Landing schema
+        replace (bool): Replace the tables, else append to them
+        chunk_rows (int): Maximum number of rows per Parquet file
+
+    Returns:
+        Dict[str, int]: Number of rows loaded per table
+
+    Raises:
+        ValueError: If the backend or a table is not supported, or a CSV misses columns
+        Exception: If there's an error converting or loading a file
+    """
+    if backend not in LOADER_BACKENDS:
+        raise ValueError(f"Unsupported backend: {backend}. Expected one of: {', '.join(LOADER_BACKENDS)}")
+    load = load_parquet_snowflake if backend == "snowflake" else load_parquet_duckdb
+
+    row_counts = {}
+    for table_name, csv_path in files.items():
+        parquet_dir = Path(work_dir) / table_name
+        csv_to_parquet(csv_path, parquet_dir, table_name, chunk_rows=chunk_rows)
+        row_counts[table_name] = load(conn, parquet_dir, table_name, database=database, schema=schema, replace=replace)
+    return row_counts
+
+
+def _parse_file_argument(value: str) -> Tuple[str, str]:
+    table_name, separator, path = value.partition("=")
+    if not separator or table_name not in LANDING_COLUMNS:
+        raise argparse.ArgumentTypeError(
+            f"Expected <table>=<csv file> with table one of: {', '.join(LANDING_COLUMNS)}, got {value!r}"
+        )
+    return table_name, path
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """
+    Load landing CSV files from the command line, e.g.
+    `python -m monitoring.landing_loader invoices=invoices.csv organizations=organizations.csv`.
+    """
+    from monitoring.backends import create_connector
+
+    parser = argparse.ArgumentParser(description="Bulk load landing CSV files through compressed Parquet files")
+    parser.add_argument("files", nargs="+", type=_parse_file_argument, help="<table>=<csv file>")
+    parser.add_argument("--backend", choices=LOADER_BACKENDS, default="snowflake", help="Warehouse to load into")
+    parser.add_argument("--duckdb-path", default=":memory:", help="DuckDB database file (duckdb backend)")
+    parser.add_argument("--database", default=DEFAULT_DATABASE, help="Database of the landing tables")
+    parser.add_argument("--schema", default=LANDING_SCHEMA, help="Landing schema")
+    parser.add_argument("--work-dir", default="landing_parquet", help="Directory of the intermediate Parquet files")
+    parser.add_argument("--chunk-rows", type=int, default=DEFAULT_CHUNK_ROWS, help="Maximum rows per Parquet file")
+    parser.add_argument("--append", action="store_true", help="Append to the tables instead of replacing them")
+    args = parser.parse_args(argv)
+
+    connection_params = (
+        {"database": args.database, "path": args.duckdb_path, "seeds_dir": None, "models_dir": None}
+        if args.backend == "duckdb" else None
+    )
+    conn = create_connector(args.backend, connection_params)
+    try:
+        row_counts = load_landing_files(
+            conn, dict(args.files), args.work_dir, backend=args.backend, database=args.database,
+            schema=args.schema, replace=not args.append, chunk_rows=args.chunk_rows,
+        )
+    finally:
+        conn.close()
+    for table_name, row_count in row_counts.items():
+        print(f"Loaded {row_count} rows into {args.database}.{args.schema}.{table_name}")
+
+
+if __name__ == "__main__":
+    main()
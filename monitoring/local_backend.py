@@ -0,0 +1,345 @@
+import re
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+DBT_PROJECT_DIR = PROJECT_ROOT / "dbt" / "deel_takehome"
+SEEDS_DIR = DBT_PROJECT_DIR / "seeds" / "landing"
+MODELS_DIR = DBT_PROJECT_DIR / "models"
+
+DEFAULT_DATABASE = "deel_takehome_dev"
+DEFAULT_TARGET_SCHEMA = "ehernani"
+
+# Landing table name -> file stem in the seeds directory
+LANDING_FILES = {
+    "invoices": "invoices_sample",
+    "organizations": "organizations",
+}
+
+# Column types of the landing tables, as created by `dbt seed` in Snowflake
+LANDING_COLUMNS: Dict[str, Dict[str, str]] = {
+    "invoices": {
+        "INVOICE_ID": "BIGINT",
+        "PARENT_INVOICE_ID": "BIGINT",
+        "TRANSACTION_ID": "BIGINT",
+        "ORGANIZATION_ID": "BIGINT",
+        "TYPE": "BIGINT",
+        "STATUS": "VARCHAR",
+        "CURRENCY": "VARCHAR",
+        "PAYMENT_CURRENCY": "VARCHAR",
+        "PAYMENT_METHOD": "VARCHAR",
+        "AMOUNT": "DOUBLE",
+        "PAYMENT_AMOUNT": "DOUBLE",
+        "FX_RATE": "DOUBLE",
+        "FX_RATE_PAYMENT": "DOUBLE",
+        "CREATED_AT": "TIMESTAMPTZ",
+    },
+    "organizations": {
+        "ORGANIZATION_ID": "BIGINT",
+        "FIRST_PAYMENT_DATE": "DATE",
+        "LAST_PAYMENT_DATE": "DATE",
+        "LEGAL_ENTITY_COUNTRY_CODE": "BIGINT",
+        "COUNT_TOTAL_CONTRACTS_ACTIVE": "BIGINT",
+        "CREATED_DATE": "TIMESTAMPTZ",
+    },
+}
+
+# Snowflake functions and types used by the dbt models, so that the model SQL runs unchanged
+SNOWFLAKE_COMPATIBILITY_SQL = [
+    "create type if not exists timestamp_ntz as timestamp",
+    "create or replace macro convert_timezone(target_timezone, ts) as timezone(target_timezone, ts)",
+]
+
+
+def create_duckdb_connector(
+    database: str = DEFAULT_DATABASE,
+    target_schema: str = DEFAULT_TARGET_SCHEMA,
+    seeds_dir: Union[str, Path, None] = SEEDS_DIR,
+    models_dir: Union[str, Path, None] = MODELS_DIR,
+    path: str = ":memory:"
+) -> Any:
+    """
+    Create an embedded DuckDB connection mirroring the Snowflake layout of the project.
+
+    The landing tables are loaded from the dbt seeds (or any directory with the same file
+    layout, e.g. synthetic data) and the dbt models are rendered and materialized in
+    dependency order. Tables are reachable with the same three-part names as in Snowflake,
+    e.g. `deel_takehome_dev.ehernani_fact_tables.fct__organizations_balance`, so `QUERY` and
+    the other monitoring queries run unchanged.
+
+    Args:
+        database (str): Name of the database (DuckDB catalog)
+        target_schema (str): dbt target schema, prefixed to the custom schema of every layer
+        seeds_dir (str | Path, optional): Directory with the landing files. None skips the loading
+        models_dir (str | Path, optional): dbt models directory. None skips building the models
+        path (str): DuckDB database file, in memory by default
+
+    Returns:
+        duckdb.DuckDBPyConnection: The DuckDB connection object
+
+    Raises:
+        ImportError: If duckdb is not installed
+        Exception: If there's an error loading the data or building the models
+    """
+    try:
+        import duckdb
+    except ImportError as e:
+        raise ImportError("The local backend requires duckdb: pip install 'deel-takehome[local]'") from e
+
+    try:
+        conn = duckdb.connect()
+        attach_path = path.replace("'", "''")
+        conn.execute(f"attach '{attach_path}' as {database}")
+        conn.execute(f"use {database}")
+        for statement in SNOWFLAKE_COMPATIBILITY_SQL:
+            conn.execute(statement)
+
+        if seeds_dir is not None:
+            load_landing_tables(conn, seeds_dir, database=database, target_schema=target_schema)
+        if models_dir is not None:
+            build_dbt_models(conn, models_dir, database=database, target_schema=target_schema)
+        return conn
+
+    except Exception as e:
+        raise Exception(f"Error creating local DuckDB backend: {str(e)}")
+
+
+def layer_schema(target_schema: str, custom_schema: Optional[str]) -> str:
+    """
+    Schema of a dbt layer, following dbt's default `generate_schema_name`.
+
+    Args:
+        target_schema (str): dbt target schema
+        custom_schema (str, optional): Custom schema configured on the model
+
+    Returns:
+        str: `<target_schema>_<custom_schema>`, or the target schema when there is no custom schema
+    """
+    return f"{target_schema}_{custom_schema}" if custom_schema else target_schema
+
+
+def load_landing_tables(
+    conn: Any,
+    seeds_dir: Union[str, Path],
+    database: str = DEFAULT_DATABASE,
+    target_schema: str = DEFAULT_TARGET_SCHEMA
+) -> Dict[str, int]:
+    """
+    Load the landing tables from CSV or Parquet files.
+
+    For every table in LANDING_FILES, `<stem>.parquet` is used when present, else `<stem>.csv`.
+
+    Args:
+        conn: DuckDB connection
+        seeds_dir (str | Path): Directory with the landing files
+        database (str): Name of the database
+        target_schema (str): dbt target schema
+
+    Returns:
+        Dict[str, int]: Number of rows loaded per table
+
+    Raises:
+        FileNotFoundError: If a landing file is missing
+    """
+    seeds_dir = Path(seeds_dir)
+    schema = layer_schema(target_schema, "landing")
+    conn.execute(f"create schema if not exists {database}.{schema}")
+
+    row_counts = {}
+    for table_name, stem in LANDING_FILES.items():
+        columns = LANDING_COLUMNS[table_name]
+        parquet_path = seeds_dir / f"{stem}.parquet"
+        csv_path = seeds_dir / f"{stem}.csv"
+        if parquet_path.exists():
+            casts = ", ".join(f"{column}::{column_type} as {column}" for column, column_type in columns.items())
+            source = f"(select {casts} from read_parquet(?))"
+            file_path = parquet_path
+        elif csv_path.exists():
+            column_types = ", ".join(f"'{column}': '{column_type}'" for column, column_type in columns.items())
+            source = f"read_csv(?, header = true, columns = {{{column_types}}})"
+            file_path = csv_path
+        else:
+            raise FileNotFoundError(f"No landing file found for {table_name} in {seeds_dir}")
+
+        conn.execute(
+            f"create or replace table {database}.{schema}.{table_name} as select * from {source}",
+            [str(file_path)],
+        )
+        row_counts[table_name] = conn.execute(
+            f"select count(*) from {database}.{schema}.{table_name}"
+        ).fetchone()[0]
+    return row_counts
+
+
+def _model_paths(models_dir: Path) -> Dict[str, Path]:
+    return {path.stem: path for path in sorted(models_dir.rglob("*.sql"))}
+
+
+def render_dbt_model(
+    sql: str,
+    relations: Dict[str, str],
+    database: str = DEFAULT_DATABASE,
+    target_schema: str = DEFAULT_TARGET_SCHEMA,
+    this: Optional[str] = None,
+    incremental: bool = False,
+    config: Optional[Dict[str, Any]] = None,
+    refs: Optional[List[str]] = None
+) -> str:
+    """
+    Render a dbt model with a minimal Jinja context.
+
+    Args:
+        sql (str): Raw model SQL
+        relations (Dict[str, str]): Model name -> fully qualified relation, used by `ref`
+        database (str): Name of the database
+        target_schema (str): dbt target schema, used by `source`
+        this (str, optional): Relation of the model itself, exposed as `this`
+        incremental (bool): Value returned by `is_incremental()`
+        config (Dict[str, Any], optional): Filled with the arguments of `config(...)`
+        refs (List[str], optional): Filled with the names of the referenced models
+
+    Returns:
+        str: Rendered SQL
+
+    Raises:
+        ImportError: If jinja2 is not installed
+    """
+    import jinja2
+
+    def model_config(**kwargs):
+        if config is not None:
+            config.update(kwargs)
+        return ""
+
+    def ref(model_name):
+        if refs is not None:
+            refs.append(model_name)
+        return relations.get(model_name, model_name)
+
+    def source(source_name, table_name):
+        return f"{database}.{layer_schema(target_schema, source_name)}.{table_name}"
+
+    return jinja2.Environment().from_string(sql).render(
+        config=model_config,
+        ref=ref,
+        source=source,
+        is_incremental=lambda: incremental,
+        this=this,
+    )
+
+
+def build_dbt_models(
+    conn: Any,
+    models_dir: Union[str, Path] = MODELS_DIR,
+    database: str = DEFAULT_DATABASE,
+    target_schema: str = DEFAULT_TARGET_SCHEMA,
+    select: Optional[List[str]] = None,
+    full_refresh: bool = False
+) -> List[str]:
+    """
+    Render and materialize the dbt models in dependency order.
+
+    Views and tables are recreated. Incremental models are created as tables on their first
+    build or with `full_refresh`; otherwise they are rendered with `is_incremental()` true and
+    merged into the existing table with the delete+insert strategy on their `unique_key`.
+
+    Args:
+        conn: DuckDB connection
+        models_dir (str | Path): dbt models directory
+        database (str): Name of the database
+        target_schema (str): dbt target schema
+        select (List[str], optional): Only build these models (their parents must already exist)
+        full_refresh (bool): Rebuild incremental models from scratch, as `dbt run --full-refresh`
+
+    Returns:
+        List[str]: Relations built, in build order
+
+    Raises:
+        ValueError: If the models have a circular dependency
+    """
+    model_paths = _model_paths(Path(models_dir))
+
+    # First pass: collect configs and dependencies
+    configs: Dict[str, Dict[str, Any]] = {}
+    dependencies: Dict[str, List[str]] = {}
+    for model_name, path in model_paths.items():
+        configs[model_name], dependencies[model_name] = {}, []
+        render_dbt_model(
+            path.read_text(), {}, database, target_schema,
+            config=configs[model_name], refs=dependencies[model_name],
+        )
+    relations = {
+        model_name: f"{database}.{layer_schema(target_schema, config.get('schema'))}.{model_name}"
+        for model_name, config in configs.items()
+    }
+
+    built = []
+    for model_name in _topological_order(dependencies):
+        if select is not None and model_name not in select:
+            continue
+        relation = relations[model_name]
+        config = configs[model_name]
+        incremental = (
+            config.get("materialized") == "incremental"
+            and not full_refresh
+            and _relation_exists(conn, relation)
+        )
+        sql = _strip_trailing_semicolon(render_dbt_model(
+            model_paths[model_name].read_text(), relations, database, target_schema,
+            this=relation, incremental=incremental,
+        ))
+        conn.execute(f"create schema if not exists {relation.rsplit('.', 1)[0]}")
+        if incremental:
+            _merge_incremental(conn, relation, sql, config.get("unique_key"))
+        else:
+            materialization = "view" if config.get("materialized") == "view" else "table"
+            conn.execute(f"create or replace {materialization} {relation} as {sql}")
+        built.append(relation)
+    return built
+
+
+def _relation_exists(conn: Any, relation: str) -> bool:
+    database, schema, name = relation.split(".")
+    return conn.execute(
+        "select count(*) from information_schema.tables"
+        " where table_catalog = ? and table_schema = ? and table_name = ?",
+        [database, schema, name],
+    ).fetchone()[0] > 0
+
+
+def _merge_incremental(conn: Any, relation: str, sql: str, unique_key: Union[str, List[str], None]) -> None:
+    # delete+insert strategy: rows of the new batch replace the stored rows with the same key
+    conn.execute(f"create or replace temp table dbt_incremental_batch as {sql}")
+    try:
+        if unique_key:
+            keys = [unique_key] if isinstance(unique_key, str) else list(unique_key)
+            matches = " and ".join(f"{relation}.{key} = dbt_incremental_batch.{key}" for key in keys)
+            conn.execute(f"delete from {relation} using dbt_incremental_batch where {matches}")
+        conn.execute(f"insert into {relation} by name select * from dbt_incremental_batch")
+    finally:
+        conn.execute("drop table if exists dbt_incremental_batch")
+
+
+def _strip_trailing_semicolon(sql: str) -> str:
+    return re.sub(r";\s*$", "", sql.strip())
+
+
+def _topological_order(dependencies: Dict[str, List[str]]) -> List[str]:
+    order: List[str] = []
+    visiting = set()
+
+    def visit(model_name: str) -> None:
+        if model_name in order:
+            return
+        if model_name in visiting:
+            raise ValueError(f"Circular dependency involving model {model_name}")
+        visiting.add(model_name)
+        for parent in dependencies.get(model_name, []):
+            if parent in dependencies:
+                visit(parent)
+        visiting.discard(model_name)
+        order.append(model_name)
+
+    for model_name in sorted(dependencies):
+        visit(model_name)
+    return order
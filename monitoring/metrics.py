@@ -0,0 +1,360 @@
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, ContextManager, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+from monitoring.utils import is_dataframe
+
+if TYPE_CHECKING:
+    import pandas as pd
+    import pyarrow as pa
+
+logger = logging.getLogger(__name__)
+
+# Stages of a monitoring run, in execution order
+STAGES = ("connect", "execute", "fetch", "transform", "format", "notify")
+
+# Run statuses
+SUCCESS = "success"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+OPENMETRICS_CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+
+
+@dataclass
+class RunMetrics:
+    """
+    Timings and counters of one monitoring run.
+
+    Spans measure their own time only: while a nested span is open, the time is counted in the
+    nested span, e.g. the fetching of batches inside the `transform` span that consumes them.
+    Spans of the same stage opened several times are summed.
+
+    Attributes:
+        rule (str): Rule key of the run (see watermark_key)
+        spans (Dict[str, float]): Seconds spent in every stage
+        rows (int): Rows fetched from the warehouse
+        bytes (int): In-memory size of the fetched results
+        query_ids (List[str]): Warehouse query ids, when the cursor exposes them (Snowflake `sfqid`)
+        status (str): "success", "failed" or "cancelled"
+        error_stage (str, optional): Stage in which the run failed
+        started_at (float): Unix time of the start of the run
+    """
+    rule: str
+    spans: Dict[str, float] = field(default_factory=dict)
+    rows: int = 0
+    bytes: int = 0
+    query_ids: List[str] = field(default_factory=list)
+    status: str = SUCCESS
+    error_stage: Optional[str] = None
+    started_at: float = field(default_factory=time.time)
+
+    def __post_init__(self):
+        # Open spans as [name, start of the current uninterrupted slice]
+        self._open: List[List[Any]] = []
+
+    @contextmanager
+    def span(self, name: str) -> Iterator[None]:
+        """
+        Time a stage of the run.
+
+        Args:
+            name (str): Stage name (see STAGES)
+        """
+        now = time.perf_counter()
+        if self._open:
+            parent = self._open[-1]
+            self._add(parent[0], now - parent[1])
+        self._open.append([name, now])
+        try:
+            yield
+        except BaseException:
+            # The innermost span sees the error first
+            if self.error_stage is None:
+                self.error_stage = name
+            raise
+        finally:
+            now = time.perf_counter()
+            self._add(name, now - self._open.pop()[1])
+            if self._open:
+                self._open[-1][1] = now
+
+    def mark_failed(self, stage: str) -> None:
+        """
+        Record the failure of a stage that did not abort the run, e.g. an alert that was not delivered.
+
+        Args:
+            stage (str): Stage that failed (see STAGES)
+        """
+        self.status = FAILED
+        if self.error_stage is None:
+            self.error_stage = stage
+
+    def iterate(self, batches: Iterable[Any], name: str = "fetch") -> Iterator[Any]:
+        """
+        Time the production of every batch of an iterator and count its rows and bytes.
+
+        Args:
+            batches (Iterable): Batches of results (DataFrames, Arrow Tables or RecordBatches)
+            name (str): Stage of the batch production
+
+        Yields:
+            The batches, unchanged
+        """
+        iterator = iter(batches)
+        while True:
+            with self.span(name):
+                batch = next(iterator, None)
+            if batch is None:
+                return
+            self.count(batch)
+            yield batch
+
+    def count(self, data: Union["pd.DataFrame", "pa.Table", "pa.RecordBatch"]) -> None:
+        """
+        Add the rows and in-memory bytes of fetched results.
+
+        Args:
+            data (pd.DataFrame | pa.Table | pa.RecordBatch): Fetched results
+        """
+        self.rows += len(data)
+        if is_dataframe(data):
+            self.bytes += int(data.memory_usage(index=False).sum())
+        else:
+            self.bytes += data.nbytes
+
+    def record_query_id(self, cur: Any) -> None:
+        """
+        Keep the warehouse query id of an executed cursor, if it has one.
+
+        Args:
+            cur: Executed DB-API cursor
+        """
+        query_id = getattr(cur, "sfqid", None)
+        if query_id:
+            self.query_ids.append(str(query_id))
+
+    @property
+    def total_seconds(self) -> float:
+        """Seconds spent in all the stages."""
+        return sum(self.spans.values())
+
+    def as_dict(self) -> Dict[str, Any]:
+        """
+        Get the metrics as a JSON serializable dictionary.
+
+        Returns:
+            Dict[str, Any]: Metrics of the run
+        """
+        return {
+            "rule": self.rule,
+            "status": self.status,
+            "error_stage": self.error_stage,
+            "started_at": self.started_at,
+            "total_seconds": round(self.total_seconds, 6),
+            "spans": {name: round(seconds, 6) for name, seconds in self.spans.items()},
+            "rows": self.rows,
+            "bytes": self.bytes,
+            "query_ids": self.query_ids,
+        }
+
+    def _add(self, name: str, seconds: float) -> None:
+        self.spans[name] = self.spans.get(name, 0.0) + seconds
+
+
+def timed(metrics: Optional[RunMetrics], name: str) -> ContextManager[None]:
+    """
+    Time a stage when metrics are collected.
+
+    Args:
+        metrics (RunMetrics, optional): Metrics of the run, or None to not time anything
+        name (str): Stage name
+
+    Returns:
+        ContextManager: The span, or a no-op context manager
+    """
+    return metrics.span(name) if metrics is not None else nullcontext()
+
+
+def log_run_metrics(metrics: RunMetrics) -> None:
+    """
+    Emit the metrics of a run as one JSON structured log record.
+
+    Args:
+        metrics (RunMetrics): Metrics of the run
+    """
+    level = logging.INFO if metrics.status == SUCCESS else logging.ERROR
+    logger.log(level, json.dumps({"event": "monitoring_run", **metrics.as_dict()}))
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(**labels: str) -> str:
+    return "{" + ",".join(f'{name}="{_escape_label(str(value))}"' for name, value in labels.items()) + "}"
+
+
+class MetricsRegistry:
+    """
+    Aggregated metrics of the monitoring runs, exportable in the Prometheus text format.
+
+    Counters accumulate over the runs of each rule; gauges describe the last run of each rule.
+
+    Usage:
+        registry = MetricsRegistry()
+        run_monitoring(..., metrics_registry=registry)
+        registry.write_textfile("/var/lib/node_exporter/monitoring.prom")
+
+    Args:
+        namespace (str): Prefix of the metric names
+    """
+
+    def __init__(self, namespace: str = "monitoring"):
+        self.namespace = namespace
+        self._lock = threading.Lock()
+        self._runs: Dict[Tuple[str, str], int] = {}
+        self._stage_seconds: Dict[Tuple[str, str], float] = {}
+        self._rows: Dict[str, int] = {}
+        self._bytes: Dict[str, int] = {}
+        self._last_runs: Dict[str, RunMetrics] = {}
+
+    def record(self, metrics: RunMetrics) -> None:
+        """
+        Add the metrics of a finished run.
+
+        Args:
+            metrics (RunMetrics): Metrics of the run
+        """
+        with self._lock:
+            rule = metrics.rule
+            self._runs[(rule, metrics.status)] = self._runs.get((rule, metrics.status), 0) + 1
+            for stage, seconds in metrics.spans.items():
+                self._stage_seconds[(rule, stage)] = self._stage_seconds.get((rule, stage), 0.0) + seconds
+            self._rows[rule] = self._rows.get(rule, 0) + metrics.rows
+            self._bytes[rule] = self._bytes.get(rule, 0) + metrics.bytes
+            self._last_runs[rule] = metrics
+
+    def last_run(self, rule: str) -> Optional[RunMetrics]:
+        """
+        Get the metrics of the last run of a rule.
+
+        Args:
+            rule (str): Rule key
+
+        Returns:
+            RunMetrics | None: Metrics of the last run, or None if the rule has not run
+        """
+        with self._lock:
+            return self._last_runs.get(rule)
+
+    def to_prometheus(self, openmetrics: bool = False) -> str:
+        """
+        Render the metrics in the Prometheus text exposition format.
+
+        Args:
+            openmetrics (bool): Render the OpenMetrics format instead
+
+        Returns:
+            str: Exposition text
+        """
+        with self._lock:
+            families = [
+                ("runs", "counter", "Monitoring runs by status", [
+                    (_labels(rule=rule, status=status), count) for (rule, status), count in self._runs.items()
+                ]),
+                ("stage_seconds", "counter", "Time spent in each stage of the monitoring runs", [
+                    (_labels(rule=rule, stage=stage), seconds)
+                    for (rule, stage), seconds in self._stage_seconds.items()
+                ]),
+                ("rows", "counter", "Rows fetched from the warehouse", [
+                    (_labels(rule=rule), rows) for rule, rows in self._rows.items()
+                ]),
+                ("bytes", "counter", "In-memory bytes of the results fetched from the warehouse", [
+                    (_labels(rule=rule), size) for rule, size in self._bytes.items()
+                ]),
+                ("last_run_stage_seconds", "gauge", "Time spent in each stage of the last run", [
+                    (_labels(rule=rule, stage=stage), seconds)
+                    for rule, run in self._last_runs.items() for stage, seconds in run.spans.items()
+                ]),
+                ("last_run_timestamp_seconds", "gauge", "Start time of the last run", [
+                    (_labels(rule=rule), run.started_at) for rule, run in self._last_runs.items()
+                ]),
+                ("last_run_success", "gauge", "Whether the last run succeeded", [
+                    (_labels(rule=rule), int(run.status == SUCCESS)) for rule, run in self._last_runs.items()
+                ]),
+            ]
+
+        lines = []
+        for name, metric_type, help_text, samples in families:
+            family = f"{self.namespace}_{name}"
+            # OpenMetrics names counter families without the _total suffix of their samples
+            sample_name = f"{family}_total" if metric_type == "counter" else family
+            lines.append(f"# HELP {family if openmetrics else sample_name} {help_text}")
+            lines.append(f"# TYPE {family if openmetrics else sample_name} {metric_type}")
+            lines.extend(f"{sample_name}{labels} {value}" for labels, value in samples)
+        if openmetrics:
+            lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path: Union[str, Path]) -> None:
+        """
+        Atomically write the metrics to a file, e.g. for the node_exporter textfile collector.
+
+        Args:
+            path (str | Path): Path of the `.prom` file
+        """
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(self.to_prometheus())
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+
+def serve_metrics(registry: MetricsRegistry, port: int = 9464, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """
+    Serve the metrics on `/metrics` from a background thread.
+
+    The OpenMetrics format is returned to scrapers accepting it, the Prometheus text format otherwise.
+
+    Args:
+        registry (MetricsRegistry): Metrics to serve
+        port (int): Port to listen on, 0 for any free port
+        host (str): Interface to listen on
+
+    Returns:
+        ThreadingHTTPServer: The running server. Call `shutdown()` and `server_close()` to stop it
+    """
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            openmetrics = "application/openmetrics-text" in self.headers.get("Accept", "")
+            body = registry.to_prometheus(openmetrics=openmetrics).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", OPENMETRICS_CONTENT_TYPE if openmetrics else PROMETHEUS_CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    return server
@@ -1,11 +1,143 @@
+# Query templates. Identifiers ({...}) are validated and formatted by monitoring.query_builder,
+# values (:name) are bound as driver parameters so that the SQL text is identical across runs.
 QUERY = """
     select
         {id_column} as id,
         {target_column} as value,
-        ({target_column} - {threshold}) as difference  
+        {date_column} as breach_date,
+        ({target_column} - :threshold) as difference  
     from {database}.{schema}.{table_name}
     where 1 = 1
-        and {target_column} > {threshold}
-        and {date_column} > '{start_date}'
+        and {target_column} > :threshold
+        and {date_column} >= :start_date{end_date_filter}
     order by difference desc
-"""
\ No newline at end of file
+"""
+
+# Same as QUERY, but the warehouse counts all the breaching rows and only returns the top_k ones
+TOP_K_QUERY = """
+    select
+        {id_column} as id,
+        {target_column} as value,
+        {date_column} as breach_date,
+        ({target_column} - :threshold) as difference,
+        count(*) over () as total_count
+    from {database}.{schema}.{table_name}
+    where 1 = 1
+        and {target_column} > :threshold
+        and {date_column} >= :start_date{end_date_filter}
+    order by difference desc
+    limit {top_k}
+"""
+
+# Rolling z-score mode: every row is compared to the mean and sample standard deviation of the
+# previous {window} rows of the same id. The window looks back before :start_date, so the whole
+# history up to the end date is scanned; only the rows from :start_date on are reported.
+# {top_k_columns} and {limit} are empty, or add the total count and the limit as in TOP_K_QUERY.
+ROLLING_ZSCORE_QUERY = """
+    with rolling_stats as (
+        select
+            {id_column} as id,
+            {target_column} as value,
+            {date_column} as breach_date,
+            avg({target_column}) over (
+                partition by {id_column} order by {date_column} rows between {window} preceding and 1 preceding
+            ) as rolling_mean,
+            stddev_samp({target_column}) over (
+                partition by {id_column} order by {date_column} rows between {window} preceding and 1 preceding
+            ) as rolling_std,
+            count({target_column}) over (
+                partition by {id_column} order by {date_column} rows between {window} preceding and 1 preceding
+            ) as rolling_count
+        from {database}.{schema}.{table_name}
+        where 1 = 1{end_date_filter}
+    ),
+    scores as (
+        select
+            *,
+            abs(value - rolling_mean) / nullif(rolling_std, 0) as zscore
+        from rolling_stats
+        where rolling_count >= :min_periods
+            and breach_date >= :start_date
+    )
+    select
+        id,
+        value,
+        breach_date,
+        rolling_mean,
+        rolling_std,
+        zscore,
+        (zscore - :threshold) as difference{top_k_columns}
+    from scores
+    where zscore > :threshold
+    order by difference desc{limit}
+"""
+
+ROLLING_TOP_K_COLUMNS = """,
+        count(*) over () as total_count"""
+
+ROLLING_LIMIT = """
+    limit {top_k}"""
+
+# Optional upper bound of the date range, used to evaluate exactly the rows up to a watermark
+END_DATE_FILTER = """
+        and {date_column} <= :end_date"""
+
+# Latest date of the rows that a monitoring run would evaluate, recorded as the rule's watermark.
+# The start date is inclusive: the day of the watermark may have been partially loaded, so its
+# rows are evaluated again by the next run
+WATERMARK_QUERY = """
+    select max({date_column}) as watermark
+    from {database}.{schema}.{table_name}
+    where {date_column} >= :start_date
+"""
+
+# Last modification time of a table, used to invalidate cached query results (Snowflake information schema)
+LAST_ALTERED_QUERY = """
+    select max(last_altered) as last_altered
+    from {database}.information_schema.tables
+    where table_schema = upper(:schema)
+        and table_name = upper(:table_name)
+"""
+
+# Batch evaluation of several rules: every table is scanned once in its own CTE, which exposes
+# one id/value/flag column triple per rule, and the per-rule selects are fanned out with union all.
+BATCH_RULE_COLUMNS = """
+            {id_column} as rule_{rule_index}_id,
+            {target_column} as rule_{rule_index}_value,
+            ({rule_filter}) as rule_{rule_index}_flag"""
+
+BATCH_RULE_FILTER = "{target_column} > :rule_{rule_index}_threshold and {date_column} >= :rule_{rule_index}_start_date"
+
+BATCH_SCAN = """
+    {scan_name} as (
+        select{rule_columns}
+        from {database}.{schema}.{table_name}
+        where {scan_filter}
+    )"""
+
+BATCH_RULE_SELECT = """
+    select
+        {rule_index} as rule_index,
+        rule_{rule_index}_id as id,
+        rule_{rule_index}_value as value,
+        (rule_{rule_index}_value - :rule_{rule_index}_threshold) as difference
+    from {scan_name}
+    where rule_{rule_index}_flag"""
+
+BATCH_QUERY = """
+    with{scans}{rule_selects}
+    order by rule_index, difference desc
+"""
+
+# Same as BATCH_QUERY, but only the top_k rows of every rule are returned, with the rule's total count
+BATCH_TOP_K_QUERY = """
+    with{scans},
+    rule_results as ({rule_selects}
+    )
+    select
+        *,
+        count(*) over (partition by rule_index) as total_count
+    from rule_results
+    qualify row_number() over (partition by rule_index order by difference desc) <= {top_k}
+    order by rule_index, difference desc
+"""
@@ -0,0 +1,60 @@
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+# Detection modes of a monitoring rule, evaluated in the warehouse by run_monitoring
+THRESHOLD = "threshold"
+ZSCORE = "zscore"
+MODES = (THRESHOLD, ZSCORE)
+
+# Defaults of the rolling modes
+DEFAULT_WINDOW = 30
+DEFAULT_MIN_PERIODS = 3
+
+
+@dataclass
+class MonitoringRule:
+    """
+    Definition of a single check, mirroring the arguments of `run_monitoring`.
+
+    Attributes:
+        table_name (str): Name of the table to monitor
+        target_column (str): Name of the column to monitor
+        id_column (str): Name of the column containing record identifiers
+        date_column (str): Name of the column containing the date information
+        threshold (float): Value to compare against, or absolute z-score in the "zscore" mode
+        start_date (str): Start date to filter records (inclusive)
+        database (str): Name of the database
+        schema (str): Name of the schema
+        name (str, optional): Unique name of the rule. Defaults to `<table>.<column> > <threshold>`,
+            or `<table>.<column> <mode>(<window>) > <threshold>` for the rolling modes
+        mode (str): "threshold" or "zscore" (see run_monitoring)
+        window (int): Number of previous records of the rolling statistics, in the "zscore" mode
+        min_periods (int): Minimum number of previous values to score a record, in the "zscore" mode
+        slack_channel (str, optional): Slack channel of the rule, instead of the default channel of the run
+        schedule (str, optional): Interval between two runs of the rule, e.g. "15m" (see
+            monitoring.config.parse_interval)
+    """
+    table_name: str
+    target_column: str
+    id_column: str
+    date_column: str
+    threshold: float
+    start_date: str
+    database: str
+    schema: str
+    name: Optional[str] = None
+    mode: str = THRESHOLD
+    window: int = DEFAULT_WINDOW
+    min_periods: int = DEFAULT_MIN_PERIODS
+    slack_channel: Optional[str] = None
+    schedule: Optional[str] = None
+
+    def __post_init__(self):
+        if not self.name:
+            check = "" if self.mode == THRESHOLD else f" {self.mode}({self.window})"
+            self.name = f"{self.table_name}.{self.target_column}{check} > {self.threshold}"
+
+    @property
+    def table_key(self) -> Tuple[str, str, str]:
+        """Fully qualified table the rule reads from, used to group rules into one scan."""
+        return (self.database.lower(), self.schema.lower(), self.table_name.lower())
@@ -0,0 +1,290 @@
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from monitoring.local_backend import DEFAULT_DATABASE, DEFAULT_TARGET_SCHEMA, layer_schema
+from monitoring.query_builder import validate_identifier
+from monitoring.snowflake_reader import read_snowflake_table
+from monitoring.utils import MonitoringResults, is_dataframe
+
+if TYPE_CHECKING:
+    from monitoring.result_cache import TableKey
+
+# dbt model with the attributes of every organization
+DIMENSION_TABLE = "dim__organizations"
+DIMENSION_SCHEMA = layer_schema(DEFAULT_TARGET_SCHEMA, "dimensions")
+
+# Attributes added to the alerts, in display order
+DIMENSION_COLUMNS = ("legal_entity_country_code", "contract_portfolio_size", "days_since_last_payment")
+
+
+def read_organization_dimension(
+    conn: Any,
+    database: str = DEFAULT_DATABASE,
+    schema: str = DIMENSION_SCHEMA,
+    table_name: str = DIMENSION_TABLE
+) -> pa.Table:
+    """
+    Read the organization attributes from the warehouse.
+
+    Args:
+        conn: Snowflake or DuckDB connection
+        database (str): Name of the database
+        schema (str): Name of the schema
+        table_name (str): Name of the organization dimension table
+
+    Returns:
+        pa.Table: organization_id and the DIMENSION_COLUMNS of every organization
+    """
+    relation = ".".join(validate_identifier(name) for name in (database, schema, table_name))
+    columns = ", ".join(("organization_id",) + DIMENSION_COLUMNS)
+    table = read_snowflake_table(conn, f"select {columns} from {relation}", arrow=True)
+    # Snowflake returns upper case column names
+    return table.rename_columns([column.lower() for column in table.column_names])
+
+
+class OrganizationDimension:
+    """
+    Immutable in-memory snapshot of the organization dimension, keyed by organization id.
+
+    The attributes are kept as Arrow columns and the ids in a hashed pandas Index: enriching any
+    number of alerts is one vectorized `get_indexer` call plus one `take` per attribute.
+    """
+
+    def __init__(self, table: pa.Table):
+        """
+        Build the snapshot.
+
+        Args:
+            table (pa.Table): organization_id and the DIMENSION_COLUMNS (see
+                read_organization_dimension). Rows without an organization id are ignored
+
+        Raises:
+            ValueError: If a column is missing or the organization ids are not unique
+        """
+        missing_columns = [
+            column for column in ("organization_id",) + DIMENSION_COLUMNS if column not in table.column_names
+        ]
+        if missing_columns:
+            raise ValueError(f"Missing columns in the organization dimension: {', '.join(missing_columns)}")
+        table = table.filter(table.column("organization_id").is_valid())
+        self._index = pd.Index(table.column("organization_id").to_numpy())
+        if not self._index.is_unique:
+            raise ValueError("Duplicated organization ids in the organization dimension")
+        self._columns = {column: table.column(column).combine_chunks() for column in DIMENSION_COLUMNS}
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __contains__(self, organization_id: Any) -> bool:
+        return organization_id in self._index
+
+    @property
+    def nbytes(self) -> int:
+        """Memory used by the snapshot, in bytes."""
+        return int(self._index.memory_usage() + sum(column.nbytes for column in self._columns.values()))
+
+    def _positions(self, organization_ids: Iterable[Any]) -> np.ndarray:
+        if not hasattr(organization_ids, "__len__"):
+            organization_ids = list(organization_ids)
+        # Ids of another type (e.g. strings) or missing ids are not found
+        return self._index.get_indexer(pd.Index(organization_ids))
+
+    def attributes(self, organization_ids: Iterable[Any]) -> pa.Table:
+        """
+        Get the attributes of many organizations at once.
+
+        Args:
+            organization_ids (Iterable[Any]): Organization ids
+
+        Returns:
+            pa.Table: DIMENSION_COLUMNS in the order of the ids, null for the unknown organizations
+        """
+        return self._take(self._positions(organization_ids))
+
+    def _take(self, positions: np.ndarray) -> pa.Table:
+        indices = pa.array(positions, mask=positions < 0, type=pa.int64())
+        return pa.table({column: values.take(indices) for column, values in self._columns.items()})
+
+    def lookup(self, organization_ids: Iterable[Any]) -> List[Optional[Dict[str, Any]]]:
+        """
+        Get the attributes of many organizations as records.
+
+        Args:
+            organization_ids (Iterable[Any]): Organization ids
+
+        Returns:
+            List[Optional[Dict[str, Any]]]: Attributes of every organization, in the order of the
+                ids, or None for the unknown organizations
+        """
+        positions = self._positions(organization_ids)
+        return [
+            record if position >= 0 else None
+            for position, record in zip(positions, self._take(positions).to_pylist())
+        ]
+
+    def enrich(self, results: MonitoringResults, id_column: str = "id") -> MonitoringResults:
+        """
+        Add the organization attributes to monitoring results.
+
+        Args:
+            results (MonitoringResults): Monitoring results whose `id_column` holds organization ids
+            id_column (str): Column of the organization ids, matched case-insensitively
+
+        Returns:
+            MonitoringResults: The results with the DIMENSION_COLUMNS appended, of the same type
+                (records, pandas DataFrame or pyarrow Table)
+        """
+        if isinstance(results, (pa.Table, pa.RecordBatch)):
+            if isinstance(results, pa.RecordBatch):
+                results = pa.Table.from_batches([results])
+            names = {name.lower(): name for name in results.column_names}
+            attributes = self.attributes(results.column(names[id_column.lower()]).to_pylist())
+            for column in DIMENSION_COLUMNS:
+                results = results.append_column(column, attributes.column(column))
+            return results
+        if is_dataframe(results):
+            names = {str(name).lower(): name for name in results.columns}
+            attributes = self.attributes(results[names[id_column.lower()]].tolist())
+            return results.assign(**{
+                column: attributes.column(column).to_pandas().values for column in DIMENSION_COLUMNS
+            })
+        attributes = self.attributes([record[id_column] for record in results]).to_pylist()
+        return [{**record, **record_attributes} for record, record_attributes in zip(results, attributes)]
+
+
+class OrganizationDimensionLookup:
+    """
+    Organization dimension cached in memory and reloaded when the table changes.
+
+    The snapshot is loaded on first use with the connection of the caller. Afterwards, at most
+    once every `check_interval` seconds, the freshness token of the table (its last altered time
+    by default) is probed and the snapshot is only reloaded when the token changed. Share one
+    lookup per process (see shared_dimension_lookup) so that the runs reuse the same snapshot.
+    """
+
+    def __init__(
+        self,
+        database: str = DEFAULT_DATABASE,
+        schema: str = DIMENSION_SCHEMA,
+        table_name: str = DIMENSION_TABLE,
+        check_interval: float = 300,
+        freshness_probe: Optional[Callable[[Any, Sequence["TableKey"]], str]] = None,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        """
+        Initialize the lookup.
+
+        Args:
+            database (str): Name of the database
+            schema (str): Name of the schema
+            table_name (str): Name of the organization dimension table
+            check_interval (float): Minimum number of seconds between two freshness probes
+            freshness_probe (Callable, optional): `probe(conn, tables) -> str` returning the
+                freshness token of the table. Defaults to get_tables_last_altered (Snowflake)
+            clock (Callable[[], float]): Monotonic clock, in seconds
+        """
+        self.database = database
+        self.schema = schema
+        self.table_name = table_name
+        self.check_interval = check_interval
+        self.freshness_probe = freshness_probe
+        self.loads = 0
+        self._clock = clock
+        self._dimension: Optional[OrganizationDimension] = None
+        self._freshness: Optional[str] = None
+        self._checked_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def _probe(self, conn: Any) -> str:
+        probe = self.freshness_probe
+        if probe is None:
+            from monitoring.result_cache import get_tables_last_altered
+            probe = get_tables_last_altered
+        return probe(conn, [(self.database, self.schema, self.table_name)])
+
+    def get(self, conn: Any) -> OrganizationDimension:
+        """
+        Get the snapshot, loading or reloading it with `conn` when needed.
+
+        Args:
+            conn: Snowflake or DuckDB connection, only used when the freshness has to be probed
+
+        Returns:
+            OrganizationDimension: The current snapshot
+
+        Raises:
+            Exception: If there's an error reading the organization dimension
+        """
+        with self._lock:
+            now = self._clock()
+            if self._dimension is not None and now - self._checked_at < self.check_interval:
+                return self._dimension
+            try:
+                # Probed before the read, so that a change during the read is picked up next time
+                freshness = self._probe(conn)
+                if self._dimension is None or freshness != self._freshness:
+                    table = read_organization_dimension(conn, self.database, self.schema, self.table_name)
+                    self._dimension = OrganizationDimension(table)
+                    self._freshness = freshness
+                    self.loads += 1
+            except Exception as e:
+                raise Exception(f"Error loading the organization dimension: {str(e)}")
+            self._checked_at = now
+            return self._dimension
+
+    def get_or_none(self, conn: Any) -> Optional[OrganizationDimension]:
+        """
+        Get the snapshot like `get`, or None when it cannot be loaded.
+
+        The enrichment is optional: alerts are sent without the attributes rather than failing.
+
+        Args:
+            conn: Snowflake or DuckDB connection
+
+        Returns:
+            OrganizationDimension | None: The current snapshot, or None if loading it failed
+        """
+        try:
+            return self.get(conn)
+        except Exception as e:
+            print(f"Warning: Failed to enrich the results with the organizations: {str(e)}")
+            return None
+
+    def invalidate(self) -> None:
+        """Drop the snapshot, so that the next call to `get` reloads it."""
+        with self._lock:
+            self._dimension = None
+            self._freshness = None
+
+
+# Lookups shared by the runs of the process, keyed by table
+_SHARED_LOOKUPS: Dict[Tuple[str, str, str], OrganizationDimensionLookup] = {}
+_SHARED_LOOKUPS_LOCK = threading.Lock()
+
+
+def shared_dimension_lookup(
+    database: str = DEFAULT_DATABASE,
+    schema: str = DIMENSION_SCHEMA,
+    table_name: str = DIMENSION_TABLE,
+    **kwargs: Any
+) -> OrganizationDimensionLookup:
+    """
+    Get the lookup of an organization dimension table shared by the whole process.
+
+    Args:
+        database (str): Name of the database
+        schema (str): Name of the schema
+        table_name (str): Name of the organization dimension table
+        **kwargs: Arguments of OrganizationDimensionLookup, used when the lookup is created
+
+    Returns:
+        OrganizationDimensionLookup: The same lookup for every call with the same table
+    """
+    key = (database.lower(), schema.lower(), table_name.lower())
+    with _SHARED_LOOKUPS_LOCK:
+        if key not in _SHARED_LOOKUPS:
+            _SHARED_LOOKUPS[key] = OrganizationDimensionLookup(database, schema, table_name, **kwargs)
+        return _SHARED_LOOKUPS[key]
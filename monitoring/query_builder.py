@@ -0,0 +1,421 @@
+import re
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+from monitoring.monitoring_queries import (
+    BATCH_QUERY,
+    BATCH_RULE_COLUMNS,
+    BATCH_RULE_FILTER,
+    BATCH_RULE_SELECT,
+    BATCH_SCAN,
+    BATCH_TOP_K_QUERY,
+    END_DATE_FILTER,
+    QUERY,
+    ROLLING_LIMIT,
+    ROLLING_TOP_K_COLUMNS,
+    ROLLING_ZSCORE_QUERY,
+    TOP_K_QUERY,
+    WATERMARK_QUERY,
+)
+from monitoring.monitoring_rule import MonitoringRule
+
+# Number of compiled statements kept per query kind
+QUERY_CACHE_SIZE = 256
+
+# Unquoted Snowflake identifiers: letters, digits, underscores and dollar signs, not starting with a digit
+IDENTIFIER_PATTERN = re.compile(r"^[A-Za-z_][A-Za-z0-9_$]*$")
+
+# Named bind markers (:name) used in the query templates. `::type` casts are not matched
+BIND_MARKER_PATTERN = re.compile(r"(?<![:\w]):([A-Za-z_]\w*)")
+
+# (database, schema, table_name, target_column, id_column, date_column)
+QueryShape = Tuple[str, str, str, str, str, str]
+
+
+def validate_identifier(identifier: str) -> str:
+    """
+    Check that a table or column name is a plain SQL identifier, so it can be safely formatted into a query.
+
+    Args:
+        identifier (str): Identifier to validate
+
+    Returns:
+        str: The identifier
+
+    Raises:
+        ValueError: If the identifier is not a valid unquoted identifier
+    """
+    if not isinstance(identifier, str) or not IDENTIFIER_PATTERN.match(identifier):
+        raise ValueError(f"Invalid SQL identifier: {identifier!r}")
+    return identifier
+
+
+def to_qmark(query: str) -> Tuple[str, Tuple[str, ...]]:
+    """
+    Replace the named bind markers of a query by positional `?` placeholders.
+
+    Args:
+        query (str): Query with `:name` bind markers
+
+    Returns:
+        Tuple[str, Tuple[str, ...]]: Query with `?` placeholders and the parameter names in placeholder order
+    """
+    names: List[str] = []
+
+    def replace(match: re.Match) -> str:
+        names.append(match.group(1))
+        return "?"
+
+    return BIND_MARKER_PATTERN.sub(replace, query), tuple(names)
+
+
+def _validate_shape(shape: QueryShape) -> None:
+    for identifier in shape:
+        validate_identifier(identifier)
+
+
+@lru_cache(maxsize=QUERY_CACHE_SIZE)
+def compile_monitoring_query(
+    shape: QueryShape,
+    top_k: Optional[int] = None,
+    bounded: bool = False
+) -> Tuple[str, Tuple[str, ...]]:
+    """
+    Compile the monitoring query for a (table, columns) shape. Results are memoized.
+
+    Args:
+        shape (QueryShape): (database, schema, table_name, target_column, id_column, date_column)
+        top_k (int, optional): Use TOP_K_QUERY with this limit instead of QUERY
+        bounded (bool): Add an upper bound (`:end_date`, inclusive) on the date column
+
+    Returns:
+        Tuple[str, Tuple[str, ...]]: Query with `?` placeholders and the parameter names in placeholder order
+
+    Raises:
+        ValueError: If any identifier is invalid
+    """
+    _validate_shape(shape)
+    database, schema, table_name, target_column, id_column, date_column = shape
+    template = QUERY if top_k is None else TOP_K_QUERY
+    return to_qmark(template.format(
+        database=database,
+        schema=schema,
+        table_name=table_name,
+        target_column=target_column,
+        id_column=id_column,
+        date_column=date_column,
+        top_k=None if top_k is None else int(top_k),
+        end_date_filter=END_DATE_FILTER.format(date_column=date_column) if bounded else "",
+    ))
+
+
+def build_monitoring_query(
+    table_name: str,
+    target_column: str,
+    id_column: str,
+    date_column: str,
+    threshold: float,
+    start_date: str,
+    database: str,
+    schema: str,
+    top_k: Optional[int] = None,
+    end_date: Optional[str] = None
+) -> Tuple[str, Tuple[Any, ...]]:
+    """
+    Build the monitoring query and its parameters.
+
+    The query text only depends on the table and columns, so repeated runs with different
+    thresholds or dates reuse both the compiled statement and the warehouse caches.
+
+    Args:
+        table_name (str): Name of the table to monitor
+        target_column (str): Name of the column to monitor
+        id_column (str): Name of the column containing record identifiers
+        date_column (str): Name of the column containing the date information
+        threshold (float): Value to compare against
+        start_date (str): Start date to filter records (inclusive)
+        database (str): Name of the database
+        schema (str): Name of the schema
+        top_k (int, optional): Only return the top_k rows, with a `total_count` column
+        end_date (str, optional): Only evaluate the records up to this date (inclusive)
+
+    Returns:
+        Tuple[str, Tuple[Any, ...]]: Query with `?` placeholders and its parameters
+
+    Raises:
+        ValueError: If any identifier is invalid
+    """
+    query, names = compile_monitoring_query(
+        (database, schema, table_name, target_column, id_column, date_column), top_k, end_date is not None
+    )
+    values = {"threshold": float(threshold), "start_date": str(start_date), "end_date": str(end_date)}
+    return query, tuple(values[name] for name in names)
+
+
+@lru_cache(maxsize=QUERY_CACHE_SIZE)
+def compile_rolling_zscore_query(
+    shape: QueryShape,
+    window: int,
+    top_k: Optional[int] = None,
+    bounded: bool = False
+) -> Tuple[str, Tuple[str, ...]]:
+    """
+    Compile the rolling z-score query for a (table, columns) shape. Results are memoized.
+
+    Args:
+        shape (QueryShape): (database, schema, table_name, target_column, id_column, date_column)
+        window (int): Number of previous rows of the same id the statistics are computed over
+        top_k (int, optional): Only return the top_k rows, with a `total_count` column
+        bounded (bool): Add an upper bound (`:end_date`, inclusive) on the date column
+
+    Returns:
+        Tuple[str, Tuple[str, ...]]: Query with `?` placeholders and the parameter names in placeholder order
+
+    Raises:
+        ValueError: If any identifier is invalid or the window is not positive
+    """
+    _validate_shape(shape)
+    if int(window) < 1:
+        raise ValueError("window must be at least 1")
+    database, schema, table_name, target_column, id_column, date_column = shape
+    return to_qmark(ROLLING_ZSCORE_QUERY.format(
+        database=database,
+        schema=schema,
+        table_name=table_name,
+        target_column=target_column,
+        id_column=id_column,
+        date_column=date_column,
+        window=int(window),
+        end_date_filter=END_DATE_FILTER.format(date_column=date_column) if bounded else "",
+        top_k_columns="" if top_k is None else ROLLING_TOP_K_COLUMNS,
+        limit="" if top_k is None else ROLLING_LIMIT.format(top_k=int(top_k)),
+    ))
+
+
+def build_rolling_zscore_query(
+    table_name: str,
+    target_column: str,
+    id_column: str,
+    date_column: str,
+    threshold: float,
+    start_date: str,
+    database: str,
+    schema: str,
+    window: int,
+    min_periods: int,
+    top_k: Optional[int] = None,
+    end_date: Optional[str] = None
+) -> Tuple[str, Tuple[Any, ...]]:
+    """
+    Build the rolling z-score query and its parameters.
+
+    A record breaches when its value is more than `threshold` standard deviations away from the
+    mean of the previous `window` records of the same id. `difference` is the z-score in excess
+    of the threshold.
+
+    Args:
+        table_name (str): Name of the table to monitor
+        target_column (str): Name of the column to monitor
+        id_column (str): Name of the column the statistics are partitioned by
+        date_column (str): Name of the column ordering the records of an id
+        threshold (float): Absolute z-score above which a record breaches
+        start_date (str): Start date to filter records (inclusive)
+        database (str): Name of the database
+        schema (str): Name of the schema
+        window (int): Number of previous records of the same id the statistics are computed over
+        min_periods (int): Minimum number of non-null previous values to score a record
+        top_k (int, optional): Only return the top_k rows, with a `total_count` column
+        end_date (str, optional): Only evaluate the records up to this date (inclusive)
+
+    Returns:
+        Tuple[str, Tuple[Any, ...]]: Query with `?` placeholders and its parameters
+
+    Raises:
+        ValueError: If any identifier is invalid or the window is not positive
+    """
+    query, names = compile_rolling_zscore_query(
+        (database, schema, table_name, target_column, id_column, date_column), window, top_k, end_date is not None
+    )
+    values = {
+        "threshold": float(threshold),
+        "start_date": str(start_date),
+        "end_date": str(end_date),
+        "min_periods": int(min_periods),
+    }
+    return query, tuple(values[name] for name in names)
+
+
+@lru_cache(maxsize=QUERY_CACHE_SIZE)
+def compile_watermark_query(
+    table_key: Tuple[str, str, str],
+    date_column: str
+) -> Tuple[str, Tuple[str, ...]]:
+    """
+    Compile the query returning the latest date from `:start_date` on in a table. Results are memoized.
+
+    Args:
+        table_key (Tuple[str, str, str]): (database, schema, table_name)
+        date_column (str): Name of the column containing the date information
+
+    Returns:
+        Tuple[str, Tuple[str, ...]]: Query with `?` placeholders and the parameter names in placeholder order
+
+    Raises:
+        ValueError: If any identifier is invalid
+    """
+    database, schema, table_name = (validate_identifier(part) for part in table_key)
+    return to_qmark(WATERMARK_QUERY.format(
+        database=database,
+        schema=schema,
+        table_name=table_name,
+        date_column=validate_identifier(date_column),
+    ))
+
+
+def build_watermark_query(
+    table_name: str,
+    date_column: str,
+    start_date: str,
+    database: str,
+    schema: str
+) -> Tuple[str, Tuple[Any, ...]]:
+    """
+    Build the query returning the latest `date_column` value from `start_date` on, as `watermark`.
+
+    Args:
+        table_name (str): Name of the monitored table
+        date_column (str): Name of the column containing the date information
+        start_date (str): Only consider the records from this date on (inclusive)
+        database (str): Name of the database
+        schema (str): Name of the schema
+
+    Returns:
+        Tuple[str, Tuple[Any, ...]]: Query with `?` placeholders and its parameters
+
+    Raises:
+        ValueError: If any identifier is invalid
+    """
+    query, names = compile_watermark_query((database, schema, table_name), date_column)
+    values = {"start_date": str(start_date)}
+    return query, tuple(values[name] for name in names)
+
+
+def group_rules_by_table(
+    rules: List[MonitoringRule]
+) -> Dict[Tuple[str, str, str], List[Tuple[int, MonitoringRule]]]:
+    """
+    Group rules by the table they read from, keeping each rule's position in the input list.
+
+    Args:
+        rules (List[MonitoringRule]): Rules to group
+
+    Returns:
+        Dict[Tuple[str, str, str], List[Tuple[int, MonitoringRule]]]: (database, schema, table) to indexed rules
+    """
+    groups: Dict[Tuple[str, str, str], List[Tuple[int, MonitoringRule]]] = {}
+    for rule_index, rule in enumerate(rules):
+        groups.setdefault(rule.table_key, []).append((rule_index, rule))
+    return groups
+
+
+def _rule_shape(rule: MonitoringRule) -> QueryShape:
+    return (rule.database, rule.schema, rule.table_name, rule.target_column, rule.id_column, rule.date_column)
+
+
+@lru_cache(maxsize=QUERY_CACHE_SIZE)
+def compile_batch_query(
+    shapes: Tuple[QueryShape, ...],
+    top_k: Optional[int] = None
+) -> Tuple[str, Tuple[str, ...]]:
+    """
+    Compile the batch query for a sequence of rule shapes. Results are memoized.
+
+    Args:
+        shapes (Tuple[QueryShape, ...]): Shape of every rule, in rule order
+        top_k (int, optional): Use BATCH_TOP_K_QUERY with this limit instead of BATCH_QUERY
+
+    Returns:
+        Tuple[str, Tuple[str, ...]]: Query with `?` placeholders and the parameter names in placeholder order
+
+    Raises:
+        ValueError: If any identifier is invalid
+    """
+    groups: Dict[Tuple[str, str, str], List[Tuple[int, QueryShape]]] = {}
+    for rule_index, shape in enumerate(shapes):
+        _validate_shape(shape)
+        groups.setdefault(tuple(part.lower() for part in shape[:3]), []).append((rule_index, shape))
+
+    scans = []
+    rule_selects = []
+    for scan_index, indexed_shapes in enumerate(groups.values()):
+        scan_name = f"scan_{scan_index}"
+        rule_columns = []
+        rule_filters = []
+        for rule_index, (_, _, _, target_column, id_column, date_column) in indexed_shapes:
+            rule_filter = BATCH_RULE_FILTER.format(
+                rule_index=rule_index,
+                target_column=target_column,
+                date_column=date_column,
+            )
+            rule_filters.append(f"({rule_filter})")
+            rule_columns.append(BATCH_RULE_COLUMNS.format(
+                rule_index=rule_index,
+                id_column=id_column,
+                target_column=target_column,
+                rule_filter=rule_filter,
+            ))
+            rule_selects.append(BATCH_RULE_SELECT.format(
+                rule_index=rule_index,
+                scan_name=scan_name,
+            ))
+
+        database, schema, table_name = indexed_shapes[0][1][:3]
+        scans.append(BATCH_SCAN.format(
+            scan_name=scan_name,
+            rule_columns=",".join(rule_columns),
+            database=database,
+            schema=schema,
+            table_name=table_name,
+            scan_filter=" or ".join(rule_filters),
+        ))
+
+    if top_k is None:
+        query = BATCH_QUERY.format(
+            scans=",".join(scans),
+            rule_selects="\n    union all".join(rule_selects),
+        )
+    else:
+        query = BATCH_TOP_K_QUERY.format(
+            scans=",".join(scans),
+            rule_selects="\n    union all".join(rule_selects),
+            top_k=int(top_k),
+        )
+    return to_qmark(query)
+
+
+def build_batch_query(
+    rules: List[MonitoringRule],
+    top_k: Optional[int] = None
+) -> Tuple[str, Tuple[Any, ...]]:
+    """
+    Build a single query evaluating all rules, scanning each distinct table only once.
+
+    The result has the columns `rule_index`, `id`, `value` and `difference`, where `rule_index`
+    is the position of the rule in `rules`. Thresholds and start dates are bound as parameters.
+
+    Args:
+        rules (List[MonitoringRule]): Rules to evaluate
+        top_k (int, optional): If given, only the top_k rows of every rule are returned, together
+            with a `total_count` column holding the rule's number of breaching rows
+
+    Returns:
+        Tuple[str, Tuple[Any, ...]]: Query with `?` placeholders and its parameters
+
+    Raises:
+        ValueError: If any identifier is invalid
+    """
+    query, names = compile_batch_query(tuple(_rule_shape(rule) for rule in rules), top_k)
+    values = {}
+    for rule_index, rule in enumerate(rules):
+        values[f"rule_{rule_index}_threshold"] = float(rule.threshold)
+        values[f"rule_{rule_index}_start_date"] = str(rule.start_date)
+    return query, tuple(values[name] for name in names)
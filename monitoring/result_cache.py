@@ -0,0 +1,307 @@
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable, Optional, Sequence, Tuple, Union
+from monitoring.monitoring_queries import LAST_ALTERED_QUERY
+from monitoring.query_builder import to_qmark, validate_identifier
+from monitoring.utils import is_dataframe
+
+if TYPE_CHECKING:
+    import pandas as pd
+    import pyarrow as pa
+
+# (database, schema, table_name)
+TableKey = Tuple[str, str, str]
+
+# Cached query results
+CachedResult = Union["pd.DataFrame", "pa.Table"]
+
+# (created_at, freshness, results)
+CacheEntry = Tuple[float, Optional[str], CachedResult]
+
+# Key of the cache entry metadata in the Parquet schema metadata
+PARQUET_METADATA_KEY = b"monitoring_result_cache"
+
+
+def normalize_query(query: str) -> str:
+    """
+    Normalize a query so that formatting differences do not change its cache key.
+
+    Whitespace runs outside of string literals are collapsed and trailing semicolons removed.
+
+    Args:
+        query (str): SQL query
+
+    Returns:
+        str: Normalized query
+    """
+    parts = re.split(r"('(?:[^']|'')*')", query.strip().rstrip(";").strip())
+    # Odd parts are string literals, kept as they are
+    return "".join(part if i % 2 else re.sub(r"\s+", " ", part) for i, part in enumerate(parts))
+
+
+def result_cache_key(query: str, params: Optional[Sequence[Any]] = None) -> str:
+    """
+    Build the cache key of a query and its parameters.
+
+    Args:
+        query (str): SQL query
+        params (Sequence[Any], optional): Values bound to the query
+
+    Returns:
+        str: Hex digest identifying the query results
+    """
+    payload = json.dumps([normalize_query(query), list(params or [])], default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def get_tables_last_altered(conn: Any, tables: Sequence[TableKey]) -> str:
+    """
+    Probe the last modification time of tables in the Snowflake information schema.
+
+    Args:
+        conn: Snowflake connection
+        tables (Sequence[TableKey]): (database, schema, table_name) of the tables
+
+    Returns:
+        str: Last altered timestamps of the tables, joined in table order
+    """
+    query_template, names = to_qmark(LAST_ALTERED_QUERY)
+    last_altered = []
+    cur = conn.cursor()
+    try:
+        for database, schema, table_name in tables:
+            values = {"schema": schema, "table_name": table_name}
+            cur.execute(
+                query_template.format(database=validate_identifier(database)),
+                tuple(values[name] for name in names),
+            )
+            row = cur.fetchone()
+            last_altered.append(str(row[0]) if row else "")
+    finally:
+        cur.close()
+    return "|".join(last_altered)
+
+
+def untracked_freshness(conn: Any, tables: Sequence[TableKey]) -> str:
+    """
+    Freshness probe of the backends without modification times, such as DuckDB.
+
+    Cached results are then only invalidated by their TTL.
+
+    Args:
+        conn: Connection, unused
+        tables (Sequence[TableKey]): (database, schema, table_name) of the tables, unused
+
+    Returns:
+        str: The same empty token for every table
+    """
+    return ""
+
+
+def backend_freshness_probe(backend: str) -> Callable[[Any, Sequence[TableKey]], str]:
+    """
+    Get the freshness probe of a warehouse backend.
+
+    Args:
+        backend (str): "snowflake" or "duckdb" (see monitoring.backends)
+
+    Returns:
+        Callable: get_tables_last_altered for Snowflake, untracked_freshness for DuckDB
+    """
+    return untracked_freshness if backend == "duckdb" else get_tables_last_altered
+
+
+class ResultCache:
+    """
+    Opt-in cache of query results, with an in-memory LRU tier and an optional Parquet tier on disk.
+
+    Entries are keyed on the normalized query and its parameters. An entry is served while it is
+    younger than `ttl_seconds` and, when a freshness token is given (e.g. the last altered time of
+    the tables read, see `get_tables_last_altered`), while the token is unchanged.
+
+    Usage:
+        cache = ResultCache(ttl_seconds=600, cache_dir=".monitoring_cache")
+        df = read_snowflake_table(conn, query, params, cache=cache, cache_tables=[(database, schema, table)])
+
+    Args:
+        max_entries (int): Maximum number of results kept in memory
+        ttl_seconds (float): Maximum age of a served entry
+        cache_dir (str | Path, optional): Directory of the Parquet tier
+        freshness_probe (Callable, optional): `probe(conn, tables) -> str` returning the freshness
+            token of the tables read. Defaults to get_tables_last_altered (Snowflake), see
+            backend_freshness_probe for the other backends
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 128,
+        ttl_seconds: float = 300,
+        cache_dir: Optional[Union[str, Path]] = None,
+        freshness_probe: Optional[Callable[[Any, Sequence[TableKey]], str]] = None
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.cache_dir = Path(cache_dir) if cache_dir is not None else None
+        self.freshness_probe = freshness_probe or get_tables_last_altered
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        if self.cache_dir is not None:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    def probe(self, conn: Any, tables: Sequence[TableKey]) -> str:
+        """
+        Get the freshness token of tables with the freshness probe.
+
+        Args:
+            conn: Connection to probe with
+            tables (Sequence[TableKey]): (database, schema, table_name) of the tables
+
+        Returns:
+            str: Freshness token
+        """
+        return self.freshness_probe(conn, tables)
+
+    def get(
+        self,
+        query: str,
+        params: Optional[Sequence[Any]] = None,
+        freshness: Optional[str] = None
+    ) -> Optional[CachedResult]:
+        """
+        Get the cached results of a query.
+
+        Args:
+            query (str): SQL query
+            params (Sequence[Any], optional): Values bound to the query
+            freshness (str, optional): Current freshness token of the tables read
+
+        Returns:
+            pd.DataFrame | pa.Table | None: A copy of the cached results, or None if missing, expired
+                or stale. Results read from the disk tier are DataFrames
+        """
+        key = result_cache_key(query, params)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+        if entry is None:
+            entry = self._read_disk(key)
+            if entry is not None:
+                self._remember(key, entry)
+
+        valid = entry is not None and self._is_valid(entry, freshness)
+        if entry is not None and not valid:
+            self.invalidate(query, params)
+        with self._lock:
+            if valid:
+                self.hits += 1
+            else:
+                self.misses += 1
+        if not valid:
+            return None
+        return entry[2].copy() if is_dataframe(entry[2]) else entry[2]
+
+    def put(
+        self,
+        query: str,
+        params: Optional[Sequence[Any]],
+        df: CachedResult,
+        freshness: Optional[str] = None
+    ) -> None:
+        """
+        Cache the results of a query.
+
+        Args:
+            query (str): SQL query
+            params (Sequence[Any], optional): Values bound to the query
+            df (pd.DataFrame | pa.Table): Query results
+            freshness (str, optional): Freshness token of the tables read, probed before the query
+        """
+        key = result_cache_key(query, params)
+        # pyarrow Tables are immutable and can be shared
+        entry = (time.time(), freshness, df.copy() if is_dataframe(df) else df)
+        self._remember(key, entry)
+        if self.cache_dir is not None:
+            self._write_disk(key, entry)
+
+    def invalidate(self, query: str, params: Optional[Sequence[Any]] = None) -> None:
+        """
+        Remove the cached results of a query from both tiers.
+
+        Args:
+            query (str): SQL query
+            params (Sequence[Any], optional): Values bound to the query
+        """
+        key = result_cache_key(query, params)
+        with self._lock:
+            self._entries.pop(key, None)
+        if self.cache_dir is not None:
+            self._disk_path(key).unlink(missing_ok=True)
+
+    def clear(self) -> None:
+        """Remove every entry from both tiers."""
+        with self._lock:
+            self._entries.clear()
+        if self.cache_dir is not None:
+            for path in self.cache_dir.glob("*.parquet"):
+                path.unlink(missing_ok=True)
+
+    def _is_valid(self, entry: CacheEntry, freshness: Optional[str]) -> bool:
+        created_at, entry_freshness, _ = entry
+        if time.time() - created_at > self.ttl_seconds:
+            return False
+        return freshness is None or freshness == entry_freshness
+
+    def _remember(self, key: str, entry: CacheEntry) -> None:
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _disk_path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.parquet"
+
+    def _read_disk(self, key: str) -> Optional[CacheEntry]:
+        if self.cache_dir is None or not self._disk_path(key).exists():
+            return None
+        import pyarrow.parquet as pq
+        try:
+            table = pq.read_table(self._disk_path(key))
+        except (OSError, ValueError):
+            # Removed or corrupted meanwhile: treat as a miss
+            return None
+        metadata = json.loads((table.schema.metadata or {}).get(PARQUET_METADATA_KEY, b"{}"))
+        if "created_at" not in metadata:
+            return None
+        return metadata["created_at"], metadata.get("freshness"), table.to_pandas()
+
+    def _write_disk(self, key: str, entry: CacheEntry) -> None:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        created_at, freshness, df = entry
+        table = pa.Table.from_pandas(df, preserve_index=False) if is_dataframe(df) else df
+        metadata = {
+            **(table.schema.metadata or {}),
+            PARQUET_METADATA_KEY: json.dumps({"created_at": created_at, "freshness": freshness}).encode("utf-8"),
+        }
+        table = table.replace_schema_metadata(metadata)
+        # Write next to the final file and rename, so readers never see a partial file
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, prefix=f".{key}.", suffix=".tmp")
+        os.close(fd)
+        try:
+            pq.write_table(table, tmp_path)
+            os.replace(tmp_path, self._disk_path(key))
+        except BaseException:
+            Path(tmp_path).unlink(missing_ok=True)
+            raise
@@ -0,0 +1,171 @@
+import threading
+from contextlib import ExitStack
+from typing import TYPE_CHECKING, Optional, Dict, List
+from monitoring.metrics import CANCELLED, FAILED, MetricsRegistry, RunMetrics, log_run_metrics
+from monitoring.utils import MonitoringSummary, format_monitoring_results
+from monitoring.backends import create_connector
+from monitoring.connection_pool import ConnectionPool, checkout_connection
+from monitoring.monitoring_rule import THRESHOLD, MonitoringRule
+from monitoring.query_builder import build_batch_query, group_rules_by_table
+from monitoring.run_monitoring import MonitoringCancelled
+from monitoring.snowflake_reader import read_snowflake_batches
+from monitoring.slack_notifier import SlackDeliveryQueue, send_monitoring_results_to_slack
+from monitoring.watermark_store import watermark_key
+
+if TYPE_CHECKING:
+    from monitoring.organization_dimension import OrganizationDimensionLookup
+
+
+def batch_key(rules: List[MonitoringRule]) -> str:
+    """
+    Build the key under which the metrics of a batch of rules are recorded.
+
+    Args:
+        rules (List[MonitoringRule]): Rules of the batch
+
+    Returns:
+        str: Key such as `batch(db.schema.table.column > 50.0, db.schema.table.other > 10.0)`, from
+            the keys of the rules (see watermark_key)
+    """
+    keys = [
+        watermark_key(rule.table_name, rule.target_column, rule.threshold, rule.database, rule.schema)
+        for rule in rules
+    ]
+    return f"batch({', '.join(keys)})"
+
+
+def run_batch_monitoring(
+    rules: List[MonitoringRule],
+    slack_channel: Optional[str] = None,
+    slack_token: Optional[str] = None,
+    pool: Optional[ConnectionPool] = None,
+    top_k: int = 5,
+    pushdown: bool = True,
+    slack_queue: Optional[SlackDeliveryQueue] = None,
+    dimension_lookup: Optional["OrganizationDimensionLookup"] = None,
+    metrics_registry: Optional[MetricsRegistry] = None,
+    cancel_event: Optional[threading.Event] = None
+) -> Dict[str, str]:
+    """
+    Run monitoring for many rules with a single connection and a single query.
+
+    Rules reading from the same table share one table scan; the rows returned are fanned
+    back out into one formatted result per rule.
+
+    Args:
+        rules (List[MonitoringRule]): Rules to evaluate. Rule names must be unique
+        slack_channel (str, optional): Slack channel to send results to, for the rules without their own channel
+        slack_token (str, optional): Slack bot token for authentication
+        pool (ConnectionPool, optional): Pool to check the connection out from. If None, a new
+            connection to the MONITORING_BACKEND warehouse (see create_connector) is opened and
+            closed after the query
+        top_k (int): Number of records displayed per rule
+        pushdown (bool): Let the warehouse count the breaching rows and return only the top_k
+            rows of every rule, instead of transferring every breaching row
+        slack_queue (SlackDeliveryQueue, optional): Queue the results for background delivery to
+            slack_channel, coalesced into digests, instead of posting them one by one with slack_token.
+            The batch waits for its digests; a message that could not be delivered is recorded as a
+            failed notify stage in the metrics
+        dimension_lookup (OrganizationDimensionLookup, optional): Add the attributes of the
+            organizations to the displayed records of the rules whose `id_column` is organization_id
+        metrics_registry (MetricsRegistry, optional): Registry the metrics of the batch are added
+            to, as one run under its batch_key (see run_monitoring for the metrics)
+        cancel_event (threading.Event, optional): Set when the batch is abandoned, e.g. once it
+            timed out. The batch then stops before notifying
+
+    Returns:
+        Dict[str, str]: Formatted monitoring results keyed by rule name, in input order
+
+    Raises:
+        ValueError: If no rules are given, rule names are not unique, a rule is not a threshold
+            rule (run the rolling modes with run_monitoring or run_concurrent_monitoring) or top_k
+            is not positive
+        MonitoringCancelled: If the cancel event is set before the results are delivered
+        Exception: If there's an error during monitoring
+    """
+    if not rules:
+        raise ValueError("At least one monitoring rule is required")
+    if top_k < 1:
+        raise ValueError("top_k must be at least 1")
+    rule_names = [rule.name for rule in rules]
+    duplicated_names = sorted({name for name in rule_names if rule_names.count(name) > 1})
+    if duplicated_names:
+        raise ValueError(f"Duplicated monitoring rule names: {', '.join(duplicated_names)}")
+    rolling_rules = [rule.name for rule in rules if rule.mode != THRESHOLD]
+    if rolling_rules:
+        raise ValueError(f"Batch monitoring only supports threshold rules: {', '.join(rolling_rules)}")
+
+    metrics = RunMetrics(rule=batch_key(rules))
+    try:
+        # Extract monitoring results for all rules at once
+        with ExitStack() as stack:
+            with metrics.span("connect"):
+                conn = stack.enter_context(checkout_connection(
+                    pool, create_connector
+                ))
+            # Stream the rows and fan them back out per rule. The fetching of every batch is timed apart
+            query, params = build_batch_query(rules, top_k=top_k if pushdown else None)
+            summaries = [MonitoringSummary(top_k=top_k) for _ in rules]
+            with metrics.span("transform"):
+                for batch in read_snowflake_batches(conn=conn, query=query, params=params, metrics=metrics):
+                    batch = batch.rename(columns=str.lower)
+                    for rule_index, rule_batch in batch.groupby('rule_index', sort=False):
+                        summaries[int(rule_index)].add(rule_batch.drop(columns='rule_index'))
+                enriched = dimension_lookup is not None and any(
+                    rule.id_column.lower() == "organization_id" and summary.top_records
+                    for rule, summary in zip(rules, summaries)
+                )
+                dimensions = dimension_lookup.get_or_none(conn) if enriched else None
+
+        with metrics.span("format"):
+            formatted_results = {}
+            for rule, summary in zip(rules, summaries):
+                formatted_results[rule.name] = format_monitoring_results(
+                    summary.top_records, rule.table_name, rule.target_column,
+                    total_count=summary.total_count, top_k=top_k,
+                    dimensions=dimensions if rule.id_column.lower() == "organization_id" else None
+                )
+
+        if cancel_event is not None and cancel_event.is_set():
+            raise MonitoringCancelled("Batch monitoring cancelled before delivering its results")
+
+        # Send to Slack if configured, to the rule's own channel if it has one
+        with metrics.span("notify"):
+            deliveries = []
+            for rule in rules:
+                channel = rule.slack_channel or slack_channel
+                message = formatted_results[rule.name]
+                if channel and slack_queue is not None:
+                    deliveries.append(slack_queue.submit(channel, message))
+                elif channel and slack_token:
+                    try:
+                        send_monitoring_results_to_slack(
+                            message=message,
+                            channel=channel,
+                            token=slack_token
+                        )
+                    except Exception as e:
+                        metrics.mark_failed("notify")
+                        print(f"Warning: Failed to send results to Slack: {str(e)}")
+            # Every message is queued before waiting, so that they are posted in the same digests
+            for delivery in deliveries:
+                try:
+                    delivery.result()
+                except Exception as e:
+                    metrics.mark_failed("notify")
+                    print(f"Warning: Failed to send results to Slack: {str(e)}")
+
+        return formatted_results
+
+    except MonitoringCancelled:
+        metrics.status = CANCELLED
+        raise
+
+    except Exception as e:
+        metrics.status = FAILED
+        raise Exception(f"Error running batch monitoring: {str(e)}")
+
+    finally:
+        log_run_metrics(metrics)
+        if metrics_registry is not None:
+            metrics_registry.record(metrics)
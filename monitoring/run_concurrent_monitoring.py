@@ -0,0 +1,271 @@
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+from monitoring.connection_pool import ConnectionPool
+from monitoring.metrics import MetricsRegistry
+from monitoring.monitoring_rule import THRESHOLD, MonitoringRule
+from monitoring.query_builder import group_rules_by_table
+from monitoring.run_batch_monitoring import run_batch_monitoring
+from monitoring.run_monitoring import run_monitoring
+from monitoring.slack_notifier import SlackDeliveryQueue
+from monitoring.watermark_store import WatermarkStore
+
+if TYPE_CHECKING:
+    from monitoring.alert_state import AlertStateStore
+    from monitoring.organization_dimension import OrganizationDimensionLookup
+    from monitoring.result_cache import ResultCache
+
+# Seconds between two checks of the rule deadlines and of the cancel event
+POLL_INTERVAL = 0.05
+
+# Outcome statuses
+SUCCESS = "success"
+FAILED = "failed"
+TIMED_OUT = "timed_out"
+CANCELLED = "cancelled"
+
+
+@dataclass
+class RuleOutcome:
+    """
+    Result of one rule in a concurrent monitoring cycle.
+
+    Attributes:
+        rule (MonitoringRule): The evaluated rule
+        status (str): "success", "failed", "timed_out" or "cancelled"
+        result (str, optional): Formatted monitoring results, for successful rules
+        error (Exception, optional): Error raised by the rule, for failed rules
+        elapsed_seconds (float): Time spent running the rule (0 if it never started)
+    """
+    rule: MonitoringRule
+    status: str
+    result: Optional[str] = None
+    error: Optional[BaseException] = None
+    elapsed_seconds: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        """Whether the rule ran to completion."""
+        return self.status == SUCCESS
+
+
+def run_monitoring_rule(
+    rule: MonitoringRule,
+    slack_channel: Optional[str] = None,
+    dimension_lookup: Optional["OrganizationDimensionLookup"] = None,
+    **kwargs: Any
+) -> str:
+    """
+    Run `run_monitoring` for one rule.
+
+    Args:
+        rule (MonitoringRule): Rule to evaluate
+        slack_channel (str, optional): Slack channel to send results to, if the rule has none
+        dimension_lookup (OrganizationDimensionLookup, optional): Only used when the rule's
+            `id_column` is organization_id
+        **kwargs: Other arguments of `run_monitoring` (pool, top_k, stores, ...)
+
+    Returns:
+        str: Formatted monitoring results
+    """
+    return run_monitoring(
+        table_name=rule.table_name,
+        target_column=rule.target_column,
+        id_column=rule.id_column,
+        date_column=rule.date_column,
+        threshold=rule.threshold,
+        start_date=rule.start_date,
+        database=rule.database,
+        schema=rule.schema,
+        slack_channel=rule.slack_channel or slack_channel,
+        mode=rule.mode,
+        window=rule.window,
+        min_periods=rule.min_periods,
+        dimension_lookup=dimension_lookup if rule.id_column.lower() == "organization_id" else None,
+        **kwargs,
+    )
+
+
+def run_concurrent_monitoring(
+    rules: List[MonitoringRule],
+    max_workers: int = 4,
+    timeout: Optional[float] = None,
+    cancel_event: Optional[threading.Event] = None,
+    slack_channel: Optional[str] = None,
+    slack_token: Optional[str] = None,
+    pool: Optional[ConnectionPool] = None,
+    top_k: int = 5,
+    pushdown: bool = True,
+    watermark_store: Optional[WatermarkStore] = None,
+    slack_queue: Optional[SlackDeliveryQueue] = None,
+    metrics_registry: Optional[MetricsRegistry] = None,
+    batch: bool = False,
+    dimension_lookup: Optional["OrganizationDimensionLookup"] = None,
+    alert_store: Optional["AlertStateStore"] = None,
+    result_cache: Optional["ResultCache"] = None
+) -> Dict[str, RuleOutcome]:
+    """
+    Run `run_monitoring` for many rules concurrently on a bounded thread pool.
+
+    Each rule is I/O bound (warehouse query and Slack post), so the cycle takes about as long
+    as the slowest rule instead of the sum of all of them. Errors are collected per rule
+    instead of aborting the cycle.
+
+    Python threads cannot be interrupted: a rule exceeding its timeout is reported as timed out
+    and its result is discarded, but its query keeps its worker until it returns. The rule is
+    signalled to stop, so that it neither posts its results nor advances its watermark once its
+    query returns. Use the warehouse statement timeout to bound the queries themselves.
+
+    Args:
+        rules (List[MonitoringRule]): Rules to evaluate. Rule names must be unique
+        max_workers (int): Maximum number of rules running at the same time. With a pool, keep it
+            at most `pool.max_size` so that workers do not wait for connections
+        timeout (float, optional): Maximum number of seconds for each rule, counted from the
+            moment the rule starts running
+        cancel_event (threading.Event, optional): When set, the rules not started yet are
+            cancelled and the running ones are abandoned, without delivering their results
+        slack_channel (str, optional): Slack channel to send results to, for the rules without their own channel
+        slack_token (str, optional): Slack bot token for authentication
+        pool (ConnectionPool, optional): Pool shared by all the rules
+        top_k (int): Number of records displayed per rule
+        pushdown (bool): See `run_monitoring`
+        watermark_store (WatermarkStore, optional): See `run_monitoring`
+        slack_queue (SlackDeliveryQueue, optional): See `run_monitoring`. Recommended here, so that
+            the results of the cycle are coalesced instead of posted by every worker
+        metrics_registry (MetricsRegistry, optional): Registry shared by the rules, see `run_monitoring`.
+            A batch is recorded as one run (see `run_batch_monitoring`)
+        batch (bool): Evaluate the threshold rules reading from the same table with a single
+            query (see `run_batch_monitoring`), as one task. Rules of a batch share its outcome
+            status, timing and timeout. Cannot be combined with a watermark store or an alert store
+        dimension_lookup (OrganizationDimensionLookup, optional): Lookup shared by the rules whose
+            `id_column` is organization_id, see `run_monitoring`
+        alert_store (AlertStateStore, optional): Store shared by the rules, see `run_monitoring`
+        result_cache (ResultCache, optional): Cache shared by the rules not batched, see `run_monitoring`
+
+    Returns:
+        Dict[str, RuleOutcome]: Outcome of every rule keyed by rule name, in input order
+
+    Raises:
+        ValueError: If no rules are given, rule names are not unique, max_workers is not positive
+            or batch is combined with a watermark store or an alert store
+    """
+    if not rules:
+        raise ValueError("At least one monitoring rule is required")
+    if max_workers < 1:
+        raise ValueError("max_workers must be at least 1")
+    rule_names = [rule.name for rule in rules]
+    duplicated_names = sorted({name for name in rule_names if rule_names.count(name) > 1})
+    if duplicated_names:
+        raise ValueError(f"Duplicated monitoring rule names: {', '.join(duplicated_names)}")
+    if batch and watermark_store is not None:
+        raise ValueError("Batch monitoring cannot be combined with a watermark store")
+    if batch and alert_store is not None:
+        raise ValueError("Batch monitoring cannot be combined with an alert store")
+
+    # Every task evaluates one rule, or one batch of threshold rules reading from the same table
+    tasks: List[List[int]] = []
+    if batch:
+        for indexed_rules in group_rules_by_table(rules).values():
+            batch_indices = [rule_index for rule_index, rule in indexed_rules if rule.mode == THRESHOLD]
+            if len(batch_indices) > 1:
+                tasks.append(batch_indices)
+    batched = {rule_index for task in tasks for rule_index in task}
+    tasks.extend([rule_index] for rule_index in range(len(rules)) if rule_index not in batched)
+
+    started_at: Dict[int, float] = {}
+    finished_at: Dict[int, float] = {}
+    # Set once a task is reported timed out or cancelled, so that it stops before delivering
+    abandoned = [threading.Event() for _ in tasks]
+
+    def run_task(task_index: int) -> Dict[int, str]:
+        started_at[task_index] = time.monotonic()
+        try:
+            task_rules = [rules[rule_index] for rule_index in tasks[task_index]]
+            if len(task_rules) > 1:
+                results = run_batch_monitoring(
+                    task_rules,
+                    slack_channel=slack_channel,
+                    slack_token=slack_token,
+                    pool=pool,
+                    top_k=top_k,
+                    pushdown=pushdown,
+                    slack_queue=slack_queue,
+                    dimension_lookup=dimension_lookup,
+                    metrics_registry=metrics_registry,
+                    cancel_event=abandoned[task_index],
+                )
+                return {rule_index: results[rules[rule_index].name] for rule_index in tasks[task_index]}
+            return {tasks[task_index][0]: run_monitoring_rule(
+                task_rules[0],
+                slack_channel=slack_channel,
+                dimension_lookup=dimension_lookup,
+                slack_token=slack_token,
+                pool=pool,
+                top_k=top_k,
+                pushdown=pushdown,
+                watermark_store=watermark_store,
+                slack_queue=slack_queue,
+                alert_store=alert_store,
+                result_cache=result_cache,
+                metrics_registry=metrics_registry,
+                cancel_event=abandoned[task_index],
+            )}
+        finally:
+            finished_at[task_index] = time.monotonic()
+
+    def elapsed(task_index: int) -> float:
+        if task_index not in started_at:
+            return 0.0
+        return finished_at.get(task_index, time.monotonic()) - started_at[task_index]
+
+    def set_outcomes(task_index: int, status: str, results: Optional[Dict[int, str]] = None,
+                     error: Optional[BaseException] = None) -> None:
+        for rule_index in tasks[task_index]:
+            outcomes[rule_index] = RuleOutcome(
+                rules[rule_index], status, result=results[rule_index] if results else None,
+                error=error, elapsed_seconds=elapsed(task_index),
+            )
+
+    outcomes: Dict[int, RuleOutcome] = {}
+    executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="monitoring")
+    try:
+        futures: Dict[Future, int] = {
+            executor.submit(run_task, task_index): task_index for task_index in range(len(tasks))
+        }
+        pending = set(futures)
+        poll_interval = POLL_INTERVAL if timeout is not None or cancel_event is not None else None
+        while pending:
+            if cancel_event is not None and cancel_event.is_set():
+                for future in pending:
+                    future.cancel()
+                    abandoned[futures[future]].set()
+                    set_outcomes(futures[future], CANCELLED)
+                break
+
+            done, pending = wait(pending, timeout=poll_interval, return_when=FIRST_COMPLETED)
+            for future in done:
+                error = future.exception()
+                if error is None:
+                    set_outcomes(futures[future], SUCCESS, results=future.result())
+                else:
+                    set_outcomes(futures[future], FAILED, error=error)
+
+            if timeout is not None:
+                now = time.monotonic()
+                for future in list(pending):
+                    task_index = futures[future]
+                    if task_index in started_at and now - started_at[task_index] > timeout:
+                        pending.discard(future)
+                        abandoned[task_index].set()
+                        names = ", ".join(rules[rule_index].name for rule_index in tasks[task_index])
+                        set_outcomes(
+                            task_index, TIMED_OUT,
+                            error=TimeoutError(f"Monitoring rule {names} timed out after {timeout}s"),
+                        )
+    finally:
+        # Do not wait for abandoned rules: their threads finish in the background
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    return {rule.name: outcomes[rule_index] for rule_index, rule in enumerate(rules)}
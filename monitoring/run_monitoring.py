@@ -1,10 +1,41 @@
-from typing import Optional
-import os
-from monitoring.utils import format_monitoring_results, get_connection_params
-from monitoring.create_snowflake_connector import create_snowflake_connector
-from monitoring.monitoring_queries import QUERY
-from monitoring.snowflake_reader import read_snowflake_table
-from monitoring.slack_notifier import send_monitoring_results_to_slack
+import threading
+import uuid
+from contextlib import ExitStack, suppress
+from typing import TYPE_CHECKING, Iterable, Iterator, Optional
+import sys
+from monitoring.monitoring_rule import DEFAULT_MIN_PERIODS, DEFAULT_WINDOW, THRESHOLD, ZSCORE
+from monitoring.metrics import CANCELLED, FAILED, MetricsRegistry, RunMetrics, log_run_metrics
+from monitoring.result_cache import ResultCache
+from monitoring.utils import format_monitoring_results, is_dataframe, summarize_monitoring_results
+from monitoring.backends import create_connector
+from monitoring.connection_pool import ConnectionPool, checkout_connection
+from monitoring.query_builder import build_monitoring_query, build_rolling_zscore_query, build_watermark_query
+from monitoring.snowflake_reader import read_snowflake_batches, read_snowflake_table
+from monitoring.slack_notifier import SlackDeliveryQueue, send_monitoring_results_to_slack
+from monitoring.watermark_store import WatermarkStore, format_watermark, watermark_key
+
+if TYPE_CHECKING:
+    import pandas as pd
+    from monitoring.alert_state import AlertStateStore
+    from monitoring.organization_dimension import OrganizationDimensionLookup
+
+
+class MonitoringError(Exception):
+    """
+    Error raised by a monitoring run.
+
+    Args:
+        message (str): Error message
+        stage (str, optional): Stage of the run that failed (see monitoring.metrics.STAGES)
+    """
+
+    def __init__(self, message: str, stage: Optional[str] = None):
+        super().__init__(message)
+        self.stage = stage
+
+
+class MonitoringCancelled(MonitoringError):
+    """Error raised by a monitoring run cancelled before delivering its results."""
 
 
 def run_monitoring(
@@ -17,7 +48,21 @@ def run_monitoring(
     database: str,
     schema: str,
     slack_channel: Optional[str] = None,
-    slack_token: Optional[str] = None
+    slack_token: Optional[str] = None,
+    pool: Optional[ConnectionPool] = None,
+    top_k: int = 5,
+    pushdown: bool = True,
+    watermark_store: Optional[WatermarkStore] = None,
+    slack_queue: Optional[SlackDeliveryQueue] = None,
+    alert_store: Optional["AlertStateStore"] = None,
+    result_cache: Optional[ResultCache] = None,
+    arrow: bool = True,
+    metrics_registry: Optional[MetricsRegistry] = None,
+    mode: str = THRESHOLD,
+    window: int = DEFAULT_WINDOW,
+    min_periods: int = DEFAULT_MIN_PERIODS,
+    dimension_lookup: Optional["OrganizationDimensionLookup"] = None,
+    cancel_event: Optional[threading.Event] = None
 ) -> str:
     """
     Run monitoring for a specific table and column.
@@ -27,84 +72,220 @@ def run_monitoring(
         target_column (str): Name of the column to monitor
         id_column (str): Name of the column containing record identifiers,
         date_column (str): Name of the column containing the date information. It should be a date or datetime column,
-        threshold (float): Value to compare against
-        start_date (str): Start date to filter records
+        threshold (float): Value to compare against. In the "zscore" mode, absolute z-score above
+            which a record breaches
+        start_date (str): Start date to filter records. With a watermark store, only used until the
+            rule has a watermark
         database (str): Name of the database
         schema (str): Name of the schema
         slack_channel (str, optional): Slack channel to send results to
         slack_token (str, optional): Slack bot token for authentication
+        pool (ConnectionPool, optional): Pool to check the connection out from. If None, a new
+            connection to the MONITORING_BACKEND warehouse (see create_connector) is opened and
+            closed after the query
+        top_k (int): Number of records displayed in the results
+        pushdown (bool): Let the warehouse count the breaching rows and return only the top_k
+            ones (TOP_K_QUERY), instead of transferring every breaching row (QUERY)
+        watermark_store (WatermarkStore, optional): Store of the latest date evaluated by each rule.
+            If given, only the records from the rule's watermark on are evaluated, and the watermark
+            is advanced once the results have been computed and delivered. The day of the watermark
+            is evaluated again, as rows may land late for it: combine with `alert_store` so that its
+            breaches are only alerted once
+        slack_queue (SlackDeliveryQueue, optional): Queue the results for background delivery to
+            slack_channel instead of posting them with slack_token. The run waits for the digest
+            holding its results, so the watermark and the alert store are only advanced once it is
+            posted
+        alert_store (AlertStateStore, optional): Store of the breaches already alerted on. If given,
+            only new or escalated breaches are reported. They are staged in the store while the
+            results are streamed, and recorded once delivered. Every breaching row is then read,
+            whatever `pushdown`
+        result_cache (ResultCache, optional): Serve the breaches from this cache while the monitored
+            table is unchanged, instead of querying the warehouse again
+        arrow (bool): Read the results as Arrow record batches and summarize them without converting
+            them to pandas. If False, the results are read as pandas DataFrames
+        metrics_registry (MetricsRegistry, optional): Registry the metrics of the run are added to.
+            The metrics (time spent connecting, executing the queries, fetching, transforming,
+            formatting and notifying, rows and bytes fetched, warehouse query ids) are also logged
+            as a JSON record on the `monitoring.metrics` logger. A run whose results could not be
+            delivered to Slack is recorded as failed in the notify stage
+        mode (str): "threshold" flags the records with `target_column > threshold`. "zscore" flags
+            the records more than `threshold` standard deviations away from the mean of the previous
+            `window` records of the same `id_column`, computed by the warehouse (ROLLING_ZSCORE_QUERY)
+        window (int): Number of previous records of the rolling statistics, in the "zscore" mode
+        min_periods (int): Minimum number of non-null previous values to score a record, in the
+            "zscore" mode
+        dimension_lookup (OrganizationDimensionLookup, optional): Add the attributes of the
+            organizations (country, portfolio size, days since last payment) to the displayed
+            records, when `id_column` holds organization ids. The dimension is cached by the lookup
+            and only read again when the table changed
+        cancel_event (threading.Event, optional): Set when the run is abandoned, e.g. once it timed
+            out. The run then stops before notifying, without advancing the watermark nor the alert
+            store. Once notified, the run completes
     
     Returns:
         str: Formatted monitoring results
     
     Raises:
-        Exception: If there's an error during monitoring
+        ValueError: If the mode is not supported or top_k is not positive
+        MonitoringError: If there's an error during monitoring, with the stage that failed
+        MonitoringCancelled: If the cancel event is set before the results are delivered
     """
+    if mode not in (THRESHOLD, ZSCORE):
+        raise ValueError(f"Unsupported monitoring mode: {mode}")
+    if top_k < 1:
+        raise ValueError("top_k must be at least 1")
+    key = watermark_key(table_name, target_column, threshold, database, schema, mode=mode, window=window)
+    metrics = RunMetrics(rule=key)
+    # Id under which the new breaches of this run are staged in the alert store
+    staging_id = uuid.uuid4().hex if alert_store is not None else None
     try:
-        # Create Snowflake connection
-        conn = create_snowflake_connector(connection_params=get_connection_params())
-        
-        # Extract monitoring results
-        query = QUERY.format(
-            table_name=table_name,
-            database=database,
-            schema=schema,
-            target_column=target_column,
-            id_column=id_column,
-            date_column=date_column,
-            threshold=threshold,
-            start_date=start_date,
-        )
-        results_df = read_snowflake_table(
-            conn=conn,
-            query=query
-        )
-
-        # Convert column names to lowercase and then to list of dictionaries
-        results_df.columns = results_df.columns.str.lower()
-        results = results_df.to_dict('records')
+        end_date = None
+        if watermark_store is not None:
+            start_date = watermark_store.get(key) or start_date
+
+        with ExitStack() as stack:
+            with metrics.span("connect"):
+                conn = stack.enter_context(checkout_connection(
+                    pool, create_connector
+                ))
+            if watermark_store is not None:
+                # Fix the upper bound first, so that rows landing during the run are left for the next one
+                watermark_query, watermark_params = build_watermark_query(
+                    table_name=table_name,
+                    date_column=date_column,
+                    start_date=start_date,
+                    database=database,
+                    schema=schema,
+                )
+                watermark_df = read_snowflake_table(
+                    conn=conn, query=watermark_query, params=watermark_params, metrics=metrics
+                )
+                end_date = format_watermark(watermark_df.iloc[0, 0]) if len(watermark_df) else None
+                if end_date is None:
+                    # No new records since the last run: nothing to evaluate nor to alert on
+                    with metrics.span("format"):
+                        return format_monitoring_results([], table_name, target_column, top_k=top_k)
+
+            # Extract monitoring results
+            query_kwargs = dict(
+                table_name=table_name,
+                target_column=target_column,
+                id_column=id_column,
+                date_column=date_column,
+                threshold=threshold,
+                start_date=start_date,
+                database=database,
+                schema=schema,
+                top_k=top_k if pushdown and alert_store is None else None,
+                end_date=end_date,
+            )
+            if mode == ZSCORE:
+                query, params = build_rolling_zscore_query(**query_kwargs, window=window, min_periods=min_periods)
+            else:
+                query, params = build_monitoring_query(**query_kwargs)
+            if result_cache is not None:
+                batches = [read_snowflake_table(
+                    conn=conn, query=query, params=params,
+                    cache=result_cache, cache_tables=[(database, schema, table_name)], arrow=arrow,
+                    metrics=metrics
+                )]
+            else:
+                batches = read_snowflake_batches(conn=conn, query=query, params=params, arrow=arrow, metrics=metrics)
+            if alert_store is not None:
+                # Drop the breaches already alerted on before they are counted and formatted
+                batches = _drop_alerted_breaches(alert_store, key, batches, staging_id)
+            # Stream the results keeping only the count and the records that are displayed.
+            # The fetching of every batch is timed apart, in the fetch stage
+            with metrics.span("transform"):
+                total_count, results = summarize_monitoring_results(batches, top_k=top_k)
+                dimensions = None
+                if dimension_lookup is not None and results:
+                    # Failing to load the dimension does not fail the run: the alert goes out without it
+                    dimensions = dimension_lookup.get_or_none(conn)
 
         # Format monitoring results
-        formatted_results = format_monitoring_results(results, table_name, target_column)
+        with metrics.span("format"):
+            formatted_results = format_monitoring_results(
+                results, table_name, target_column, total_count=total_count, top_k=top_k,
+                dimensions=dimensions
+            )
         
-        # Send to Slack if configured
-        if slack_channel and slack_token:
+        # An abandoned run must not alert nor advance the watermark behind the back of its caller
+        _check_cancelled(cancel_event)
+
+        # Send to Slack if configured. With an alert store, a run without new breaches is not posted
+        delivered = True
+        notify = bool(slack_channel) and (alert_store is None or total_count > 0)
+        with metrics.span("notify"):
             try:
-                send_monitoring_results_to_slack(
-                    message=formatted_results,
-                    channel=slack_channel,
-                    token=slack_token
-                )
+                if notify and slack_queue is not None:
+                    # Wait for the digest holding the results: the queue fails it once out of retries
+                    slack_queue.submit(slack_channel, formatted_results).result()
+                elif notify and slack_token:
+                    send_monitoring_results_to_slack(
+                        message=formatted_results,
+                        channel=slack_channel,
+                        token=slack_token
+                    )
             except Exception as e:
+                delivered = False
+                metrics.mark_failed("notify")
                 print(f"Warning: Failed to send results to Slack: {str(e)}")
+
+        # Once the alert is out, the state is advanced even if the run was abandoned meanwhile, so
+        # that the next run does not alert again. A failed delivery is retried by the next run
+        if watermark_store is not None and delivered:
+            watermark_store.set(key, end_date)
+        if alert_store is not None and delivered:
+            alert_store.commit_staged(staging_id)
+        elif alert_store is not None:
+            alert_store.discard_staged(staging_id)
         
         return formatted_results
 
     except Exception as e:
-        raise Exception(f"Error running monitoring: {str(e)}")
+        cancelled = isinstance(e, MonitoringCancelled)
+        metrics.status = CANCELLED if cancelled else FAILED
+        if staging_id is not None:
+            # Left over stages are also dropped by the next commits, once expired
+            with suppress(Exception):
+                alert_store.discard_staged(staging_id)
+        if cancelled:
+            raise
+        raise MonitoringError(f"Error running monitoring: {str(e)}", stage=metrics.error_stage)
+
+    finally:
+        log_run_metrics(metrics)
+        if metrics_registry is not None:
+            metrics_registry.record(metrics)
+
+def _check_cancelled(cancel_event: Optional[threading.Event]) -> None:
+    if cancel_event is not None and cancel_event.is_set():
+        raise MonitoringCancelled("Monitoring run cancelled before delivering its results")
+
+def _drop_alerted_breaches(
+    alert_store: "AlertStateStore",
+    key: str,
+    batches: Iterable["pd.DataFrame"],
+    staging_id: str
+) -> Iterator["pd.DataFrame"]:
+    # Filter every batch through the alert store, staging the remaining breaches to record them once delivered
+    for batch in batches:
+        if not is_dataframe(batch):
+            batch = batch.to_pandas()
+        batch = alert_store.filter_new(key, batch)
+        alert_store.stage(staging_id, key, batch)
+        yield batch
 
 def main():
     """
-    Main function to run monitoring for balance table.
+    Run the rules of the monitoring configuration file (see monitoring.cli).
+
+    The file is `monitoring.toml`, or the one given by the MONITORING_CONFIG environment variable.
     """
-    slack_channel = os.getenv("SLACK_CHANNEL")
-    slack_token = os.getenv("SLACK_BOT_TOKEN")
-
-    monitoring_config = {
-            "table_name": "fct__organizations_balance",
-            "target_column": "balance_change_percentage",
-            "id_column": "organization_id",
-            "date_column": "balance_date",
-            "threshold": 50.0,
-            "start_date": "2024-01-01",
-            "database": "deel_takehome_dev",
-            "schema": "ehernani_fact_tables",
-            "slack_channel": slack_channel,
-            "slack_token": slack_token
-    }
-    
-    results = run_monitoring(**monitoring_config)
-    print(results)
+    from monitoring import cli
+
+    sys.exit(cli.main(["run"]))
 
 if __name__ == "__main__":
     main()
@@ -1,5 +1,10 @@
-from slack_sdk import WebClient
-from slack_sdk.errors import SlackApiError
+import threading
+import time
+from concurrent.futures import Future
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    from slack_sdk import WebClient
 
 def send_monitoring_results_to_slack(
     message: str,
@@ -20,6 +25,10 @@ def send_monitoring_results_to_slack(
     Raises:
         SlackApiError: If there's an error sending the message to Slack
     """
+    # slack_sdk is only imported by the runs that deliver results
+    from slack_sdk import WebClient
+    from slack_sdk.errors import SlackApiError
+
     try:
         client = WebClient(token=token)
         
@@ -34,3 +43,264 @@ def send_monitoring_results_to_slack(
     except SlackApiError as e:
         print(f"Error sending message to Slack: {e.response['error']}")
         raise
+
+
+# Slack rejects messages longer than 40000 characters; digests are split below this length
+MAX_MESSAGE_LENGTH = 39000
+
+# Separator of the results in a digest message
+DIGEST_SEPARATOR = "\n\n"
+
+
+def build_digest(messages: List[str], max_length: int = MAX_MESSAGE_LENGTH) -> List[str]:
+    """
+    Coalesce several monitoring results into as few Slack messages as possible.
+
+    Args:
+        messages (List[str]): Formatted monitoring results, in submission order
+        max_length (int): Maximum length of a digest message. Longer single messages are kept whole
+
+    Returns:
+        List[str]: Digest messages. A single result is sent unchanged
+    """
+    return [_format_digest(chunk) for chunk in _digest_chunks(messages, max_length)]
+
+
+def _digest_chunks(messages: List[str], max_length: int = MAX_MESSAGE_LENGTH) -> List[List[str]]:
+    # Messages grouped into the digests of build_digest, in submission order
+    chunks = []
+    chunk: List[str] = []
+    chunk_length = 0
+    for message in messages:
+        if chunk and chunk_length + len(DIGEST_SEPARATOR) + len(message) > max_length:
+            chunks.append(chunk)
+            chunk, chunk_length = [], 0
+        chunk.append(message)
+        chunk_length += len(message) + (len(DIGEST_SEPARATOR) if len(chunk) > 1 else 0)
+    if chunk:
+        chunks.append(chunk)
+    return chunks
+
+
+def _format_digest(chunk: List[str]) -> str:
+    if len(chunk) == 1:
+        return chunk[0]
+    return f"{len(chunk)} monitoring results:{DIGEST_SEPARATOR}" + DIGEST_SEPARATOR.join(chunk)
+
+
+class SlackDeliveryQueue:
+    """
+    Background delivery of monitoring results to Slack.
+
+    Messages are queued by `submit` without blocking the caller. A worker thread groups the
+    messages of every channel received within `window_seconds` into one digest, and posts them
+    with a single reused `WebClient`. Rate limited requests (HTTP 429) are retried after the
+    `Retry-After` delay, and server or connection errors with exponential backoff; other Slack
+    errors are not retried. During a rate limit pause, no channel is posted to.
+
+    Usage:
+        with SlackDeliveryQueue(token=slack_token) as slack_queue:
+            run_monitoring(..., slack_channel="#alerts", slack_queue=slack_queue)
+
+    Args:
+        token (str): Slack bot token
+        window_seconds (float): Time to wait for more messages of a channel before posting
+        max_retries (int): Maximum number of retries of a digest
+        backoff_seconds (float): First delay between retries of server or connection errors, doubled
+            after every attempt. Also used for rate limited responses without `Retry-After`
+        max_backoff_seconds (float): Maximum delay between two retries
+        base_url (str, optional): Slack API URL, e.g. of a fake server in tests
+        client (WebClient, optional): Client to use instead of creating one
+    """
+
+    def __init__(
+        self,
+        token: Optional[str] = None,
+        window_seconds: float = 2.0,
+        max_retries: int = 5,
+        backoff_seconds: float = 1.0,
+        max_backoff_seconds: float = 60.0,
+        base_url: Optional[str] = None,
+        client: Optional["WebClient"] = None
+    ):
+        if client is None:
+            from slack_sdk import WebClient
+            client = WebClient(token=token) if base_url is None else WebClient(token=token, base_url=base_url)
+        self.client = client
+        self.window_seconds = window_seconds
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+        self.delivered_count = 0
+        self.failed: List[Tuple[str, str, Exception]] = []
+
+        self._condition = threading.Condition()
+        self._buffers: Dict[str, List[Tuple[str, Future]]] = {}
+        self._deadlines: Dict[str, float] = {}
+        self._in_flight = 0
+        self._flush_requests = 0
+        self._closed = False
+        self._paused_until = 0.0
+        self._worker = threading.Thread(target=self._run, name="slack-delivery", daemon=True)
+        self._worker.start()
+
+    def submit(self, channel: str, message: str) -> Future:
+        """
+        Queue a message for a channel.
+
+        Args:
+            channel (str): The Slack channel to send the message to
+            message (str): The message to send
+
+        Returns:
+            Future: Resolved with True once the digest holding the message is posted, or with
+                the last error if it could not be posted
+
+        Raises:
+            RuntimeError: If the queue is closed
+        """
+        future: Future = Future()
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("Slack delivery queue is closed")
+            if channel not in self._buffers:
+                self._buffers[channel] = []
+                self._deadlines[channel] = time.monotonic() + self.window_seconds
+            self._buffers[channel].append((message, future))
+            self._condition.notify_all()
+        return future
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Post the buffered messages without waiting for their window, and wait for the deliveries.
+
+        Args:
+            timeout (float, optional): Maximum number of seconds to wait
+
+        Returns:
+            bool: True if every queued message was processed (posted or failed)
+        """
+        with self._condition:
+            self._flush_requests += 1
+            self._condition.notify_all()
+            try:
+                return self._condition.wait_for(
+                    lambda: not self._buffers and not self._in_flight, timeout=timeout
+                )
+            finally:
+                self._flush_requests -= 1
+
+    def close(self, timeout: Optional[float] = None) -> bool:
+        """
+        Stop accepting messages, deliver the buffered ones and stop the worker thread.
+
+        Args:
+            timeout (float, optional): Maximum number of seconds to wait for the deliveries
+
+        Returns:
+            bool: True if every queued message was processed
+        """
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        self._worker.join(timeout)
+        return not self._worker.is_alive()
+
+    def __enter__(self) -> "SlackDeliveryQueue":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+    def _next_channel(self) -> Optional[str]:
+        # Called with the condition held; returns the channel to post to, or None to stop
+        while True:
+            if self._closed and not self._buffers:
+                return None
+            wait_timeout = None
+            if self._buffers:
+                channel = min(self._deadlines, key=self._deadlines.get)
+                wait_timeout = self._deadlines[channel] - time.monotonic()
+                if self._closed or self._flush_requests or wait_timeout <= 0:
+                    return channel
+            self._condition.wait(wait_timeout)
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                channel = self._next_channel()
+                if channel is None:
+                    return
+                entries = self._buffers.pop(channel)
+                del self._deadlines[channel]
+                self._in_flight += 1
+            try:
+                self._deliver(channel, entries)
+            finally:
+                with self._condition:
+                    self._in_flight -= 1
+                    self._condition.notify_all()
+
+    def _deliver(self, channel: str, entries: List[Tuple[str, Future]]) -> None:
+        # Every digest succeeds or fails on its own: the messages of the digests already posted
+        # are delivered, even if a later digest of the channel fails
+        remaining = list(entries)
+        delivered = 0
+        failed = []
+        for chunk in _digest_chunks([message for message, _ in entries]):
+            chunk_entries, remaining = remaining[:len(chunk)], remaining[len(chunk):]
+            try:
+                self._post(channel, _format_digest(chunk))
+            except Exception as e:
+                print(f"Error sending message to Slack: {str(e)}")
+                for message, future in chunk_entries:
+                    future.set_exception(e)
+                failed.extend((channel, message, e) for message, _ in chunk_entries)
+                continue
+            for _, future in chunk_entries:
+                future.set_result(True)
+            delivered += len(chunk_entries)
+        with self._condition:
+            self.delivered_count += delivered
+            self.failed.extend(failed)
+
+    def _post(self, channel: str, text: str) -> None:
+        from slack_sdk.errors import SlackApiError
+
+        backoff = self.backoff_seconds
+        for attempt in range(self.max_retries + 1):
+            self._wait_for_rate_limit()
+            try:
+                self.client.chat_postMessage(channel=channel, text=text)
+                return
+            except SlackApiError as e:
+                status_code = getattr(e.response, "status_code", None)
+                retryable = status_code == 429 or (status_code is not None and status_code >= 500)
+                if not retryable or attempt == self.max_retries:
+                    raise
+                if status_code == 429:
+                    # Pause every post, not only this channel's, until the limit is lifted
+                    delay = _retry_after(e.response, default=backoff)
+                    with self._condition:
+                        self._paused_until = max(self._paused_until, time.monotonic() + delay)
+                    continue
+            except OSError:
+                if attempt == self.max_retries:
+                    raise
+            time.sleep(backoff)
+            backoff = min(backoff * 2, self.max_backoff_seconds)
+
+    def _wait_for_rate_limit(self) -> None:
+        with self._condition:
+            delay = self._paused_until - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+
+def _retry_after(response: Any, default: float) -> float:
+    headers = getattr(response, "headers", None) or {}
+    value = headers.get("Retry-After", headers.get("retry-after"))
+    try:
+        return float(value[0] if isinstance(value, list) else value)
+    except (TypeError, ValueError):
+        return default
@@ -1,30 +1,179 @@
-import pandas as pd
-import snowflake.connector
+from typing import TYPE_CHECKING, Any, Iterator, List, Optional, Sequence, Union
+from monitoring.metrics import RunMetrics, timed
+from monitoring.result_cache import ResultCache, TableKey
+from monitoring.utils import is_dataframe
+
+if TYPE_CHECKING:
+    import pandas as pd
+    import pyarrow as pa
+    import snowflake.connector
+
+DEFAULT_BATCH_SIZE = 10000
+
+
+def execute_query(cur: Any, query: str, params: Optional[Sequence[Any]] = None) -> None:
+    """
+    Execute a query on a cursor, binding `params` when given.
+
+    Args:
+        cur: DB-API cursor
+        query (str): SQL query, with `?` placeholders for the parameters
+        params (Sequence[Any], optional): Values bound to the placeholders
+    """
+    if params is None:
+        cur.execute(query)
+    else:
+        cur.execute(query, params)
+
+def _rows_to_arrow(rows: List[Sequence[Any]], columns: List[str]) -> "pa.Table":
+    import pyarrow as pa
+
+    return pa.table({column: [row[i] for row in rows] for i, column in enumerate(columns)})
+
+
+def fetch_arrow_table(cur: Any) -> "pa.Table":
+    """
+    Fetch all the results of an executed cursor as a pyarrow Table.
+
+    Snowflake and DuckDB cursors hand over their Arrow results without conversion; any other
+    DB-API cursor is read with `fetchall`.
+
+    Args:
+        cur: DB-API cursor on which a query was executed
+
+    Returns:
+        pa.Table: Query results
+    """
+    if hasattr(cur, "fetch_arrow_all"):
+        return cur.fetch_arrow_all(force_return_table=True)
+    if hasattr(cur, "to_arrow_table"):
+        return cur.to_arrow_table()
+    if hasattr(cur, "fetch_arrow_table"):
+        # DuckDB before 1.4
+        return cur.fetch_arrow_table()
+    return _rows_to_arrow(cur.fetchall(), [column[0] for column in cur.description or []])
+
+
+def fetch_arrow_batches(cur: Any, batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator["pa.RecordBatch"]:
+    """
+    Stream the results of an executed cursor as pyarrow RecordBatches.
+
+    Args:
+        cur: DB-API cursor on which a query was executed
+        batch_size (int): Rows per batch, for the cursors that do not choose the batch size
+            (Snowflake batches follow the result chunks sent by the warehouse)
+
+    Yields:
+        pa.RecordBatch: Batches of query results
+    """
+    if hasattr(cur, "fetch_arrow_batches"):
+        for table in cur.fetch_arrow_batches():
+            yield from table.to_batches()
+    elif hasattr(cur, "to_arrow_reader"):
+        yield from cur.to_arrow_reader(batch_size)
+    elif hasattr(cur, "fetch_record_batch"):
+        # DuckDB before 1.4
+        yield from cur.fetch_record_batch(batch_size)
+    else:
+        columns = [column[0] for column in cur.description or []]
+        while True:
+            rows = cur.fetchmany(batch_size)
+            if not rows:
+                break
+            yield from _rows_to_arrow(rows, columns).to_batches()
+
+
+def _fetch_frames(cur: Any, batch_size: int) -> Iterator["pd.DataFrame"]:
+    # DataFrame batches of an executed cursor
+    if hasattr(cur, "fetch_pandas_batches"):
+        yield from cur.fetch_pandas_batches()
+        return
+    import pandas as pd
+
+    columns = [column[0] for column in cur.description or []]
+    while True:
+        rows = cur.fetchmany(batch_size)
+        if not rows:
+            break
+        yield pd.DataFrame.from_records(rows, columns=columns)
+
+
+def _as_output(data: Union["pd.DataFrame", "pa.Table"], arrow: bool) -> Union["pd.DataFrame", "pa.Table"]:
+    # Convert cached results to the requested type
+    if arrow and is_dataframe(data):
+        import pyarrow as pa
+        return pa.Table.from_pandas(data, preserve_index=False)
+    if not arrow and not is_dataframe(data):
+        return data.to_pandas()
+    return data
+
 
 def read_snowflake_table(
-    conn: snowflake.connector.SnowflakeConnection,
-    query: str
-) -> pd.DataFrame:
+    conn: "snowflake.connector.SnowflakeConnection",
+    query: str,
+    params: Optional[Sequence[Any]] = None,
+    close_connection: bool = False,
+    cache: Optional[ResultCache] = None,
+    cache_tables: Optional[Sequence[TableKey]] = None,
+    arrow: bool = False,
+    metrics: Optional[RunMetrics] = None
+) -> Union["pd.DataFrame", "pa.Table"]:
     """
     Read data from a Snowflake table and return it as a pandas DataFrame.
+
+    Other DB-API connections (e.g. the local DuckDB backend) are read with `fetchall`.
     
     Args:
         query (str): Custom SQL query to execute
         conn (snowflake.connector.SnowflakeConnection): Snowflake connection object
+        params (Sequence[Any], optional): Values bound to the `?` placeholders of the query
+        close_connection (bool): Close the connection once the data is read. Defaults to False
+            so that the connection can be reused, e.g. when it comes from a ConnectionPool
+        cache (ResultCache, optional): Serve the results from this cache when possible, and cache them otherwise
+        cache_tables (Sequence[TableKey], optional): (database, schema, table_name) of the tables read
+            by the query. Their freshness is probed first, so that cached results of modified tables
+            are not served. Without tables, cached results are only invalidated by the TTL
+        arrow (bool): Return the results as a pyarrow Table, without converting them to pandas
+        metrics (RunMetrics, optional): Time the execute and fetch stages, and count the fetched
+            rows and bytes
     
     Returns:
-        pd.DataFrame: DataFrame containing the query results
+        pd.DataFrame | pa.Table: DataFrame (or Table) containing the query results
     
     Raises:
         Exception: If there's an error executing the query
     """
+    cur = None
     try:
+        freshness = None
+        if cache is not None:
+            freshness = cache.probe(conn, cache_tables) if cache_tables else None
+            df = cache.get(query, params, freshness=freshness)
+            if df is not None:
+                return _as_output(df, arrow)
+
         # Create cursor
         cur = conn.cursor()        
-        cur.execute(query)
+        with timed(metrics, "execute"):
+            execute_query(cur, query, params)
+        if metrics is not None:
+            metrics.record_query_id(cur)
         
         # Fetch results into DataFrame
-        df = cur.fetch_pandas_all()
+        with timed(metrics, "fetch"):
+            if arrow:
+                df = fetch_arrow_table(cur)
+            elif hasattr(cur, "fetch_pandas_all"):
+                df = cur.fetch_pandas_all()
+            else:
+                import pandas as pd
+                columns = [column[0] for column in cur.description or []]
+                df = pd.DataFrame.from_records(cur.fetchall(), columns=columns)
+        if metrics is not None:
+            metrics.count(df)
+
+        if cache is not None:
+            cache.put(query, params, df, freshness=freshness)
         
         return df
         
@@ -34,5 +183,59 @@ def read_snowflake_table(
     finally:
         if cur is not None:
             cur.close() 
-        if conn is not None:
+        if close_connection and conn is not None:
+            conn.close()
+
+
+def read_snowflake_batches(
+    conn: "snowflake.connector.SnowflakeConnection",
+    query: str,
+    params: Optional[Sequence[Any]] = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    close_connection: bool = False,
+    arrow: bool = False,
+    metrics: Optional[RunMetrics] = None
+) -> Iterator[Union["pd.DataFrame", "pa.RecordBatch"]]:
+    """
+    Stream the results of a query as a sequence of pandas DataFrames.
+
+    Snowflake cursors are read with `fetch_pandas_batches`, which downloads one result chunk
+    at a time; any other DB-API cursor is read with `fetchmany(batch_size)`. Only one batch
+    is held in memory at a time. The cursor is closed once the generator is exhausted or closed.
+
+    Args:
+        conn (snowflake.connector.SnowflakeConnection): Snowflake (or DB-API) connection object
+        query (str): Custom SQL query to execute
+        params (Sequence[Any], optional): Values bound to the `?` placeholders of the query
+        batch_size (int): Rows per batch for the `fetchmany` path. Snowflake batches follow
+            the result chunks sent by the warehouse
+        close_connection (bool): Close the connection once the data is read
+        arrow (bool): Yield pyarrow RecordBatches instead of DataFrames (see fetch_arrow_batches)
+        metrics (RunMetrics, optional): Time the execute stage and the fetching of every batch,
+            and count the fetched rows and bytes
+
+    Yields:
+        pd.DataFrame | pa.RecordBatch: Batches of query results
+
+    Raises:
+        Exception: If there's an error executing the query or fetching the results
+    """
+    cur = None
+    try:
+        cur = conn.cursor()
+        with timed(metrics, "execute"):
+            execute_query(cur, query, params)
+        if metrics is not None:
+            metrics.record_query_id(cur)
+
+        batches = fetch_arrow_batches(cur, batch_size) if arrow else _fetch_frames(cur, batch_size)
+        yield from (metrics.iterate(batches) if metrics is not None else batches)
+
+    except Exception as e:
+        raise Exception(f"Error reading from Snowflake: {str(e)}")
+
+    finally:
+        if cur is not None:
+            cur.close()
+        if close_connection and conn is not None:
             conn.close()
@@ -0,0 +1,227 @@
+import argparse
+from pathlib import Path
+from typing import Dict, Optional, Union
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from monitoring.landing_loader import landing_schema
+from monitoring.local_backend import LANDING_FILES, SEEDS_DIR
+
+# Columns of the seed invoices resampled together, so that their correlations are kept
+# (e.g. status and payment amount, currency and FX rate)
+INVOICE_TEMPLATE_COLUMNS = [
+    "TYPE",
+    "STATUS",
+    "CURRENCY",
+    "PAYMENT_CURRENCY",
+    "PAYMENT_METHOD",
+    "AMOUNT",
+    "PAYMENT_AMOUNT",
+    "FX_RATE",
+    "FX_RATE_PAYMENT",
+    "CREATED_AT",
+]
+
+# Shape of the Pareto distribution of invoices per organization. The seed sample is heavy
+# tailed: half of the organizations have a single invoice, the largest one has 443
+ORGANIZATION_ACTIVITY_SHAPE = 1.2
+
+# Standard deviation of the log-normal noise applied to the resampled amounts
+AMOUNT_NOISE = 0.1
+
+# Maximum shift of the resampled invoice dates, in days
+DATE_JITTER_DAYS = 30
+
+DEFAULT_CHUNK_SIZE = 1_000_000
+
+# Fixed schema of the invoices file, so that every chunk is written with the same types
+INVOICES_SCHEMA = landing_schema("invoices")
+
+
+def load_seed_profile(seeds_dir: Union[str, Path] = SEEDS_DIR) -> Dict[str, pd.DataFrame]:
+    """
+    Load the seed files the synthetic data is resampled from.
+
+    Args:
+        seeds_dir (str | Path): Directory with the landing CSV files
+
+    Returns:
+        Dict[str, pd.DataFrame]: "invoices" and "organizations" seed rows
+    """
+    seeds_dir = Path(seeds_dir)
+    invoices = pd.read_csv(
+        seeds_dir / f"{LANDING_FILES['invoices']}.csv",
+        usecols=["ORGANIZATION_ID", *INVOICE_TEMPLATE_COLUMNS],
+        dtype={"TYPE": "int64"},
+    )
+    invoices["CREATED_AT"] = pd.to_datetime(invoices["CREATED_AT"], utc=True)
+    organizations = pd.read_csv(
+        seeds_dir / f"{LANDING_FILES['organizations']}.csv",
+        parse_dates=["FIRST_PAYMENT_DATE", "LAST_PAYMENT_DATE", "CREATED_DATE"],
+    )
+    return {"invoices": invoices, "organizations": organizations}
+
+
+def _random_ids(rng: np.random.Generator, size: int) -> np.ndarray:
+    # Signed 64-bit identifiers, as in the seeds (about half of them are negative)
+    return rng.integers(np.iinfo(np.int64).min, np.iinfo(np.int64).max, size=size, dtype=np.int64)
+
+
+def generate_organizations(
+    profile: Dict[str, pd.DataFrame],
+    n_organizations: int,
+    rng: np.random.Generator
+) -> pd.DataFrame:
+    """
+    Generate landing organizations by resampling the seed organizations with new identifiers.
+
+    Args:
+        profile (Dict[str, pd.DataFrame]): Seed profile (see load_seed_profile)
+        n_organizations (int): Number of organizations
+        rng (np.random.Generator): Random generator
+
+    Returns:
+        pd.DataFrame: Organizations with the landing columns
+    """
+    seed = profile["organizations"]
+    organizations = seed.iloc[rng.integers(0, len(seed), size=n_organizations)].reset_index(drop=True)
+    organizations["ORGANIZATION_ID"] = _random_ids(rng, n_organizations)
+    return organizations
+
+
+def generate_invoices(
+    profile: Dict[str, pd.DataFrame],
+    organization_ids: np.ndarray,
+    n_invoices: int,
+    rng: np.random.Generator,
+    organization_weights: Optional[np.ndarray] = None
+) -> pd.DataFrame:
+    """
+    Generate landing invoices.
+
+    Every invoice resamples the categorical values, amounts, FX rates and date of a seed invoice
+    together, then gets new identifiers, log-normal noise on its amounts and a shifted date.
+    Invoices are spread over the organizations with heavy-tailed weights.
+
+    Args:
+        profile (Dict[str, pd.DataFrame]): Seed profile (see load_seed_profile)
+        organization_ids (np.ndarray): Identifiers of the organizations
+        n_invoices (int): Number of invoices
+        rng (np.random.Generator): Random generator
+        organization_weights (np.ndarray, optional): Probability of each organization. Defaults to
+            Pareto distributed weights
+
+    Returns:
+        pd.DataFrame: Invoices with the landing columns
+    """
+    if organization_weights is None:
+        organization_weights = organization_activity(len(organization_ids), rng)
+    seed = profile["invoices"][INVOICE_TEMPLATE_COLUMNS]
+    invoices = seed.iloc[rng.integers(0, len(seed), size=n_invoices)].reset_index(drop=True)
+
+    noise = np.exp(rng.normal(0.0, AMOUNT_NOISE, size=n_invoices))
+    invoices["AMOUNT"] = (invoices["AMOUNT"] * noise).round(2)
+    invoices["PAYMENT_AMOUNT"] = (invoices["PAYMENT_AMOUNT"] * noise).round(2)
+    jitter = rng.integers(-DATE_JITTER_DAYS * 86400, DATE_JITTER_DAYS * 86400, size=n_invoices)
+    created_at = invoices["CREATED_AT"] + pd.to_timedelta(jitter, unit="s")
+    invoices["CREATED_AT"] = created_at.clip(seed["CREATED_AT"].min(), seed["CREATED_AT"].max())
+
+    invoices.insert(0, "INVOICE_ID", _random_ids(rng, n_invoices))
+    invoices.insert(1, "PARENT_INVOICE_ID", _random_ids(rng, n_invoices))
+    invoices.insert(2, "TRANSACTION_ID", _random_ids(rng, n_invoices))
+    invoices.insert(3, "ORGANIZATION_ID", rng.choice(organization_ids, size=n_invoices, p=organization_weights))
+    return invoices
+
+
+def organization_activity(n_organizations: int, rng: np.random.Generator) -> np.ndarray:
+    """
+    Draw the share of invoices of every organization.
+
+    Args:
+        n_organizations (int): Number of organizations
+        rng (np.random.Generator): Random generator
+
+    Returns:
+        np.ndarray: Pareto distributed probabilities summing to 1
+    """
+    weights = rng.pareto(ORGANIZATION_ACTIVITY_SHAPE, size=n_organizations) + 1
+    return weights / weights.sum()
+
+
+def write_synthetic_landing(
+    output_dir: Union[str, Path],
+    n_invoices: int,
+    n_organizations: Optional[int] = None,
+    seed: int = 0,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    seeds_dir: Union[str, Path] = SEEDS_DIR
+) -> Dict[str, int]:
+    """
+    Write synthetic landing files, loadable with `create_duckdb_connector(seeds_dir=output_dir)`.
+
+    Invoices are generated and written chunk by chunk into one Parquet file, so memory use is
+    bounded by `chunk_size` whatever the number of rows.
+
+    Args:
+        output_dir (str | Path): Directory of the Parquet files
+        n_invoices (int): Number of invoices
+        n_organizations (int, optional): Number of organizations. Defaults to keeping the seed
+            ratio of invoices per invoicing organization
+        seed (int): Seed of the random generator, for reproducible data
+        chunk_size (int): Number of invoices generated at a time
+        seeds_dir (str | Path): Directory with the seed files to resample
+
+    Returns:
+        Dict[str, int]: Number of rows written per landing table
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    profile = load_seed_profile(seeds_dir)
+    if n_organizations is None:
+        ratio = len(profile["invoices"]) / profile["invoices"]["ORGANIZATION_ID"].nunique()
+        n_organizations = max(1, int(n_invoices / ratio))
+
+    organizations = generate_organizations(profile, n_organizations, rng)
+    organizations.to_parquet(output_dir / f"{LANDING_FILES['organizations']}.parquet", index=False)
+
+    organization_ids = organizations["ORGANIZATION_ID"].to_numpy()
+    weights = organization_activity(n_organizations, rng)
+    writer = None
+    try:
+        for start in range(0, n_invoices, chunk_size):
+            invoices = generate_invoices(
+                profile, organization_ids, min(chunk_size, n_invoices - start), rng, organization_weights=weights
+            )
+            table = pa.Table.from_pandas(invoices, schema=INVOICES_SCHEMA, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(output_dir / f"{LANDING_FILES['invoices']}.parquet", INVOICES_SCHEMA)
+            writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+
+    return {"invoices": n_invoices, "organizations": n_organizations}
+
+
+def main():
+    """
+    Generate synthetic landing files from the command line.
+    """
+    parser = argparse.ArgumentParser(description="Generate synthetic landing invoices and organizations")
+    parser.add_argument("output_dir", help="Directory of the Parquet files")
+    parser.add_argument("--invoices", type=int, default=1_000_000, help="Number of invoices")
+    parser.add_argument("--organizations", type=int, default=None, help="Number of organizations")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the random generator")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="Invoices generated at a time")
+    args = parser.parse_args()
+
+    row_counts = write_synthetic_landing(
+        args.output_dir, args.invoices, args.organizations, seed=args.seed, chunk_size=args.chunk_size
+    )
+    print(f"Wrote {row_counts['invoices']} invoices and {row_counts['organizations']} organizations to {args.output_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,33 +1,230 @@
-from typing import List, Dict, Any
+from typing import TYPE_CHECKING, List, Dict, Any, Iterable, Optional, Tuple, Union
+import heapq
+import itertools
 import os
+import sys
 
-def format_monitoring_results(results: List[Dict[str, Any]], table_name: str, target_column: str) -> str:
+if TYPE_CHECKING:
+    import pandas as pd
+    import pyarrow as pa
+    from monitoring.organization_dimension import OrganizationDimension
+
+# Columns displayed for every record by format_monitoring_results
+RESULT_COLUMNS = ("id", "value", "difference")
+
+# Monitoring results: records, or columnar data (pandas or Arrow)
+MonitoringResults = Union[List[Dict[str, Any]], "pd.DataFrame", "pa.Table", "pa.RecordBatch"]
+
+
+def is_dataframe(data: Any) -> bool:
+    """
+    Check whether data is a pandas DataFrame, without importing pandas.
+
+    pandas is only imported by the code paths that build DataFrames: if it was never imported,
+    `data` cannot be one.
+
+    Args:
+        data (Any): Object to check
+
+    Returns:
+        bool: True if data is a pandas DataFrame
+    """
+    pandas = sys.modules.get("pandas")
+    return pandas is not None and isinstance(data, pandas.DataFrame)
+
+
+def is_arrow(data: Any) -> bool:
+    """
+    Check whether data is a pyarrow Table or RecordBatch, without importing pyarrow.
+
+    Like pandas, pyarrow is only imported by the code paths that read or build Arrow data.
+
+    Args:
+        data (Any): Object to check
+
+    Returns:
+        bool: True if data is a pyarrow Table or RecordBatch
+    """
+    pyarrow = sys.modules.get("pyarrow")
+    return pyarrow is not None and isinstance(data, (pyarrow.Table, pyarrow.RecordBatch))
+
+
+def _lowercase_arrow(data: Union["pa.Table", "pa.RecordBatch"]) -> "pa.Table":
+    import pyarrow as pa
+
+    if isinstance(data, pa.RecordBatch):
+        data = pa.Table.from_batches([data])
+    return data.rename_columns([name.lower() for name in data.column_names])
+
+
+def _result_columns(results: MonitoringResults, top_k: int) -> List[List[Any]]:
+    # First top_k values of every displayed column, reading columnar results column by column
+    if is_arrow(results):
+        results = _lowercase_arrow(results).slice(0, top_k)
+        return [results.column(column).to_pylist() for column in RESULT_COLUMNS]
+    if is_dataframe(results):
+        results = results.rename(columns=str.lower).head(top_k)
+        return [results[column].tolist() for column in RESULT_COLUMNS]
+    return [[record[column] for record in results[:top_k]] for column in RESULT_COLUMNS]
+
+
+def format_monitoring_results(
+    results: MonitoringResults,
+    table_name: str,
+    target_column: str,
+    total_count: Optional[int] = None,
+    top_k: int = 5,
+    dimensions: Optional["OrganizationDimension"] = None
+) -> str:
     """
     Format monitoring results into a readable string.
     
     Args:
-        results (List[Dict[str, Any]]): List of monitoring results
+        results (MonitoringResults): Monitoring results sorted by difference: a list of records, or
+            columnar results (pandas DataFrame, pyarrow Table or RecordBatch) read without
+            converting them to records
         table_name (str): Name of the monitored table
         target_column (str): Name of the monitored column
+        total_count (int, optional): Total number of records exceeding the threshold, when
+            `results` only holds the top records. Defaults to len(results)
+        top_k (int): Number of records displayed
+        dimensions (OrganizationDimension, optional): Attributes of the organizations, displayed
+            under every record whose id is an organization id. Looked up once for all the records
     
     Returns:
         str: Formatted results string
     """
-    if not results:
+    if total_count is None:
+        total_count = results.num_rows if is_arrow(results) else len(results)
+    if not total_count:
         return f"No records found exceeding threshold in {table_name}.{target_column}"
     
     output = [f"Monitoring Results for {table_name}.{target_column}:"]
-    output.append(f"Found {len(results)} records exceeding threshold")
-    output.append("\nTop 5 records:")
+    output.append(f"Found {total_count} records exceeding threshold")
+    output.append(f"\nTop {top_k} records:")
     
-    for i, record in enumerate(results[:5], 1):
-        output.append(f"\n{i}. ID: {record['id']}")
-        output.append(f"   Value: {record['value']}")
-        output.append(f"   Difference: {record['difference']}")
+    record_ids, values, differences = _result_columns(results, top_k)
+    attributes = dimensions.lookup(record_ids) if dimensions is not None else [None] * len(record_ids)
+    for i, (record_id, value, difference, record_attributes) in enumerate(
+        zip(record_ids, values, differences, attributes), 1
+    ):
+        output.append(f"\n{i}. ID: {record_id}")
+        output.append(f"   Value: {value}")
+        output.append(f"   Difference: {difference}")
+        for name, attribute in (record_attributes or {}).items():
+            output.append(f"   {name.replace('_', ' ').capitalize()}: {attribute}")
     
     return "\n".join(output)
 
 
+class MonitoringSummary:
+    """
+    Running summary of monitoring results: total row count plus the top-k rows by difference.
+
+    Memory is bounded by `top_k` whatever the number of rows added, so result batches can be
+    consumed as they are streamed from the warehouse. When the rows carry a `total_count`
+    column (top-k pushdown queries), the count computed by the warehouse is used instead of
+    counting the rows received.
+    """
+
+    def __init__(self, top_k: int = 5, sort_column: str = "difference"):
+        """
+        Args:
+            top_k (int): Number of records to keep
+            sort_column (str): Column the records are ranked by, largest first
+        """
+        self.top_k = top_k
+        self.sort_column = sort_column
+        self.total_count = 0
+        self._heap: List[Tuple[Any, int, Dict[str, Any]]] = []
+        self._sequence = itertools.count()
+
+    def add(self, batch: Union["pd.DataFrame", "pa.Table", "pa.RecordBatch"]) -> None:
+        """
+        Add a batch of results. Column names are matched case-insensitively.
+
+        Arrow batches are ranked with Arrow compute kernels: only their top-k rows are
+        converted to Python records.
+
+        Args:
+            batch (pd.DataFrame | pa.Table | pa.RecordBatch): Batch of monitoring results
+        """
+        if is_arrow(batch):
+            self._add_arrow(batch)
+            return
+        if batch.empty:
+            return
+        batch = batch.rename(columns=str.lower)
+        if "total_count" in batch.columns:
+            self.total_count = max(self.total_count, int(batch["total_count"].max()))
+            batch = batch.drop(columns="total_count")
+        else:
+            self.total_count += len(batch)
+        if self.top_k <= 0:
+            return
+
+        # Only the batch's own top-k can make it into the overall top-k. Null values are never ranked
+        ranked = batch.dropna(subset=[self.sort_column])
+        self._push(ranked.nlargest(self.top_k, self.sort_column, keep="first").to_dict("records"))
+
+    def _add_arrow(self, batch: Union["pa.Table", "pa.RecordBatch"]) -> None:
+        import pyarrow.compute as pc
+
+        if batch.num_rows == 0:
+            return
+        batch = _lowercase_arrow(batch)
+        if "total_count" in batch.column_names:
+            self.total_count = max(self.total_count, int(pc.max(batch.column("total_count")).as_py()))
+            batch = batch.drop_columns(["total_count"])
+        else:
+            self.total_count += batch.num_rows
+        if self.top_k <= 0:
+            return
+
+        # Stable sort, so that ties keep their arrival order as with nlargest(keep="first")
+        indices = pc.sort_indices(batch, sort_keys=[(self.sort_column, "descending")])
+        candidates = batch.take(indices.slice(0, self.top_k)).to_pylist()
+        # Nulls and NaNs are sorted last and, as with nlargest, never ranked (NaN != NaN)
+        self._push([
+            record for record in candidates
+            if record[self.sort_column] is not None and record[self.sort_column] == record[self.sort_column]
+        ])
+
+    def _push(self, records: List[Dict[str, Any]]) -> None:
+        for record in records:
+            # Ties are broken by arrival order: earlier records rank higher
+            item = (record[self.sort_column], -next(self._sequence), record)
+            if len(self._heap) < self.top_k:
+                heapq.heappush(self._heap, item)
+            elif item[:2] > self._heap[0][:2]:
+                heapq.heapreplace(self._heap, item)
+
+    @property
+    def top_records(self) -> List[Dict[str, Any]]:
+        """Top records, sorted by `sort_column` in descending order."""
+        return [record for *_, record in sorted(self._heap, key=lambda item: item[:2], reverse=True)]
+
+
+def summarize_monitoring_results(
+    batches: Iterable[Union["pd.DataFrame", "pa.Table", "pa.RecordBatch"]],
+    top_k: int = 5
+) -> Tuple[int, List[Dict[str, Any]]]:
+    """
+    Consume a stream of result batches keeping only a running count and the top-k records.
+
+    Args:
+        batches (Iterable[pd.DataFrame | pa.Table | pa.RecordBatch]): Batches of monitoring results
+        top_k (int): Number of records to keep
+
+    Returns:
+        Tuple[int, List[Dict[str, Any]]]: Total number of records and the top-k records by difference
+    """
+    summary = MonitoringSummary(top_k=top_k)
+    for batch in batches:
+        summary.add(batch)
+    return summary.total_count, summary.top_records
+
+
 def get_connection_params() -> Dict[str, Any]:
     """
     Get Snowflake connection parameters from environment variables.
@@ -0,0 +1,198 @@
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Optional, Union
+
+# File suffixes handled by SqliteWatermarkStore in create_watermark_store, other paths are JSON files
+SQLITE_SUFFIXES = (".db", ".sqlite", ".sqlite3")
+
+
+def watermark_key(
+    table_name: str,
+    target_column: str,
+    threshold: float,
+    database: str,
+    schema: str,
+    mode: str = "threshold",
+    window: Optional[int] = None
+) -> str:
+    """
+    Build the key under which the watermark of a monitoring rule is stored.
+
+    Args:
+        table_name (str): Name of the monitored table
+        target_column (str): Name of the monitored column
+        threshold (float): Threshold of the rule
+        database (str): Name of the database
+        schema (str): Name of the schema
+        mode (str): Detection mode of the rule (see monitoring.monitoring_rule.MODES)
+        window (int, optional): Window of the rolling modes
+
+    Returns:
+        str: Key such as `db.schema.table.column > 50.0`, or `db.schema.table.column zscore(30) > 3.0`
+            for the rolling modes, with case-insensitive identifiers lowercased
+    """
+    column = f"{database}.{schema}.{table_name}.{target_column}".lower()
+    if mode != "threshold":
+        column += f" {mode}({window})"
+    return column + f" > {float(threshold)}"
+
+
+def format_watermark(value: Any) -> Optional[str]:
+    """
+    Convert a date value returned by the warehouse into the string stored as watermark.
+
+    Args:
+        value (Any): Date, datetime, pandas Timestamp, string or null value
+
+    Returns:
+        str | None: ISO formatted value, or None for null values (including NaT)
+    """
+    if value is None or value != value:  # NaN and NaT are not equal to themselves
+        return None
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return str(value)
+
+
+class WatermarkStore:
+    """
+    Persisted map of rule key to the latest date already evaluated by the rule.
+
+    Subclasses implement `get` and `set`; any object with these two methods can be passed
+    to `run_monitoring` as a watermark store.
+    """
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Get the watermark of a rule.
+
+        Args:
+            key (str): Rule key (see watermark_key)
+
+        Returns:
+            str | None: The stored watermark, or None if the rule has never run
+        """
+        raise NotImplementedError
+
+    def set(self, key: str, value: str) -> None:
+        """
+        Atomically store the watermark of a rule.
+
+        Args:
+            key (str): Rule key (see watermark_key)
+            value (str): New watermark
+        """
+        raise NotImplementedError
+
+
+class JsonWatermarkStore(WatermarkStore):
+    """
+    Watermarks kept in a JSON file.
+
+    Updates write a temporary file in the same directory and rename it over the store with
+    `os.replace`, so readers never see a partially written file. Concurrent writers are
+    serialized within the process only: use SqliteWatermarkStore to share a store between processes.
+
+    Args:
+        path (str | Path): Path of the JSON file, created on the first update
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+
+    def _read(self) -> Dict[str, str]:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            return self._read().get(key)
+
+    def set(self, key: str, value: str) -> None:
+        with self._lock:
+            watermarks = self._read()
+            watermarks[key] = value
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.path.parent, prefix=f".{self.path.name}.", suffix=".tmp")
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    json.dump(watermarks, f, indent=2, sort_keys=True)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, self.path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+
+
+class SqliteWatermarkStore(WatermarkStore):
+    """
+    Watermarks kept in a SQLite table, safe to share between processes.
+
+    Args:
+        path (str | Path): Path of the SQLite database, created if missing
+        timeout (float): Seconds to wait for a lock held by another writer
+    """
+
+    def __init__(self, path: Union[str, Path], timeout: float = 30):
+        self.path = Path(path)
+        self.timeout = timeout
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute(
+                    "create table if not exists watermarks ("
+                    "rule_key text primary key, watermark text not null, updated_at text not null)"
+                )
+        finally:
+            conn.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=self.timeout)
+
+    def get(self, key: str) -> Optional[str]:
+        conn = self._connect()
+        try:
+            row = conn.execute("select watermark from watermarks where rule_key = ?", (key,)).fetchone()
+        finally:
+            conn.close()
+        return row[0] if row else None
+
+    def set(self, key: str, value: str) -> None:
+        conn = self._connect()
+        try:
+            # The connection context manager commits the upsert, or rolls it back on error
+            with conn:
+                conn.execute(
+                    "insert into watermarks (rule_key, watermark, updated_at) values (?, ?, ?) "
+                    "on conflict (rule_key) do update set "
+                    "watermark = excluded.watermark, updated_at = excluded.updated_at",
+                    (key, value, datetime.now().isoformat()),
+                )
+        finally:
+            conn.close()
+
+
+def create_watermark_store(path: Union[str, Path]) -> WatermarkStore:
+    """
+    Create a watermark store, picking the implementation from the file suffix.
+
+    Args:
+        path (str | Path): `.db`, `.sqlite` or `.sqlite3` for SQLite, any other suffix for JSON
+
+    Returns:
+        WatermarkStore: The store
+    """
+    if Path(path).suffix.lower() in SQLITE_SUFFIXES:
+        return SqliteWatermarkStore(path)
+    return JsonWatermarkStore(path)
@@ -0,0 +1,6 @@
+import sys
+from pathlib import Path
+
+# Add the Airflow DAGs folder to Python path, as Airflow does when it parses the DAGs
+dags_folder = str(Path(__file__).parent.parent.parent / "airflow" / "dags")
+sys.path.insert(0, dags_folder)
@@ -0,0 +1,49 @@
+import importlib
+import json
+import sys
+import pytest
+
+pytest.importorskip("airflow.models")
+
+def load_dag(monkeypatch, tmp_path, manifest=None):
+    if manifest is not None:
+        manifest_path = tmp_path / 'manifest.json'
+        manifest_path.write_text(json.dumps(manifest))
+    monkeypatch.setenv('DBT_PROJECT_DIR', str(tmp_path))
+    monkeypatch.setenv('DBT_MANIFEST_PATH', str(tmp_path / 'manifest.json'))
+    sys.modules.pop('dbt_dag', None)
+    return importlib.import_module('dbt_dag').dag
+
+def test_dag_from_manifest(monkeypatch, tmp_path):
+    """Test that the DAG has one pooled task per model, wired by the refs."""
+    def model(name, depends_on=(), meta=None):
+        return {
+            'resource_type': 'model',
+            'name': name,
+            'depends_on': {'nodes': [f'model.deel_takehome.{parent}' for parent in depends_on]},
+            'config': {'enabled': True, 'meta': meta or {}},
+        }
+    manifest = {'nodes': {
+        'model.deel_takehome.stg__invoices': model('stg__invoices'),
+        'model.deel_takehome.fct__organizations_balance': model(
+            'fct__organizations_balance', ['stg__invoices'], meta={'airflow_pool_slots': 2}
+        ),
+    }}
+
+    dag = load_dag(monkeypatch, tmp_path, manifest)
+
+    assert set(dag.task_ids) == {
+        'dbt_deps', 'select_models', 'stg__invoices', 'fct__organizations_balance', 'save_state'
+    }
+    fct_task = dag.get_task('fct__organizations_balance')
+    assert fct_task.upstream_task_ids == {'stg__invoices'}
+    assert fct_task.pool == 'dbt'
+    assert fct_task.pool_slots == 2
+    assert dag.get_task('stg__invoices').upstream_task_ids == {'select_models'}
+    assert dag.get_task('save_state').upstream_task_ids == {'stg__invoices', 'fct__organizations_balance'}
+
+def test_dag_without_manifest(monkeypatch, tmp_path):
+    """Test that the whole project is built in one task when there is no manifest."""
+    dag = load_dag(monkeypatch, tmp_path)
+
+    assert set(dag.task_ids) == {'dbt_deps', 'dbt_build'}
@@ -0,0 +1,165 @@
+import json
+import pytest
+import dbt_manifest
+from dbt_manifest import (
+    AIRFLOW_TARGET_DIR, FULL, RESULT_ERROR, STATE_MODIFIED, DbtModel, dbt_command, failed_models, load_models,
+    merge_run_results, model_build_args, modified_models, save_state, select_models, topological_order,
+    with_descendants,
+)
+
+STG_INVOICES = 'model.deel_takehome.stg__invoices'
+STG_ORGANIZATIONS = 'model.deel_takehome.stg__organizations'
+DIM_ORGANIZATIONS = 'model.deel_takehome.dim__organizations'
+FCT_BALANCE = 'model.deel_takehome.fct__organizations_balance'
+
+def model_node(name, depends_on=(), checksum='a', meta=None):
+    return {
+        'resource_type': 'model',
+        'name': name,
+        'depends_on': {'nodes': ['source.deel_takehome.landing.raw', *depends_on]},
+        'checksum': {'name': 'sha256', 'checksum': checksum},
+        'config': {'enabled': True, 'materialized': 'table', 'meta': meta or {}},
+    }
+
+def data_test_node(depends_on, attached_node=None, checksum='t'):
+    return {
+        'resource_type': 'test',
+        'depends_on': {'nodes': list(depends_on)},
+        'attached_node': attached_node,
+        'checksum': {'name': 'none', 'checksum': checksum},
+        'config': {'enabled': True},
+    }
+
+@pytest.fixture
+def manifest():
+    return {
+        'nodes': {
+            FCT_BALANCE: model_node('fct__organizations_balance', [STG_INVOICES], meta={'airflow_pool_slots': 2}),
+            DIM_ORGANIZATIONS: model_node('dim__organizations', [STG_ORGANIZATIONS]),
+            STG_INVOICES: model_node('stg__invoices'),
+            STG_ORGANIZATIONS: model_node('stg__organizations'),
+            'test.deel_takehome.not_null_stg__invoices_id': data_test_node([STG_INVOICES], STG_INVOICES),
+            'test.deel_takehome.unique_fct__organizations_balance': data_test_node([FCT_BALANCE], FCT_BALANCE),
+            'test.deel_takehome.relationships_dim_fct': data_test_node([FCT_BALANCE, STG_INVOICES]),
+            'seed.deel_takehome.organizations': {'resource_type': 'seed', 'name': 'organizations'},
+            'model.deel_takehome.disabled': {**model_node('disabled'), 'config': {'enabled': False}},
+        }
+    }
+
+def test_load_models(manifest):
+    """Test that the models are loaded upstream first with their tests and pool slots."""
+    models = load_models(manifest)
+
+    assert list(models) == [STG_ORGANIZATIONS, DIM_ORGANIZATIONS, STG_INVOICES, FCT_BALANCE]
+    assert models[DIM_ORGANIZATIONS].upstream == [STG_ORGANIZATIONS]
+    assert models[STG_INVOICES].upstream == []
+    assert models[STG_INVOICES].tests == ['test.deel_takehome.not_null_stg__invoices_id']
+    assert models[FCT_BALANCE].tests == [
+        'test.deel_takehome.relationships_dim_fct',
+        'test.deel_takehome.unique_fct__organizations_balance',
+    ]
+    assert models[FCT_BALANCE].pool_slots == 2
+    assert models[STG_INVOICES].pool_slots == 1
+
+def test_topological_order_cycle():
+    """Test that a cycle in the refs is reported."""
+    models = {
+        'a': DbtModel(unique_id='a', name='a', upstream=['b']),
+        'b': DbtModel(unique_id='b', name='b', upstream=['a']),
+    }
+
+    with pytest.raises(ValueError, match="Cycle in the dbt models"):
+        topological_order(models)
+
+def test_with_descendants(manifest):
+    """Test that the selection includes every downstream model."""
+    models = load_models(manifest)
+
+    assert with_descendants(models, [STG_INVOICES]) == {STG_INVOICES, FCT_BALANCE}
+    assert with_descendants(models, [FCT_BALANCE, 'model.deel_takehome.unknown']) == {FCT_BALANCE}
+
+def test_modified_models(manifest):
+    """Test that changed, new and re-configured models, and models with changed tests, are modified."""
+    models = load_models(manifest)
+    state_manifest = json.loads(json.dumps(manifest))
+
+    assert modified_models(manifest, state_manifest, models) == set()
+
+    manifest['nodes'][STG_INVOICES]['checksum']['checksum'] = 'b'
+    assert modified_models(manifest, state_manifest, models) == {STG_INVOICES, FCT_BALANCE}
+
+    state_manifest['nodes'][STG_INVOICES]['checksum']['checksum'] = 'b'
+    manifest['nodes'][DIM_ORGANIZATIONS]['config']['materialized'] = 'view'
+    assert modified_models(manifest, state_manifest, models) == {DIM_ORGANIZATIONS}
+
+    del state_manifest['nodes']['test.deel_takehome.unique_fct__organizations_balance']
+    del state_manifest['nodes'][STG_ORGANIZATIONS]
+    assert modified_models(manifest, state_manifest, models) == {STG_ORGANIZATIONS, DIM_ORGANIZATIONS, FCT_BALANCE}
+
+def test_failed_models(manifest):
+    """Test that errored models and models with failed tests are selected with their descendants."""
+    models = load_models(manifest)
+    run_results = {'results': [
+        {'unique_id': STG_ORGANIZATIONS, 'status': 'success'},
+        {'unique_id': STG_INVOICES, 'status': 'success'},
+        {'unique_id': 'test.deel_takehome.not_null_stg__invoices_id', 'status': 'fail'},
+        {'unique_id': DIM_ORGANIZATIONS, 'status': 'skipped'},
+    ]}
+
+    assert failed_models(run_results, models) == {STG_INVOICES, FCT_BALANCE}
+
+    run_results['results'][0]['status'] = 'error'
+    assert failed_models(run_results, models) == {STG_INVOICES, FCT_BALANCE, STG_ORGANIZATIONS, DIM_ORGANIZATIONS}
+
+def test_select_models(manifest, tmp_path):
+    """Test that every selection mode reads its state, and selects all the models without state."""
+    models = load_models(manifest)
+
+    assert select_models(models, FULL) == set(models)
+    assert select_models(models, STATE_MODIFIED, manifest=manifest, state_dir=tmp_path) == set(models)
+    assert select_models(models, RESULT_ERROR, state_dir=tmp_path) == set(models)
+
+    (tmp_path / 'manifest.json').write_text(json.dumps(manifest))
+    (tmp_path / 'run_results.json').write_text(json.dumps({'results': [{'unique_id': FCT_BALANCE, 'status': 'error'}]}))
+    assert select_models(models, STATE_MODIFIED, manifest=manifest, state_dir=tmp_path) == set()
+    assert select_models(models, RESULT_ERROR, state_dir=tmp_path) == {FCT_BALANCE}
+
+    with pytest.raises(ValueError, match="Unsupported selection mode: state:new"):
+        select_models(models, 'state:new')
+
+def test_model_build_args(manifest):
+    """Test that every model is built with its tests in its own target directory."""
+    model = load_models(manifest)[FCT_BALANCE]
+    command = dbt_command(model_build_args(model), '/opt/dbt', '/opt/dbt', 'postgres')
+
+    assert command == (
+        "cd /opt/dbt && dbt build --select fct__organizations_balance --indirect-selection buildable "
+        "--target-path target/airflow/fct__organizations_balance "
+        "--log-path target/airflow/fct__organizations_balance/logs "
+        "--project-dir /opt/dbt --profiles-dir /opt/dbt --target postgres"
+    )
+
+def test_save_state(manifest, tmp_path):
+    """Test that the per-model run results are merged and the manifest is only saved on success."""
+    project_dir = tmp_path / 'project'
+    for name, unique_id in [('stg__invoices', STG_INVOICES), ('fct__organizations_balance', FCT_BALANCE)]:
+        artifacts_dir = project_dir / AIRFLOW_TARGET_DIR / name
+        artifacts_dir.mkdir(parents=True)
+        (artifacts_dir / 'run_results.json').write_text(
+            json.dumps({'results': [{'unique_id': unique_id, 'status': 'success'}]})
+        )
+    manifest_path = tmp_path / 'manifest.json'
+    manifest_path.write_text(json.dumps(manifest))
+    state_dir = tmp_path / 'state'
+
+    run_results = save_state(project_dir, state_dir, manifest_path, save_manifest=False)
+
+    assert [result['unique_id'] for result in run_results['results']] == [FCT_BALANCE, STG_INVOICES]
+    assert json.loads((state_dir / 'run_results.json').read_text()) == run_results
+    assert not (state_dir / 'manifest.json').exists()
+
+    save_state(project_dir, state_dir, manifest_path)
+    assert json.loads((state_dir / 'manifest.json').read_text()) == manifest
+
+    dbt_manifest.clear_artifacts(project_dir)
+    assert merge_run_results(project_dir / AIRFLOW_TARGET_DIR) == {'results': []}
@@ -0,0 +1,79 @@
+import time
+import pandas as pd
+import pytest
+from monitoring.alert_state import AlertStateStore, hash_breaches
+
+@pytest.fixture
+def breaches():
+    return pd.DataFrame({
+        'ID': ['1', '2', '3'],
+        'VALUE': [200.0, 180.0, 150.0],
+        'BREACH_DATE': ['2024-03-01', '2024-03-01', '2024-03-02'],
+        'DIFFERENCE': [100.0, 80.0, 50.0]
+    })
+
+@pytest.fixture
+def store(tmp_path):
+    return AlertStateStore(tmp_path / 'alerts.db')
+
+def test_hash_breaches(breaches):
+    """Test that hashes depend on the rule, id and date only"""
+    hashes = hash_breaches('rule_a', breaches)
+    moved = breaches.assign(VALUE=0.0, DIFFERENCE=0.0)
+
+    assert len(set(hashes)) == 3
+    assert (hash_breaches('rule_a', moved) == hashes).all()
+    assert not set(hash_breaches('rule_b', breaches)) & set(hashes)
+
+def test_filter_new_drops_alerted_breaches(store, breaches):
+    """Test that recorded breaches are not reported again, for the same rule only"""
+    assert store.filter_new('rule_a', breaches).equals(breaches)
+
+    store.record('rule_a', breaches.iloc[:2])
+
+    assert store.filter_new('rule_a', breaches)['ID'].tolist() == ['3']
+    assert len(store.filter_new('rule_b', breaches)) == 3
+
+def test_filter_new_keeps_escalated_breaches(tmp_path, breaches):
+    """Test that breaches whose difference grew beyond the escalation ratio are reported again"""
+    store = AlertStateStore(tmp_path / 'alerts.db', escalation_ratio=0.5)
+    store.record('rule_a', breaches)
+
+    grown = breaches.assign(DIFFERENCE=[160.0, 120.0, 50.0])
+
+    assert store.filter_new('rule_a', grown)['ID'].tolist() == ['1']
+
+def test_entries_expire(tmp_path, breaches):
+    """Test that breaches can be alerted again once their entry expired"""
+    store = AlertStateStore(tmp_path / 'alerts.db', ttl_seconds=0.1)
+    store.record('rule_a', breaches)
+    assert store.filter_new('rule_a', breaches).empty
+
+    time.sleep(0.2)
+
+    assert len(store.filter_new('rule_a', breaches)) == 3
+    assert store.evict_expired() == 3
+
+def test_filter_new_many_breaches(store):
+    """Test lookups of more breaches than fit in one statement"""
+    many = pd.DataFrame({
+        'id': range(2000),
+        'breach_date': '2024-03-01',
+        'difference': 1.0
+    })
+    store.record('rule_a', many.iloc[::2])
+
+    assert store.filter_new('rule_a', many)['id'].tolist() == list(range(1, 2000, 2))
+
+def test_staged_breaches_recorded_on_commit(store, breaches):
+    """Test that staged breaches are only recorded as alerted once committed"""
+    store.stage('run_1', 'rule_a', breaches.iloc[:1])
+    store.stage('run_1', 'rule_a', breaches.iloc[1:2])
+    store.stage('run_2', 'rule_a', breaches.iloc[2:])
+    assert len(store.filter_new('rule_a', breaches)) == 3
+
+    assert store.commit_staged('run_1') == 2
+    store.discard_staged('run_2')
+
+    assert store.filter_new('rule_a', breaches)['ID'].tolist() == ['3']
+    assert store.commit_staged('run_2') == 0
@@ -0,0 +1,123 @@
+import numpy as np
+import pandas as pd
+import pytest
+from monitoring.anomaly_detection import (
+    ANOMALY_COLUMNS,
+    _nanpercentile_rows,
+    detect_rolling_percentile,
+    detect_rolling_zscore,
+    rolling_window_stats,
+)
+
+@pytest.fixture
+def balances():
+    """Two organizations: a stable one with a spike, and a volatile one without any"""
+    dates = pd.date_range("2024-01-01", periods=8, freq="D")
+    return pd.DataFrame({
+        "organization_id": [1] * 8 + [2] * 8,
+        "balance_date": list(dates) * 2,
+        "balance_change_percentage": [1.0, 2.0, 1.0, 2.0, 1.0, 2.0, 40.0, 1.5]
+                                     + [-50.0, 60.0, -40.0, 55.0, -45.0, 50.0, -60.0, 65.0],
+    }).sample(frac=1.0, random_state=0)  # The detection sorts the records itself
+
+def test_rolling_window_stats_matches_pandas():
+    """Test the vectorized statistics against a per-group pandas rolling window"""
+    rng = np.random.default_rng(0)
+    ids = np.sort(rng.integers(0, 50, size=2000))
+    values = rng.normal(size=2000)
+    values[rng.random(2000) < 0.1] = np.nan
+    position_in_group = pd.Series(ids).groupby(ids).cumcount().to_numpy()
+
+    mean, std, count = rolling_window_stats(values, position_in_group, window=5)
+
+    previous = pd.Series(values).groupby(ids).shift(1)
+    rolling = previous.groupby(ids).rolling(5, min_periods=1)
+    np.testing.assert_allclose(mean, rolling.mean().to_numpy(), equal_nan=True)
+    np.testing.assert_allclose(std, rolling.std().to_numpy(), equal_nan=True)
+    np.testing.assert_array_equal(count, rolling.count().to_numpy())
+
+def test_detect_rolling_zscore_flags_spikes_relative_to_each_organization(balances):
+    """Test that the spike of the stable organization is flagged, not the volatile organization"""
+    result = detect_rolling_zscore(
+        balances, "organization_id", "balance_date", "balance_change_percentage", threshold=3.0, window=5
+    )
+
+    assert list(result.columns) == ANOMALY_COLUMNS
+    assert result["id"].tolist() == [1]
+    assert result["breach_date"].tolist() == [pd.Timestamp("2024-01-07")]
+    previous = np.array([2.0, 1.0, 2.0, 1.0, 2.0])
+    expected_zscore = (40.0 - previous.mean()) / previous.std(ddof=1)
+    assert result["zscore"].iloc[0] == pytest.approx(expected_zscore)
+    assert result["difference"].iloc[0] == pytest.approx(expected_zscore - 3.0)
+
+def test_detect_rolling_zscore_min_periods_and_start_date(balances):
+    """Test that records without enough history or before the start date are not reported"""
+    kwargs = dict(id_column="organization_id", date_column="balance_date", target_column="balance_change_percentage")
+
+    assert detect_rolling_zscore(balances, **kwargs, threshold=3.0, window=5, min_periods=7).empty
+    assert detect_rolling_zscore(balances, **kwargs, threshold=3.0, window=5, start_date="2024-01-08").empty
+    with pytest.raises(ValueError):
+        detect_rolling_zscore(balances, **kwargs, threshold=3.0, window=0)
+
+def test_nanpercentile_rows_matches_numpy():
+    """Test the vectorized percentile against np.nanpercentile"""
+    rng = np.random.default_rng(1)
+    windows = rng.normal(size=(500, 10))
+    windows[rng.random((500, 10)) < 0.3] = np.nan
+    windows[0] = np.nan
+
+    result = _nanpercentile_rows(windows, 90, min_periods=1)
+
+    scored = ~np.isnan(windows).all(axis=1)
+    np.testing.assert_allclose(result[scored], np.nanpercentile(windows[scored], 90, axis=1))
+    assert np.isnan(result[0])
+
+def test_detect_rolling_percentile(balances):
+    """Test that records above the rolling percentile of their organization are flagged"""
+    result = detect_rolling_percentile(
+        balances, "organization_id", "balance_date", "balance_change_percentage",
+        percentile=100, window=5, min_periods=5, chunk_size=3
+    )
+
+    # Above the maximum of the previous 5 days: the spike, and the volatile organization's last record
+    assert sorted(zip(result["id"], result["breach_date"])) == [
+        (1, pd.Timestamp("2024-01-07")), (2, pd.Timestamp("2024-01-08"))
+    ]
+    assert result["difference"].is_monotonic_decreasing
+
+def test_zscore_matches_warehouse_query():
+    """Test that the vectorized detection gives the same breaches as ROLLING_ZSCORE_QUERY"""
+    pytest.importorskip("duckdb")
+    pytest.importorskip("jinja2")
+    from monitoring.local_backend import DEFAULT_DATABASE, create_duckdb_connector
+    from monitoring.query_builder import build_rolling_zscore_query
+
+    conn = create_duckdb_connector()
+    try:
+        table = f"{DEFAULT_DATABASE}.ehernani_fact_tables.fct__organizations_balance"
+        balances = conn.execute(f"select * from {table}").df()
+        query, params = build_rolling_zscore_query(
+            table_name="fct__organizations_balance",
+            target_column="balance_change_percentage",
+            id_column="organization_id",
+            date_column="balance_date",
+            threshold=3.0,
+            start_date="2020-01-01",
+            database=DEFAULT_DATABASE,
+            schema="ehernani_fact_tables",
+            window=10,
+            min_periods=3,
+        )
+        expected = conn.execute(query, params).df()
+    finally:
+        conn.close()
+
+    result = detect_rolling_zscore(
+        balances, "organization_id", "balance_date", "balance_change_percentage",
+        threshold=3.0, window=10, min_periods=3, start_date="2020-01-01"
+    )
+
+    assert len(expected) > 0
+    merged = expected.merge(result, on=["id", "breach_date"], suffixes=("_sql", "_numpy"))
+    assert len(merged) == len(expected) == len(result)
+    np.testing.assert_allclose(merged["zscore_sql"], merged["zscore_numpy"])
@@ -0,0 +1,92 @@
+import numpy as np
+import pandas as pd
+import pytest
+from monitoring.balance_engine import (
+    BALANCE_COLUMNS,
+    compute_organizations_balance,
+    read_invoices_csv,
+    stage_invoices,
+)
+from monitoring.local_backend import SEEDS_DIR
+
+@pytest.fixture
+def staged_invoices():
+    return pd.DataFrame({
+        'invoice_id': [1, 2, 3, 4, 5, 6, 7],
+        'organization_id': [10, 10, 10, 10, 20, 20, 20],
+        'invoice_status': ['paid', 'paid', 'pending', 'refunded', 'paid', 'paid', 'paid'],
+        'payment_amount': [100.0, 50.0, 30.0, 20.0, None, 10.0, 40.0],
+        'payment_fx_rate': [1.0, 2.0, 1.0, 1.0, 1.0, 1.0, 1.0],
+        'invoice_fx_rate': [1.0, 1.0, 1.0, 0.5, 1.0, 1.0, 1.0],
+        'created_at_utc': pd.to_datetime([
+            '2024-01-01 10:00', '2024-01-01 18:00', '2024-01-03 09:00', '2024-01-05 12:00',
+            '2024-01-01 08:00', '2024-01-02 08:00', '2024-01-04 08:00',
+        ]),
+    })
+
+def test_compute_organizations_balance(staged_invoices):
+    """Test daily aggregates, running balance and balance change on a small example"""
+    balance = compute_organizations_balance(staged_invoices)
+
+    assert list(balance.columns) == BALANCE_COLUMNS
+    org_10 = balance[balance['organization_id'] == 10].reset_index(drop=True)
+    assert org_10['balance_date'].dt.strftime('%Y-%m-%d').tolist() == ['2024-01-01', '2024-01-03', '2024-01-05']
+    assert org_10['daily_balance_change_usd'].tolist() == [200.0, 0.0, -10.0]
+    assert org_10['daily_invoices_count'].tolist() == [2, 1, 1]
+    assert org_10['daily_invoices_paid_count'].tolist() == [2, 0, 0]
+    assert org_10['daily_invoices_refunded_count'].tolist() == [0, 0, 1]
+    assert org_10['balance_usd'].tolist() == [200.0, 200.0, 190.0]
+    assert org_10['days_since_last_balance_change'].tolist() == [pd.NA, 2, 2]
+    assert np.isnan(org_10.loc[0, 'balance_change_percentage'])
+    assert org_10.loc[2, 'balance_change_percentage'] == pytest.approx(-5.0)
+
+def test_compute_organizations_balance_null_semantics(staged_invoices):
+    """Test that null payment amounts behave as in SQL"""
+    balance = compute_organizations_balance(staged_invoices)
+    org_20 = balance[balance['organization_id'] == 20].reset_index(drop=True)
+
+    # A day with only null changes has a null change and a null running balance
+    assert np.isnan(org_20.loc[0, 'daily_balance_change_usd'])
+    assert np.isnan(org_20.loc[0, 'balance_usd'])
+    # The running sum ignores the null day afterwards
+    assert org_20['balance_usd'].tolist()[1:] == [10.0, 50.0]
+    assert np.isnan(org_20.loc[1, 'balance_change_percentage'])
+    assert org_20.loc[2, 'balance_change_percentage'] == pytest.approx(400.0)
+
+def test_stage_invoices():
+    """Test that the staging mirrors stg__invoices"""
+    raw = read_invoices_csv(SEEDS_DIR / 'invoices_sample.csv')
+
+    staged = stage_invoices(raw)
+
+    assert len(staged) == len(raw)
+    assert (staged['invoice_id'] >= 0).all()
+    assert (staged['organization_id'] >= 0).all()
+    assert staged['created_at_utc'].dt.tz is None
+    assert set(staged['invoice_status'].unique()) <= {
+        'awaiting_payment', 'pending', 'skipped', 'refunded', 'paid', 'cancelled',
+        'credited', 'open', 'failed', 'processing', 'unpayable'
+    }
+
+def test_parity_with_sql_model():
+    """Test that the engine computes the same fact table as the dbt model"""
+    pytest.importorskip("duckdb")
+    pytest.importorskip("jinja2")
+    from monitoring.local_backend import create_duckdb_connector
+
+    conn = create_duckdb_connector()
+    expected = conn.execute(
+        "select * from deel_takehome_dev.ehernani_fact_tables.fct__organizations_balance"
+        " order by organization_id, balance_date"
+    ).df()
+    conn.close()
+
+    actual = compute_organizations_balance(stage_invoices(read_invoices_csv(SEEDS_DIR / 'invoices_sample.csv')))
+
+    assert len(actual) == len(expected)
+    for column in ['balance_date', 'previous_balance_date']:
+        expected[column] = pd.to_datetime(expected[column]).astype('datetime64[ns]')
+    for column in ['organization_id', 'daily_invoices_count', 'daily_invoices_paid_count', 'daily_invoices_refunded_count']:
+        expected[column] = expected[column].astype('int64')
+    expected['days_since_last_balance_change'] = expected['days_since_last_balance_change'].astype('Int64')
+    pd.testing.assert_frame_equal(actual, expected[BALANCE_COLUMNS], check_exact=False, rtol=1e-9)
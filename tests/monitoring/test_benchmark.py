@@ -0,0 +1,109 @@
+import json
+import subprocess
+import sys
+import pytest
+from monitoring.benchmark import (
+    PROJECT_DIR,
+    baseline_path,
+    compare_to_baseline,
+    load_baseline,
+    parse_import_time,
+    run_benchmarks,
+    save_baseline,
+    time_function,
+    time_import,
+)
+
+IMPORTTIME_OUTPUT = """import time: self [us] | cumulative | imported package
+import time:       310 |        310 |   monitoring.monitoring_rule
+import time:      1200 |     195000 | monitoring.cli
+import time:        90 |         90 | monitoring.cli.extra
+"""
+
+def test_time_function_runs_setup_before_every_round():
+    """Test the timing statistics and that the setup is run once per round"""
+    calls = []
+
+    timing = time_function(lambda: calls.append("run"), repeat=3, setup=lambda: calls.append("setup"))
+
+    assert calls == ["setup", "run"] * 3
+    assert timing["rounds"] == 3
+    assert 0 <= timing["min"] <= timing["median"]
+
+def test_parse_import_time():
+    """Test that the cumulative import time of the module is read from the importtime output"""
+    assert parse_import_time(IMPORTTIME_OUTPUT, "monitoring.cli") == 0.195
+    with pytest.raises(ValueError, match="monitoring.utils not found"):
+        parse_import_time(IMPORTTIME_OUTPUT, "monitoring.utils")
+
+def test_time_import():
+    """Test that the import of a module is timed in fresh interpreters"""
+    timing = time_import("monitoring.monitoring_rule", repeat=2)
+
+    assert timing["rounds"] == 2
+    assert 0 < timing["min"] <= timing["median"]
+
+@pytest.mark.parametrize("module", ["monitoring", "monitoring.cli", "monitoring.run_monitoring"])
+def test_heavy_dependencies_are_imported_lazily(module):
+    """Test that importing the entry points does not import pandas, pyarrow, numpy, the Snowflake connector or slack_sdk"""
+    heavy_modules = ["pandas", "pyarrow", "numpy", "snowflake.connector", "slack_sdk"]
+    completed = subprocess.run(
+        [sys.executable, "-c", f"import sys, {module}; print([m for m in {heavy_modules!r} if m in sys.modules])"],
+        capture_output=True, text=True, check=True, cwd=PROJECT_DIR,
+    )
+
+    assert completed.stdout.strip() == "[]"
+
+def test_compare_to_baseline():
+    """Test that only the benchmarks slower than the tolerance are reported"""
+    baseline = {"fast": {"min": 1.0, "median": 1.0}, "slow": {"min": 1.0, "median": 1.0}}
+    results = {
+        "fast": {"min": 1.4, "median": 3.0},
+        "slow": {"min": 2.5, "median": 2.5},
+        "new": {"min": 9.0, "median": 9.0},
+    }
+
+    regressions = compare_to_baseline(results, baseline, tolerance=1.5)
+
+    assert regressions == ["slow: 2.5000s vs 1.0000s baseline (2.50x)"]
+
+def test_save_and_load_baseline(tmp_path):
+    """Test the baseline file round trip"""
+    path = tmp_path / "baseline.json"
+    results = {"read_arrow": {"min": 0.1, "median": 0.2, "rounds": 5}}
+
+    save_baseline(results, 1000, path)
+
+    baseline = load_baseline(path)
+    assert baseline["rows"] == 1000
+    assert baseline["results"] == results
+    assert json.loads(path.read_text())["environment"]["python"]
+
+def test_baseline_path():
+    """Test that every Python minor version and architecture has its own baseline"""
+    path = baseline_path("3.11.7", "x86_64", directory="benchmarks")
+
+    assert path.as_posix() == "benchmarks/baseline-py3.11-x86_64.json"
+    assert baseline_path("3.11.2", "X86_64", directory="benchmarks") == path
+    assert baseline_path("3.12.0", "arm64", directory="benchmarks").name == "baseline-py3.12-arm64.json"
+
+def test_run_benchmarks_on_small_data():
+    """Test that every benchmark runs end to end on a small synthetic dataset"""
+    pytest.importorskip("duckdb")
+    pytest.importorskip("jinja2")
+
+    results = run_benchmarks(n_invoices=2000, repeat=1)
+
+    assert {
+        "import_cli",
+        "import_run_monitoring",
+        "build_query_cold",
+        "build_query_cached",
+        "read_arrow",
+        "read_pandas",
+        "summarize_and_format",
+        "slack_delivery",
+        "run_monitoring_pushdown",
+        "run_monitoring",
+    } <= set(results)
+    assert all(timing["min"] >= 0 for timing in results.values())
@@ -0,0 +1,140 @@
+import pytest
+from unittest.mock import patch
+from monitoring.cli import main
+from monitoring.local_backend import DEFAULT_DATABASE
+from monitoring.run_batch_monitoring import run_batch_monitoring
+
+CONFIG = f"""
+[monitoring]
+backend = "duckdb"
+max_workers = 2
+
+[defaults]
+database = "{DEFAULT_DATABASE}"
+schema = "ehernani_fact_tables"
+start_date = "2024-01-01"
+table_name = "fct__organizations_balance"
+target_column = "balance_change_percentage"
+id_column = "organization_id"
+date_column = "balance_date"
+
+[[rules]]
+name = "large changes"
+threshold = 50.0
+
+[[rules]]
+name = "very large changes"
+threshold = 100.0
+
+[[rules]]
+name = "volatile balances"
+threshold = 3.0
+mode = "zscore"
+"""
+
+@pytest.fixture
+def config_path(tmp_path):
+    """Fixture with a configuration of three rules on the local backend."""
+    path = tmp_path / 'monitoring.toml'
+    path.write_text(CONFIG)
+    return path
+
+def test_validate(config_path, capsys):
+    """Test that a valid configuration is reported with its number of rules"""
+    assert main(['validate', str(config_path)]) == 0
+    assert 'valid (3 rules)' in capsys.readouterr().out
+
+def test_validate_invalid_config(tmp_path, capsys):
+    """Test that the errors of an invalid configuration are printed with a failing exit status"""
+    path = tmp_path / 'monitoring.toml'
+    path.write_text('[[rules]]\ntable_name = "balances"\n')
+
+    assert main(['validate', str(path)]) == 1
+    error = capsys.readouterr().err
+    assert 'Invalid monitoring configuration:' in error
+    assert 'rules[0]: missing field threshold' in error
+
+def test_run_local_backend(config_path, capsys):
+    """Test that the rules run on the local backend, the threshold rules of the table as one batch"""
+    pytest.importorskip('duckdb')
+    pytest.importorskip('jinja2')
+
+    with patch('monitoring.run_concurrent_monitoring.run_batch_monitoring',
+               wraps=run_batch_monitoring) as mock_batch:
+        assert main(['run', str(config_path)]) == 0
+
+    assert [rule.name for rule in mock_batch.call_args[0][0]] == ['large changes', 'very large changes']
+    output = capsys.readouterr().out
+    assert '[success] large changes' in output
+    assert '[success] volatile balances' in output
+    assert 'Monitoring Results for fct__organizations_balance.balance_change_percentage:' in output
+
+def test_run_enriched_with_organizations(config_path, capsys, monkeypatch):
+    """Test that the alerts are enriched with dim__organizations, loaded once for all the rules"""
+    pytest.importorskip('duckdb')
+    pytest.importorskip('jinja2')
+    from monitoring.organization_dimension import shared_dimension_lookup
+    monkeypatch.setattr('monitoring.organization_dimension._SHARED_LOOKUPS', {})
+    config_path.write_text(CONFIG.replace('max_workers = 2', 'max_workers = 2\nenrich_organizations = true'))
+
+    assert main(['run', str(config_path)]) == 0
+
+    output = capsys.readouterr().out
+    assert '   Contract portfolio size: ' in output
+    assert '   Days since last payment: ' in output
+    assert shared_dimension_lookup().loads == 1
+
+def test_run_with_alert_store(config_path, tmp_path, capsys):
+    """Test that a second run with an alert store does not report the breaches alerted on again"""
+    pytest.importorskip('duckdb')
+    pytest.importorskip('jinja2')
+    alert_store = (tmp_path / 'alerts.db').as_posix()
+    config_path.write_text(CONFIG.replace('max_workers = 2', f'max_workers = 2\nbatch = false\nalert_store = "{alert_store}"'))
+
+    assert main(['run', str(config_path), '--rule', 'large changes']) == 0
+    assert 'Found ' in capsys.readouterr().out
+    assert main(['run', str(config_path), '--rule', 'large changes']) == 0
+    assert 'No records found exceeding threshold' in capsys.readouterr().out
+
+def test_run_with_result_cache(config_path, tmp_path, capsys):
+    """Test that the local backend caches the results without probing the Snowflake information schema"""
+    pytest.importorskip('duckdb')
+    pytest.importorskip('jinja2')
+    cache_dir = tmp_path / 'cache'
+    config_path.write_text(CONFIG.replace(
+        'max_workers = 2', f'max_workers = 2\nresult_cache_ttl = 600\nresult_cache_dir = "{cache_dir.as_posix()}"'
+    ))
+
+    assert main(['run', str(config_path), '--rule', 'volatile balances']) == 0
+    first = capsys.readouterr().out
+    [cached] = cache_dir.glob('*.parquet')
+    cached_at = cached.stat().st_mtime_ns
+    assert main(['run', str(config_path), '--rule', 'volatile balances']) == 0
+
+    # Served from the Parquet tier, which a miss would have rewritten
+    assert cached.stat().st_mtime_ns == cached_at
+    assert '[success] volatile balances' in first
+    assert capsys.readouterr().out.split('\n', 1)[1] == first.split('\n', 1)[1]
+
+def test_run_selected_rules(config_path):
+    """Test that --rule only runs the given rules"""
+    with patch('monitoring.cli.run_concurrent_monitoring', return_value={}) as mock_run, \
+         patch('monitoring.cli.create_connector'):
+        assert main(['run', str(config_path), '--rule', 'volatile balances']) == 0
+
+    assert [rule.name for rule in mock_run.call_args[0][0]] == ['volatile balances']
+    assert mock_run.call_args[1]['batch'] is True
+
+def test_run_unknown_rule(config_path, capsys):
+    """Test that an unknown rule name fails without running anything"""
+    with patch('monitoring.cli.run_concurrent_monitoring') as mock_run, \
+         patch('monitoring.cli.create_connector'):
+        assert main(['run', str(config_path), '--rule', 'missing rule']) == 1
+
+    mock_run.assert_not_called()
+    assert 'Unknown monitoring rules: missing rule' in capsys.readouterr().err
+
+def test_daemon_requires_schedules(config_path, capsys):
+    """Test that the daemon refuses rules without a schedule"""
+    assert main(['daemon', str(config_path)]) == 1
+    assert 'Monitoring rules without a schedule: large changes' in capsys.readouterr().err
@@ -0,0 +1,168 @@
+import pytest
+from monitoring.config import ExecutorConfig, load_config, parse_config, parse_interval
+
+RULE = {
+    'table_name': 'fct__organizations_balance',
+    'target_column': 'balance_change_percentage',
+    'id_column': 'organization_id',
+    'date_column': 'balance_date',
+    'threshold': 50.0,
+}
+
+DEFAULTS = {'start_date': '2024-01-01', 'database': 'test_db', 'schema': 'test_schema'}
+
+TOML_CONFIG = """
+[monitoring]
+backend = "duckdb"
+max_workers = 2
+slack_channel = "#alerts"
+
+[defaults]
+database = "test_db"
+schema = "test_schema"
+start_date = "2024-01-01"
+
+[[rules]]
+table_name = "fct__organizations_balance"
+target_column = "balance_change_percentage"
+id_column = "organization_id"
+date_column = "balance_date"
+threshold = 50.0
+schedule = "15m"
+
+[[rules]]
+name = "volatile balances"
+table_name = "fct__organizations_balance"
+target_column = "balance_change_percentage"
+id_column = "organization_id"
+date_column = "balance_date"
+threshold = 3.0
+mode = "zscore"
+window = 14
+slack_channel = "#finance-alerts"
+"""
+
+@pytest.mark.parametrize('value, seconds', [
+    (90, 90.0),
+    ('30s', 30.0),
+    ('15m', 900.0),
+    ('1.5h', 5400.0),
+    ('1d', 86400.0),
+])
+def test_parse_interval(value, seconds):
+    """Test that intervals are parsed to seconds"""
+    assert parse_interval(value) == seconds
+
+@pytest.mark.parametrize('value', ['', '15 minutes', '-5m', '0'])
+def test_parse_interval_invalid(value):
+    """Test that invalid intervals are rejected"""
+    with pytest.raises(ValueError, match='Invalid interval'):
+        parse_interval(value)
+
+def test_defaults_apply_to_every_rule():
+    """Test that the defaults are merged into the rules that do not override them"""
+    config = parse_config({
+        'defaults': DEFAULTS,
+        'rules': [RULE, {**RULE, 'threshold': 80.0, 'database': 'other_db'}],
+    })
+
+    assert config.executor == ExecutorConfig()
+    assert [rule.database for rule in config.rules] == ['test_db', 'other_db']
+    assert all(rule.start_date == '2024-01-01' for rule in config.rules)
+    assert config.rules[1].name == 'fct__organizations_balance.balance_change_percentage > 80.0'
+
+def test_all_errors_are_reported_at_once():
+    """Test that every error of the configuration is listed in a single exception"""
+    with pytest.raises(ValueError) as exc_info:
+        parse_config({
+            'monitoring': {
+                'backend': 'oracle', 'max_workers': 0, 'watermark_store': 'watermarks.json', 'alert_store': 'alerts.db',
+            },
+            'defaults': DEFAULTS,
+            'rules': [
+                {**RULE, 'threshold': 'high', 'colour': 'red'},
+                {**RULE, 'table_name': 'balances; drop table x', 'mode': 'median', 'schedule': 'hourly'},
+                {key: value for key, value in RULE.items() if key != 'id_column'},
+            ],
+        })
+
+    message = str(exc_info.value)
+    assert message.startswith('Invalid monitoring configuration:')
+    for error in [
+        'monitoring: backend must be one of snowflake, duckdb',
+        'monitoring: max_workers must be a positive integer',
+        'monitoring: batch cannot be combined with watermark_store',
+        'monitoring: batch cannot be combined with alert_store',
+        'rules[0]: unknown field colour',
+        'rules[0]: threshold must be a number',
+        'rules[1]: Invalid SQL identifier',
+        'rules[1]: mode must be one of threshold, zscore',
+        "rules[1]: Invalid interval: 'hourly'",
+        'rules[2]: missing field id_column',
+    ]:
+        assert error in message
+
+@pytest.mark.parametrize('options, message', [
+    ({'jitter': 1.5}, 'jitter must be a number between 0 and 1'),
+    ({'health_port': 70000}, 'health_port must be a port number'),
+    ({'shutdown_timeout': 0}, 'shutdown_timeout must be a positive number'),
+    ({'timeout': 'soon'}, 'timeout must be a positive number'),
+    ({'result_cache_ttl': -1}, 'result_cache_ttl must be a positive number'),
+    ({'result_cache_dir': '.monitoring_cache'}, 'result_cache_dir requires result_cache_ttl'),
+])
+def test_invalid_daemon_options(options, message):
+    """Test the validation of the daemon options of the [monitoring] section"""
+    with pytest.raises(ValueError, match=message):
+        parse_config({'monitoring': options, 'defaults': DEFAULTS, 'rules': [RULE]})
+
+def test_duplicated_rule_names_are_rejected():
+    """Test that two rules with the same name are rejected"""
+    with pytest.raises(ValueError, match='duplicated rule names'):
+        parse_config({'defaults': DEFAULTS, 'rules': [RULE, RULE]})
+
+def test_rules_are_required():
+    """Test that a configuration without rules is rejected"""
+    with pytest.raises(ValueError, match='at least one rule is required'):
+        parse_config({'monitoring': {'backend': 'duckdb'}})
+
+def test_load_toml_config(tmp_path):
+    """Test that a TOML configuration is loaded and validated"""
+    path = tmp_path / 'monitoring.toml'
+    path.write_text(TOML_CONFIG)
+
+    config = load_config(path)
+
+    assert config.executor.backend == 'duckdb'
+    assert config.executor.max_workers == 2
+    assert config.executor.slack_channel == '#alerts'
+    assert config.rules[0].schedule == '15m'
+    assert config.rules[1].name == 'volatile balances'
+    assert config.rules[1].mode == 'zscore'
+    assert config.rules[1].window == 14
+    assert config.rules[1].slack_channel == '#finance-alerts'
+
+def test_load_yaml_config(tmp_path):
+    """Test that a YAML configuration is loaded like its TOML equivalent"""
+    yaml = pytest.importorskip('yaml')
+    toml_path = tmp_path / 'monitoring.toml'
+    toml_path.write_text(TOML_CONFIG)
+    yaml_path = tmp_path / 'monitoring.yaml'
+    yaml_path.write_text(yaml.safe_dump({
+        'monitoring': {'backend': 'duckdb', 'max_workers': 2, 'slack_channel': '#alerts'},
+        'defaults': DEFAULTS,
+        'rules': [
+            {**RULE, 'schedule': '15m'},
+            {**RULE, 'name': 'volatile balances', 'threshold': 3.0, 'mode': 'zscore', 'window': 14,
+             'slack_channel': '#finance-alerts'},
+        ],
+    }))
+
+    assert load_config(yaml_path) == load_config(toml_path)
+
+def test_load_unsupported_file_type(tmp_path):
+    """Test that unknown file types are rejected"""
+    path = tmp_path / 'monitoring.json'
+    path.write_text('{}')
+
+    with pytest.raises(ValueError, match='Unsupported configuration file type: .json'):
+        load_config(path)
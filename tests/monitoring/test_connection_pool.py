@@ -0,0 +1,153 @@
+import sqlite3
+import threading
+import pytest
+from unittest.mock import MagicMock
+from monitoring.connection_pool import ConnectionPool, checkout_connection, ping_connection
+
+@pytest.fixture
+def sqlite_connect():
+    """Fixture with a SQLite connection factory counting the connections opened."""
+    opened = []
+
+    def connect():
+        conn = sqlite3.connect(":memory:", check_same_thread=False)
+        opened.append(conn)
+        return conn
+
+    connect.opened = opened
+    return connect
+
+def test_connection_is_reused(sqlite_connect):
+    """Test that a released connection is handed out again instead of opening a new one."""
+    pool = ConnectionPool(connect=sqlite_connect, max_size=2)
+
+    with pool.connection() as conn:
+        conn.execute("create table t (x integer)")
+    with pool.connection() as conn:
+        # Same session, so the table created above is still there
+        assert conn.execute("select count(*) from t").fetchone() == (0,)
+
+    assert len(sqlite_connect.opened) == 1
+    assert pool.open_count == 1
+    assert pool.idle_count == 1
+
+def test_pool_is_bounded(sqlite_connect):
+    """Test that checkouts beyond max_size wait and eventually time out."""
+    pool = ConnectionPool(connect=sqlite_connect, max_size=1, checkout_timeout=0.05)
+
+    conn = pool.acquire()
+    with pytest.raises(TimeoutError):
+        pool.acquire()
+
+    pool.release(conn)
+    assert pool.acquire() is conn
+
+def test_waiting_checkout_gets_released_connection(sqlite_connect):
+    """Test that a blocked checkout is woken up when a connection is released."""
+    pool = ConnectionPool(connect=sqlite_connect, max_size=1, checkout_timeout=5)
+    conn = pool.acquire()
+    acquired = []
+
+    waiter = threading.Thread(target=lambda: acquired.append(pool.acquire()))
+    waiter.start()
+    pool.release(conn)
+    waiter.join(timeout=5)
+
+    assert acquired == [conn]
+    assert len(sqlite_connect.opened) == 1
+
+def test_idle_connections_are_evicted(sqlite_connect):
+    """Test that connections idle for longer than max_idle_seconds are closed."""
+    pool = ConnectionPool(connect=sqlite_connect, max_idle_seconds=0)
+
+    with pool.connection():
+        pass
+
+    assert pool.evict_idle() == 1
+    assert pool.open_count == 0
+    with pytest.raises(sqlite3.ProgrammingError):
+        sqlite_connect.opened[0].execute("select 1")
+
+def test_idle_connections_are_closed_outside_the_lock():
+    """Test that checkouts do not wait for the closing of the evicted connections."""
+    pool = ConnectionPool(connect=MagicMock, max_size=2, max_idle_seconds=0, health_check=None)
+    lock_free_while_closing = []
+    def close():
+        # Another thread tries to take the pool lock while the connection is closed
+        def try_lock():
+            acquired = pool._condition.acquire(blocking=False)
+            if acquired:
+                pool._condition.release()
+            lock_free_while_closing.append(acquired)
+        thread = threading.Thread(target=try_lock)
+        thread.start()
+        thread.join()
+
+    with pool.connection() as conn:
+        conn.close.side_effect = close
+    with pool.connection() as new_conn:
+        assert new_conn is not conn
+
+    assert lock_free_while_closing == [True]
+    assert pool.open_count == 1
+
+def test_unhealthy_connection_is_replaced(sqlite_connect):
+    """Test that idle connections failing the health check are dropped on checkout."""
+    pool = ConnectionPool(connect=sqlite_connect, health_check_interval=0)
+
+    with pool.connection() as conn:
+        pass
+    conn.close()
+
+    with pool.connection() as new_conn:
+        assert new_conn is not conn
+        assert new_conn.execute("select 1").fetchone() == (1,)
+    assert pool.open_count == 1
+
+def test_connection_failure_frees_slot():
+    """Test that a failing connection factory does not leak pool capacity."""
+    pool = ConnectionPool(connect=MagicMock(side_effect=Exception("Connection failed")), max_size=1)
+
+    for _ in range(2):
+        with pytest.raises(Exception) as exc_info:
+            pool.acquire()
+        assert "Connection failed" in str(exc_info.value)
+    assert pool.open_count == 0
+
+def test_close_pool(sqlite_connect):
+    """Test that closing the pool closes idle connections and refuses new checkouts."""
+    pool = ConnectionPool(connect=sqlite_connect)
+    with pool.connection():
+        pass
+
+    pool.close()
+
+    assert pool.open_count == 0
+    with pytest.raises(RuntimeError):
+        pool.acquire()
+
+def test_ping_connection(sqlite_connect):
+    """Test the default health check."""
+    conn = sqlite_connect()
+    assert ping_connection(conn) is True
+    conn.close()
+    assert ping_connection(conn) is False
+
+def test_checkout_connection_without_pool():
+    """Test that one-off connections are closed on exit."""
+    mock_conn = MagicMock()
+
+    with checkout_connection(None, lambda: mock_conn) as conn:
+        assert conn is mock_conn
+
+    mock_conn.close.assert_called_once()
+
+def test_checkout_connection_with_pool(sqlite_connect):
+    """Test that pooled connections are kept open on exit."""
+    pool = ConnectionPool(connect=sqlite_connect)
+
+    with checkout_connection(pool, lambda: pytest.fail("should not connect")) as conn:
+        pass
+
+    assert conn.execute("select 1").fetchone() == (1,)
+    assert pool.idle_count == 1
@@ -28,8 +28,8 @@ def test_create_snowflake_connector_with_params(mock_snowflake_connector, valid_
     """Test creating a connection with explicit parameters."""
     conn = create_snowflake_connector(connection_params=valid_connection_params)
     
-    # Verify the connection was created with correct parameters
-    mock_snowflake_connector.assert_called_once_with(**valid_connection_params)
+    # Verify the connection was created with correct parameters, binding values with `?` placeholders
+    mock_snowflake_connector.assert_called_once_with(paramstyle="qmark", **valid_connection_params)
     assert conn == mock_snowflake_connector.return_value
 
 def test_create_snowflake_connector_missing_required_params():
@@ -0,0 +1,137 @@
+from datetime import date
+from unittest.mock import Mock
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pytest
+from monitoring.current_balance import (
+    CURRENT_BALANCE_SCHEMA, BalanceIndex, CurrentBalance, CurrentBalanceLookup, main, read_current_balances,
+)
+from monitoring.local_backend import DEFAULT_DATABASE, build_dbt_models, create_duckdb_connector
+
+CURRENT_BALANCES = pa.table({
+    "organization_id": pa.array([30, 10, 20, None], pa.int64()),
+    "balance_date": pa.array([date(2024, 3, 1), date(2024, 1, 15), date(2023, 12, 31), date(2024, 1, 1)]),
+    "balance_usd": pa.array([150.5, None, -20.0, 1.0]),
+})
+
+def test_balance_index_get():
+    """Test that point lookups return the current balance, or None for unknown organizations."""
+    index = BalanceIndex.from_arrow(CURRENT_BALANCES)
+
+    assert len(index) == 3
+    assert 30 in index and 40 not in index
+    assert index.get(30) == CurrentBalance(organization_id=30, balance_date=date(2024, 3, 1), balance_usd=150.5)
+    assert index.get(10) == CurrentBalance(organization_id=10, balance_date=date(2024, 1, 15), balance_usd=None)
+    assert index.get(40) is None
+    assert index.nbytes < 1000
+
+def test_balance_index_get_many():
+    """Test that bulk lookups keep the order of the ids, with missing values for unknown organizations."""
+    index = BalanceIndex.from_arrow(CURRENT_BALANCES)
+
+    balances = index.get_many(iter([20, 40, 30, 20]))
+
+    expected = pd.DataFrame({
+        "organization_id": np.array([20, 40, 30, 20], dtype=np.int64),
+        "balance_date": pd.to_datetime(["2023-12-31", None, "2024-03-01", "2023-12-31"]).values.astype("datetime64[s]"),
+        "balance_usd": [-20.0, np.nan, 150.5, -20.0],
+    })
+    pd.testing.assert_frame_equal(balances, expected, check_dtype=False)
+    assert index.get_many(np.array([], dtype=np.int64)).empty
+
+def test_empty_balance_index():
+    """Test that lookups on an empty index find nothing instead of failing."""
+    index = BalanceIndex.from_arrow(CURRENT_BALANCES.slice(0, 0))
+
+    balances = index.get_many([10, 20])
+
+    assert len(index) == 0
+    assert index.get(10) is None
+    assert balances["organization_id"].tolist() == [10, 20]
+    assert balances["balance_date"].isna().all() and balances["balance_usd"].isna().all()
+
+def test_balance_index_rejects_duplicates():
+    """Test that duplicated organization ids are rejected."""
+    with pytest.raises(ValueError, match="Duplicated organization ids"):
+        BalanceIndex([1, 1], ["2024-01-01", "2024-01-02"], [1.0, 2.0])
+    with pytest.raises(ValueError, match="same length"):
+        BalanceIndex([1, 2], ["2024-01-01"], [1.0, 2.0])
+
+def test_lookup_refreshes_when_stale(monkeypatch):
+    """Test that the index is loaded on first use, kept while fresh and reloaded once stale."""
+    now = [0.0]
+    tables = [CURRENT_BALANCES, CURRENT_BALANCES.slice(0, 1)]
+    reads = []
+    def fake_read(conn, database, schema, table_name):
+        reads.append((database, schema, table_name))
+        return tables[len(reads) - 1]
+    monkeypatch.setattr("monitoring.current_balance.read_current_balances", fake_read)
+    conn = Mock()
+    lookup = CurrentBalanceLookup(connect=lambda: conn, max_age=60, clock=lambda: now[0])
+
+    assert lookup.get(20).balance_usd == -20.0
+    now[0] = 59
+    assert lookup.get(20).balance_usd == -20.0
+    assert len(reads) == 1
+    now[0] = 60
+    assert lookup.get(20) is None
+    assert reads == [(DEFAULT_DATABASE, CURRENT_BALANCE_SCHEMA, "fct__organizations_current_balance")] * 2
+    assert conn.close.call_count == 2
+
+def test_current_balance_model_on_local_backend():
+    """Test that the model has the latest balance row of every organization, through the lookup."""
+    pytest.importorskip("duckdb")
+    pytest.importorskip("jinja2")
+    conn = create_duckdb_connector()
+    latest = conn.execute(f"""
+        select organization_id, balance_date, balance_usd
+        from {DEFAULT_DATABASE}.ehernani_fact_tables.fct__organizations_balance
+        qualify row_number() over (partition by organization_id order by balance_date desc) = 1
+        order by organization_id
+    """).df()
+
+    table = read_current_balances(conn.cursor())
+    balances = CurrentBalanceLookup(connect=conn.cursor).get_many(latest["organization_id"])
+
+    assert table.num_rows == len(latest) > 0
+    np.testing.assert_array_equal(balances["balance_date"].values, latest["balance_date"].values.astype("datetime64[D]"))
+    np.testing.assert_allclose(balances["balance_usd"], latest["balance_usd"])
+
+def test_incremental_current_balance_matches_full_refresh():
+    """Test that incremental runs of the current balances give the same rows as a full refresh."""
+    pytest.importorskip("duckdb")
+    pytest.importorskip("jinja2")
+    conn = create_duckdb_connector(models_dir=None)
+    invoices = f"{DEFAULT_DATABASE}.ehernani_landing.invoices"
+    current = f"{DEFAULT_DATABASE}.ehernani_fact_tables.fct__organizations_current_balance"
+    conn.execute(f"create temp table all_invoices as select * from {invoices}")
+    cutoffs = ["2023-06-01 12:00:00+00", "2024-01-10 06:30:00+00", None]
+    models = ["fct__organizations_balance", "fct__organizations_current_balance"]
+
+    conn.execute(f"delete from {invoices} where created_at >= ?", [cutoffs[0]])
+    build_dbt_models(conn)
+    for start, end in zip(cutoffs, cutoffs[1:]):
+        new_rows = "select * from all_invoices where created_at >= ?" + (" and created_at < ?" if end else "")
+        conn.execute(f"insert into {invoices} {new_rows}", [start, end] if end else [start])
+        build_dbt_models(conn, select=models)
+
+    order_by = " order by organization_id"
+    incremental = conn.execute(f"select * from {current}{order_by}").df()
+    build_dbt_models(conn, select=models, full_refresh=True)
+    full_refresh = conn.execute(f"select * from {current}{order_by}").df()
+
+    assert incremental["organization_id"].is_unique
+    pd.testing.assert_frame_equal(incremental, full_refresh, check_exact=False, rtol=1e-9)
+
+def test_main(monkeypatch, capsys):
+    """Test that the command line prints the balances of the given organizations."""
+    monkeypatch.setattr("monitoring.current_balance.read_current_balances", lambda *args: CURRENT_BALANCES)
+    monkeypatch.setattr("monitoring.backends.create_connector", lambda *args: Mock())
+
+    main(["30", "40"])
+
+    output = capsys.readouterr().out.splitlines()
+    assert output[0].split() == ["organization_id", "balance_date", "balance_usd"]
+    assert output[1].split() == ["30", "2024-03-01", "150.5"]
+    assert output[2].split() == ["40", "NaT", "NaN"]
@@ -0,0 +1,216 @@
+import json
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+from contextlib import contextmanager
+from unittest.mock import Mock, patch
+import pytest
+from monitoring.config import ExecutorConfig, MonitoringConfig
+from monitoring.daemon import MonitoringDaemon, RuleSchedule, serve_health
+from monitoring.monitoring_rule import MonitoringRule
+
+def make_rule(table_name, schedule='0.05s'):
+    return MonitoringRule(
+        table_name=table_name,
+        target_column='amount',
+        id_column='id',
+        date_column='date',
+        threshold=100.0,
+        start_date='2024-01-01',
+        database='test_db',
+        schema='test_schema',
+        schedule=schedule,
+    )
+
+def make_config(rules, **executor_options):
+    return MonitoringConfig(rules=rules, executor=ExecutorConfig(**{'jitter': 0.0, **executor_options}))
+
+@contextmanager
+def fake_resources(executor, rules, slack_token=None):
+    yield Mock(), None
+
+def fake_run_monitoring_rule(delays=None, errors=(), calls=None):
+    """run_monitoring_rule replacement sleeping for the delay of each table."""
+    def run(rule, **kwargs):
+        if calls is not None:
+            calls.append((rule.table_name, time.monotonic()))
+        time.sleep((delays or {}).get(rule.table_name, 0))
+        if rule.table_name in errors:
+            raise Exception(f"{rule.table_name} failed")
+        return 'ok'
+    return run
+
+@contextmanager
+def running_daemon(daemon):
+    """Run the daemon in a background thread, stopping it on exit."""
+    thread = threading.Thread(target=daemon.run, daemon=True)
+    with patch('monitoring.daemon.executor_resources', fake_resources):
+        thread.start()
+        try:
+            yield daemon
+        finally:
+            daemon.stop()
+            thread.join(timeout=5)
+    assert not thread.is_alive()
+
+def test_rules_run_on_their_schedule():
+    """Test that every rule runs about once per interval"""
+    rules = [make_rule('fast_table', schedule='0.05s'), make_rule('slow_table', schedule='0.2s')]
+    calls = []
+
+    with patch('monitoring.daemon.run_monitoring_rule', side_effect=fake_run_monitoring_rule(calls=calls)):
+        with running_daemon(MonitoringDaemon(make_config(rules))):
+            time.sleep(0.45)
+
+    fast_runs = [at for table, at in calls if table == 'fast_table']
+    slow_runs = [at for table, at in calls if table == 'slow_table']
+    assert 7 <= len(fast_runs) <= 11
+    assert 2 <= len(slow_runs) <= 3
+    assert all(0.03 < later - earlier < 0.08 for earlier, later in zip(fast_runs, fast_runs[1:]))
+
+def test_max_concurrency():
+    """Test that no more than max_workers rules run at the same time"""
+    rules = [make_rule(f'table_{i}') for i in range(4)]
+    running = []
+    peak = []
+    lock = threading.Lock()
+
+    def run(rule, **kwargs):
+        with lock:
+            running.append(rule.name)
+            peak.append(len(running))
+        time.sleep(0.05)
+        with lock:
+            running.remove(rule.name)
+        return 'ok'
+
+    with patch('monitoring.daemon.run_monitoring_rule', side_effect=run):
+        with running_daemon(MonitoringDaemon(make_config(rules, max_workers=2))) as daemon:
+            time.sleep(0.3)
+            health = daemon.health()
+
+    assert max(peak) == 2
+    assert all(rule['runs'] >= 1 for rule in health['rules'].values())
+
+def test_overlapping_runs_are_skipped():
+    """Test that a rule still running when it is due again is not started twice"""
+    rule = make_rule('slow_table', schedule='0.05s')
+    calls = []
+
+    with patch('monitoring.daemon.run_monitoring_rule',
+               side_effect=fake_run_monitoring_rule(delays={'slow_table': 0.18}, calls=calls)):
+        with running_daemon(MonitoringDaemon(make_config([rule]))) as daemon:
+            time.sleep(0.3)
+            health = daemon.health()
+
+    assert len(calls) == 2
+    assert health['rules'][rule.name]['skipped'] >= 2
+
+def test_rule_past_its_timeout_is_not_started_again():
+    """Test that a rule overrunning its timeout stays running until its run returns"""
+    rule = make_rule('slow_table', schedule='0.05s')
+    calls = []
+
+    with patch('monitoring.daemon.run_monitoring_rule',
+               side_effect=fake_run_monitoring_rule(delays={'slow_table': 0.25}, errors={'slow_table'}, calls=calls)):
+        with running_daemon(MonitoringDaemon(make_config([rule], timeout=0.1))) as daemon:
+            time.sleep(0.15)
+            running = daemon.health()
+            time.sleep(0.15)
+            health = daemon.health()
+
+    assert running['running_rules'] == 1
+    assert len(calls) == 2
+    assert calls[1][1] - calls[0][1] >= 0.25
+    assert health['rules'][rule.name]['last_status'] == 'timed_out'
+    assert 'timed out after 0.1s: slow_table failed' in health['rules'][rule.name]['last_error']
+
+def test_graceful_shutdown_waits_for_running_rules():
+    """Test that stopping the daemon lets the running rule finish"""
+    rule = make_rule('slow_table', schedule='1h')
+    daemon = MonitoringDaemon(make_config([rule]))
+
+    with patch('monitoring.daemon.run_monitoring_rule',
+               side_effect=fake_run_monitoring_rule(delays={'slow_table': 0.2})):
+        with running_daemon(daemon):
+            time.sleep(0.05)
+            assert daemon.health()['running_rules'] == 1
+
+    health = daemon.health()
+    assert health['status'] == 'stopped'
+    assert health['rules'][rule.name]['runs'] == 1
+    assert health['rules'][rule.name]['last_status'] == 'success'
+
+def test_failures_are_counted():
+    """Test that consecutive failures are reported by the health check"""
+    rule = make_rule('bad_table')
+
+    with patch('monitoring.daemon.run_monitoring_rule',
+               side_effect=fake_run_monitoring_rule(errors={'bad_table'})):
+        with running_daemon(MonitoringDaemon(make_config([rule]))) as daemon:
+            time.sleep(0.15)
+            health = daemon.health()
+
+    rule_health = health['rules'][rule.name]
+    assert rule_health['consecutive_failures'] == rule_health['runs'] >= 2
+    assert rule_health['last_error'] == 'bad_table failed'
+
+def test_jitter_delays_runs_within_bounds():
+    """Test that the jitter delays every run by up to its fraction of the interval"""
+    daemon = MonitoringDaemon(make_config([make_rule('test_table', schedule='100s')], jitter=0.2),
+                              rng=random.Random(0))
+    schedule = daemon.schedules[0]
+
+    delays = []
+    for _ in range(50):
+        daemon._advance(schedule, now=schedule.slot_at)
+        delays.append(schedule.next_run_at - schedule.slot_at)
+
+    assert all(0 <= delay <= 20 for delay in delays)
+    assert max(delays) - min(delays) > 5
+
+def test_missed_slots_are_skipped():
+    """Test that the next run is the first slot after now, not every missed slot"""
+    daemon = MonitoringDaemon(make_config([make_rule('test_table', schedule='10s')]))
+    schedule = RuleSchedule(daemon.schedules[0].rule, interval=10.0, slot_at=100.0)
+
+    daemon._advance(schedule, now=135.0)
+
+    assert schedule.slot_at == 140.0
+    assert schedule.next_run_at == 140.0
+    assert schedule.skipped == 3
+
+def test_rules_without_schedule_are_rejected():
+    """Test that every rule needs a schedule"""
+    with pytest.raises(ValueError, match='Monitoring rules without a schedule: test_table'):
+        MonitoringDaemon(make_config([make_rule('test_table', schedule=None)]))
+
+def test_health_endpoint():
+    """Test the health and metrics endpoints while running and after stopping"""
+    rule = make_rule('test_table', schedule='1h')
+    daemon = MonitoringDaemon(make_config([rule]))
+    server = serve_health(daemon, port=0)
+    url = f'http://127.0.0.1:{server.server_address[1]}'
+
+    try:
+        with patch('monitoring.daemon.run_monitoring_rule', side_effect=fake_run_monitoring_rule()):
+            with running_daemon(daemon):
+                time.sleep(0.05)
+                with urllib.request.urlopen(f'{url}/health') as response:
+                    assert response.status == 200
+                    report = json.loads(response.read())
+                with urllib.request.urlopen(f'{url}/metrics') as response:
+                    assert response.headers['Content-Type'].startswith('text/plain')
+
+        with pytest.raises(urllib.error.HTTPError) as exc_info:
+            urllib.request.urlopen(f'{url}/health')
+        assert exc_info.value.code == 503
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert report['status'] == 'running'
+    assert report['rules'][rule.name]['runs'] == 1
+    assert report['rules'][rule.name]['next_run_in_seconds'] > 3000
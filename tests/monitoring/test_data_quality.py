@@ -0,0 +1,141 @@
+import pandas as pd
+import pytest
+from monitoring.data_quality import (
+    ACCEPTED_VALUES, COMPARISON, NOT_NULL, TABLE_CHECKS, UNIQUE, QualityCheck, build_validation_query,
+    format_validation_report, main, validate_dataframe, validate_file, validate_table,
+)
+from monitoring.local_backend import DEFAULT_DATABASE, SEEDS_DIR, create_duckdb_connector
+
+CHECKS = [
+    QualityCheck(NOT_NULL, "invoice_id"),
+    QualityCheck(UNIQUE, "invoice_id"),
+    QualityCheck(ACCEPTED_VALUES, "status", values=("paid", "refunded")),
+    QualityCheck(COMPARISON, "amount", operator="==", other="payment_amount"),
+    QualityCheck(COMPARISON, "fx_rate", operator=">", other=0),
+]
+
+@pytest.fixture
+def invoices():
+    return pd.DataFrame({
+        "invoice_id": [1, 2, 2, 3, None, 4],
+        "status": ["paid", "paid", "open", None, "refunded", "paid"],
+        "amount": [10.0, 20.0, 30.0, None, 50.0, 60.0],
+        "payment_amount": [10.0, 25.0, None, 40.0, 50.0, 61.0],
+        "fx_rate": [1.0, 0.0, 1.2, None, -1.0, 1.1],
+    })
+
+EXPECTED_FAILURES = {
+    "invoice_id is not null": 1,
+    "invoice_id is unique": 1,
+    "status in accepted values": 1,
+    "amount == payment_amount": 2,
+    "fx_rate > 0": 2,
+}
+
+def test_validate_dataframe(invoices):
+    """Test that every check counts its failing rows and keeps samples of the failed ones."""
+    report = validate_dataframe(invoices, CHECKS, table="invoices", sample_size=1)
+
+    assert report.row_count == 6
+    assert {result.check.name: result.failures for result in report.results} == EXPECTED_FAILURES
+    assert not report.passed
+    unique_result = report.results[1]
+    assert unique_result.samples["invoice_id"].tolist() == [2.0]
+    assert report.results[3].samples["amount"].tolist() == [20.0]
+
+def test_validate_table_matches_dataframe(invoices):
+    """Test that the warehouse query gives the same failures as the vectorized checks, in one scan."""
+    duckdb = pytest.importorskip("duckdb")
+    conn = duckdb.connect()
+    conn.register("invoices_df", invoices)
+    conn.execute("attach ':memory:' as db")
+    conn.execute("create schema db.landing")
+    conn.execute("create table db.landing.invoices as select * from invoices_df")
+
+    report = validate_table(conn, "db", "landing", "invoices", CHECKS, sample_size=5)
+
+    assert report.table == "db.landing.invoices"
+    assert report.row_count == 6
+    assert {result.check.name: result.failures for result in report.results} == EXPECTED_FAILURES
+    assert sorted(report.results[1].samples["invoice_id"].tolist()) == [2, 2]
+    assert sorted(report.results[4].samples["fx_rate"].tolist()) == [-1.0, 0.0]
+    assert report.results[0].samples["status"].tolist() == ["refunded"]
+
+def test_build_validation_query_single_scan():
+    """Test that all the checks are evaluated by one aggregate query with bound values."""
+    query, params = build_validation_query("db.landing.invoices", CHECKS)
+
+    assert query.count("from db.landing.invoices") == 1
+    assert "count(invoice_id) - count(distinct invoice_id) as check_1" in query
+    assert "status not in (?, ?)" in query
+    assert "not (amount = payment_amount)" in query
+    assert params == ["paid", "refunded", 0]
+
+def test_project_checks_pass_on_seeds():
+    """Test that the landing and staging checks hold on the seeds, in the warehouse and on the files."""
+    pytest.importorskip("duckdb")
+    pytest.importorskip("jinja2")
+    conn = create_duckdb_connector()
+    for table_name, schema in [
+        ("invoices", "ehernani_landing"),
+        ("organizations", "ehernani_landing"),
+        ("stg__invoices", "ehernani_staging"),
+        ("stg__organizations", "ehernani_staging"),
+    ]:
+        report = validate_table(conn, DEFAULT_DATABASE, schema, table_name)
+        assert report.passed, format_validation_report(report)
+        assert len(report.results) == len(TABLE_CHECKS[table_name])
+
+    assert validate_file(SEEDS_DIR / "invoices_sample.csv", "invoices").passed
+
+def test_validate_table_error():
+    """Test that query errors are wrapped with the table name."""
+    pytest.importorskip("duckdb")
+    conn = create_duckdb_connector(seeds_dir=None, models_dir=None)
+
+    with pytest.raises(Exception, match="Error validating db.landing.missing"):
+        validate_table(conn, "db", "landing", "missing", CHECKS)
+    with pytest.raises(ValueError, match="No checks for table: missing"):
+        validate_table(conn, "db", "landing", "missing")
+
+def test_quality_check_validation(invoices):
+    """Test that invalid checks and missing columns are rejected."""
+    with pytest.raises(ValueError, match="Unsupported check kind: range"):
+        QualityCheck("range", "amount")
+    with pytest.raises(ValueError, match="Unsupported operator: =>"):
+        QualityCheck(COMPARISON, "amount", operator="=>", other=0)
+    with pytest.raises(ValueError, match="requires values"):
+        QualityCheck(ACCEPTED_VALUES, "status")
+    with pytest.raises(ValueError, match="Invalid SQL identifier"):
+        QualityCheck(COMPARISON, "amount", operator="==", other="payment_amount; drop table x")
+    with pytest.raises(ValueError, match="Missing columns in invoices: currency"):
+        validate_dataframe(invoices, [QualityCheck(NOT_NULL, "currency")], table="invoices")
+
+def test_format_validation_report(invoices):
+    """Test that the report lists the failed checks with their sample rows."""
+    report = validate_dataframe(invoices, CHECKS, table="invoices", sample_size=1)
+
+    output = format_validation_report(report)
+
+    assert output.startswith("Data quality of invoices: 6 rows, 5 of 5 checks failed")
+    assert "- amount == payment_amount: 2 failing rows" in output
+    lines = output.splitlines()
+    sample_header = lines[lines.index("- amount == payment_amount: 2 failing rows") + 1]
+    assert sample_header.split() == ["invoice_id", "status", "amount", "payment_amount", "fx_rate"]
+
+def test_main_file(tmp_path, capsys):
+    """Test that the command line validates a file and exits with 1 when a check fails."""
+    csv_path = tmp_path / "organizations.csv"
+    csv_path.write_text(
+        "ORGANIZATION_ID,FIRST_PAYMENT_DATE,LAST_PAYMENT_DATE,LEGAL_ENTITY_COUNTRY_CODE,"
+        "COUNT_TOTAL_CONTRACTS_ACTIVE,CREATED_DATE\n"
+        "1,2023-04-04,2024-02-27,10,2,2023-03-24T20:48:11.037Z\n"
+        "1,2023-04-04,2024-02-27,10,-1,2023-03-24T20:48:11.037Z\n"
+    )
+
+    assert main(["organizations", "--file", str(csv_path)]) == 1
+
+    output = capsys.readouterr().out
+    assert "- ORGANIZATION_ID is unique: 1 failing rows" in output
+    assert "- COUNT_TOTAL_CONTRACTS_ACTIVE >= 0: 1 failing rows" in output
+    assert main(["organizations", "--file", str(SEEDS_DIR / "organizations.csv")]) == 0
@@ -0,0 +1,15 @@
+import pytest
+import monitoring
+from monitoring.config import load_config
+from monitoring.monitoring_rule import MonitoringRule
+
+def test_public_names_are_resolved_on_access():
+    """Test that the public names of the package resolve to the objects of their modules"""
+    assert monitoring.MonitoringRule is MonitoringRule
+    assert monitoring.load_config is load_config
+    assert set(monitoring.__all__) <= set(dir(monitoring))
+
+def test_unknown_attribute():
+    """Test that unknown names raise AttributeError"""
+    with pytest.raises(AttributeError, match="has no attribute 'missing'"):
+        monitoring.missing
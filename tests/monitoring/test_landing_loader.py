@@ -0,0 +1,182 @@
+from unittest.mock import Mock
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+from monitoring.landing_loader import (
+    csv_to_parquet, landing_schema, load_landing_files, load_parquet_duckdb, load_parquet_snowflake, main,
+)
+from monitoring.local_backend import DEFAULT_DATABASE, LANDING_COLUMNS, SEEDS_DIR, create_duckdb_connector
+
+INVOICES_CSV = SEEDS_DIR / "invoices_sample.csv"
+ORGANIZATIONS_CSV = SEEDS_DIR / "organizations.csv"
+
+def test_csv_to_parquet_chunks(tmp_path):
+    """Test that the CSV is streamed into files of at most chunk_rows rows with the landing types."""
+    n_rows = sum(1 for _ in open(INVOICES_CSV)) - 1
+
+    paths = csv_to_parquet(INVOICES_CSV, tmp_path, "invoices", chunk_rows=1000, block_size=64 << 10)
+
+    tables = [pq.read_table(path) for path in paths]
+    assert len(paths) == -(-n_rows // 1000)
+    assert [table.num_rows for table in tables[:-1]] == [1000] * (len(paths) - 1)
+    assert sum(table.num_rows for table in tables) == n_rows
+    assert all(table.schema.equals(landing_schema("invoices")) for table in tables)
+    assert pq.ParquetFile(paths[0]).metadata.row_group(0).column(0).compression == "ZSTD"
+
+    # Files of a previous conversion are replaced
+    assert csv_to_parquet(INVOICES_CSV, tmp_path, "invoices") == [tmp_path / "part-00000.parquet"]
+    assert sorted(tmp_path.glob("*.parquet")) == [tmp_path / "part-00000.parquet"]
+
+def test_csv_to_parquet_column_order_and_empty_file(tmp_path):
+    """Test that columns are reordered, extra columns dropped and an empty CSV gives an empty file."""
+    csv_path = tmp_path / "organizations.csv"
+    columns = list(reversed(LANDING_COLUMNS["organizations"])) + ["EXTRA"]
+    csv_path.write_text(",".join(columns) + "\n")
+
+    paths = csv_to_parquet(csv_path, tmp_path / "parquet", "organizations")
+
+    table = pq.read_table(paths[0])
+    assert table.num_rows == 0
+    assert table.schema.equals(landing_schema("organizations"))
+
+def test_csv_to_parquet_missing_columns(tmp_path):
+    """Test that a CSV missing columns of the landing table is rejected."""
+    csv_path = tmp_path / "organizations.csv"
+    csv_path.write_text("ORGANIZATION_ID,CREATED_DATE\n1,2023-03-24T20:48:11.037Z\n")
+
+    with pytest.raises(ValueError, match="misses columns of the organizations table: FIRST_PAYMENT_DATE"):
+        csv_to_parquet(csv_path, tmp_path / "parquet", "organizations")
+
+    with pytest.raises(ValueError, match="Unknown landing table: payments"):
+        csv_to_parquet(csv_path, tmp_path / "parquet", "payments")
+
+def test_load_landing_files_duckdb(tmp_path):
+    """Test that the bulk loaded tables match the tables loaded from the seeds."""
+    pytest.importorskip("duckdb")
+    seeded = create_duckdb_connector(models_dir=None)
+    conn = create_duckdb_connector(seeds_dir=None, models_dir=None)
+    files = {"invoices": INVOICES_CSV, "organizations": ORGANIZATIONS_CSV}
+
+    row_counts = load_landing_files(conn, files, tmp_path, backend="duckdb", chunk_rows=5000)
+
+    for table_name in files:
+        relation = f"{DEFAULT_DATABASE}.ehernani_landing.{table_name}"
+        query = f"select * from {relation} order by all"
+        assert conn.execute(f"describe {relation}").fetchall() == seeded.execute(f"describe {relation}").fetchall()
+        assert conn.execute(query).fetchall() == seeded.execute(query).fetchall()
+        assert row_counts[table_name] == len(conn.execute(query).fetchall())
+
+    # Appending loads the rows a second time
+    load_landing_files(conn, {"organizations": ORGANIZATIONS_CSV}, tmp_path, backend="duckdb", replace=False)
+    assert conn.execute(
+        f"select count(*) from {DEFAULT_DATABASE}.ehernani_landing.organizations"
+    ).fetchone()[0] == 2 * row_counts["organizations"]
+
+def test_load_parquet_duckdb_failed_load_keeps_table(tmp_path):
+    """Test that a load failing halfway leaves the previous rows of the table."""
+    pytest.importorskip("duckdb")
+    conn = create_duckdb_connector(models_dir=None)
+    relation = f"{DEFAULT_DATABASE}.ehernani_landing.organizations"
+    row_count = conn.execute(f"select count(*) from {relation}").fetchone()[0]
+    csv_to_parquet(ORGANIZATIONS_CSV, tmp_path / "parquet", "organizations")
+    # A second file whose ids cannot be cast to the landing type
+    bad_file = pa.table({column: pa.array(["not a number"]) for column in LANDING_COLUMNS["organizations"]})
+    pq.write_table(bad_file, tmp_path / "parquet" / "part-00001.parquet")
+
+    for replace in (True, False):
+        with pytest.raises(Exception, match="Error loading organizations into DuckDB"):
+            load_parquet_duckdb(conn, tmp_path / "parquet", "organizations", replace=replace)
+        assert conn.execute(f"select count(*) from {relation}").fetchone()[0] == row_count
+
+def test_load_parquet_snowflake(tmp_path):
+    """Test that the files are uploaded to a stage and copied into the table by column name."""
+    csv_to_parquet(ORGANIZATIONS_CSV, tmp_path, "organizations", chunk_rows=100)
+    cursor = Mock()
+    cursor.fetchall.return_value = [("organizations/part-00000.parquet", "LOADED", 100, 100),
+                                    ("organizations/part-00001.parquet", "LOADED", 20, 20)]
+    cursor.description = [("file",), ("status",), ("rows_parsed",), ("rows_loaded",)]
+    conn = Mock()
+    conn.cursor.return_value = cursor
+
+    rows_loaded = load_parquet_snowflake(conn, tmp_path, "organizations", database="db", schema="landing")
+
+    statements = [call.args[0] for call in cursor.execute.call_args_list]
+    assert rows_loaded == 120
+    assert statements[0] == "create temporary stage if not exists db.landing.landing_loader_stage"
+    assert statements[1] == (
+        f"put 'file://{tmp_path.resolve().as_posix()}/*.parquet' @db.landing.landing_loader_stage/organizations "
+        "parallel = 8 auto_compress = false overwrite = true"
+    )
+    assert statements[2].startswith(
+        "create or replace table db.landing.organizations__loading (ORGANIZATION_ID BIGINT, FIRST_PAYMENT_DATE DATE"
+    )
+    assert statements[3] == (
+        "copy into db.landing.organizations__loading from @db.landing.landing_loader_stage/organizations "
+        "file_format = (type = parquet) match_by_column_name = case_insensitive purge = true"
+    )
+    assert statements[4].startswith("create table if not exists db.landing.organizations (")
+    assert statements[5:] == [
+        "alter table db.landing.organizations__loading swap with db.landing.organizations",
+        "drop table if exists db.landing.organizations__loading",
+    ]
+    cursor.close.assert_called_once()
+
+def test_load_parquet_snowflake_failed_copy_keeps_table(tmp_path):
+    """Test that a failed copy drops the loading table without touching the landing table."""
+    def execute(statement):
+        if statement.startswith("copy"):
+            raise Exception("Numeric value 'abc' is not recognized")
+    cursor = Mock()
+    cursor.execute.side_effect = execute
+    cursor.fetchall.return_value = []
+    cursor.description = [("rows_loaded",)]
+    conn = Mock()
+    conn.cursor.return_value = cursor
+
+    with pytest.raises(Exception, match="Error loading invoices into Snowflake: Numeric value"):
+        load_parquet_snowflake(conn, tmp_path, "invoices", database="db", schema="landing")
+
+    statements = [call.args[0] for call in cursor.execute.call_args_list]
+    assert statements[-1] == "drop table if exists db.landing.invoices__loading"
+    assert not any("swap" in statement for statement in statements)
+
+    # Appending copies into the landing table itself
+    cursor.execute.side_effect = None
+    cursor.execute.reset_mock()
+    load_parquet_snowflake(conn, tmp_path, "invoices", database="db", schema="landing", replace=False)
+    statements = [call.args[0] for call in cursor.execute.call_args_list]
+    assert statements[2].startswith("create table if not exists db.landing.invoices (")
+    assert statements[3].startswith("copy into db.landing.invoices from")
+    assert len(statements) == 4
+
+def test_load_parquet_snowflake_error(tmp_path):
+    """Test that load errors are wrapped and the cursor is closed."""
+    cursor = Mock()
+    cursor.execute.side_effect = Exception("Stage not found")
+    conn = Mock()
+    conn.cursor.return_value = cursor
+
+    with pytest.raises(Exception, match="Error loading invoices into Snowflake: Stage not found"):
+        load_parquet_snowflake(conn, tmp_path, "invoices")
+    cursor.close.assert_called_once()
+
+    with pytest.raises(ValueError, match="Invalid SQL identifier"):
+        load_parquet_snowflake(conn, tmp_path, "invoices", schema="landing; drop table x")
+
+def test_main_duckdb(tmp_path, capsys):
+    """Test that the command line loads the files into a DuckDB database file."""
+    duckdb = pytest.importorskip("duckdb")
+    database_path = tmp_path / "warehouse.duckdb"
+
+    main([
+        f"organizations={ORGANIZATIONS_CSV}", "--backend", "duckdb", "--duckdb-path", str(database_path),
+        "--work-dir", str(tmp_path / "parquet"),
+    ])
+
+    output = capsys.readouterr().out
+    conn = duckdb.connect(str(database_path))
+    row_count = conn.execute("select count(*) from ehernani_landing.organizations").fetchone()[0]
+    assert f"Loaded {row_count} rows into {DEFAULT_DATABASE}.ehernani_landing.organizations" in output
+
+    with pytest.raises(SystemExit):
+        main(["payments=payments.csv", "--backend", "duckdb"])
@@ -0,0 +1,271 @@
+from unittest.mock import patch
+import pandas as pd
+import pytest
+from monitoring.backends import create_connector
+from monitoring.connection_pool import ConnectionPool
+from monitoring.local_backend import DEFAULT_DATABASE, build_dbt_models, create_duckdb_connector, render_dbt_model
+from monitoring.query_builder import build_monitoring_query
+from monitoring.run_monitoring import run_monitoring
+from monitoring.snowflake_reader import read_snowflake_table
+
+duckdb = pytest.importorskip("duckdb")
+pytest.importorskip("jinja2")
+
+FACT_SCHEMA = "ehernani_fact_tables"
+
+@pytest.fixture(scope="module")
+def local_conn():
+    """Fixture with the seeds loaded and the dbt models built in DuckDB."""
+    conn = create_duckdb_connector()
+    yield conn
+    conn.close()
+
+def test_seeds_and_models_are_loaded(local_conn):
+    """Test that the landing tables and every dbt model are available with their Snowflake names."""
+    tables = {
+        (schema, name) for schema, name in local_conn.execute(
+            "select table_schema, table_name from information_schema.tables where table_catalog = ?",
+            [DEFAULT_DATABASE]
+        ).fetchall()
+    }
+
+    assert {
+        ("ehernani_landing", "invoices"),
+        ("ehernani_landing", "organizations"),
+        ("ehernani_staging", "stg__invoices"),
+        ("ehernani_staging", "stg__organizations"),
+        (FACT_SCHEMA, "fct__organizations_balance"),
+        (FACT_SCHEMA, "fct__organizations_current_balance"),
+        ("ehernani_dimensions", "dim__organizations"),
+    } <= tables
+    assert local_conn.execute(
+        "select count(*) from deel_takehome_dev.ehernani_landing.invoices"
+    ).fetchone()[0] == 9999
+
+def test_fct_model_matches_invoice_aggregates(local_conn):
+    """Test that the final balance of every organization equals its summed paid/refunded invoices."""
+    mismatches = local_conn.execute("""
+        with latest as (
+            select organization_id, balance_usd
+            from deel_takehome_dev.ehernani_fact_tables.fct__organizations_balance
+            qualify row_number() over (partition by organization_id order by balance_date desc) = 1
+        ),
+        expected as (
+            select
+                organization_id,
+                sum(case
+                        when invoice_status = 'paid' then payment_amount * payment_fx_rate
+                        when invoice_status = 'refunded' then -1 * payment_amount * invoice_fx_rate
+                        else 0
+                    end) as balance_usd
+            from deel_takehome_dev.ehernani_staging.stg__invoices
+            group by organization_id
+        )
+        select count(*)
+        from latest
+        join expected using (organization_id)
+        where abs(coalesce(latest.balance_usd, 0) - coalesce(expected.balance_usd, 0)) > 1e-6
+    """).fetchone()[0]
+
+    assert mismatches == 0
+
+def test_monitoring_query_runs_locally(local_conn):
+    """Test that the monitoring query runs unchanged on the local backend."""
+    query, params = build_monitoring_query(
+        table_name="fct__organizations_balance",
+        target_column="balance_change_percentage",
+        id_column="organization_id",
+        date_column="balance_date",
+        threshold=50.0,
+        start_date="2024-01-01",
+        database=DEFAULT_DATABASE,
+        schema=FACT_SCHEMA,
+        top_k=5,
+    )
+
+    df = read_snowflake_table(conn=local_conn, query=query, params=params)
+
+    expected_count = local_conn.execute(
+        "select count(*) from deel_takehome_dev.ehernani_fact_tables.fct__organizations_balance "
+        "where balance_change_percentage > 50 and balance_date >= '2024-01-01'"
+    ).fetchone()[0]
+    assert expected_count > 5
+    assert len(df) == 5
+    assert (df["total_count"] == expected_count).all()
+    assert df["difference"].is_monotonic_decreasing
+
+def test_run_monitoring_on_local_backend(local_conn):
+    """Test the end-to-end monitoring run with a pool of local connections."""
+    pool = ConnectionPool(connect=local_conn.cursor, max_size=1)
+
+    result = run_monitoring(
+        table_name="fct__organizations_balance",
+        target_column="balance_change_percentage",
+        id_column="organization_id",
+        date_column="balance_date",
+        threshold=50.0,
+        start_date="2024-01-01",
+        database=DEFAULT_DATABASE,
+        schema=FACT_SCHEMA,
+        pool=pool,
+    )
+
+    assert "Monitoring Results for fct__organizations_balance.balance_change_percentage:" in result
+    assert "Top 5 records:" in result
+
+def test_create_connector_duckdb_without_models():
+    """Test the backend selection and that the model build can be skipped."""
+    conn = create_connector("duckdb", {"models_dir": None})
+
+    assert conn.execute(
+        "select count(*) from deel_takehome_dev.ehernani_landing.organizations"
+    ).fetchone()[0] > 0
+    assert conn.execute(
+        "select count(*) from information_schema.tables where table_name = 'fct__organizations_balance'"
+    ).fetchone()[0] == 0
+
+def test_create_connector_unknown_backend():
+    """Test that unknown backends are rejected."""
+    with pytest.raises(ValueError) as exc_info:
+        create_connector("oracle")
+    assert "Unsupported backend: oracle" in str(exc_info.value)
+
+def test_create_connector_statement_timeout():
+    """Test that the statement timeout is set as a Snowflake session parameter."""
+    params = {"user": "u", "password": "p", "session_parameters": {"QUERY_TAG": "monitoring"}}
+
+    with patch("monitoring.create_snowflake_connector.create_snowflake_connector") as mock_connect:
+        create_connector("snowflake", params, statement_timeout=12.5)
+
+    assert mock_connect.call_args[1]["connection_params"]["session_parameters"] == {
+        "QUERY_TAG": "monitoring", "STATEMENT_TIMEOUT_IN_SECONDS": 13,
+    }
+    assert params["session_parameters"] == {"QUERY_TAG": "monitoring"}
+
+def test_render_dbt_model_collects_config_and_refs():
+    """Test the minimal dbt Jinja context."""
+    config, refs = {}, []
+    sql = render_dbt_model(
+        "{{ config(materialized='table', schema='fact_tables') }}\n"
+        "{% set stg = ref('stg__invoices') %}select * from {{ stg }} join {{ source('landing', 'invoices') }}",
+        {"stg__invoices": "db.ehernani_staging.stg__invoices"},
+        database="db",
+        config=config,
+        refs=refs,
+    )
+
+    assert config == {"materialized": "table", "schema": "fact_tables"}
+    assert refs == ["stg__invoices"]
+    assert sql.strip() == "select * from db.ehernani_staging.stg__invoices join db.ehernani_landing.invoices"
+
+def test_build_dbt_models_detects_cycles(tmp_path):
+    """Test that circular refs are reported."""
+    (tmp_path / "a.sql").write_text("select * from {{ ref('b') }}")
+    (tmp_path / "b.sql").write_text("select * from {{ ref('a') }}")
+
+    with pytest.raises(ValueError) as exc_info:
+        build_dbt_models(duckdb.connect(), tmp_path)
+    assert "Circular dependency" in str(exc_info.value)
+
+def test_incremental_fct_matches_full_refresh():
+    """Test that successive incremental runs of the fact table give the same result as a full refresh."""
+    conn = create_duckdb_connector(models_dir=None)
+    invoices = "deel_takehome_dev.ehernani_landing.invoices"
+    fct = "deel_takehome_dev.ehernani_fact_tables.fct__organizations_balance"
+    conn.execute(f"create temp table all_invoices as select * from {invoices}")
+    # Cutoffs in the middle of a day, so that the watermark day is partially loaded
+    cutoffs = ["2023-06-01 12:00:00+00", "2023-12-15 06:30:00+00", "2024-03-01 18:00:00+00", None]
+
+    conn.execute(f"delete from {invoices} where created_at >= ?", [cutoffs[0]])
+    build_dbt_models(conn)
+    for start, end in zip(cutoffs, cutoffs[1:]):
+        new_rows = "select * from all_invoices where created_at >= ?" + (" and created_at < ?" if end else "")
+        conn.execute(f"insert into {invoices} {new_rows}", [start, end] if end else [start])
+        build_dbt_models(conn, select=["fct__organizations_balance"])
+
+    order_by = " order by organization_id, balance_date"
+    incremental = conn.execute(f"select * from {fct}{order_by}").df()
+    build_dbt_models(conn, select=["fct__organizations_balance"], full_refresh=True)
+    full_refresh = conn.execute(f"select * from {fct}{order_by}").df()
+
+    assert len(full_refresh) > 0
+    pd.testing.assert_frame_equal(incremental, full_refresh, check_exact=False, rtol=1e-9)
+
+def test_run_monitoring_with_watermark_on_local_backend(local_conn, tmp_path):
+    """Test that a second run with a watermark store and an alert store has no new breaches to report."""
+    from monitoring.alert_state import AlertStateStore
+    from monitoring.watermark_store import SqliteWatermarkStore
+
+    store = SqliteWatermarkStore(tmp_path / "watermarks.db")
+    pool = ConnectionPool(connect=local_conn.cursor, max_size=1)
+    monitoring_kwargs = dict(
+        table_name="fct__organizations_balance",
+        target_column="balance_change_percentage",
+        id_column="organization_id",
+        date_column="balance_date",
+        threshold=50.0,
+        start_date="2024-01-01",
+        database=DEFAULT_DATABASE,
+        schema=FACT_SCHEMA,
+        pool=pool,
+        watermark_store=store,
+        alert_store=AlertStateStore(tmp_path / "alerts.db"),
+    )
+
+    first = run_monitoring(**monitoring_kwargs)
+    max_date = local_conn.execute(
+        f"select max(balance_date) from {DEFAULT_DATABASE}.{FACT_SCHEMA}.fct__organizations_balance"
+    ).fetchone()[0]
+
+    assert "Top 5 records:" in first
+    assert store.get(f"{DEFAULT_DATABASE}.{FACT_SCHEMA}.fct__organizations_balance.balance_change_percentage > 50.0") \
+        .startswith(max_date.isoformat())
+    assert run_monitoring(**monitoring_kwargs).startswith("No records found exceeding threshold")
+
+def test_watermark_day_late_rows_are_evaluated(tmp_path):
+    """Test that a row landing late for the day of the watermark is alerted on by the next run."""
+    from monitoring.alert_state import AlertStateStore
+    from monitoring.watermark_store import SqliteWatermarkStore
+
+    conn = duckdb.connect()
+    conn.execute("create table balances (organization_id integer, balance_date date, balance_usd double)")
+    conn.execute("insert into balances values (1, '2024-03-01', 100.0), (2, '2024-02-29', 200.0)")
+    monitoring_kwargs = dict(
+        table_name="balances",
+        target_column="balance_usd",
+        id_column="organization_id",
+        date_column="balance_date",
+        threshold=50.0,
+        start_date="2024-01-01",
+        database="memory",
+        schema="main",
+        pool=ConnectionPool(connect=conn.cursor, max_size=1),
+        watermark_store=SqliteWatermarkStore(tmp_path / "watermarks.db"),
+        alert_store=AlertStateStore(tmp_path / "alerts.db"),
+    )
+
+    assert "Found 2 records exceeding threshold" in run_monitoring(**monitoring_kwargs)
+    conn.execute("insert into balances values (3, '2024-03-01', 300.0)")
+    second = run_monitoring(**monitoring_kwargs)
+
+    assert "Found 1 records exceeding threshold" in second
+    assert "1. ID: 3" in second
+    assert run_monitoring(**monitoring_kwargs).startswith("No records found exceeding threshold")
+    conn.close()
+
+def test_run_monitoring_without_pool_uses_backend(monkeypatch):
+    """Test that a run without a pool connects to the backend selected by MONITORING_BACKEND."""
+    monkeypatch.setenv("MONITORING_BACKEND", "duckdb")
+
+    result = run_monitoring(
+        table_name="fct__organizations_balance",
+        target_column="balance_change_percentage",
+        id_column="organization_id",
+        date_column="balance_date",
+        threshold=50.0,
+        start_date="2024-01-01",
+        database=DEFAULT_DATABASE,
+        schema=FACT_SCHEMA,
+    )
+
+    assert "Top 5 records:" in result
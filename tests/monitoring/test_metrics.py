@@ -0,0 +1,148 @@
+import json
+import logging
+import urllib.request
+import pandas as pd
+import pyarrow as pa
+import pytest
+from unittest.mock import Mock, patch
+from monitoring.metrics import FAILED, MetricsRegistry, RunMetrics, log_run_metrics, serve_metrics, timed
+
+@pytest.fixture
+def fake_clock():
+    """Fixture replacing perf_counter with a clock advanced by the test"""
+    clock = {"now": 0.0}
+    with patch('monitoring.metrics.time.perf_counter', side_effect=lambda: clock["now"]):
+        yield clock
+
+def test_nested_spans_count_their_own_time(fake_clock):
+    """Test that the time of a nested span is not counted in its parent"""
+    metrics = RunMetrics(rule="rule")
+
+    with metrics.span("transform"):
+        fake_clock["now"] += 1.0
+        with metrics.span("fetch"):
+            fake_clock["now"] += 2.0
+        fake_clock["now"] += 0.5
+        with metrics.span("fetch"):
+            fake_clock["now"] += 3.0
+
+    assert metrics.spans == {"transform": 1.5, "fetch": 5.0}
+    assert metrics.total_seconds == 6.5
+
+def test_span_records_the_innermost_failed_stage():
+    """Test that the stage where an error is raised is kept"""
+    metrics = RunMetrics(rule="rule")
+
+    with pytest.raises(ValueError):
+        with metrics.span("transform"):
+            with metrics.span("execute"):
+                raise ValueError("boom")
+
+    assert metrics.error_stage == "execute"
+    assert set(metrics.spans) == {"transform", "execute"}
+
+def test_iterate_counts_rows_and_bytes(fake_clock):
+    """Test that every batch is timed and counted, for pandas and Arrow batches"""
+    metrics = RunMetrics(rule="rule")
+    df = pd.DataFrame({"id": [1, 2, 3], "difference": [1.0, 2.0, 3.0]})
+    batch = pa.record_batch({"id": [4, 5], "difference": [4.0, 5.0]})
+
+    def batches():
+        fake_clock["now"] += 1.0
+        yield df
+        fake_clock["now"] += 1.0
+        yield batch
+
+    assert list(metrics.iterate(batches())) == [df, batch]
+    assert metrics.rows == 5
+    assert metrics.bytes == 48 + batch.nbytes
+    assert metrics.spans == {"fetch": 2.0}
+
+def test_record_query_id():
+    """Test that the Snowflake query id is kept and cursors without one are ignored"""
+    metrics = RunMetrics(rule="rule")
+
+    metrics.record_query_id(Mock(sfqid="01b2-query"))
+    metrics.record_query_id(object())
+
+    assert metrics.query_ids == ["01b2-query"]
+
+def test_timed_without_metrics():
+    """Test that timing is a no-op without metrics"""
+    with timed(None, "execute"):
+        pass
+
+def test_log_run_metrics(caplog):
+    """Test the structured log record of a run"""
+    metrics = RunMetrics(rule="db.schema.table.column > 50.0", rows=3, query_ids=["q1"])
+    metrics.status = FAILED
+    metrics.error_stage = "execute"
+
+    with caplog.at_level(logging.INFO, logger="monitoring.metrics"):
+        log_run_metrics(metrics)
+
+    record = caplog.records[-1]
+    payload = json.loads(record.getMessage())
+    assert record.levelno == logging.ERROR
+    assert payload["event"] == "monitoring_run"
+    assert payload["rule"] == "db.schema.table.column > 50.0"
+    assert payload["error_stage"] == "execute"
+    assert payload["rows"] == 3
+    assert payload["query_ids"] == ["q1"]
+
+def test_registry_to_prometheus():
+    """Test the Prometheus text format, with counters accumulated over runs"""
+    registry = MetricsRegistry()
+    registry.record(RunMetrics(rule='a "b"', spans={"execute": 1.0}, rows=2, bytes=10, started_at=100.0))
+    registry.record(RunMetrics(rule='a "b"', spans={"execute": 0.5}, rows=3, bytes=20, started_at=200.0))
+
+    text = registry.to_prometheus()
+
+    assert "# TYPE monitoring_runs_total counter" in text
+    assert 'monitoring_runs_total{rule="a \\"b\\"",status="success"} 2' in text
+    assert 'monitoring_stage_seconds_total{rule="a \\"b\\"",stage="execute"} 1.5' in text
+    assert 'monitoring_rows_total{rule="a \\"b\\""} 5' in text
+    assert 'monitoring_last_run_stage_seconds{rule="a \\"b\\"",stage="execute"} 0.5' in text
+    assert 'monitoring_last_run_timestamp_seconds{rule="a \\"b\\""} 200.0' in text
+    assert not text.rstrip().endswith("# EOF")
+    assert registry.last_run('a "b"').rows == 3
+
+def test_registry_to_openmetrics():
+    """Test the OpenMetrics format"""
+    registry = MetricsRegistry()
+    registry.record(RunMetrics(rule="rule", spans={"fetch": 1.0}))
+
+    text = registry.to_prometheus(openmetrics=True)
+
+    assert "# TYPE monitoring_runs counter" in text
+    assert 'monitoring_runs_total{rule="rule",status="success"} 1' in text
+    assert text.endswith("# EOF\n")
+
+def test_write_textfile(tmp_path):
+    """Test that the metrics are written to a file"""
+    registry = MetricsRegistry()
+    registry.record(RunMetrics(rule="rule"))
+    path = tmp_path / "metrics" / "monitoring.prom"
+
+    registry.write_textfile(path)
+
+    assert path.read_text() == registry.to_prometheus()
+    assert list(path.parent.iterdir()) == [path]
+
+def test_serve_metrics():
+    """Test the metrics endpoint in both formats"""
+    registry = MetricsRegistry()
+    registry.record(RunMetrics(rule="rule"))
+    server = serve_metrics(registry, port=0)
+    url = f"http://127.0.0.1:{server.server_address[1]}/metrics"
+    try:
+        with urllib.request.urlopen(url) as response:
+            assert response.headers["Content-Type"].startswith("text/plain")
+            assert 'monitoring_runs_total{rule="rule",status="success"} 1' in response.read().decode()
+        request = urllib.request.Request(url, headers={"Accept": "application/openmetrics-text"})
+        with urllib.request.urlopen(request) as response:
+            assert response.headers["Content-Type"].startswith("application/openmetrics-text")
+            assert response.read().decode().endswith("# EOF\n")
+    finally:
+        server.shutdown()
+        server.server_close()
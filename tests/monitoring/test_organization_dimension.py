@@ -0,0 +1,126 @@
+from unittest.mock import Mock
+import pandas as pd
+import pyarrow as pa
+import pytest
+from monitoring.local_backend import DEFAULT_DATABASE, create_duckdb_connector
+from monitoring.organization_dimension import (
+    DIMENSION_COLUMNS, DIMENSION_SCHEMA, OrganizationDimension, OrganizationDimensionLookup,
+    read_organization_dimension, shared_dimension_lookup,
+)
+from monitoring.utils import format_monitoring_results
+
+DIMENSION = pa.table({
+    "ORGANIZATION_ID": pa.array([30, 10, 20, None], pa.int64()),
+    "LEGAL_ENTITY_COUNTRY_CODE": ["US", "PT", None, "FR"],
+    "CONTRACT_PORTFOLIO_SIZE": ["large_portfolio", "single_contract", "small_portfolio", "single_contract"],
+    "DAYS_SINCE_LAST_PAYMENT": pa.array([3, 120, 15, 1], pa.int64()),
+}).rename_columns(["organization_id"] + list(DIMENSION_COLUMNS))
+
+def test_dimension_lookup_records():
+    """Test that the attributes are looked up in bulk, with None for unknown organizations."""
+    dimension = OrganizationDimension(DIMENSION)
+
+    assert len(dimension) == 3
+    assert 10 in dimension and 40 not in dimension
+    assert dimension.lookup(iter([20, 40, "30", None])) == [
+        {"legal_entity_country_code": None, "contract_portfolio_size": "small_portfolio", "days_since_last_payment": 15},
+        None, None, None,
+    ]
+    assert dimension.attributes([10, 40]).column("days_since_last_payment").to_pylist() == [120, None]
+    assert dimension.nbytes > 0
+
+def test_dimension_enrich():
+    """Test that records, DataFrames and Arrow results get the attributes appended, in their own type."""
+    dimension = OrganizationDimension(DIMENSION)
+    records = [{"id": 30, "value": 5.0}, {"id": 40, "value": 4.0}]
+
+    enriched_records = dimension.enrich(records)
+    enriched_df = dimension.enrich(pd.DataFrame(records).rename(columns={"id": "ID"}))
+    enriched_table = dimension.enrich(pa.RecordBatch.from_pylist(records))
+
+    assert enriched_records[0] == {
+        "id": 30, "value": 5.0, "legal_entity_country_code": "US",
+        "contract_portfolio_size": "large_portfolio", "days_since_last_payment": 3,
+    }
+    assert enriched_records[1]["contract_portfolio_size"] is None
+    assert enriched_df["legal_entity_country_code"].tolist() == ["US", None]
+    assert enriched_table.column_names == ["id", "value"] + list(DIMENSION_COLUMNS)
+    assert enriched_table.column("days_since_last_payment").to_pylist() == [3, None]
+
+def test_dimension_validation():
+    """Test that missing columns and duplicated organization ids are rejected."""
+    with pytest.raises(ValueError, match="Missing columns in the organization dimension: days_since_last_payment"):
+        OrganizationDimension(DIMENSION.drop_columns(["days_since_last_payment"]))
+    with pytest.raises(ValueError, match="Duplicated organization ids"):
+        OrganizationDimension(pa.concat_tables([DIMENSION, DIMENSION]))
+
+def test_lookup_reloads_only_on_change(monkeypatch):
+    """Test that the table is probed once per check interval and only read again when it changed."""
+    now = [0.0]
+    freshness = ["2024-03-01 10:00"]
+    probes = []
+    def probe(conn, tables):
+        probes.append(tables)
+        return freshness[0]
+    read = Mock(return_value=DIMENSION)
+    monkeypatch.setattr("monitoring.organization_dimension.read_organization_dimension", read)
+    lookup = OrganizationDimensionLookup(check_interval=60, freshness_probe=probe, clock=lambda: now[0])
+    conn = Mock()
+
+    first = lookup.get(conn)
+    now[0] = 30
+    assert lookup.get(conn) is first
+    now[0] = 60
+    assert lookup.get(conn) is first
+    freshness[0] = "2024-03-02 10:00"
+    now[0] = 120
+    assert lookup.get(conn) is not first
+
+    assert lookup.loads == read.call_count == 2
+    assert probes == [[(DEFAULT_DATABASE, DIMENSION_SCHEMA, "dim__organizations")]] * 3
+    read.assert_called_with(conn, DEFAULT_DATABASE, DIMENSION_SCHEMA, "dim__organizations")
+
+def test_lookup_error():
+    """Test that read errors are wrapped and nothing is cached."""
+    conn = Mock()
+    conn.cursor.return_value.execute.side_effect = Exception("Table not found")
+    lookup = OrganizationDimensionLookup(freshness_probe=lambda conn, tables: "")
+
+    with pytest.raises(Exception, match="Error loading the organization dimension: .*Table not found"):
+        lookup.get(conn)
+    assert lookup.loads == 0
+
+def test_shared_dimension_lookup(monkeypatch):
+    """Test that the process shares one lookup per table."""
+    monkeypatch.setattr("monitoring.organization_dimension._SHARED_LOOKUPS", {})
+
+    lookup = shared_dimension_lookup(check_interval=10)
+
+    assert shared_dimension_lookup(database=DEFAULT_DATABASE.upper()) is lookup
+    assert lookup.check_interval == 10
+    assert shared_dimension_lookup(table_name="dim__organizations_v2") is not lookup
+
+def test_enriched_results_on_local_backend():
+    """Test that the alerts show the attributes of dim__organizations, read in one query."""
+    pytest.importorskip("duckdb")
+    pytest.importorskip("jinja2")
+    conn = create_duckdb_connector()
+    expected = conn.execute(f"""
+        select organization_id, legal_entity_country_code, contract_portfolio_size, days_since_last_payment
+        from {DEFAULT_DATABASE}.{DIMENSION_SCHEMA}.dim__organizations
+        order by organization_id
+        limit 2
+    """).fetchall()
+    results = [{"id": row[0], "value": 10.0, "difference": 5.0} for row in expected]
+
+    dimension = OrganizationDimensionLookup(freshness_probe=lambda conn, tables: "").get(conn.cursor())
+    formatted = format_monitoring_results(results, "fct__organizations_balance", "balance_usd", dimensions=dimension)
+
+    assert len(dimension) == len(read_organization_dimension(conn.cursor()))
+    lines = formatted.splitlines()
+    first = lines.index(f"1. ID: {expected[0][0]}")
+    assert lines[first + 3:first + 6] == [
+        f"   Legal entity country code: {expected[0][1]}",
+        f"   Contract portfolio size: {expected[0][2]}",
+        f"   Days since last payment: {expected[0][3]}",
+    ]
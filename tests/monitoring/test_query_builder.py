@@ -0,0 +1,150 @@
+import pytest
+from monitoring.monitoring_rule import MonitoringRule
+from monitoring.query_builder import (
+    build_batch_query,
+    build_monitoring_query,
+    build_rolling_zscore_query,
+    build_watermark_query,
+    compile_batch_query,
+    compile_monitoring_query,
+    to_qmark,
+    validate_identifier,
+)
+
+@pytest.fixture
+def query_kwargs():
+    return {
+        "table_name": "fct__organizations_balance",
+        "target_column": "balance_change_percentage",
+        "id_column": "organization_id",
+        "date_column": "balance_date",
+        "threshold": 50,
+        "start_date": "2024-01-01",
+        "database": "deel_takehome_dev",
+        "schema": "fact_tables",
+    }
+
+@pytest.mark.parametrize("identifier", ["balance_date", "BALANCE_DATE", "_col", "col$1"])
+def test_validate_identifier_valid(identifier):
+    """Test that plain identifiers are accepted"""
+    assert validate_identifier(identifier) == identifier
+
+@pytest.mark.parametrize("identifier", ["1col", "col name", "col; drop table x", "col--", "\"col\"", "", None])
+def test_validate_identifier_invalid(identifier):
+    """Test that anything that is not a plain identifier is rejected"""
+    with pytest.raises(ValueError) as exc_info:
+        validate_identifier(identifier)
+    assert "Invalid SQL identifier" in str(exc_info.value)
+
+def test_to_qmark_keeps_casts():
+    """Test that bind markers are replaced in order and casts are left untouched"""
+    query, names = to_qmark("select a::date from t where a > :start_date and b < :threshold and c = :threshold")
+
+    assert query == "select a::date from t where a > ? and b < ? and c = ?"
+    assert names == ("start_date", "threshold", "threshold")
+
+def test_build_monitoring_query_binds_values(query_kwargs):
+    """Test that values are bound as parameters instead of being formatted into the SQL"""
+    query, params = build_monitoring_query(**query_kwargs)
+
+    assert "from deel_takehome_dev.fact_tables.fct__organizations_balance" in query
+    assert "balance_change_percentage > ?" in query
+    assert "balance_date >= ?" in query
+    assert "2024-01-01" not in query
+    assert params == (50.0, 50.0, "2024-01-01")
+
+def test_build_monitoring_query_top_k(query_kwargs):
+    """Test the top-k pushdown variant"""
+    query, params = build_monitoring_query(**query_kwargs, top_k=5)
+
+    assert "count(*) over () as total_count" in query
+    assert "limit 5" in query
+    assert params == (50.0, 50.0, "2024-01-01")
+
+def test_build_monitoring_query_same_text_across_runs(query_kwargs):
+    """Test that different thresholds and dates reuse the same cached SQL text"""
+    compile_monitoring_query.cache_clear()
+
+    query_1, params_1 = build_monitoring_query(**query_kwargs)
+    query_2, params_2 = build_monitoring_query(**{**query_kwargs, "threshold": 75, "start_date": "2024-02-01"})
+
+    assert query_1 is query_2
+    assert params_1 != params_2
+    assert compile_monitoring_query.cache_info().hits == 1
+
+def test_build_monitoring_query_rejects_injection(query_kwargs):
+    """Test that column names cannot be used to inject SQL"""
+    with pytest.raises(ValueError):
+        build_monitoring_query(**{**query_kwargs, "target_column": "1; drop table fct__organizations_balance"})
+
+def test_build_batch_query_is_cached(query_kwargs):
+    """Test that batch queries are compiled once per shape"""
+    compile_batch_query.cache_clear()
+    rules = [MonitoringRule(**query_kwargs), MonitoringRule(**{**query_kwargs, "threshold": 80})]
+
+    query_1, params_1 = build_batch_query(rules, top_k=5)
+    rules[1].threshold = 90
+    query_2, params_2 = build_batch_query(rules, top_k=5)
+
+    assert query_1 is query_2
+    assert 80.0 in params_1 and 90.0 in params_2
+    assert compile_batch_query.cache_info().hits == 1
+
+def test_build_batch_query_rejects_injection(query_kwargs):
+    """Test that batch rule identifiers are validated"""
+    rules = [MonitoringRule(**{**query_kwargs, "table_name": "t where 1 = 1 --"})]
+
+    with pytest.raises(ValueError):
+        build_batch_query(rules)
+
+def test_build_monitoring_query_with_end_date(query_kwargs):
+    """Test that the end date adds an inclusive upper bound bound as a parameter."""
+    query, params = build_monitoring_query(**query_kwargs, end_date="2024-03-01")
+    unbounded_query, _ = build_monitoring_query(**query_kwargs)
+
+    assert "and balance_date <= ?" in query
+    assert "<=" not in unbounded_query
+    assert params == (50.0, 50.0, "2024-01-01", "2024-03-01")
+
+def test_build_watermark_query(query_kwargs):
+    """Test the query returning the latest date after the start date."""
+    query, params = build_watermark_query(
+        table_name=query_kwargs["table_name"],
+        date_column=query_kwargs["date_column"],
+        start_date="2024-01-01",
+        database=query_kwargs["database"],
+        schema=query_kwargs["schema"],
+    )
+
+    assert "select max(balance_date) as watermark" in query
+    assert "from deel_takehome_dev.fact_tables.fct__organizations_balance" in query
+    assert params == ("2024-01-01",)
+
+    with pytest.raises(ValueError):
+        build_watermark_query("fct; drop table x", "balance_date", "2024-01-01", "db", "schema")
+
+def test_build_rolling_zscore_query(query_kwargs):
+    """Test the rolling z-score query and its parameters"""
+    query, params = build_rolling_zscore_query(**{**query_kwargs, "threshold": 3}, window=30, min_periods=5)
+
+    assert "rows between 30 preceding and 1 preceding" in query
+    assert "partition by organization_id order by balance_date" in query
+    assert "total_count" not in query
+    assert params == (5, "2024-01-01", 3.0, 3.0)
+
+def test_build_rolling_zscore_query_top_k_and_end_date(query_kwargs):
+    """Test the pushdown and bounded variants of the rolling z-score query"""
+    query, params = build_rolling_zscore_query(
+        **{**query_kwargs, "threshold": 3}, window=7, min_periods=3, top_k=5, end_date="2024-03-01"
+    )
+
+    assert "count(*) over () as total_count" in query
+    assert "limit 5" in query
+    assert "balance_date <= ?" in query
+    assert params == ("2024-03-01", 3, "2024-01-01", 3.0, 3.0)
+
+def test_build_rolling_zscore_query_rejects_invalid_window(query_kwargs):
+    """Test that the window must be positive"""
+    with pytest.raises(ValueError) as exc_info:
+        build_rolling_zscore_query(**query_kwargs, window=0, min_periods=3)
+    assert "window must be at least 1" in str(exc_info.value)
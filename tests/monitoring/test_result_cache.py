@@ -0,0 +1,136 @@
+import sqlite3
+import time
+import pandas as pd
+import pytest
+from unittest.mock import Mock
+from monitoring.result_cache import (
+    ResultCache, backend_freshness_probe, get_tables_last_altered, normalize_query, result_cache_key,
+    untracked_freshness,
+)
+from monitoring.snowflake_reader import read_snowflake_table
+
+QUERY = "select id, value from balances where value > ? order by id"
+
+@pytest.fixture
+def sample_df():
+    return pd.DataFrame({'id': [1, 2], 'value': [200.0, 180.0]})
+
+@pytest.fixture
+def sqlite_conn():
+    conn = sqlite3.connect(":memory:")
+    conn.execute("create table balances (id integer, value real)")
+    conn.executemany("insert into balances values (?, ?)", [(1, 200.0), (2, 180.0), (3, 50.0)])
+    yield conn
+    conn.close()
+
+def row_count_probe(conn, tables):
+    """Freshness probe for SQLite, which does not track modification times."""
+    return "|".join(str(conn.execute(f"select count(*) from {table}").fetchone()[0]) for _, _, table in tables)
+
+def test_normalize_query():
+    """Test that whitespace is collapsed outside of string literals only"""
+    assert normalize_query("\n  select a,\n\t b  from t where c = 'x  y' ;") == "select a, b from t where c = 'x  y'"
+
+def test_result_cache_key():
+    """Test that keys ignore formatting but depend on the parameters"""
+    assert result_cache_key(QUERY, (100,)) == result_cache_key(f"\n    {QUERY.replace(' ', '  ')};", (100,))
+    assert result_cache_key(QUERY, (100,)) != result_cache_key(QUERY, (150,))
+
+def test_get_and_put(sample_df):
+    """Test that cached results are returned as copies"""
+    cache = ResultCache()
+    assert cache.get(QUERY, (100,)) is None
+
+    cache.put(QUERY, (100,), sample_df)
+    cached = cache.get(QUERY, (100,))
+    cached.loc[0, 'value'] = 0.0
+
+    pd.testing.assert_frame_equal(cache.get(QUERY, (100,)), sample_df)
+    assert (cache.hits, cache.misses) == (2, 1)
+
+def test_ttl_expiry(sample_df):
+    """Test that entries older than the TTL are not served"""
+    cache = ResultCache(ttl_seconds=0.1)
+    cache.put(QUERY, (100,), sample_df)
+    time.sleep(0.2)
+
+    assert cache.get(QUERY, (100,)) is None
+
+def test_freshness_invalidation(sample_df):
+    """Test that entries are only served while the freshness token is unchanged"""
+    cache = ResultCache()
+    cache.put(QUERY, (100,), sample_df, freshness="2024-03-01 10:00:00")
+
+    assert cache.get(QUERY, (100,), freshness="2024-03-01 10:00:00") is not None
+    assert cache.get(QUERY, (100,), freshness="2024-03-02 10:00:00") is None
+    assert cache.get(QUERY, (100,)) is None
+
+def test_lru_eviction(sample_df):
+    """Test that the least recently used entry is evicted from memory"""
+    cache = ResultCache(max_entries=2)
+    for threshold in (1, 2):
+        cache.put(QUERY, (threshold,), sample_df)
+    cache.get(QUERY, (1,))
+    cache.put(QUERY, (3,), sample_df)
+
+    assert cache.get(QUERY, (2,)) is None
+    assert cache.get(QUERY, (1,)) is not None
+    assert cache.get(QUERY, (3,)) is not None
+
+def test_disk_tier(tmp_path, sample_df):
+    """Test that results written to the Parquet tier are served by another cache instance"""
+    ResultCache(cache_dir=tmp_path).put(QUERY, (100,), sample_df, freshness="v1")
+
+    cache = ResultCache(cache_dir=tmp_path)
+    pd.testing.assert_frame_equal(cache.get(QUERY, (100,), freshness="v1"), sample_df)
+    assert [p.suffix for p in tmp_path.iterdir()] == [".parquet"]
+
+    assert cache.get(QUERY, (100,), freshness="v2") is None
+    assert list(tmp_path.iterdir()) == []
+
+def test_read_snowflake_table_with_cache(sqlite_conn):
+    """Test that repeated reads are served from the cache until the table changes"""
+    cache = ResultCache(freshness_probe=row_count_probe)
+    tables = [("main", "main", "balances")]
+
+    first = read_snowflake_table(conn=sqlite_conn, query=QUERY, params=(100,), cache=cache, cache_tables=tables)
+    sqlite_conn.execute("update balances set value = 0 where id = 1")
+    second = read_snowflake_table(conn=sqlite_conn, query=QUERY, params=(100,), cache=cache, cache_tables=tables)
+    sqlite_conn.execute("insert into balances values (4, 300.0)")
+    third = read_snowflake_table(conn=sqlite_conn, query=QUERY, params=(100,), cache=cache, cache_tables=tables)
+
+    assert first['id'].tolist() == [1, 2]
+    pd.testing.assert_frame_equal(second, first)  # the update did not change the probe
+    assert third['id'].tolist() == [2, 4]
+    assert (cache.hits, cache.misses) == (1, 2)
+
+def test_get_tables_last_altered():
+    """Test the information schema probe"""
+    mock_cursor = Mock()
+    mock_cursor.fetchone.side_effect = [("2024-03-01 10:00:00",), ("2024-03-02 10:00:00",)]
+    mock_conn = Mock()
+    mock_conn.cursor.return_value = mock_cursor
+
+    token = get_tables_last_altered(mock_conn, [("db", "fact_tables", "fct"), ("db", "dimensions", "dim")])
+
+    assert token == "2024-03-01 10:00:00|2024-03-02 10:00:00"
+    query, params = mock_cursor.execute.call_args[0]
+    assert "from db.information_schema.tables" in query
+    assert params == ("dimensions", "dim")
+    mock_cursor.close.assert_called_once()
+
+def test_backend_freshness_probe(sqlite_conn):
+    """Test that backends without modification times get a probe that never queries them"""
+    conn = Mock()
+
+    assert backend_freshness_probe("snowflake") is get_tables_last_altered
+    assert backend_freshness_probe("duckdb") is untracked_freshness
+    assert untracked_freshness(conn, [("db", "fact_tables", "fct")]) == ""
+    conn.cursor.assert_not_called()
+
+    cache = ResultCache(freshness_probe=backend_freshness_probe("duckdb"))
+    tables = [("main", "main", "balances")]
+    first = read_snowflake_table(conn=sqlite_conn, query=QUERY, params=(100,), cache=cache, cache_tables=tables)
+    second = read_snowflake_table(conn=sqlite_conn, query=QUERY, params=(100,), cache=cache, cache_tables=tables)
+    pd.testing.assert_frame_equal(second, first)
+    assert (cache.hits, cache.misses) == (1, 1)
@@ -1,7 +1,9 @@
 import pytest
 from unittest.mock import MagicMock
 import pandas as pd
-from monitoring.snowflake_reader import read_snowflake_table
+import sqlite3
+import warnings
+from monitoring.snowflake_reader import read_snowflake_table, read_snowflake_batches
 
 @pytest.fixture
 def mock_snowflake_connection():
@@ -71,4 +73,102 @@ def test_read_snowflake_table_cursor_cleanup(mock_snowflake_connection):
         pass
     
     # Verify cursor was closed
-    mock_cursor.close.assert_called_once()
\ No newline at end of file
+    mock_cursor.close.assert_called_once()
+
+def test_read_snowflake_table_keeps_connection_open(mock_snowflake_connection, sample_dataframe):
+    """Test that the connection is only closed when requested."""
+    mock_conn, mock_cursor = mock_snowflake_connection
+    mock_cursor.fetch_pandas_all.return_value = sample_dataframe
+
+    read_snowflake_table(conn=mock_conn, query="select 1")
+    mock_conn.close.assert_not_called()
+
+    read_snowflake_table(conn=mock_conn, query="select 1", close_connection=True)
+    mock_conn.close.assert_called_once()
+
+
+def test_read_snowflake_batches_uses_connector_batches(mock_snowflake_connection, sample_dataframe):
+    """Test that Snowflake cursors are streamed with fetch_pandas_batches."""
+    mock_conn, mock_cursor = mock_snowflake_connection
+    mock_cursor.fetch_pandas_batches.return_value = iter([sample_dataframe[:2], sample_dataframe[2:]])
+
+    batches = list(read_snowflake_batches(conn=mock_conn, query="select id, name from test_table"))
+
+    assert [len(batch) for batch in batches] == [2, 1]
+    mock_cursor.fetch_pandas_all.assert_not_called()
+    mock_cursor.close.assert_called_once()
+    mock_conn.close.assert_not_called()
+
+def test_read_snowflake_batches_dbapi_fetchmany():
+    """Test that other DB-API connections are streamed with fetchmany."""
+    conn = sqlite3.connect(":memory:")
+    conn.execute("create table test_table (id integer, name text)")
+    conn.executemany("insert into test_table values (?, ?)", [(i, f"name_{i}") for i in range(5)])
+
+    batches = list(read_snowflake_batches(conn=conn, query="select id, name from test_table", batch_size=2))
+
+    assert [len(batch) for batch in batches] == [2, 2, 1]
+    assert list(batches[0].columns) == ['id', 'name']
+    assert batches[2]['name'].tolist() == ['name_4']
+
+def test_read_snowflake_batches_execution_error(mock_snowflake_connection):
+    """Test handling of query execution errors while streaming."""
+    mock_conn, mock_cursor = mock_snowflake_connection
+    mock_cursor.execute.side_effect = Exception("Query execution failed")
+
+    with pytest.raises(Exception) as exc_info:
+        list(read_snowflake_batches(conn=mock_conn, query="select 1"))
+
+    assert "Error reading from Snowflake" in str(exc_info.value)
+    mock_cursor.close.assert_called_once()
+
+def test_read_snowflake_table_arrow(mock_snowflake_connection, sample_dataframe):
+    """Test that Snowflake Arrow results are returned without pandas conversion."""
+    import pyarrow as pa
+
+    mock_conn, mock_cursor = mock_snowflake_connection
+    arrow_table = pa.Table.from_pandas(sample_dataframe)
+    mock_cursor.fetch_arrow_all.return_value = arrow_table
+
+    result = read_snowflake_table(conn=mock_conn, query="select id, name from test_table", arrow=True)
+
+    assert result is arrow_table
+    mock_cursor.fetch_arrow_all.assert_called_once_with(force_return_table=True)
+    mock_cursor.fetch_pandas_all.assert_not_called()
+
+def test_read_snowflake_batches_arrow(mock_snowflake_connection, sample_dataframe):
+    """Test that Snowflake Arrow chunks are yielded as record batches."""
+    import pyarrow as pa
+
+    mock_conn, mock_cursor = mock_snowflake_connection
+    mock_cursor.fetch_arrow_batches.return_value = iter([
+        pa.Table.from_pandas(sample_dataframe.iloc[:2]), pa.Table.from_pandas(sample_dataframe.iloc[2:])
+    ])
+
+    batches = list(read_snowflake_batches(conn=mock_conn, query="select id, name from test_table", arrow=True))
+
+    assert all(isinstance(batch, pa.RecordBatch) for batch in batches)
+    assert pa.Table.from_batches(batches).column('name').to_pylist() == ['Alice', 'Bob', 'Charlie']
+
+def test_read_snowflake_arrow_dbapi_fallback():
+    """Test the Arrow path on a plain DB-API connection."""
+    conn = sqlite3.connect(":memory:")
+    conn.execute("create table t (id integer, name text)")
+    conn.executemany("insert into t values (?, ?)", [(1, 'Alice'), (2, 'Bob'), (3, 'Charlie')])
+
+    table = read_snowflake_table(conn=conn, query="select id, name from t where id > ?", params=(1,), arrow=True)
+    batches = list(read_snowflake_batches(conn=conn, query="select id, name from t", batch_size=2, arrow=True))
+
+    assert table.to_pydict() == {'id': [2, 3], 'name': ['Bob', 'Charlie']}
+    assert [batch.num_rows for batch in batches] == [2, 1]
+
+def test_read_snowflake_table_duckdb_arrow():
+    """Test that DuckDB results are fetched as Arrow without the deprecated cursor methods."""
+    duckdb = pytest.importorskip("duckdb")
+    conn = duckdb.connect()
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("error", DeprecationWarning)
+        table = read_snowflake_table(conn=conn, query="select range as id from range(?)", params=[3], arrow=True)
+
+    assert table.column('id').to_pylist() == [0, 1, 2]
@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+from monitoring.local_backend import LANDING_COLUMNS
+from monitoring.synthetic_data import INVOICES_SCHEMA, load_seed_profile, organization_activity, write_synthetic_landing
+
+@pytest.fixture(scope="module")
+def synthetic_dir(tmp_path_factory):
+    """Fixture with a small synthetic landing directory, written in several chunks."""
+    output_dir = tmp_path_factory.mktemp("synthetic")
+    write_synthetic_landing(output_dir, n_invoices=5000, n_organizations=300, seed=7, chunk_size=2000)
+    return output_dir
+
+def test_write_synthetic_landing_row_counts_and_schema(synthetic_dir):
+    """Test that every chunk lands in one file with the landing columns."""
+    invoices = pq.read_table(synthetic_dir / "invoices_sample.parquet")
+    organizations = pd.read_parquet(synthetic_dir / "organizations.parquet")
+
+    assert invoices.num_rows == 5000
+    assert invoices.schema.equals(INVOICES_SCHEMA)
+    assert len(organizations) == 300
+    assert set(organizations.columns) == set(LANDING_COLUMNS["organizations"])
+    assert organizations["ORGANIZATION_ID"].is_unique
+    assert set(invoices.column("ORGANIZATION_ID").to_pylist()) <= set(organizations["ORGANIZATION_ID"])
+
+def test_synthetic_invoices_follow_the_seed_distributions(synthetic_dir):
+    """Test that categorical values and dates stay within the seed profile."""
+    seed = load_seed_profile()["invoices"]
+    invoices = pd.read_parquet(synthetic_dir / "invoices_sample.parquet")
+
+    assert set(invoices["STATUS"]) <= set(seed["STATUS"])
+    assert abs((invoices["STATUS"] == "paid").mean() - (seed["STATUS"] == "paid").mean()) < 0.05
+    assert invoices["CREATED_AT"].min() >= seed["CREATED_AT"].min()
+    assert invoices["CREATED_AT"].max() <= seed["CREATED_AT"].max()
+    # Payment amounts stay null when the seed invoice had none
+    assert abs(invoices["PAYMENT_AMOUNT"].isna().mean() - seed["PAYMENT_AMOUNT"].isna().mean()) < 0.05
+
+def test_write_synthetic_landing_is_reproducible(tmp_path):
+    """Test that the same seed gives the same files, whatever the chunk size."""
+    write_synthetic_landing(tmp_path / "a", n_invoices=500, seed=3, chunk_size=100)
+    write_synthetic_landing(tmp_path / "b", n_invoices=500, seed=3, chunk_size=100)
+    write_synthetic_landing(tmp_path / "c", n_invoices=500, seed=4, chunk_size=100)
+
+    a = pd.read_parquet(tmp_path / "a" / "invoices_sample.parquet")
+    pd.testing.assert_frame_equal(a, pd.read_parquet(tmp_path / "b" / "invoices_sample.parquet"))
+    assert not a.equals(pd.read_parquet(tmp_path / "c" / "invoices_sample.parquet"))
+
+def test_organization_activity_is_heavy_tailed():
+    """Test that a few organizations get a large share of the invoices."""
+    weights = organization_activity(10000, np.random.default_rng(0))
+
+    assert weights.sum() == pytest.approx(1.0)
+    assert np.sort(weights)[-100:].sum() > 0.1
+
+def test_synthetic_landing_builds_locally(synthetic_dir):
+    """Test that the synthetic files load into the local backend and the models build on them."""
+    pytest.importorskip("duckdb")
+    pytest.importorskip("jinja2")
+    from monitoring.local_backend import create_duckdb_connector
+
+    conn = create_duckdb_connector(seeds_dir=synthetic_dir)
+    try:
+        assert conn.execute(
+            "select count(*) from deel_takehome_dev.ehernani_staging.stg__invoices"
+        ).fetchone()[0] == 5000
+        assert conn.execute(
+            "select count(*) from deel_takehome_dev.ehernani_fact_tables.fct__organizations_balance"
+        ).fetchone()[0] > 0
+    finally:
+        conn.close()
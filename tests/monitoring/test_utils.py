@@ -1,5 +1,8 @@
 import pytest
-from monitoring.utils import format_monitoring_results
+from unittest.mock import Mock
+import pandas as pd
+import pyarrow as pa
+from monitoring.utils import MonitoringSummary, format_monitoring_results, is_dataframe, summarize_monitoring_results
 
 @pytest.fixture
 def sample_results():
@@ -36,6 +39,24 @@ def test_format_monitoring_results_with_data(sample_results):
     # Verify only top 5 records are shown
     assert len(lines) == 24  # Header + 5 records with their details
 
+def test_format_monitoring_results_with_dimensions(sample_results):
+    """Test that the organization attributes are displayed under the records found in the dimension"""
+    dimensions = Mock()
+    dimensions.lookup.return_value = [{'legal_entity_country_code': 'US', 'days_since_last_payment': 3}, None]
+
+    formatted = format_monitoring_results(
+        results=sample_results[:2],
+        table_name='test_table',
+        target_column='amount',
+        dimensions=dimensions
+    )
+
+    lines = formatted.split('\n')
+    dimensions.lookup.assert_called_once_with(['1', '2'])
+    assert lines[8:10] == ["   Legal entity country code: US", "   Days since last payment: 3"]
+    assert lines[11] == "2. ID: 2"
+    assert len(lines) == 14
+
 def test_format_monitoring_results_empty():
     """Test formatting results when no records exceed threshold"""
     formatted = format_monitoring_results(
@@ -74,4 +95,131 @@ def test_format_monitoring_results_less_than_five_records():
     assert lines[9] == "2. ID: 2"
     
     # Verify correct number of lines
-    assert len(lines) == 12  # Header + 2 records with their details 
\ No newline at end of file
+    assert len(lines) == 12  # Header + 2 records with their details 
+
+def test_format_monitoring_results_with_total_count(sample_results):
+    """Test that the total count is reported when only the top records are given"""
+    formatted = format_monitoring_results(
+        results=sample_results[:5],
+        table_name='test_table',
+        target_column='amount',
+        total_count=1000
+    )
+
+    lines = formatted.split('\n')
+    assert lines[1] == "Found 1000 records exceeding threshold"
+    assert len(lines) == 24
+
+def test_summarize_monitoring_results_across_batches(sample_results):
+    """Test that the summary keeps the count and the top records over several batches"""
+    records = pd.DataFrame(sample_results).rename(columns=str.upper)
+    # Shuffle the records across batches so that the top ones are not in the first batch
+    batches = [records.iloc[[5, 3]], records.iloc[[4, 0]], records.iloc[[2, 1]]]
+
+    total_count, top_records = summarize_monitoring_results(batches, top_k=3)
+
+    assert total_count == 6
+    assert [record['id'] for record in top_records] == ['1', '2', '3']
+    assert top_records[0] == {'id': '1', 'value': 200.0, 'difference': 100.0}
+
+def test_summarize_monitoring_results_ties_keep_arrival_order():
+    """Test that records with the same difference are ranked by arrival order"""
+    batches = [
+        pd.DataFrame({'id': ['a', 'b'], 'value': [1.0, 1.0], 'difference': [5.0, 5.0]}),
+        pd.DataFrame({'id': ['c'], 'value': [1.0], 'difference': [5.0]}),
+    ]
+
+    _, top_records = summarize_monitoring_results(batches, top_k=2)
+
+    assert [record['id'] for record in top_records] == ['a', 'b']
+
+def test_monitoring_summary_memory_is_bounded():
+    """Test that the summary never keeps more than top_k records"""
+    summary = MonitoringSummary(top_k=5)
+    for start in range(0, 1000, 100):
+        summary.add(pd.DataFrame({
+            'id': range(start, start + 100),
+            'value': range(start, start + 100),
+            'difference': range(start, start + 100),
+        }))
+
+    assert summary.total_count == 1000
+    assert len(summary._heap) == 5
+    assert [record['id'] for record in summary.top_records] == [999, 998, 997, 996, 995]
+
+def test_summarize_monitoring_results_empty():
+    """Test that an empty stream gives an empty summary"""
+    assert summarize_monitoring_results([]) == (0, [])
+
+def test_format_monitoring_results_top_k(sample_results):
+    """Test that the number of records displayed is configurable"""
+    formatted = format_monitoring_results(
+        results=sample_results,
+        table_name='test_table',
+        target_column='amount',
+        top_k=2
+    )
+
+    lines = formatted.split('\n')
+    assert lines[3] == "Top 2 records:"
+    assert len(lines) == 12
+
+def test_summarize_monitoring_results_pushdown_count():
+    """Test that the warehouse total count is used instead of counting rows"""
+    batches = [pd.DataFrame({
+        'ID': ['1', '2'],
+        'VALUE': [200.0, 180.0],
+        'DIFFERENCE': [100.0, 80.0],
+        'TOTAL_COUNT': [42, 42]
+    })]
+
+    total_count, top_records = summarize_monitoring_results(batches)
+
+    assert total_count == 42
+    assert top_records[0] == {'id': '1', 'value': 200.0, 'difference': 100.0}
+
+def test_format_monitoring_results_columnar(sample_results):
+    """Test that columnar results are formatted like the list of records"""
+    import pyarrow as pa
+
+    expected = format_monitoring_results(sample_results, 'test_table', 'amount')
+    df = pd.DataFrame(sample_results).rename(columns=str.upper)
+
+    assert format_monitoring_results(df, 'test_table', 'amount') == expected
+    assert format_monitoring_results(pa.Table.from_pandas(df), 'test_table', 'amount') == expected
+    assert format_monitoring_results(pa.table({'ID': [], 'VALUE': [], 'DIFFERENCE': []}), 'test_table', 'amount') == \
+        "No records found exceeding threshold in test_table.amount"
+
+def test_summarize_monitoring_results_arrow_matches_pandas():
+    """Test that Arrow batches are summarized like the equivalent DataFrames, ties and nulls included"""
+    import pyarrow as pa
+
+    batches = [
+        pd.DataFrame({'ID': ['1', '2', '3'], 'VALUE': [150.0, 170.0, None], 'DIFFERENCE': [50.0, 70.0, None]}),
+        pd.DataFrame({'ID': ['4', '5'], 'VALUE': [170.0, 120.0], 'DIFFERENCE': [70.0, 20.0]}),
+    ]
+
+    pandas_count, pandas_top = summarize_monitoring_results(batches, top_k=3)
+    arrow_count, arrow_top = summarize_monitoring_results(
+        [pa.RecordBatch.from_pandas(batch) for batch in batches], top_k=3
+    )
+
+    assert arrow_count == pandas_count == 5
+    assert [record['id'] for record in arrow_top] == [record['id'] for record in pandas_top] == ['2', '4', '1']
+
+def test_summarize_monitoring_results_arrow_pushdown_count():
+    """Test that the warehouse count is used for Arrow batches"""
+    import pyarrow as pa
+
+    batch = pa.table({'ID': ['1', '2'], 'VALUE': [200.0, 180.0], 'DIFFERENCE': [100.0, 80.0], 'TOTAL_COUNT': [42, 42]})
+
+    total_count, top_records = summarize_monitoring_results([batch], top_k=2)
+
+    assert total_count == 42
+    assert top_records[0] == {'id': '1', 'value': 200.0, 'difference': 100.0}
+
+def test_is_dataframe():
+    """Test that only pandas DataFrames are recognized as DataFrames"""
+    assert is_dataframe(pd.DataFrame({"id": [1]}))
+    assert not is_dataframe(pa.table({"id": [1]}))
+    assert not is_dataframe([{"id": 1}])
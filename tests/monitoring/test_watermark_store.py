@@ -0,0 +1,64 @@
+import json
+from datetime import date
+import pandas as pd
+import pytest
+from monitoring.watermark_store import (
+    JsonWatermarkStore,
+    SqliteWatermarkStore,
+    create_watermark_store,
+    format_watermark,
+    watermark_key,
+)
+
+@pytest.fixture(params=["watermarks.json", "watermarks.db"])
+def store(request, tmp_path):
+    return create_watermark_store(tmp_path / "state" / request.param)
+
+def test_create_watermark_store_picks_implementation(tmp_path):
+    """Test that the store implementation follows the file suffix."""
+    assert isinstance(create_watermark_store(tmp_path / "w.json"), JsonWatermarkStore)
+    assert isinstance(create_watermark_store(tmp_path / "w.sqlite"), SqliteWatermarkStore)
+
+def test_store_get_and_set(store):
+    """Test that watermarks are stored per key and overwritten on update."""
+    assert store.get("rule_a") is None
+
+    store.set("rule_a", "2024-01-01")
+    store.set("rule_b", "2024-02-01")
+    store.set("rule_a", "2024-03-01")
+
+    assert store.get("rule_a") == "2024-03-01"
+    assert store.get("rule_b") == "2024-02-01"
+
+def test_store_is_persisted(store):
+    """Test that a new store on the same path sees the previous updates."""
+    store.set("rule_a", "2024-01-01")
+
+    assert create_watermark_store(store.path).get("rule_a") == "2024-01-01"
+
+def test_json_store_replaces_file_atomically(tmp_path):
+    """Test that updates leave only the complete JSON file behind."""
+    path = tmp_path / "watermarks.json"
+    store = JsonWatermarkStore(path)
+
+    store.set("rule_a", "2024-01-01")
+    store.set("rule_b", "2024-02-01")
+
+    assert [p.name for p in tmp_path.iterdir()] == ["watermarks.json"]
+    assert json.loads(path.read_text()) == {"rule_a": "2024-01-01", "rule_b": "2024-02-01"}
+
+def test_watermark_key():
+    """Test that keys are case-insensitive on identifiers and include the threshold."""
+    assert watermark_key("FCT", "Balance", 50, "DB", "Schema") == "db.schema.fct.balance > 50.0"
+    assert watermark_key("fct", "balance", 50, "db", "schema") != watermark_key("fct", "balance", 75, "db", "schema")
+    assert watermark_key("fct", "balance", 3, "db", "schema", mode="zscore", window=30) == \
+        "db.schema.fct.balance zscore(30) > 3.0"
+
+def test_format_watermark():
+    """Test the conversion of warehouse date values."""
+    assert format_watermark(date(2024, 3, 1)) == "2024-03-01"
+    assert format_watermark(pd.Timestamp("2024-03-01 10:30:00")) == "2024-03-01T10:30:00"
+    assert format_watermark("2024-03-01") == "2024-03-01"
+    assert format_watermark(None) is None
+    assert format_watermark(pd.NaT) is None
+    assert format_watermark(float("nan")) is None